@@ -33,15 +33,27 @@
 ###########################################################################################
 
 import asyncio
+import json
+from datetime import datetime, timezone
 
 from gdrive_helper_code import GDriveHelper
+from gdrive_client_pool_code import GDriveClientPool
+from job_scheduler_code import (BacklogFullError, ShortestJobFirstScheduler, estimate_gfile_audio_seconds,
+                                get_real_time_factor_tracker)
 from audio_transcriber_code import AudioTranscriber
 from workflow_states_code import WorkflowEnum
-from workflow_tracker_code import WorkflowTracker
+from workflow_tracker_code import WorkflowTracker, AUDIO_QUALITY_MAP
 from workflow_error_code import async_error_handler
 from logger_code import LoggerBase
+from metrics_code import get_metrics_registry
+from profiling_code import profile_job
+from tracing_code import job_trace
 from env_settings_code import get_settings
 from pydantic_models import GDriveInput
+from work_lease_code import LeaseLostError, LeaseManager, parse_lease
+
+# The duration assumed for an mp3 file whose duration can't be estimated.
+UNKNOWN_AUDIO_SECONDS = 3600
 
 @async_error_handler(error_message = 'Errored attempting to manage mp3 audio file transcription.')
 async def main():
@@ -57,8 +69,17 @@ async def main():
     1. Setup logger for process monitoring.
     2. Retrieve environment settings for Google Drive folder ID.
     3. List mp3 files in the folder pending transcription.
-    4. For each file, check and update transcription status.
-    5. If not already transcribed, initiate transcription process.
+    4. Estimate how long each file takes to transcribe, from its duration and the speed of the model on this
+       host, and queue it. Files beyond the backlog limit ('job_max_backlog_seconds') are left for a later run.
+    5. Take the files shortest first (with aging, so long files get their turn), check and update their
+       transcription status, and transcribe the ones not transcribed yet. A file whose transcription failed
+       or was interrupted is resumed from its last completed step (see AudioTranscriber.find_resume_point):
+       e.g. only its transcript is uploaded if that was the step that failed.
+
+    Several hosts can run main() on the same folder. Each file is transcribed under a lease (see work_lease_code):
+    a file another worker holds a lease on is skipped, and a worker whose lease is taken over stops working on
+    the file. When a worker has run out of files while others still hold leases, it waits, and takes over the
+    files whose leases expire (their worker died) until every file is done.
 
     The process relies on environment settings for Google Drive configurations and assumes
     the presence of a structured error handling mechanism to manage potential transcription errors.
@@ -67,20 +88,92 @@ async def main():
     settings = get_settings()
     gh = GDriveHelper()
     folder_id = settings.gdrive_mp3_folder_id
-    gfiles_to_process = await gh.list_files_to_transcribe(folder_id)
-    logger.info(f"Number of Files to process: {len(gfiles_to_process)}")
-
-    for g_file in gfiles_to_process:
-        gdrive_input = GDriveInput(gdrive_id=g_file['id'])
-        # For debug sanity check, get the name of the file.
-        filename = await gh.get_filename(gdrive_input)
-        logger.debug(f"mp3 filename: {filename}, gfile_id: {gdrive_input.gdrive_id}")
-        await gh.sync_workflowTracker_from_gfile_description(gdrive_input)
-        logger.flow(f"\n---------\n {WorkflowTracker.get_model().model_dump_json(indent=4)}")
-        status = WorkflowTracker.get('status')
-        if status != WorkflowEnum.TRANSCRIPTION_UPLOAD_COMPLETE.name:
-            transcriber = AudioTranscriber()
-            await transcriber.transcribe(input_mp3 = gdrive_input)
+    transcriber = AudioTranscriber()
+    lease_manager = LeaseManager(gh, owner=settings.worker_id or None, ttl_seconds=settings.lease_ttl_seconds,
+                                 heartbeat_seconds=settings.lease_heartbeat_seconds)
+    real_time_factors = get_real_time_factor_tracker()
+    model_name = AUDIO_QUALITY_MAP["default"]
+    # The files this run has tried, so a file that failed isn't tried again and again.
+    attempted = set()
+    while True:
+        gfiles_to_process = await gh.list_files_to_transcribe(folder_id)
+        logger.info(f"Number of Files to process: {len(gfiles_to_process)}")
+        job_scheduler = ShortestJobFirstScheduler(max_backlog_seconds=settings.job_max_backlog_seconds,
+                                                  aging_factor=settings.job_aging_factor)
+        # When the first lease held by another worker runs out.
+        next_lease_expiry = None
+        # Files are admitted oldest first, so a file left out for lack of room gets in on a later run. Among the admitted
+        # files, the shortest run first.
+        for g_file in sorted(gfiles_to_process, key=lambda g_file: g_file.get('createdDate') or ''):
+            if g_file['id'] in attempted or _listed_status(g_file) == WorkflowEnum.TRANSCRIPTION_UPLOAD_COMPLETE.name:
+                continue
+            owner, expires_at, _ = parse_lease(g_file.get('description'))
+            if owner and owner != lease_manager.owner and expires_at and expires_at > datetime.now(timezone.utc):
+                next_lease_expiry = min(next_lease_expiry or expires_at, expires_at)
+                continue
+            audio_seconds = await estimate_gfile_audio_seconds(gh, g_file) or UNKNOWN_AUDIO_SECONDS
+            cost_seconds = real_time_factors.estimate_seconds(audio_seconds, model_name, "float16")
+            try:
+                job_scheduler.submit(g_file['id'], g_file, cost_seconds)
+            except BacklogFullError as e:
+                logger.info(f"Leaving {g_file.get('title')} for a later run: {e}")
+        logger.info(f"Transcription jobs: {job_scheduler.stats()}")
+
+        while (job := job_scheduler.next_job()) is not None:
+            attempted.add(job.job_id)
+            try:
+                # The spans of the file's work are a trace of their own, named after the file. The file is profiled
+                # if the profile_jobs or profile_sample_every setting says so.
+                with job_trace(job.job_id), profile_job(job.job_id):
+                    await _transcribe_under_lease(GDriveInput(gdrive_id=job.job_id), transcriber, gh, lease_manager, logger, job.cost_seconds)
+            finally:
+                job_scheduler.job_done(job)
+        if next_lease_expiry is None:
+            break
+        # Other workers hold leases. Look again when the first expires, or after a heartbeat to catch released ones.
+        wait_seconds = min(max(0.0, (next_lease_expiry - datetime.now(timezone.utc)).total_seconds()), lease_manager.heartbeat_seconds)
+        logger.info(f"Other workers hold leases. Looking again in {wait_seconds:.0f}s.")
+        await asyncio.sleep(wait_seconds)
+    logger.debug(f"GDrive client pool: {GDriveClientPool.stats()}")
+    logger.debug(f"GDrive requests: {gh.scheduler.metrics()}")
+    logger.info(f"Metrics of this run:\n{get_metrics_registry().summary()}")
+
+async def _transcribe_under_lease(gdrive_input: GDriveInput, transcriber: AudioTranscriber, gh: GDriveHelper,
+                                  lease_manager: LeaseManager, logger, cost_seconds: float) -> None:
+    """
+    Claims the mp3 file and transcribes it while holding the lease. Skips it if another worker has claimed it.
+    """
+    lease = await lease_manager.try_claim(gdrive_input.gdrive_id)
+    if lease is None:
+        logger.info(f"Skipping gfile {gdrive_input.gdrive_id}: it is transcribed already or another worker has claimed it.")
+        return
+    lost = False
+    try:
+        async with lease_manager.hold(lease):
+            # For debug sanity check, get the name of the file.
+            filename = await gh.get_filename(gdrive_input)
+            logger.debug(f"mp3 filename: {filename}, gfile_id: {gdrive_input.gdrive_id}, estimated processing: {cost_seconds:.0f}s")
+            await gh.sync_workflowTracker_from_gfile_description(gdrive_input)
+            logger.flow(f"\n---------\n {WorkflowTracker.get_model().model_dump_json(indent=4)}")
+            status = WorkflowTracker.get('status')
+            if status != WorkflowEnum.TRANSCRIPTION_UPLOAD_COMPLETE.name:
+                # A file whose workflow failed or was interrupted carries on from its last completed step.
+                await transcriber.transcribe(input_mp3 = gdrive_input, resume = True)
+    except LeaseLostError as e:
+        lost = True
+        logger.warning(f"Stopped working on gfile {gdrive_input.gdrive_id}: {e}")
+    finally:
+        if not lost:
+            await lease_manager.release(lease)
+
+def _listed_status(g_file: dict):
+    """
+    Returns the workflow status kept in the description of a listed gfile, or None if it has none.
+    """
+    try:
+        return json.loads(g_file.get('description') or '{}').get('status')
+    except (ValueError, AttributeError):
+        return None
 
 
 if __name__ == "__main__":
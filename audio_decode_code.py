@@ -0,0 +1,403 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: Ingestion of audio and video files of any format ffmpeg reads (mp4, mkv, m4a, wav, mp3, ...). Each file
+# is decoded by ffmpeg straight to the 16 kHz mono PCM Whisper takes, and kept in a decode cache of .npy
+# files named after the SHA-256 of the file, so a file is decoded once however often it is transcribed.
+# Decoding runs in a pool of worker processes, one per core, so a whole directory is decoded concurrently.
+# This replaces the utilities/to_mp3 step, which re-encoded each file to an mp3 that was then decoded again.
+# 
+# Usage: python audio_decode_code.py PATH [PATH ...] [--recursive] [--workers N] [--transcribe]
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import argparse
+import asyncio
+import functools
+import hashlib
+import io
+import os
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Sequence, Union
+
+import numpy as np
+
+from env_settings_code import get_settings
+from workflow_error_code import async_error_handler
+
+# Whisper's sampling rate.
+SAMPLE_RATE = 16_000
+# The decoded samples: 16-bit little-endian PCM, as ffmpeg writes it ('-f s16le').
+PCM_DTYPE = np.dtype('<i2')
+# The files a directory is searched for. Files named on the command line are decoded whatever their extension.
+AUDIO_EXTENSIONS = frozenset({'.mp3', '.m4a', '.aac', '.wav', '.flac', '.ogg', '.opus', '.wma', '.amr',
+                              '.mp4', '.m4v', '.mkv', '.mov', '.avi', '.webm', '.wmv', '.flv', '.3gp'})
+READ_CHUNK_BYTES = 1024 * 1024
+
+
+class AudioDecodeError(Exception):
+    """
+    ffmpeg couldn't be run, or couldn't decode the audio of a file.
+    """
+
+
+class DecodedAudio(NamedTuple):
+    """
+    A file decoded into the decode cache.
+
+    Attributes:
+        source (Path): The audio or video file.
+        sha256 (str): The SHA-256 of the file, which names its samples in the cache.
+        pcm_path (Path): The .npy file of the samples.
+        samples (int): The number of samples.
+        sample_rate (int): The samples per second.
+        cached (bool): Whether the samples were in the cache already, so the file wasn't decoded.
+    """
+    source: Path
+    sha256: str
+    pcm_path: Path
+    samples: int
+    sample_rate: int
+    cached: bool
+
+    @property
+    def duration_seconds(self) -> float:
+        return self.samples / self.sample_rate
+
+
+class DecodeCache:
+    """
+    The decoded samples of audio files, one .npy file of 16-bit mono PCM per file and sample rate, named after the
+    SHA-256 of the file. Files are written under a temporary name and renamed once complete, so a reader (another
+    worker, or another process) never sees a partly decoded file. Reading a file marks it as used; prune() deletes
+    the least recently used files once the cache is larger than max_bytes.
+    """
+    def __init__(self, directory, max_bytes: int = 0, sample_rate: int = SAMPLE_RATE):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.sample_rate = sample_rate
+
+    def path(self, sha256: str) -> Path:
+        return self.directory / f'{sha256}.{self.sample_rate}hz.npy'
+
+    def samples(self, sha256: str) -> Optional[int]:
+        """
+        Returns the number of samples of the file with this SHA-256, or None if they aren't in the cache (or the
+        cached file is damaged, e.g. cut short by a crash). Marks the file as used.
+        """
+        path = self.path(sha256)
+        try:
+            with open(path, 'rb') as f:
+                np.lib.format.read_magic(f)
+                shape, _, dtype = np.lib.format.read_array_header_1_0(f)
+                complete = dtype == PCM_DTYPE and len(shape) == 1 and os.fstat(f.fileno()).st_size == f.tell() + shape[0] * PCM_DTYPE.itemsize
+            if not complete:
+                return None
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return shape[0]
+
+    def load(self, sha256: str) -> Optional[np.ndarray]:
+        """
+        Returns the samples of the file with this SHA-256 as the float32 values in [-1, 1] Whisper takes, or None if
+        they aren't in the cache.
+        """
+        if self.samples(sha256) is None:
+            return None
+        pcm = np.load(self.path(sha256), mmap_mode='r')
+        audio = pcm.astype(np.float32)
+        audio *= 1 / 32768.0
+        return audio
+
+    def store(self, sha256: str, pcm_chunks: Iterable[bytes]) -> int:
+        """
+        Writes the samples of the file with this SHA-256 as they come, in chunks of 16-bit mono PCM bytes, and returns
+        how many there were. The header is written first for no samples and rewritten in place at the end (numpy pads
+        the header so the shape can grow), so the samples are never held in memory. Nothing is stored if reading the
+        chunks raises.
+        """
+        path = self.path(sha256)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(f'{path.name}.{os.getpid()}-{threading.get_ident()}.partial')
+        try:
+            with open(partial, 'wb') as f:
+                offset = _write_pcm_header(f, 0)
+                size = 0
+                for chunk in pcm_chunks:
+                    f.write(chunk)
+                    size += len(chunk)
+                samples = size // PCM_DTYPE.itemsize
+                # A stream cut off within a sample ends in an odd byte.
+                f.truncate(offset + samples * PCM_DTYPE.itemsize)
+                f.seek(0)
+                if _write_pcm_header(f, samples) != offset:
+                    raise AudioDecodeError(f"The header of {path} can't be rewritten in place for {samples} samples.")
+            os.replace(partial, path)
+        except BaseException:
+            partial.unlink(missing_ok=True)
+            raise
+        return samples
+
+    def size_bytes(self) -> int:
+        return sum(entry.stat().st_size for entry in self.directory.glob('*.npy'))
+
+    def prune(self, keep: Optional[Path] = None) -> int:
+        """
+        Deletes the least recently used files until the cache is no larger than max_bytes (0: no limit), except the
+        file `keep` (e.g. the one just decoded, which is about to be read). Returns the number of files deleted.
+        """
+        if not self.max_bytes or not self.directory.is_dir():
+            return 0
+        entries = []
+        for path in self.directory.glob('*.npy'):
+            try:
+                entries.append((path.stat(), path))
+            except FileNotFoundError:
+                # Pruned by another process meanwhile.
+                continue
+        total = sum(stat.st_size for stat, _ in entries)
+        deleted = 0
+        for stat, path in sorted(entries, key=lambda entry: entry[0].st_mtime):
+            if total <= self.max_bytes:
+                break
+            if keep is not None and path == Path(keep):
+                continue
+            path.unlink(missing_ok=True)
+            total -= stat.st_size
+            deleted += 1
+        return deleted
+
+
+def _write_pcm_header(f, samples: int) -> int:
+    header = io.BytesIO()
+    np.lib.format.write_array_header_1_0(header, {'descr': np.lib.format.dtype_to_descr(PCM_DTYPE),
+                                                  'fortran_order': False, 'shape': (samples,)})
+    f.write(header.getvalue())
+    return header.tell()
+
+def file_sha256(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(READ_CHUNK_BYTES), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def ffmpeg_pcm_chunks(source, sample_rate: int = SAMPLE_RATE, ffmpeg: str = 'ffmpeg') -> Iterator[bytes]:
+    """
+    Yields the audio of a file as 16-bit mono PCM at sample_rate, in the chunks ffmpeg writes it to its standard
+    output. Video streams are skipped, and ffmpeg mixes the channels down and resamples. Raises AudioDecodeError,
+    with what ffmpeg said, once the output ends if ffmpeg failed.
+    """
+    command = [ffmpeg, '-nostdin', '-loglevel', 'error', '-i', str(source), '-vn', '-ac', '1', '-ar', str(sample_rate),
+               '-f', 's16le', 'pipe:1']
+    # ffmpeg's messages go to a file rather than a pipe, which could fill up and stall ffmpeg while its output is read.
+    with tempfile.TemporaryFile() as messages:
+        try:
+            process = subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=messages)
+        except OSError as e:
+            raise AudioDecodeError(f"Could not run {ffmpeg} (the ffmpeg_path setting): {e}") from e
+        try:
+            yield from iter(lambda: process.stdout.read(READ_CHUNK_BYTES), b'')
+        except BaseException:
+            # The reader stopped early.
+            process.kill()
+            raise
+        finally:
+            process.stdout.close()
+            process.wait()
+        if process.returncode != 0:
+            messages.seek(0)
+            said = messages.read()[-2000:].decode('utf-8', errors='replace').strip()
+            raise AudioDecodeError(f"ffmpeg could not decode {source}: {said or f'exit status {process.returncode}'}")
+
+def decode_file(source, cache: DecodeCache, ffmpeg: str = 'ffmpeg', sha256: Optional[str] = None) -> DecodedAudio:
+    """
+    Decodes a file into the decode cache, unless its samples are there already, and prunes the cache. Blocking: it
+    runs in a worker process of an AudioDecodePool, or in an executor thread.
+
+    Parameters:
+        source: The audio or video file.
+        cache (DecodeCache): The cache, which also sets the sample rate.
+        ffmpeg (str): The ffmpeg executable.
+        sha256 (str): Optional. The SHA-256 of the file, if it is known (e.g. computed while the file was copied).
+    """
+    source = Path(source)
+    sha256 = sha256 or file_sha256(source)
+    samples = cache.samples(sha256)
+    cached = samples is not None
+    if not cached:
+        samples = cache.store(sha256, ffmpeg_pcm_chunks(source, cache.sample_rate, ffmpeg))
+        if samples == 0:
+            cache.path(sha256).unlink(missing_ok=True)
+            raise AudioDecodeError(f"{source} has no audio.")
+        cache.prune(keep=cache.path(sha256))
+    return DecodedAudio(source, sha256, cache.path(sha256), samples, cache.sample_rate, cached)
+
+def decode_cache_dir() -> Path:
+    """
+    The decode_cache_dir setting, by default decode_cache in local_mp3_dir.
+    """
+    settings = get_settings()
+    return Path(settings.decode_cache_dir or Path(settings.local_mp3_dir) / 'decode_cache')
+
+def open_decode_cache(sample_rate: int = SAMPLE_RATE) -> DecodeCache:
+    """
+    Opens the decode cache in decode_cache_dir, of at most decode_cache_max_bytes.
+    """
+    return DecodeCache(decode_cache_dir(), get_settings().decode_cache_max_bytes, sample_rate)
+
+def load_decoded_audio(source, sha256: Optional[str] = None, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Returns the float32 samples of a file at sample_rate, from the decode cache, decoding the file into the cache
+    first if they aren't there. Blocking: for executor threads. ffmpeg runs in a process of its own, so the thread
+    only waits for it.
+    """
+    cache = open_decode_cache(sample_rate)
+    decoded = decode_file(source, cache, get_settings().ffmpeg_path, sha256)
+    audio = cache.load(decoded.sha256)
+    if audio is None:
+        raise AudioDecodeError(f"The decoded samples of {source} were removed from {cache.directory} before they were read.")
+    return audio
+
+def list_audio_files(paths: Sequence[Union[str, Path]], recursive: bool = False) -> List[Path]:
+    """
+    The files to decode: the files among paths, whatever their extension, and the files of the directories among
+    paths (and of their subdirectories, if recursive) with an extension in AUDIO_EXTENSIONS.
+    """
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            found = path.rglob('*') if recursive else path.iterdir()
+            files.extend(sorted(entry for entry in found if entry.is_file() and entry.suffix.lower() in AUDIO_EXTENSIONS))
+        else:
+            files.append(path)
+    return files
+
+
+class AudioDecodePool:
+    """
+    Decodes files into the decode cache in a pool of worker processes, one per core by default, so the files of a
+    directory are decoded concurrently. Hashing the file and running ffmpeg both happen in the worker.
+    """
+    def __init__(self, cache: DecodeCache, workers: int = 0, ffmpeg: str = 'ffmpeg'):
+        self.cache = cache
+        self.workers = workers or os.cpu_count() or 1
+        self.ffmpeg = ffmpeg
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @async_error_handler()
+    async def decode(self, source, sha256: Optional[str] = None) -> DecodedAudio:
+        """
+        Decodes a file into the cache in a worker process, unless its samples are there already.
+        """
+        if self._executor is None:
+            # Created on first use, so a pool that is never used starts no processes.
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(decode_file, source, self.cache, self.ffmpeg, sha256))
+
+    async def decode_all(self, sources: Iterable[Union[str, Path]]) -> List[Union[DecodedAudio, BaseException]]:
+        """
+        Decodes the files concurrently. Returns, in the order of sources, each file's DecodedAudio, or the exception
+        its decoding raised.
+        """
+        return await asyncio.gather(*(self.decode(source) for source in sources), return_exceptions=True)
+
+    async def decode_directory(self, directory, recursive: bool = False) -> List[Union[DecodedAudio, BaseException]]:
+        """
+        Decodes the files of a directory with an extension in AUDIO_EXTENSIONS concurrently, as decode_all().
+        """
+        return await self.decode_all(list_audio_files([directory], recursive))
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+
+async def ingest(paths: Sequence[Union[str, Path]], recursive: bool = False, workers: int = 0, transcribe: bool = False,
+                 audio_quality: str = "default") -> int:
+    """
+    Decodes the files (see list_audio_files) concurrently into the decode cache and prints each as it is done. With
+    transcribe, each file is transcribed as soon as it is decoded, while the others are still being decoded: its
+    transcript is saved and uploaded as in the job workflow, named after the file. Returns the number of files that
+    failed.
+    """
+    # pylint: disable=import-outside-toplevel
+    from audio_transcriber_code import AudioTranscriber
+    from pydantic_models import LocalAudioInput
+    from tracing_code import job_trace
+    from workflow_tracker_code import WorkflowTracker
+    settings = get_settings()
+    sources = list_audio_files(paths, recursive)
+    pool = AudioDecodePool(open_decode_cache(), workers or settings.audio_decode_workers, settings.ffmpeg_path)
+    transcriber = AudioTranscriber() if transcribe else None
+    print(f"Decoding {len(sources)} file(s) in {min(pool.workers, len(sources))} process(es) into {pool.cache.directory}")
+    failed = 0
+    try:
+        for next_decoded in asyncio.as_completed([pool.decode(source) for source in sources]):
+            try:
+                decoded = await next_decoded
+            except Exception as e: # pylint: disable=broad-exception-caught
+                failed += 1
+                print(f"FAILED: {e}")
+                continue
+            print(f"{decoded.source}: {decoded.duration_seconds:.1f}s of audio{' (cached)' if decoded.cached else ''}")
+            if transcriber is None:
+                continue
+            try:
+                with job_trace(decoded.sha256[:16], file=decoded.source.name):
+                    WorkflowTracker.start_job()
+                    text = await transcriber.transcribe(input_mp3=LocalAudioInput(path=decoded.source, sha256=decoded.sha256,
+                                                                                  duration_seconds=decoded.duration_seconds),
+                                                        audio_quality=audio_quality)
+                print(f"  transcribed: {text[:70]}...")
+            except Exception as e: # pylint: disable=broad-exception-caught
+                failed += 1
+                print(f"  FAILED to transcribe: {e}")
+    finally:
+        pool.close()
+    return failed
+
+def main():
+    parser = argparse.ArgumentParser(description="Decode audio and video files to 16 kHz mono PCM in the decode cache, "
+                                                 "and optionally transcribe them.")
+    parser.add_argument('paths', nargs='+', help="Files, and directories whose audio and video files are decoded.")
+    parser.add_argument('--recursive', action='store_true', help="Also decode the files in subdirectories.")
+    parser.add_argument('--workers', type=int, default=0, help="Decoding processes. Defaults to the audio_decode_workers setting.")
+    parser.add_argument('--transcribe', action='store_true', help="Transcribe each file once it is decoded.")
+    parser.add_argument('--audio-quality', default="default", help="The Whisper model to transcribe with (a key of AUDIO_QUALITY_MAP).")
+    args = parser.parse_args()
+    failed = asyncio.run(ingest(args.paths, args.recursive, args.workers, args.transcribe, args.audio_quality))
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
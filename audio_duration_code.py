@@ -0,0 +1,118 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: The audio_duration module estimates how long an mp3 recording is without decoding it. The
+# duration comes from the first MPEG frame header: the frame count of a Xing/Info or VBRI header
+# (written by LAME and ffmpeg), or else the bitrate of a constant bitrate file. When only the file
+# size is known (e.g. from a Drive listing), an assumed bitrate is used.
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+from pathlib import Path
+from typing import Optional
+
+ID3_HEADER_SIZE = 10
+# Enough of the file for an ID3 tag without cover art, the first frame header and its Xing/VBRI header.
+HEAD_SIZE = 64 * 1024
+
+# Layer III bitrates in kbps by bitrate index, for MPEG-1 and for MPEG-2/2.5.
+_BITRATES_MPEG1 = [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320]
+_BITRATES_MPEG2 = [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160]
+# Sample rates by version bits (3 = MPEG-1, 2 = MPEG-2, 0 = MPEG-2.5) and sample rate index.
+_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+
+def _audio_start(head: bytes) -> int:
+    """
+    Returns the offset of the first byte after the ID3v2 tag, or 0 if there is none.
+    """
+    if len(head) < ID3_HEADER_SIZE or head[:3] != b'ID3':
+        return 0
+    size = 0
+    for b in head[6:10]:
+        size = (size << 7) | (b & 0x7F)
+    footer_size = ID3_HEADER_SIZE if head[5] & 0x10 else 0
+    return ID3_HEADER_SIZE + size + footer_size
+
+def mp3_duration_seconds(head: bytes, file_size: int) -> Optional[float]:
+    """
+    Returns the duration of an mp3 file from its first bytes.
+
+    Parameters:
+        head (bytes): The start of the file, e.g. its first HEAD_SIZE bytes.
+        file_size (int): The size of the whole file in bytes.
+
+    Returns:
+        Optional[float]: The duration in seconds, or None if head doesn't reach a valid Layer III frame header.
+    """
+    offset = _audio_start(head)
+    # Skip padding between the tag and the first frame.
+    while offset < len(head) and head[offset] == 0:
+        offset += 1
+    if offset + 4 > len(head) or head[offset] != 0xFF or head[offset + 1] & 0xE0 != 0xE0:
+        return None
+    version = (head[offset + 1] >> 3) & 0x03
+    layer = (head[offset + 1] >> 1) & 0x03
+    bitrate_index = head[offset + 2] >> 4
+    sample_rate_index = (head[offset + 2] >> 2) & 0x03
+    mono = head[offset + 3] >> 6 == 3
+    # Layer III only (layer bits 01), and no reserved or free-format values.
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+    sample_rate = _SAMPLE_RATES[version][sample_rate_index]
+    samples_per_frame = 1152 if version == 3 else 576
+
+    # A Xing/Info header follows the side information of the first frame. Its frame count gives the exact duration.
+    side_info_size = (17 if mono else 32) if version == 3 else (9 if mono else 17)
+    xing = offset + 4 + side_info_size
+    if head[xing:xing + 4] in (b'Xing', b'Info') and len(head) >= xing + 12:
+        flags = int.from_bytes(head[xing + 4:xing + 8], 'big')
+        if flags & 0x01:
+            frames = int.from_bytes(head[xing + 8:xing + 12], 'big')
+            return frames * samples_per_frame / sample_rate
+    # A VBRI header is always 32 bytes after the frame header.
+    vbri = offset + 4 + 32
+    if head[vbri:vbri + 4] == b'VBRI' and len(head) >= vbri + 18:
+        frames = int.from_bytes(head[vbri + 14:vbri + 18], 'big')
+        return frames * samples_per_frame / sample_rate
+
+    # Constant bitrate: every frame has the bitrate of the first one.
+    bitrates = _BITRATES_MPEG1 if version == 3 else _BITRATES_MPEG2
+    return (file_size - offset) * 8 / (bitrates[bitrate_index] * 1000)
+
+def mp3_file_duration_seconds(file_path: Path) -> Optional[float]:
+    """
+    Returns the duration of a local mp3 file in seconds, or None if it can't be told from the frame headers.
+    """
+    file_path = Path(file_path)
+    with open(file_path, 'rb') as f:
+        head = f.read(HEAD_SIZE)
+    return mp3_duration_seconds(head, file_path.stat().st_size)
+
+def duration_from_size_seconds(file_size: int, bitrate_kbps: float) -> float:
+    """
+    Returns the duration of an mp3 file of file_size bytes encoded at bitrate_kbps.
+    """
+    return file_size * 8 / (bitrate_kbps * 1000)
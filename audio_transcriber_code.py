@@ -32,25 +32,41 @@
 # SOFTWARE.
 ###########################################################################################
 import asyncio
+import contextvars
+import functools
+import hashlib
+import time
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Tuple
+from typing import Optional, Tuple
 
-import aiofiles
 from fastapi import UploadFile
-import torch
-from transformers import pipeline
 
+from audio_decode_code import load_decoded_audio
+from audio_duration_code import duration_from_size_seconds, mp3_file_duration_seconds
 from env_settings_code import get_settings
 from gdrive_helper_code import GDriveHelper
+from job_scheduler_code import get_inference_load, get_real_time_factor_tracker
 from logger_code import LoggerBase
+from metrics_code import record_stage, record_transcription
+from model_selector_code import ModelChoice, choose_model
+from mp3_ingest_code import ingest_upload_file
 from pydantic_models import (
                              GDriveInput,
+                             LocalAudioInput,
+                             LocalMP3Input,
+                             MIN_MP3_FILE_SIZE,
                              validate_upload_file)
 from workflow_states_code import WorkflowEnum
 
-from workflow_tracker_code import WorkflowTracker, AUDIO_QUALITY_MAP, COMPUTE_TYPE_MAP
-from workflow_error_code import async_error_handler
+from workflow_tracker_code import WorkflowTracker, AUDIO_QUALITY_MAP, torch_dtype
+from workflow_error_code import async_error_handler, retry_stage
 from status_update_code import update_and_monitor_gdrive_status
+from profiling_code import profile_inference
+from tracing_code import tracing_span
+from transcript_index_code import index_transcript
+from semantic_index_code import embed_transcript
+from topic_model_code import assign_topics
 
 class AudioTranscriber:
     """
@@ -73,25 +89,41 @@ class AudioTranscriber:
 
 
     @async_error_handler()
-    async def transcribe(self,input_mp3=None,audio_quality="default",compute_type="default") -> str:
+    async def transcribe(self,input_mp3=None,audio_quality="default",compute_type="default",deadline_seconds=None,resume=False) -> str:
 
         """
         Transcribes audio to text, orchestrating workflow via WorkflowTracker updates.
 
         Prerequisites:
         - Start with:
-            - input_mp3: GDriveInput or UploadFile datatype set. NOT OPTIONAL.
+            - input_mp3: GDriveInput, UploadFile, LocalMP3Input or LocalAudioInput datatype set. NOT OPTIONAL.
             - transcript_audio_quality: OPTIONAL. One of the text strings within
               AUDIO_QUALITY_MAP.  The default value is "default" by the WorkflowTrackerModel on instance creation.
             - transcript_compute_type: OPTIONAL. This is either "float16" or "float32".
               By default the WorkflowTrackerModel instantiates "default" ("float16").
+            - deadline_seconds: OPTIONAL. The transcript is wanted within this many seconds. The model and
+              compute type are then picked automatically (audio_quality and compute_type are ignored): the
+              most accurate model predicted to finish in time, given the audio duration, the speed of each
+              model measured on this host and the transcriptions already running. The chosen model and the
+              predicted completion time are recorded in the WorkflowTracker.
+            - resume: OPTIONAL. For a GDriveInput whose workflow state has been loaded into the WorkflowTracker from
+              the gfile's description (see GDriveHelper.sync_workflowTracker_from_gfile_description): carry on from
+              the last step the state says was completed, instead of from the start (see find_resume_point).
 
         Workflow Progress:
         1. Validates input source and creates a local copy of the mp3 file.
         2. Uploads the mp3 file to GDrive if it isn't there already. Note: status info is
-           tracked within the description field of the mp3 GDrive file.
-        3. Uses Whisper to translate the audio file to text.
-        4. Uploads resulting transcript to Google Drive.
+           tracked within the description field of the mp3 GDrive file. A LocalAudioInput isn't uploaded (nor
+           deleted afterwards): its status is only kept in the WorkflowTracker, and its transcript is named after it.
+        3. Uses Whisper to translate the audio file to text. This runs while step 2 uploads, so a slow
+           upload doesn't delay the transcription.
+        4. Saves the transcript locally, then uploads it to Google Drive once both steps 2 and 3 are done.
+        5. Adds the transcript to the search index (see transcript_index_code), and to the semantic index if it
+           is on (see semantic_index_code). If topic modelling is on, the transcript is folded into the topic
+           model (see topic_model_code) and its main topics are written with the TRANSCRIPTION_UPLOAD_COMPLETE status.
+
+        The download, transcription and transcript upload are tried again after a failure as their retry policy
+        (the stage_retry_policy setting) allows.
 
         Returns:
             str: The transcribed text.
@@ -99,59 +131,142 @@ class AudioTranscriber:
         Raises:
             -all errors are handled by the @async_error_handler() decorator.
         """
+        start_time = time.monotonic()
         gfile_id = None
-        WorkflowTracker.update(input_mp3=input_mp3,audio_quality=audio_quality,compute_type=compute_type)
         if isinstance(input_mp3, GDriveInput):
             gfile_id = input_mp3.gdrive_id
         mp3_gfile_id = gfile_id if gfile_id else None
-
-        await update_and_monitor_gdrive_status(self.gh,status=WorkflowEnum.START.name,
-        comment= "Starting the transcription workflow.", mp3_gfile_id = mp3_gfile_id)
-
-        # First load the mp3 file (either a GDrive file or uploaded) into a local temporary file
-        mp3_gfile_id, local_mp3_path = await self.create_local_mp3_from_input()
-
-        await update_and_monitor_gdrive_status(self.gh,status = WorkflowEnum.MP3_UPLOADED.name,mp3_gfile_id = mp3_gfile_id,local_mp3_path = local_mp3_path,comment="mp3 file uploaded")
-
-        transcription_text = await self.transcribe_mp3()
-
-        # See if we should delete the temp mp3 file based on the env setting.
-        if self.settings.remove_temp_mp3:
-            local_mp3_path.unlink()
-            self.logger.info(f"Temporary mp3 file {local_mp3_path} deleted successfully.")
-            local_mp3_path = None
-
-        await update_and_monitor_gdrive_status(self.gh,status=WorkflowEnum.TRANSCRIPTION_COMPLETE.name,local_mp3_path=local_mp3_path, comment= f'Success! First 50 chars: {transcription_text[:50]}')
-
-        transcript_gfile_id, local_transcript_file_path = await self.gh.upload_transcript_to_gdrive(transcription_text)
+        resume_point, local_mp3_path, local_transcript_file_path = WorkflowEnum.START, None, None
+        if resume and mp3_gfile_id:
+            resume_point, local_mp3_path, local_transcript_file_path = await self.find_resume_point(input_mp3)
+        # Clear the IDs of a previous job, so the status of an uploaded file isn't written to the previous job's gfile
+        # before its own upload is done.
+        WorkflowTracker.update(input_mp3=input_mp3,audio_quality=audio_quality,compute_type=compute_type,
+                               mp3_gfile_id=mp3_gfile_id, mp3_sha256=None, upload_progress=None, transcript_gdrive_id=None,
+                               audio_duration_seconds=None, chosen_model=None, predicted_completion=None,
+                               deadline=datetime.now(timezone.utc) + timedelta(seconds=deadline_seconds) if deadline_seconds is not None else None)
+
+        if resume_point == WorkflowEnum.TRANSCRIPTION_COMPLETE:
+            # Only the upload of the transcript is left to do.
+            self.logger.info(f"Resuming the workflow of gfile {mp3_gfile_id} at the transcript upload: {local_transcript_file_path} is intact.")
+            transcription_text = await asyncio.to_thread(local_transcript_file_path.read_text, encoding="utf-8")
+        else:
+            if resume_point == WorkflowEnum.MP3_UPLOADED:
+                self.logger.info(f"Resuming the workflow of gfile {mp3_gfile_id} at the transcription: the local copy {local_mp3_path} matches the gfile.")
+            else:
+                await update_and_monitor_gdrive_status(self.gh,status=WorkflowEnum.START.name,
+                comment= "Starting the transcription workflow.", mp3_gfile_id = mp3_gfile_id)
+                # First load the mp3 file (either a GDrive file or uploaded) into a local temporary file
+                mp3_gfile_id, local_mp3_path = await self.create_local_mp3_from_input()
+            if deadline_seconds is not None:
+                await self.choose_model_for_deadline(local_mp3_path, deadline_seconds - (time.monotonic() - start_time))
+
+            await update_and_monitor_gdrive_status(self.gh,status = WorkflowEnum.MP3_UPLOADED.name,mp3_gfile_id = mp3_gfile_id,local_mp3_path = local_mp3_path,comment="mp3 file uploaded")
+
+            # An uploaded mp3 file isn't in GDrive yet. Transcribe the local copy while it is uploaded: the time taken is
+            # the longer of the two instead of their sum. Both have to finish before the job continues.
+            branches = [retry_stage('transcription', self.transcribe_mp3)]
+            if mp3_gfile_id is None and not isinstance(input_mp3, LocalAudioInput):
+                branches.append(self.upload_mp3_in_background(local_mp3_path))
+            results = await asyncio.gather(*branches, return_exceptions=True)
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
+            transcription_text = results[0]
+
+            # See if we should delete the temp mp3 file based on the env setting. The upload has finished with it.
+            if self.settings.remove_temp_mp3 and not isinstance(input_mp3, LocalAudioInput):
+                local_mp3_path.unlink()
+                self.logger.info(f"Temporary mp3 file {local_mp3_path} deleted successfully.")
+                local_mp3_path = None
+
+            # Save the transcript before saying the transcription is complete, so a workflow that fails from here on
+            # is resumed at the transcript upload.
+            transcript_filename = input_mp3.path.stem + '.txt' if isinstance(input_mp3, LocalAudioInput) else None
+            local_transcript_file_path = await self.gh.save_transcript_locally(transcription_text, transcript_filename)
+            WorkflowTracker.update(transcript_sha256=_file_sha256(local_transcript_file_path))
+            await update_and_monitor_gdrive_status(self.gh,status=WorkflowEnum.TRANSCRIPTION_COMPLETE.name,local_mp3_path=local_mp3_path,
+            local_transcript_path=str(local_transcript_file_path), comment= f'Success! First 50 chars: {transcription_text[:50]}')
+
+        transcript_gfile_id, local_transcript_file_path = await retry_stage('transcript_write', self.gh.upload_transcript_to_gdrive,
+                                                                            None, local_transcript_file_path=local_transcript_file_path)
+        transcript_title = local_transcript_file_path.name
 
         # As with the temp mp3 file, delete the temp transcription file if requested to do so based on the env settings.
         if self.settings.remove_temp_transcription:
             local_transcript_file_path.unlink()
             self.logger.info(f"Temporary transcription file {local_transcript_file_path} deleted successfully.")
             local_transcript_file_path = None
+            WorkflowTracker.update(local_transcript_path=None, transcript_sha256=None)
 
+        # The topics go into the workflow status with the status write below. A failure is only logged.
+        topics = await assign_topics(transcript_gfile_id, transcript_title, transcription_text)
+        if topics is not None:
+            WorkflowTracker.update(topics=topics)
         await update_and_monitor_gdrive_status(self.gh,status=WorkflowEnum.TRANSCRIPTION_UPLOAD_COMPLETE.name,
         transcript_gdrive_id=transcript_gfile_id,local_transcript_path= local_transcript_file_path,
         comment= 'Transcript available within the transcript folder (unless moved/deleted).')
+        # Make the transcript searchable. A failure is only logged.
+        await index_transcript(transcript_gfile_id, transcript_title, transcription_text, mp3_file_id=WorkflowTracker.get('mp3_gfile_id'))
+        await embed_transcript(transcript_gfile_id, transcript_title, transcription_text)
 
         return transcription_text
 
+    async def find_resume_point(self, gdrive_input: GDriveInput) -> Tuple[WorkflowEnum, Optional[Path], Optional[Path]]:
+        """
+        Finds the step a failed or interrupted workflow of an mp3 gfile can carry on from, given the workflow state
+        loaded into the WorkflowTracker from the gfile's description. The local files the state refers to are only
+        used if they are intact:
+
+        - TRANSCRIPTION_COMPLETE: the local transcript is used if its SHA-256 is the one recorded with the status.
+          Only the transcript upload is left.
+        - From MP3_UPLOADED on (including a transcript that isn't intact): the local copy of the mp3 file is used if
+          its MD5 matches the md5Checksum Drive keeps for the gfile. The download is skipped.
+        - Otherwise the workflow starts over.
+
+        Parameters:
+            gdrive_input (GDriveInput): The mp3 gfile.
+
+        Returns:
+            Tuple[WorkflowEnum, Optional[Path], Optional[Path]]: The state to carry on from (START, MP3_UPLOADED or
+            TRANSCRIPTION_COMPLETE), the local mp3 file to transcribe and the local transcript to upload.
+        """
+        status = WorkflowTracker.get('status')
+        resumable = [WorkflowEnum.MP3_UPLOADED.name, WorkflowEnum.TRANSCRIBING.name,
+                     WorkflowEnum.TRANSCRIPTION_FAILED.name, WorkflowEnum.TRANSCRIPTION_COMPLETE.name]
+        if status not in resumable:
+            return WorkflowEnum.START, None, None
+        local_transcript_path = WorkflowTracker.get('local_transcript_path')
+        transcript_sha256 = WorkflowTracker.get('transcript_sha256')
+        if status == WorkflowEnum.TRANSCRIPTION_COMPLETE.name and local_transcript_path and transcript_sha256:
+            local_transcript_file_path = Path(local_transcript_path)
+            if local_transcript_file_path.is_file() and await asyncio.to_thread(_file_sha256, local_transcript_file_path) == transcript_sha256:
+                return WorkflowEnum.TRANSCRIPTION_COMPLETE, None, local_transcript_file_path
+        local_mp3_path = Path(self.settings.local_mp3_dir) / await self.gh.get_filename(gdrive_input)
+        if local_mp3_path.is_file():
+            md5 = await asyncio.get_running_loop().run_in_executor(None, _file_md5, local_mp3_path)
+            if md5 == await self.gh.get_md5_checksum(gdrive_input):
+                return WorkflowEnum.MP3_UPLOADED, local_mp3_path, None
+        return WorkflowEnum.START, None, None
+
     @async_error_handler()
     async def create_local_mp3_from_input(self) -> Path:
         """
         Asynchronously creates a local copy of an MP3 file from the specified input.
 
         This method handles both uploaded files and Google Drive inputs. For an uploaded file,
-        it directly saves the file to a local temporary directory. For a Google Drive input,
-        it downloads the file from Google Drive to the local temporary directory.
+        it directly saves the file to a local temporary directory. The uploaded file isn't in Google Drive
+        yet, so its gfile_id is None. For a Google Drive input, it downloads the file from Google Drive to
+        the local temporary directory. A LocalMP3Input is already a local copy and is used as is, as is a
+        LocalAudioInput, whose decoded samples the transcription reads from the decode cache.
 
         Parameters:
-        - input_file (Union[UploadFile, GDriveInput]): The source of the MP3 file, which can be
-        an uploaded file (UploadFile) or a reference to a file stored in Google Drive (GDriveInput).
+        - input_file (Union[UploadFile, GDriveInput, LocalMP3Input, LocalAudioInput]): The source of the MP3 file, which
+        can be an uploaded file (UploadFile), a reference to a file stored in Google Drive (GDriveInput), a file
+        already in the local mp3 directory (LocalMP3Input) or a local audio or video file (LocalAudioInput).
 
         Returns:
-        - gfile_id: The Google Drive ID of the MP3 file.
+        - gfile_id: The Google Drive ID of the MP3 file, or None for an uploaded file.
         - Path: The path to the local copy of the MP3 file.
 
         Raises:
@@ -165,45 +280,46 @@ class AudioTranscriber:
             await validate_upload_file(input_mp3)
             mp3_gfile_id, mp3_path = await self.copy_uploadfile_to_local_mp3(input_mp3)
         elif isinstance(input_mp3, GDriveInput):
-            mp3_gfile_id, mp3_path = await self.copy_gfile_to_local_mp3(input_mp3)
+            mp3_gfile_id, mp3_path = await retry_stage('download', self.copy_gfile_to_local_mp3, input_mp3)
+        elif isinstance(input_mp3, LocalMP3Input):
+            mp3_path = input_mp3.path
+            WorkflowTracker.update(mp3_sha256=input_mp3.sha256)
+        elif isinstance(input_mp3, LocalAudioInput):
+            mp3_path = input_mp3.path
+            WorkflowTracker.update(mp3_sha256=input_mp3.sha256, audio_duration_seconds=input_mp3.duration_seconds)
 
         return mp3_gfile_id, mp3_path
 
     @async_error_handler()
-    async def copy_uploadfile_to_local_mp3(self, upload_file: UploadFile) -> Tuple[str, Path]:
+    async def copy_uploadfile_to_local_mp3(self, upload_file: UploadFile) -> Tuple[None, Path]:
         """
-        Asynchronously copies a FastAPI uploaded UploadFile MP3 file to a local directory and uploads it to Google Drive.
+        Asynchronously copies a FastAPI uploaded UploadFile MP3 file to a local directory.
 
-        This method takes an uploaded MP3 file, saves it to a specified local directory, and then uploads
-        the file to Google Drive. It ensures the file pointer is at the start before reading, to guarantee
-        accurate copying. The method wraps the file saving and uploading process with error handling.
+        The file is copied in one streaming pass of fixed-size chunks, so even a large upload is never
+        held in memory. Its SHA-256 is computed and its mp3 header checked during the same pass, and the
+        SHA-256 is recorded in the WorkflowTracker. The file is uploaded to Google Drive later, while it is
+        transcribed (see upload_mp3_in_background).
 
         Parameters:
         - upload_file (UploadFile): The uploaded file object provided by FastAPI, which contains
-        the MP3 file to be copied and uploaded.
+        the MP3 file to be copied.
 
         Returns:
-        - Tuple[str, Path]: A tuple containing the Google Drive file ID of the uploaded MP3 file and
-        the path to the local copy of the MP3 file.
+        - Tuple[None, Path]: None, since the file has no Google Drive file ID yet, and the path to the
+        local copy of the MP3 file.
 
         Raises:
-        - Exception: Any exception raised during the file saving or uploading process is caught
-        and handled by the `async_error_handler` decorator.
+        - Exception: Any exception raised during the file saving process is caught and handled by the
+        `async_error_handler` decorator. This includes the ValueError raised when the upload is larger
+        than the 'max_upload_mp3_bytes' setting or isn't mp3 audio.
         """
-        local_mp3_dir_path = Path(self.settings.local_mp3_dir)
-
-        if not local_mp3_dir_path.exists():
-            # All parent directories should be created if needed. Don't raise an error if the directory
-            # already exists.
-            local_mp3_dir_path.mkdir(parents=True, exist_ok=True)
         local_mp3_dir_path = self._make_sure_dir_exists(self.settings.local_mp3_dir)
         local_mp3_file_path = Path(local_mp3_dir_path) / upload_file.filename
-        upload_file.file.seek(0)  # Rewind to the start of the file.
-        async with aiofiles.open(str(local_mp3_file_path), "wb") as temp_file:
-            content = await upload_file.read()
-            await temp_file.write(content)
-        mp3_gfile_id = await self.gh.upload_mp3_to_gdrive(local_mp3_file_path)
-        return mp3_gfile_id, local_mp3_file_path
+        ingested_mp3 = await ingest_upload_file(upload_file, local_mp3_file_path, min_size=MIN_MP3_FILE_SIZE,
+                                                max_size=self.settings.max_upload_mp3_bytes,
+                                                chunk_size=self.settings.upload_copy_chunk_size)
+        WorkflowTracker.update(mp3_sha256=ingested_mp3.sha256)
+        return None, local_mp3_file_path
 
 
     @async_error_handler()
@@ -258,45 +374,154 @@ class AudioTranscriber:
         audio_quality_text_representation = WorkflowTracker.get('transcript_audio_quality')
         compute_type_text_representation = WorkflowTracker.get('transcript_compute_type')
         hf_model_name = AUDIO_QUALITY_MAP.get(audio_quality_text_representation,"distil-whisper/distil-large-v2")
-        compute_type_pytorch = COMPUTE_TYPE_MAP.get(compute_type_text_representation, torch.float16)
 
-        self.logger.debug(f"Starting transcription with model: {hf_model_name} and compute type: {compute_type_pytorch}")
         str_compute_type = WorkflowTracker.get_compute_type_string(compute_type_text_representation) # reconcile when this is 'default'
+        self.logger.debug(f"Starting transcription with model: {hf_model_name} and compute type: {str_compute_type}")
         str_audio_quality = WorkflowTracker.get_audio_quality_string(audio_quality_text_representation)
         await update_and_monitor_gdrive_status(self.gh, status=WorkflowEnum.TRANSCRIBING.name,transcript_audio_quality=str_audio_quality, transcript_compute_type=str_compute_type, comment= f'Start by loading the whisper {hf_model_name} model.')
 
         transcription_text = ""
         audio_file_path = WorkflowTracker.get('local_mp3_path')
         audio_file_path_str = str(audio_file_path) # Pathname to filename.
-        transcription_text = await self._transcribe_pipeline(audio_file_path_str, hf_model_name, compute_type_pytorch)
+        # Time the transcription against the audio duration, so the job scheduler knows how fast this model runs here.
+        # The duration of decoded audio is known already. That of an mp3 file is read from its frame headers.
+        audio_seconds = WorkflowTracker.get('audio_duration_seconds') or mp3_file_duration_seconds(audio_file_path)
+        WorkflowTracker.update(audio_duration_seconds=audio_seconds)
+        real_time_factors = get_real_time_factor_tracker()
+        # Let deadline jobs that start meanwhile know how long this one still needs.
+        inference_token = get_inference_load().start(real_time_factors.estimate_seconds(audio_seconds or 0, hf_model_name, str_compute_type))
+        start_time = time.monotonic()
+        try:
+            transcription_text = await self._transcribe_pipeline(audio_file_path_str, hf_model_name, str_compute_type)
+        finally:
+            get_inference_load().finish(inference_token)
+        if audio_seconds:
+            processing_seconds = time.monotonic() - start_time
+            real_time_factors.record(hf_model_name, str_compute_type, audio_seconds, processing_seconds)
+            record_transcription(hf_model_name, str_compute_type, audio_seconds, processing_seconds)
         return transcription_text
 
 
+    async def choose_model_for_deadline(self, local_mp3_path: Path, seconds_left: float) -> ModelChoice:
+        """
+        Picks the model and compute type that transcribe the mp3 file within seconds_left, and sets them (with the
+        chosen model and the predicted completion time) in the WorkflowTracker. Reading the mp3 file's duration and
+        checking for a GPU (which imports torch the first time, taking seconds) run in a worker thread, so other
+        jobs and requests on the event loop aren't held up.
+
+        Parameters:
+            local_mp3_path (Path): The local copy of the mp3 file.
+            seconds_left (float): The time left until the deadline.
+
+        Returns:
+            ModelChoice: The model picked. If no model is predicted to make the deadline, the fastest.
+        """
+        audio_seconds = WorkflowTracker.get('audio_duration_seconds') or \
+            await asyncio.to_thread(_mp3_audio_seconds, local_mp3_path, self.settings.assumed_mp3_bitrate_kbps)
+        cuda_available = await asyncio.to_thread(_cuda_available)
+        choice = choose_model(audio_seconds, seconds_left, get_real_time_factor_tracker(),
+                              queue_seconds=get_inference_load().remaining_seconds(), cuda_available=cuda_available)
+        if not choice.meets_deadline:
+            self.logger.warning(f"No model is predicted to transcribe {audio_seconds:.0f}s of audio within {seconds_left:.0f}s. Using the fastest, {choice.model_name}.")
+        WorkflowTracker.update(transcript_audio_quality=choice.audio_quality, transcript_compute_type=choice.compute_type,
+                               chosen_model=choice.model_name, predicted_completion=choice.predicted_completion())
+        return choice
+
     @async_error_handler()
-    async def _transcribe_pipeline(self, audio_filename: str, model_name: str, compute_float_type: torch.dtype) -> str:
+    async def upload_mp3_in_background(self, local_mp3_path: Path) -> str:
+        """
+        Uploads the local copy of an uploaded mp3 file to GDrive while it is being transcribed.
+
+        Until the gfile exists, status updates only change the WorkflowTracker, since the status is written to the
+        description of the mp3 gfile. Once the upload is done, the gfile ID is set and the current status written,
+        which brings the gfile's description up to date with every update made meanwhile.
+
+        Parameters:
+            local_mp3_path (Path): The local copy of the uploaded mp3 file.
+
+        Returns:
+            str: The GDrive ID of the mp3 gfile.
+        """
+        mp3_gfile_id = await self.gh.upload_mp3_to_gdrive(local_mp3_path)
+        await update_and_monitor_gdrive_status(self.gh, status=WorkflowTracker.get('status'), mp3_gfile_id=mp3_gfile_id)
+        return mp3_gfile_id
+
+    @async_error_handler()
+    async def _transcribe_pipeline(self, audio_filename: str, model_name: str, compute_float_type: str) -> str:
         """
         This method employs the Hugging Face `pipeline` for automatic speech recognition (ASR), specifying the model based on audio quality (model_name) and optimizing computation with the provided `compute_float_type`. It is designed to handle heavy lifting of audio processing in an asynchronous workflow, ensuring non-blocking operation in the main event loop.
 
         Args:
             audio_filename (str): The path to the audio file to be transcribed.
             model_name (str): Identifier for the Hugging Face ASR model to use.
-            compute_float_type (torch.dtype): The data type for computation, indicating precision and possibly affecting performance.
+            compute_float_type (str): The compute type (a key of COMPUTE_TYPE_MAP, e.g. 'float16'), which sets the torch dtype of the computation, indicating precision and possibly affecting performance.
 
         Returns:
             str: The transcribed text from the audio file.
 
         It's wrapped with an async error handler to gracefully handle failures, marking the transcription phase as failed in such events. The method encapsulates model loading and execution within a synchronous function, offloading it to an executor to maintain async workflow integrity.
+
+        Model loading, decoding the mp3 file and inference are timed as the 'model_load', 'decode' and 'inference' stages,
+        and traced as spans within the span of this call. The file is decoded into the decode cache (see
+        audio_decode_code), or its samples read from there if it has been decoded before (e.g. a file ingested by
+        audio_decode_code, or a job tried again). torch and transformers are imported here, on first use, so
+        the rest of the workflow (and the tools that only list files or read their status) start without them.
         """
         self.logger.debug(f"Transcribe using HF's Transformer pipeline (_transcribe_pipeline)...LOADING MODEL {model_name} using compute type {compute_float_type}")
+        # The executor thread doesn't see the job's WorkflowTracker state, so the stage labels are passed.
+        labels = {'model': model_name, 'dtype': compute_float_type}
+        # The SHA-256 of the file, if known, saves hashing it to look it up in the decode cache.
+        sha256 = WorkflowTracker.get('mp3_sha256')
         def load_and_run_pipeline():
-            pipe = pipeline(
-                "automatic-speech-recognition",
-                model=model_name,
-                device=0 if torch.cuda.is_available() else -1,
-                torch_dtype=compute_float_type
-            )
-            return pipe(audio_filename, chunk_length_s=30, batch_size=8, return_timestamps=False)
+            # pylint: disable=import-outside-toplevel
+            import torch
+            from transformers import pipeline
+            started = time.perf_counter()
+            with tracing_span('model_load', **labels):
+                pipe = pipeline(
+                    "automatic-speech-recognition",
+                    model=model_name,
+                    device=0 if torch.cuda.is_available() else -1,
+                    torch_dtype=torch_dtype(compute_float_type)
+                )
+            loaded = time.perf_counter()
+            record_stage('model_load', loaded - started, **labels)
+            # Decode the file apart from the pipeline, so decoding is timed apart from inference.
+            sampling_rate = pipe.feature_extractor.sampling_rate
+            with tracing_span('decode', **labels):
+                audio = load_decoded_audio(audio_filename, sha256, sampling_rate)
+            decoded = time.perf_counter()
+            record_stage('decode', decoded - loaded, **labels)
+            with tracing_span('inference', **labels), profile_inference():
+                result = pipe({'raw': audio, 'sampling_rate': sampling_rate}, chunk_length_s=30, batch_size=8, return_timestamps=False)
+            record_stage('inference', time.perf_counter() - decoded, **labels)
+            return result
         loop = asyncio.get_running_loop()
-        # Run the blocking operation in an executor
-        result = await loop.run_in_executor(None, load_and_run_pipeline)
+        # Run the blocking operation in an executor, in a copy of this context so its spans are children of this call's.
+        result = await loop.run_in_executor(None, functools.partial(contextvars.copy_context().run, load_and_run_pipeline))
         return result['text']
+
+def _cuda_available() -> bool:
+    import torch # pylint: disable=import-outside-toplevel
+    return torch.cuda.is_available()
+
+def _mp3_audio_seconds(path: Path, assumed_bitrate_kbps: float) -> float:
+    """
+    Returns the duration of an mp3 file from its frame headers, or else estimated from its size.
+    """
+    audio_seconds = mp3_file_duration_seconds(path)
+    if audio_seconds is None:
+        audio_seconds = duration_from_size_seconds(path.stat().st_size, assumed_bitrate_kbps)
+    return audio_seconds
+
+def _file_sha256(path: Path) -> str:
+    return _file_digest(path, hashlib.sha256())
+
+def _file_md5(path: Path) -> str:
+    return _file_digest(path, hashlib.md5())
+
+def _file_digest(path: Path, digest) -> str:
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
@@ -0,0 +1,125 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: Benchmarks ingesting a directory of audio files: the old to_mp3 step (ffmpeg re-encoding each file to
+# an mp3, one at a time, which the pipeline then decoded again) compared with decoding each file straight
+# to 16 kHz PCM in the decode pool, and reading the samples of a file transcribed again from the decode
+# cache compared with decoding its mp3 again. Needs ffmpeg.
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import argparse
+import asyncio
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from pathlib import Path
+
+import numpy as np
+
+from audio_decode_code import SAMPLE_RATE, AudioDecodePool, DecodeCache
+
+
+def _write_wav(path: Path, seconds: float, rng: np.random.Generator):
+    # Stereo at 44.1 kHz, as audio extracted from a video usually is: noise under a wandering tone.
+    t = np.arange(int(seconds * 44_100)) / 44_100
+    tone = np.sin(2 * np.pi * (300 + 50 * np.sin(t)) * t) * 8000 + rng.normal(0, 800, len(t))
+    with wave.open(str(path), 'wb') as audio:
+        audio.setnchannels(2)
+        audio.setsampwidth(2)
+        audio.setframerate(44_100)
+        audio.writeframes(np.repeat(tone.astype('<i2'), 2).tobytes())
+
+def _to_mp3_then_decode(source: Path, mp3_dir: Path) -> np.ndarray:
+    # utilities/to_mp3, then the decoding the pipeline did (transformers' ffmpeg_read).
+    mp3_path = mp3_dir / (source.stem + '.mp3')
+    subprocess.run(['ffmpeg', '-nostdin', '-loglevel', 'error', '-y', '-i', str(source), '-vn', '-ar', '16000', '-ac', '1',
+                    '-acodec', 'libmp3lame', '-q:a', '0', str(mp3_path)], check=True)
+    return _decode_mp3(mp3_path)
+
+def _decode_mp3(mp3_path: Path) -> np.ndarray:
+    output = subprocess.run(['ffmpeg', '-nostdin', '-loglevel', 'error', '-i', str(mp3_path), '-ac', '1', '-ar', str(SAMPLE_RATE),
+                             '-f', 'f32le', 'pipe:1'], check=True, capture_output=True).stdout
+    return np.frombuffer(output, np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the decode pool against the to_mp3 conversion.")
+    parser.add_argument('--files', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=600.0, help="Audio seconds per file.")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Decoding processes.")
+    args = parser.parse_args()
+    if shutil.which('ffmpeg') is None:
+        sys.exit("ffmpeg is not installed.")
+
+    rng = np.random.default_rng(7)
+    with tempfile.TemporaryDirectory() as directory:
+        directory = Path(directory)
+        (directory / 'inbox').mkdir()
+        (directory / 'mp3').mkdir()
+        sources = [directory / 'inbox' / f'episode_{n}.wav' for n in range(args.files)]
+        for source in sources:
+            _write_wav(source, args.seconds, rng)
+        audio_seconds = args.files * args.seconds
+
+        started = time.perf_counter()
+        for source in sources:
+            _to_mp3_then_decode(source, directory / 'mp3')
+        mp3_seconds = time.perf_counter() - started
+
+        cache = DecodeCache(directory / 'cache')
+        pool = AudioDecodePool(cache, workers=args.workers)
+        try:
+            started = time.perf_counter()
+            results = asyncio.run(pool.decode_all(sources))
+            pool_seconds = time.perf_counter() - started
+        finally:
+            pool.close()
+        failed = [result for result in results if isinstance(result, BaseException)]
+        if failed:
+            sys.exit(f"Decoding failed: {failed[0]}")
+
+        started = time.perf_counter()
+        _decode_mp3(directory / 'mp3' / (sources[0].stem + '.mp3'))
+        mp3_again_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        cache.load(results[0].sha256)
+        cache_again_seconds = time.perf_counter() - started
+
+    print(f"{args.files} files of {args.seconds:.0f}s ({audio_seconds / 3600:.1f} hours of audio):")
+    print(f"{'':<40} {'seconds':>9} {'x real time':>12}")
+    print(f"{'to_mp3 + decode, one at a time':<40} {mp3_seconds:>9.2f} {audio_seconds / mp3_seconds:>12.0f}")
+    print(f"{f'decode pool, {args.workers} process(es)':<40} {pool_seconds:>9.2f} {audio_seconds / pool_seconds:>12.0f}")
+    print(f"The decode pool is {mp3_seconds / pool_seconds:.1f}x faster.")
+    print(f"Transcribing a file again: decoding its mp3 takes {mp3_again_seconds * 1000:.0f} ms, "
+          f"reading the decode cache {cache_again_seconds * 1000:.0f} ms.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: End-to-end throughput benchmark of audio_batch_transcriber_code.main against the
+# FakeDriveBackend, with no credentials or network needed. The fake Drive can add per-call latency, a
+# bandwidth limit, rate-limit errors and failures. ASR is a stub that sleeps for a given real-time
+# factor, or the real openai/whisper-tiny model when an mp3 file with speech is given.
+# 
+# Usage: python -m benchmarks.bench_batch_fake_drive [--files 20] [--latency 0.05] [--asr stub|tiny] [--mp3 path]
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from fake_drive_backend_code import FakeDriveBackend
+from storage_backend_code import set_storage_backend
+
+STUB_TRANSCRIPT = "This is a stub transcript produced by the benchmark instead of running a Whisper model. " * 4
+
+
+def configure_environment(work_dir: Path, mp3_folder_id: str, transcripts_folder_id: str) -> None:
+    os.environ.update({
+        'GDRIVE_MP3_FOLDER_ID': mp3_folder_id,
+        'GDRIVE_TRANSCRIPTS_FOLDER_ID': transcripts_folder_id,
+        'GOOGLE_SERVICE_ACCOUNT_CREDENTIALS_PATH': str(work_dir / 'unused.json'),
+        'GOOGLE_DRIVE_OAUTH_SCOPES': json.dumps(['https://www.googleapis.com/auth/drive']),
+        'LOCAL_MP3_DIR': str(work_dir / 'mp3'),
+        'LOCAL_TRANSCRIPT_DIR': str(work_dir / 'transcripts'),
+        'REMOVE_TEMP_MP3': 'true',
+        'REMOVE_TEMP_TRANSCRIPTION': 'true',
+        'GDRIVE_UPLOAD_SESSION_DIR': str(work_dir / 'upload_sessions'),
+    })
+
+def install_stub_asr(seconds_per_file: float) -> None:
+    """
+    Replaces the Whisper pipeline with a stub that holds an executor thread for seconds_per_file, like inference would.
+    """
+    from audio_transcriber_code import AudioTranscriber # pylint: disable=import-outside-toplevel
+
+    async def _stub_transcribe_pipeline(self, audio_filename, model_name, compute_float_type): # pylint: disable=unused-argument
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, time.sleep, seconds_per_file)
+        return STUB_TRANSCRIPT
+    AudioTranscriber._transcribe_pipeline = _stub_transcribe_pipeline
+
+def install_tiny_asr() -> None:
+    """
+    Makes every transcription use the openai/whisper-tiny model in float32, which runs on a CPU.
+    """
+    from audio_transcriber_code import AudioTranscriber # pylint: disable=import-outside-toplevel
+    transcribe = AudioTranscriber.transcribe
+
+    async def _transcribe_with_tiny_model(self, input_mp3=None, **kwargs): # pylint: disable=unused-argument
+        return await transcribe(self, input_mp3=input_mp3, audio_quality="tiny", compute_type="float32")
+    AudioTranscriber.transcribe = _transcribe_with_tiny_model
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the batch transcriber against a fake Drive.")
+    parser.add_argument('--files', type=int, default=20, help="Number of mp3 files in the fake Drive folder.")
+    parser.add_argument('--file-kb', type=int, default=512, help="Size of each generated mp3 file in KB.")
+    parser.add_argument('--latency', type=float, default=0.05, help="Latency of each fake Drive call in seconds.")
+    parser.add_argument('--bandwidth-mbps', type=float, default=10, help="Fake Drive transfer speed in MB/s (0 for unlimited).")
+    parser.add_argument('--rate-limit-probability', type=float, default=0.02, help="Chance of a 403 userRateLimitExceeded per call.")
+    parser.add_argument('--failure-probability', type=float, default=0.0, help="Chance of a 503 backendError per call.")
+    parser.add_argument('--asr', choices=['stub', 'tiny'], default='stub', help="A stub ASR or the openai/whisper-tiny model.")
+    parser.add_argument('--asr-seconds', type=float, default=0.2, help="Seconds the stub ASR takes per file.")
+    parser.add_argument('--mp3', type=Path, help="An mp3 file with speech to use as every file's content (needed for --asr tiny).")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    if args.asr == 'tiny' and not args.mp3:
+        parser.error("--asr tiny needs an mp3 file with speech (--mp3).")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        work_dir = Path(tmp_dir)
+        fake_drive = FakeDriveBackend(latency_seconds=args.latency,
+                                      bandwidth_bytes_per_second=args.bandwidth_mbps * 1024 * 1024 if args.bandwidth_mbps else None,
+                                      rate_limit_probability=args.rate_limit_probability,
+                                      failure_probability=args.failure_probability, seed=args.seed)
+        mp3_folder_id, transcripts_folder_id = fake_drive.new_id(), fake_drive.new_id()
+        content = args.mp3.read_bytes() if args.mp3 else os.urandom(args.file_kb * 1024)
+        for i in range(args.files):
+            fake_drive.add_file(mp3_folder_id, f"episode_{i:04d}.mp3", content)
+        configure_environment(work_dir, mp3_folder_id, transcripts_folder_id)
+        set_storage_backend(fake_drive)
+        if args.asr == 'stub':
+            install_stub_asr(args.asr_seconds)
+        else:
+            install_tiny_asr()
+
+        from audio_batch_transcriber_code import main as batch_main # pylint: disable=import-outside-toplevel
+        from gdrive_scheduler_code import get_drive_scheduler # pylint: disable=import-outside-toplevel
+        started = time.perf_counter()
+        asyncio.run(batch_main())
+        elapsed = time.perf_counter() - started
+
+        transcripts = fake_drive.list_files(transcripts_folder_id)
+        print(f"files: {args.files}  transcribed: {len(transcripts)}  seconds: {elapsed:.2f}  files/minute: {len(transcripts) * 60 / elapsed:.1f}")
+        print(f"fake drive calls: {dict(fake_drive.calls)}")
+        print(f"drive scheduler: {get_drive_scheduler().metrics()}")
+
+
+if __name__ == "__main__":
+    main()
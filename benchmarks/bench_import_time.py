@@ -0,0 +1,93 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: Measures the cold-start cost (wall time and peak RSS of a fresh interpreter) of importing the
+# modules of the status and listing paths, which shouldn't import torch or transformers. Exits with
+# status 1 if a path imports either, or takes longer than the budget.
+# 
+# Usage: python -m benchmarks.bench_import_time [--budget-seconds 1.5] [--runs 5]
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+# The modules each path imports. Nothing on them runs a model.
+STARTUP_PATHS = {
+    'settings': ['env_settings_code'],
+    'status': ['gdrive_helper_code', 'status_update_code'],
+    'batch listing': ['audio_batch_transcriber_code'],
+}
+HEAVY_MODULES = ('torch', 'transformers')
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+_PROBE = """
+import json, resource, sys, time
+started = time.perf_counter()
+for module in sys.argv[1:]:
+    __import__(module)
+print(json.dumps({'seconds': time.perf_counter() - started,
+                  'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                  'heavy': [name for name in %r if name in sys.modules]}))
+"""
+
+def measure_cold_import(modules, runs: int = 5) -> dict:
+    """
+    Imports the modules in `runs` fresh interpreters. Returns the median import seconds, the largest peak RSS (MB)
+    and the heavy modules (torch, transformers) that were imported along.
+    """
+    results = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', _PROBE % (HEAVY_MODULES,), *modules], cwd=REPO_DIR,
+                                capture_output=True, text=True, check=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    return {'seconds': statistics.median(result['seconds'] for result in results),
+            'max_rss_mb': max(result['max_rss_mb'] for result in results),
+            'heavy': sorted({name for result in results for name in result['heavy']})}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the cold-start import time of the status and listing paths.")
+    parser.add_argument('--budget-seconds', type=float, default=1.5, help="The import time allowed per path.")
+    parser.add_argument('--runs', type=int, default=5, help="Fresh interpreters per path (the median is taken).")
+    args = parser.parse_args()
+
+    over_budget = False
+    print(f"{'path':<16} {'import s':>9} {'peak RSS MB':>12}  heavy modules")
+    for path, modules in STARTUP_PATHS.items():
+        result = measure_cold_import(modules, args.runs)
+        failed = result['seconds'] > args.budget_seconds or result['heavy']
+        over_budget = over_budget or failed
+        print(f"{path:<16} {result['seconds']:>9.2f} {result['max_rss_mb']:>12.0f}  {', '.join(result['heavy']) or '-'}"
+              f"{'  OVER BUDGET' if failed else ''}")
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
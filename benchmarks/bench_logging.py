@@ -0,0 +1,81 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: Benchmarks the cost of a log record in the calling thread: the dev logger (stack walk
+# and colorized line, written synchronously) against the production logger (QueueHandler, JSON
+# lines written by a background thread), with and without caller information.
+# 
+# Usage: python -m benchmarks.bench_logging [--records 20000]
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import argparse
+import logging
+import os
+import time
+
+from logger_code import LoggerBase, start_queue_logging, stop_queue_logging
+
+
+def _per_record_microseconds(logger: logging.Logger, records: int) -> float:
+    started = time.perf_counter()
+    for n in range(records):
+        logger.info("Transcribed chunk %d of %s.", n, 'episode.mp3')
+    return (time.perf_counter() - started) / records * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the per-record cost of the dev and production loggers.")
+    parser.add_argument('--records', type=int, default=20000, help="Records logged per run.")
+    args = parser.parse_args()
+
+    with open(os.devnull, 'w', encoding='utf-8') as devnull:
+        os.environ.pop('LOG_MODE', None)
+        dev_logger = LoggerBase.setup_logger('bench_dev', logging.INFO)
+        dev_logger.propagate = False
+        dev_logger.handlers[0].setStream(devnull)
+        results = [('dev (colorized, synchronous)', _per_record_microseconds(dev_logger, args.records), 0.0)]
+
+        srcfile = logging._srcfile # pylint: disable=protected-access
+        for label, caller_info in (('production (JSON, queued)', True), ('production, no caller info', False)):
+            production_logger = logging.getLogger(f'bench_production_{caller_info}')
+            production_logger.setLevel(logging.INFO)
+            production_logger.propagate = False
+            production_logger.addHandler(start_queue_logging(stream=devnull, caller_info=caller_info))
+            per_record = _per_record_microseconds(production_logger, args.records)
+            # The background thread's share: the time left to write the queued records.
+            started = time.perf_counter()
+            stop_queue_logging()
+            drain = (time.perf_counter() - started) / args.records * 1e6
+            results.append((label, per_record, drain))
+            logging._srcfile = srcfile # pylint: disable=protected-access
+
+    print(f"{'logger':<30} {'caller us/record':>16} {'drain us/record':>16}")
+    for label, per_record, drain in results:
+        print(f"{label:<30} {per_record:>16.2f} {drain:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
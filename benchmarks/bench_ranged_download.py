@@ -0,0 +1,71 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: Benchmarks RangedDownloader against the local Drive stand-in server. Compares
+# single-stream downloads with N concurrent Range segments, with a per-connection bandwidth cap to
+# mimic a link where one TCP stream can't use all the bandwidth.
+# 
+# Usage: python -m benchmarks.bench_ranged_download [--size-mb 64] [--segments 1 2 4 8] [--stream-mbps 20]
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import argparse
+import hashlib
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.local_drive_server import LocalDriveServer
+from gdrive_download_code import RangedDownloader
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ranged downloads against a local HTTP server.")
+    parser.add_argument('--size-mb', type=int, default=64, help="Size of the file to download in MB.")
+    parser.add_argument('--segments', type=int, nargs='+', default=[1, 2, 4, 8], help="Segment counts to compare.")
+    parser.add_argument('--stream-mbps', type=float, default=20, help="Bandwidth cap of each connection in MB/s (0 for none).")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per segment count. The best run is reported.")
+    args = parser.parse_args()
+
+    payload = os.urandom(args.size_mb * 1024 * 1024)
+    md5 = hashlib.md5(payload).hexdigest()
+    bytes_per_second = args.stream_mbps * 1024 * 1024 if args.stream_mbps else None
+    with LocalDriveServer(payload, bytes_per_second=bytes_per_second) as server, tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = Path(tmp_dir) / 'download.mp3'
+        print(f"{'segments':>8} {'seconds':>8} {'MB/s':>8}")
+        for segment_count in args.segments:
+            downloader = RangedDownloader(segment_count=segment_count, min_parallel_size=0)
+            best = None
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                downloader.download(server.url, file_path, total_size=len(payload), expected_md5=md5)
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            print(f"{segment_count:>8} {best:>8.2f} {args.size_mb / best:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
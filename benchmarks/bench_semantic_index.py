@@ -0,0 +1,113 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: Benchmarks the semantic index: appends synthetic transcripts of clustered embeddings (as a model's
+# embeddings of related passages are) and reports the time of an add, and the latency and recall of exact
+# and IVF queries. The embedder stands in for the model, so only the index is measured.
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import argparse
+import statistics
+import tempfile
+import time
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+from semantic_index_code import SemanticIndex, normalize
+
+DIMENSION = 384
+TOPICS = 500
+
+
+class ClusteredEmbedder:
+    """
+    Embeds 'topic <t> item <i>.' as the centroid of topic t plus noise seeded by the text.
+    """
+    model_name = 'clustered'
+
+    def __init__(self):
+        self.centroids = normalize(np.random.default_rng(0).standard_normal((TOPICS, DIMENSION)))
+
+    def embed(self, texts):
+        vectors = np.empty((len(texts), DIMENSION), dtype=np.float32)
+        for row, text in enumerate(texts):
+            topic = int(text.split()[1])
+            noise = np.random.default_rng(zlib.crc32(text.encode())).standard_normal(DIMENSION)
+            vectors[row] = self.centroids[topic] + 0.08 * noise
+        return normalize(vectors)
+
+def _transcript(rng: np.random.Generator, number: int, chunks: int) -> str:
+    topics = rng.integers(0, TOPICS, size=4)
+    return ' '.join(f"topic {rng.choice(topics)} item {number}-{n}." for n in range(chunks))
+
+def _search(index: SemanticIndex, queries, limit: int):
+    latencies, results = [], []
+    for query in queries:
+        started = time.perf_counter()
+        results.append([(hit.file_id, hit.chunk) for hit in index.search(query, limit)])
+        latencies.append((time.perf_counter() - started) * 1000)
+    return sorted(latencies), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the add and query latency of the semantic index.")
+    parser.add_argument('--transcripts', type=int, default=300, help="Transcripts indexed.")
+    parser.add_argument('--chunks', type=int, default=360, help="Chunks per transcript (about an hour of speech).")
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--limit', type=int, default=10, help="Hits per query.")
+    parser.add_argument('--probes', type=int, default=16, help="IVF partitions a query scores.")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    with tempfile.TemporaryDirectory() as directory:
+        index = SemanticIndex(Path(directory), ClusteredEmbedder(), chunk_sentences=1, ivf_min_chunks=0, ivf_probes=args.probes)
+        add_seconds = []
+        for n in range(args.transcripts):
+            text = _transcript(rng, n, args.chunks)
+            started = time.perf_counter()
+            index.add(f'gfile-{n}', f'episode_{n}.txt', text)
+            add_seconds.append(time.perf_counter() - started)
+        size_mb = sum(path.stat().st_size for path in Path(directory).iterdir()) / 1e6
+        print(f"Indexed {index.count()} chunks of {args.transcripts} transcripts, {size_mb:.0f} MB. Add (embedding included): "
+              f"median {statistics.median(add_seconds) * 1000:.1f} ms, last {add_seconds[-1] * 1000:.1f} ms.")
+
+        queries = [f"topic {rng.integers(0, TOPICS)} query {n}." for n in range(args.queries)]
+        print(f"{'search':<10} {'median ms':>10} {'p95 ms':>10} {'recall@' + str(args.limit):>10}")
+        exact_latencies, exact = _search(index, queries, args.limit)
+        print(f"{'exact':<10} {statistics.median(exact_latencies):>10.2f} {exact_latencies[int(0.95 * (len(queries) - 1))]:>10.2f} {1:>10.2f}")
+        started = time.perf_counter()
+        index.train_ivf()
+        print(f"Trained the IVF partitions in {time.perf_counter() - started:.1f}s.")
+        ivf_latencies, ivf = _search(index, queries, args.limit)
+        recall = statistics.mean(len(set(found) & set(truth)) / len(truth) for found, truth in zip(ivf, exact))
+        print(f"{'ivf':<10} {statistics.median(ivf_latencies):>10.2f} {ivf_latencies[int(0.95 * (len(queries) - 1))]:>10.2f} {recall:>10.2f}")
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
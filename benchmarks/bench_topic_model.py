@@ -0,0 +1,100 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: Benchmarks the topic pipeline on a synthetic corpus of transcripts drawn from LDA's generative model:
+# the cost per transcript of folding a batch of new transcripts into a trained model with one online
+# update, compared with retraining a model on the whole corpus, and preprocessing in the process pool
+# compared with one process.
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from topic_model_code import TopicPipeline, preprocess_texts
+
+SYLLABLES = ['ka', 'lo', 'mi', 'ran', 'te', 'su', 'vo', 'ne', 'dor', 'pi', 'gal', 'ber']
+
+
+def _corpus(rng: np.random.Generator, documents: int, words: int, vocabulary_size: int, topics: int):
+    vocabulary = sorted({''.join(rng.choice(SYLLABLES, rng.integers(2, 5))) for _ in range(vocabulary_size * 2)})[:vocabulary_size]
+    topic_words = rng.dirichlet(np.full(len(vocabulary), 0.05), size=topics)
+    transcripts = []
+    for n in range(documents):
+        weights = rng.dirichlet(np.full(topics, 0.1))
+        counts = rng.multinomial(words, weights @ topic_words)
+        text = ' '.join(word for word, count in zip(vocabulary, counts) for _ in range(count))
+        transcripts.append((f'gfile-{n}', f'episode_{n}.txt', text))
+    return transcripts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark folding transcripts into the topic model against retraining it.")
+    parser.add_argument('--transcripts', type=int, default=400, help="Transcripts of the trained model.")
+    parser.add_argument('--new', type=int, default=16, help="New transcripts folded in (one batch by default).")
+    parser.add_argument('--words', type=int, default=3000, help="Content words per transcript (an hour has about 3,000 "
+                                                                 "once stopwords and filler are dropped).")
+    parser.add_argument('--vocabulary', type=int, default=5000)
+    parser.add_argument('--topics', type=int, default=20)
+    parser.add_argument('--passes', type=int, default=3, help="Passes of a retrain.")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Preprocessing processes.")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    transcripts = _corpus(rng, args.transcripts + args.new, args.words, args.vocabulary, args.topics)
+    texts = [text for _, _, text in transcripts]
+    started = time.perf_counter()
+    preprocess_texts(texts, workers=1)
+    serial_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    preprocess_texts(texts, workers=args.workers)
+    pool_seconds = time.perf_counter() - started
+    print(f"Preprocessed {len(texts)} transcripts in {serial_seconds:.2f}s in one process, {pool_seconds:.2f}s in {args.workers}.")
+
+    with tempfile.TemporaryDirectory() as directory:
+        pipeline = TopicPipeline(directory, topics=args.topics, workers=args.workers)
+        started = time.perf_counter()
+        pipeline.fold_in(transcripts[:args.transcripts], passes=args.passes)
+        train_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        pipeline.fold_in(transcripts[args.transcripts:])
+        fold_seconds = time.perf_counter() - started
+    with tempfile.TemporaryDirectory() as directory:
+        started = time.perf_counter()
+        TopicPipeline(directory, topics=args.topics, workers=args.workers).fold_in(transcripts, passes=args.passes)
+        retrain_seconds = time.perf_counter() - started
+    print(f"Trained on {args.transcripts} transcripts ({args.passes} passes) in {train_seconds:.1f}s.")
+    print(f"{'':<24} {'seconds':>9} {'ms per new transcript':>22}")
+    print(f"{'online fold-in':<24} {fold_seconds:>9.2f} {fold_seconds / args.new * 1000:>22.1f}")
+    print(f"{'retrain on all':<24} {retrain_seconds:>9.2f} {retrain_seconds / args.new * 1000:>22.1f}")
+    print(f"Folding in is {retrain_seconds / fold_seconds:.0f}x cheaper.")
+
+
+if __name__ == "__main__":
+    main()
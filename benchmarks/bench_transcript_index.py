@@ -0,0 +1,115 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: Benchmarks the transcript search index: indexes synthetic hour-long transcripts (about 9,000
+# words each, drawn from a Zipf-distributed vocabulary like speech) and reports the query latency of
+# rare and common words, phrases and prefixes.
+# 
+# Usage: python -m benchmarks.bench_transcript_index [--transcripts 2000] [--words 9000] [--queries 50]
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from transcript_index_code import TranscriptIndex
+
+VOCABULARY_SIZE = 30_000
+
+
+def _vocabulary(rng: random.Random):
+    syllables = ['ka', 'lo', 'mi', 'ran', 'te', 'su', 'vo', 'ne', 'dor', 'pi', 'gal', 'ber', 'tu', 'shi', 'om']
+    words = set()
+    while len(words) < VOCABULARY_SIZE:
+        words.add(''.join(rng.choice(syllables) for _ in range(rng.randint(1, 4))))
+    return sorted(words)
+
+def _transcript(rng: random.Random, vocabulary, weights, words: int) -> str:
+    return ' '.join(rng.choices(vocabulary, cum_weights=weights, k=words))
+
+def _latencies_ms(index: TranscriptIndex, queries, limit: int):
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        index.search(query, limit)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the indexing and query latency of the transcript index.")
+    parser.add_argument('--transcripts', type=int, default=2000, help="Transcripts indexed.")
+    parser.add_argument('--words', type=int, default=9000, help="Words per transcript (about an hour of speech).")
+    parser.add_argument('--queries', type=int, default=50, help="Queries of each kind.")
+    parser.add_argument('--limit', type=int, default=10, help="Hits per query.")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    vocabulary = _vocabulary(rng)
+    # Zipf: the n-th most common word is used 1/n as often as the most common.
+    cumulative, total = [], 0.0
+    for rank in range(1, len(vocabulary) + 1):
+        total += 1 / rank
+        cumulative.append(total)
+
+    with tempfile.TemporaryDirectory() as directory:
+        index = TranscriptIndex(Path(directory) / 'index.sqlite3')
+        started = time.perf_counter()
+        texts = []
+        for n in range(args.transcripts):
+            text = _transcript(rng, vocabulary, cumulative, args.words)
+            index.add(f'gfile-{n}', f'episode_{n}.txt', text)
+            if n < 100:
+                texts.append(text.split())
+        index.optimize()
+        index_seconds = time.perf_counter() - started
+        size_mb = sum(path.stat().st_size for path in Path(directory).iterdir()) / 1e6
+        print(f"Indexed {args.transcripts} transcripts of {args.words} words in {index_seconds:.1f}s "
+              f"({index_seconds / args.transcripts * 1000:.1f} ms each), {size_mb:.0f} MB.")
+
+        def _phrase():
+            words = rng.choice(texts)
+            start = rng.randrange(len(words) - 2)
+            return '"' + ' '.join(words[start:start + 2]) + '"'
+        query_kinds = {
+            'rare word': lambda: rng.choice(vocabulary[-10_000:]),
+            'common word': lambda: rng.choice(vocabulary[:20]),
+            'two words': lambda: f"{rng.choice(vocabulary[1000:5000])} {rng.choice(vocabulary[1000:5000])}",
+            'phrase': _phrase,
+            'prefix': lambda: rng.choice(vocabulary[100:1000])[:rng.choice([3, 4, 5])] + '*',
+        }
+        print(f"{'query':<12} {'median ms':>10} {'p95 ms':>10} {'max ms':>10}")
+        for kind, make_query in query_kinds.items():
+            latencies = sorted(_latencies_ms(index, [make_query() for _ in range(args.queries)], args.limit))
+            print(f"{kind:<12} {statistics.median(latencies):>10.2f} {latencies[int(0.95 * (len(latencies) - 1))]:>10.2f} {latencies[-1]:>10.2f}")
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: A local stand-in for Drive's file content endpoint, used by the download benchmark and
+# tests. It serves one payload over HTTP with support for Range requests, and can cap the bandwidth of
+# each connection to mimic the per-stream throughput limit seen on real links.
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+RANGE_PATTERN = re.compile(r'bytes=(\d+)-(\d*)')
+
+
+class LocalDriveServer:
+    """
+    Serves `payload` at every URL of http://127.0.0.1:<port>/ in a background thread.
+
+    Attributes:
+        url (str): The URL to download the payload from.
+        requests (list): The Range header of each request served (None for a full request).
+    """
+    def __init__(self, payload: bytes, bytes_per_second: float = None, ignore_range: bool = False):
+        """
+        Parameters:
+            payload (bytes): The content to serve.
+            bytes_per_second (float): Optional. Caps the throughput of each connection.
+            ignore_range (bool): If True, answer Range requests with the full payload, like servers without Range support.
+        """
+        self.payload = payload
+        self.bytes_per_second = bytes_per_second
+        self.ignore_range = ignore_range
+        self.requests = []
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_port}/file"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler_class(self):
+        server = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self): # pylint: disable=invalid-name
+                range_header = self.headers.get('Range')
+                server.requests.append(range_header)
+                match = RANGE_PATTERN.fullmatch(range_header or '')
+                if match and not server.ignore_range:
+                    start = int(match.group(1))
+                    end = int(match.group(2)) if match.group(2) else len(server.payload) - 1
+                    body = server.payload[start:end + 1]
+                    self.send_response(206)
+                    self.send_header('Content-Range', f"bytes {start}-{end}/{len(server.payload)}")
+                else:
+                    body = server.payload
+                    self.send_response(200)
+                self.send_header('Accept-Ranges', 'none' if server.ignore_range else 'bytes')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self._send_throttled(body)
+
+            def _send_throttled(self, body):
+                block_size = 64 * 1024
+                started = time.perf_counter()
+                for offset in range(0, len(body), block_size):
+                    self.wfile.write(body[offset:offset + block_size])
+                    if server.bytes_per_second:
+                        ahead = (offset + block_size) / server.bytes_per_second - (time.perf_counter() - started)
+                        if ahead > 0:
+                            time.sleep(ahead)
+
+            def log_message(self, format, *args): # pylint: disable=redefined-builtin
+                pass
+
+        return _Handler
@@ -35,7 +35,8 @@
 ###########################################################################################
 
 import json
-from typing import List
+import os
+from typing import Dict, List, Optional
 from dotenv import load_dotenv
 
 from pydantic_settings import BaseSettings
@@ -56,6 +57,114 @@ class Settings(BaseSettings):
     local_transcript_dir: str
     remove_temp_mp3: bool
     remove_temp_transcription: bool
+    # Uploaded mp3 files larger than this are rejected. They are copied to local_mp3_dir this many bytes at a time.
+    max_upload_mp3_bytes: int = 2 * 1024 * 1024 * 1024
+    upload_copy_chunk_size: int = 1024 * 1024
+    # The batch transcriber runs the shortest jobs (estimated processing seconds) first. Waiting jobs gain
+    # job_aging_factor seconds of priority per second. Jobs beyond job_max_backlog_seconds of estimated
+    # processing are left for a later run. Drive files are assumed to be encoded at assumed_mp3_bitrate_kbps.
+    job_max_backlog_seconds: float = 8 * 3600
+    job_aging_factor: float = 1.0
+    assumed_mp3_bitrate_kbps: float = 64.0
+    # The job service (transcription_service_code) runs service_workers jobs at a time. Submissions are refused
+    # with 429 when service_max_queued_jobs jobs are waiting or the estimated backlog is over job_max_backlog_seconds.
+    # The last service_job_retention finished jobs can still be looked up.
+    service_workers: int = 1
+    service_max_queued_jobs: int = 100
+    service_job_retention: int = 1000
+    # Live transcription (the /live WebSocket of the job service) uses the live_audio_quality model. Every
+    # live_step_seconds, the last live_window_seconds (at most) of audio not finalized yet are decoded.
+    # live_model_pool_size pipelines of each model are kept loaded, ahead of the first session if
+    # live_preload_model. At most live_max_sessions sessions run at once.
+    live_audio_quality: str = "base.en"
+    live_window_seconds: float = 15.0
+    live_step_seconds: float = 1.0
+    live_model_pool_size: int = 1
+    live_preload_model: bool = False
+    live_max_sessions: int = 4
+    # Batch transcribers on several hosts can share a folder. Each claims a file with a lease of lease_ttl_seconds,
+    # renewed every lease_heartbeat_seconds (a third of the TTL by default, and less than half of it). A lease that
+    # can't be renewed is given up a heartbeat before it runs out. worker_id names this worker in the leases. By
+    # default it is made from the host name and process ID.
+    lease_ttl_seconds: float = 600.0
+    lease_heartbeat_seconds: Optional[float] = None
+    worker_id: str = ""
+    # Tracing spans (a span per @async_error_handler-decorated call, with its wall and CPU time) are written as JSON
+    # lines to trace_file, if set. The file is rotated at trace_max_bytes, keeping trace_backup_count old files.
+    trace_file: str = ""
+    trace_max_bytes: int = 50 * 1024 * 1024
+    trace_backup_count: int = 5
+    # Profiling: a profiled job's workflow runs under cProfile and its inference under torch.profiler (with memory
+    # tracking if profile_memory). Every job is profiled if profile_jobs, otherwise one in profile_sample_every
+    # jobs (0 for none) and the jobs submitted with profile=true. The profiles are written to profile_dir/<job ID>
+    # (by default the 'profiles' directory in local_transcript_dir). The oldest are removed to keep profile_dir
+    # under profile_max_bytes.
+    profile_jobs: bool = False
+    profile_sample_every: int = 0
+    profile_memory: bool = False
+    profile_dir: str = ""
+    profile_max_bytes: int = 500 * 1024 * 1024
+    # The retry policy of each workflow stage ("download", "transcription" and "transcript_write"), as a JSON object
+    # of stage name to {"attempts": n, "backoff_seconds": s}. A failed stage is tried up to n times in all, waiting
+    # s seconds before the second try and twice as long before each one after. A stage not listed is tried once.
+    stage_retry_policy: Dict[str, Dict[str, float]] = {"download": {"attempts": 3, "backoff_seconds": 2.0},
+                                                       "transcript_write": {"attempts": 3, "backoff_seconds": 2.0}}
+    # Uploaded transcripts are added to a full-text search index (an SQLite database, see transcript_index_code) at
+    # transcript_index_path, by default transcript_index.sqlite3 in local_transcript_dir.
+    transcript_index_enabled: bool = True
+    transcript_index_path: str = ""
+    # Uploaded transcripts are also split into chunks of semantic_index_chunk_sentences sentences and embedded by
+    # semantic_index_model (a sentence-transformers model, run on the CPU) into a semantic index in
+    # semantic_index_dir, by default semantic_index in local_transcript_dir (see semantic_index_code). Off by
+    # default, since the model has to be downloaded. Once the index holds semantic_index_ivf_min_chunks chunks, a
+    # query only scores the chunks of the semantic_index_ivf_probes partitions nearest to it.
+    semantic_index_enabled: bool = False
+    semantic_index_dir: str = ""
+    semantic_index_model: str = "sentence-transformers/all-MiniLM-L6-v2"
+    semantic_index_chunk_sentences: int = 3
+    semantic_index_ivf_min_chunks: int = 20000
+    semantic_index_ivf_probes: int = 16
+    # Uploaded transcripts are folded into an online LDA topic model of topic_model_topics topics in topic_model_dir,
+    # by default topic_model in local_transcript_dir (see topic_model_code), one online update per
+    # topic_model_batch_size transcripts. A job's transcript gets its main topics in the workflow status ('topics')
+    # once the model has had its first update. A corpus is preprocessed by topic_model_workers processes (0: one
+    # per core).
+    topic_model_enabled: bool = False
+    topic_model_dir: str = ""
+    topic_model_topics: int = 20
+    topic_model_batch_size: int = 16
+    topic_model_workers: int = 0
+    # Audio is decoded by ffmpeg_path straight to 16 kHz mono PCM, which is kept in a decode cache in decode_cache_dir,
+    # by default decode_cache in local_mp3_dir, of at most decode_cache_max_bytes (0: no limit; an hour of audio takes
+    # 115 MB) (see audio_decode_code). Its command line decodes files in audio_decode_workers processes (0: one per core).
+    decode_cache_dir: str = ""
+    decode_cache_max_bytes: int = 4 * 1024 * 1024 * 1024
+    audio_decode_workers: int = 0
+    ffmpeg_path: str = "ffmpeg"
+    # The processing time per second of audio of each model, as measured on this host.
+    real_time_factors_path: str = "real_time_factors.json"
+    # Where the mp3 files, transcripts and workflow status are stored: "gdrive", "local" (directories of a local or
+    # network file system) or "fake" (in-memory, for tests and benchmarks).
+    storage_backend: str = "gdrive"
+    # For the "local" backend: the directory of each folder ID, as a JSON object. Folders not listed are
+    # directories named after the folder ID within local_storage_root.
+    local_storage_root: str = "local_storage"
+    local_storage_folders: Dict[str, str] = {}
+    # Drive metadata (workflow status) writes are collected for this long and sent as one batch request.
+    gdrive_batch_window_seconds: float = 0.05
+    gdrive_batch_max_size: int = 100
+    gdrive_batch_max_retries: int = 3
+    # Files are uploaded to Drive in chunks of this many bytes (a multiple of 256 KiB). The upload session
+    # URIs are saved in gdrive_upload_session_dir so an interrupted upload can be resumed.
+    gdrive_upload_chunk_size: int = 8 * 1024 * 1024
+    gdrive_upload_session_dir: str = "upload_sessions"
+    # Files of at least gdrive_parallel_download_min_bytes are downloaded as this many concurrent Range requests.
+    gdrive_download_segments: int = 4
+    gdrive_parallel_download_min_bytes: int = 32 * 1024 * 1024
+    # All Drive requests share a token bucket sized to the Drive quota. Throttled requests are retried up to gdrive_max_retries times.
+    gdrive_requests_per_second: float = 10.0
+    gdrive_request_burst: int = 20
+    gdrive_max_retries: int = 5
 
     @field_validator('google_drive_oauth_scopes')
     @classmethod
@@ -79,11 +188,25 @@ class Settings(BaseSettings):
                 pass  # Optionally handle error or log a warning
         return v
 # Dependency that retrieves the settings
+# The settings last loaded, and the environment they were loaded from.
+_cached_settings: Optional[tuple] = None
+
 def get_settings() -> Settings:
     """
     Loads and returns the configuration settings from environment variables.
 
+    The settings are loaded once and shared (the .env file is read once, when this module is imported). They are only
+    loaded again when the environment has changed since, e.g. when a test sets a variable: comparing the environment
+    costs a small fraction of parsing it into Settings. Callers shouldn't change the Settings they get.
+
     Returns:
         Settings: An instance of the Settings class populated with values from environment variables.
     """
-    return Settings()
+    global _cached_settings # pylint: disable=global-statement
+    environ = os.environ.copy()
+    cached = _cached_settings
+    if cached is not None and cached[0] == environ:
+        return cached[1]
+    settings = Settings()
+    _cached_settings = (environ, settings)
+    return settings
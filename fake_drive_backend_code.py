@@ -0,0 +1,243 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: The fake_drive_backend module is an in-memory (or on-disk) stand-in for Google Drive that
+# implements StorageBackend. It needs no credentials or network. Every call can be slowed by a
+# configurable latency, and uploads and downloads by a bandwidth limit. Calls can also fail at a
+# configurable rate with Drive-like rate-limit (403 userRateLimitExceeded) or server (503) errors, or
+# once a calls-per-second quota is exceeded. That makes it usable for offline end-to-end tests and
+# throughput benchmarks of the transcription workflow.
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import collections
+import datetime
+import hashlib
+import itertools
+import random
+import string
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from storage_backend_code import StorageBackend, StorageRequestError
+
+ID_ALPHABET = string.ascii_letters + string.digits + '-_'
+
+
+class FakeDriveBackend(StorageBackend):
+    """
+    A fake Google Drive with latency and fault injection.
+
+    File content is kept in memory, or in `root_dir` when one is given. The backend is thread-safe, since
+    GDriveHelper calls it from executor threads.
+
+    Attributes:
+        latency_seconds (float): Added to every call.
+        bandwidth_bytes_per_second (Optional[float]): Limits upload and download speed. None means unlimited.
+        rate_limit_probability (float): The chance that a call fails with 403 userRateLimitExceeded.
+        failure_probability (float): The chance that a call fails with 503 backendError.
+        quota_per_second (Optional[float]): Calls beyond this many per second fail with 403 userRateLimitExceeded.
+        calls (collections.Counter): The number of calls per operation.
+    """
+    supports_read_head = True
+
+    def __init__(self, latency_seconds: float = 0.0, bandwidth_bytes_per_second: Optional[float] = None,
+                 rate_limit_probability: float = 0.0, failure_probability: float = 0.0,
+                 quota_per_second: Optional[float] = None, root_dir: Optional[Path] = None, seed: Optional[int] = None):
+        self.latency_seconds = latency_seconds
+        self.bandwidth_bytes_per_second = bandwidth_bytes_per_second
+        self.rate_limit_probability = rate_limit_probability
+        self.failure_probability = failure_probability
+        self.quota_per_second = quota_per_second
+        self.root_dir = Path(root_dir) if root_dir else None
+        if self.root_dir:
+            self.root_dir.mkdir(parents=True, exist_ok=True)
+        self.calls = collections.Counter()
+        self._random = random.Random(seed)
+        self._files: Dict[str, dict] = {}
+        self._contents: Dict[str, bytes] = {}
+        self._recent_calls = collections.deque()
+        self._etags = itertools.count(1)
+        self._lock = threading.RLock()
+
+    def new_id(self) -> str:
+        """
+        Returns a new ID in the format of a Drive ID (28 characters), so it passes GDriveInput validation.
+        """
+        with self._lock:
+            return ''.join(self._random.choice(ID_ALPHABET) for _ in range(28))
+
+    def add_file(self, folder_id: str, title: str, content: bytes, description: Optional[str] = None) -> str:
+        """
+        Puts a file into the fake Drive without latency or faults, e.g. to set up a benchmark. Returns its ID.
+        """
+        file_id = self.new_id()
+        with self._lock:
+            self._store(file_id, folder_id, title, content, description)
+        return file_id
+
+    def get_content(self, file_id: str) -> bytes:
+        """
+        Returns a file's content without latency or faults, e.g. to check the result of a test.
+        """
+        with self._lock:
+            return self._read(file_id)
+
+    def list_files(self, folder_id: str) -> List[dict]:
+        self._simulate_call('list_files')
+        with self._lock:
+            return [dict(metadata) for metadata in self._files.values() if folder_id in metadata['parents']]
+
+    def get_metadata(self, file_id: str, fields: List[str]) -> dict:
+        self._simulate_call('get_metadata')
+        with self._lock:
+            metadata = self._get(file_id)
+            return {field: metadata[field] for field in fields if field in metadata}
+
+    def upload_file(self, folder_id: str, file_path: Path, progress_callback: Optional[Callable[[int, int], None]] = None) -> str:
+        self._simulate_call('upload_file')
+        content = Path(file_path).read_bytes()
+        self._simulate_transfer(len(content), progress_callback)
+        file_id = self.new_id()
+        with self._lock:
+            self._store(file_id, folder_id, Path(file_path).name, content, None)
+        return file_id
+
+    def download_file(self, file_id: str, directory_path: Path) -> Path:
+        self._simulate_call('download_file')
+        with self._lock:
+            title = self._get(file_id)['title']
+            content = self._read(file_id)
+        self._simulate_transfer(len(content))
+        local_file_path = Path(directory_path) / title
+        local_file_path.write_bytes(content)
+        return local_file_path
+
+    def read_head(self, file_id: str, length: int) -> Optional[bytes]:
+        self._simulate_call('read_head')
+        with self._lock:
+            return self._read(file_id)[:length]
+
+    def update_metadata(self, updates: Dict[str, dict]) -> Dict[str, Optional[Exception]]:
+        # Like a Drive batch request: one round trip, with faults injected per item.
+        self._simulate_call('update_metadata', inject_faults=False)
+        results = {}
+        for file_id, fields in updates.items():
+            try:
+                self._inject_fault()
+                with self._lock:
+                    self._get(file_id).update(fields, etag=self._new_etag())
+                results[file_id] = None
+            except StorageRequestError as e:
+                results[file_id] = e
+        return results
+
+    def update_metadata_if_match(self, file_id: str, fields: dict, etag: str) -> str:
+        self._simulate_call('update_metadata_if_match')
+        with self._lock:
+            metadata = self._get(file_id)
+            if metadata['etag'] != etag:
+                raise StorageRequestError(f"The etag of {file_id} is no longer {etag}.", status_code=412, reason='conditionNotMet')
+            metadata.update(fields, etag=self._new_etag())
+            return metadata['etag']
+
+    def delete_file(self, file_id: str) -> None:
+        self._simulate_call('delete_file')
+        with self._lock:
+            self._get(file_id)
+            del self._files[file_id]
+            content = self._contents.pop(file_id, None)
+            if content is None and self.root_dir:
+                (self.root_dir / file_id).unlink(missing_ok=True)
+
+    def _store(self, file_id: str, folder_id: str, title: str, content: bytes, description: Optional[str]) -> None:
+        self._files[file_id] = {
+            'id': file_id,
+            'title': title,
+            'parents': [folder_id],
+            'fileSize': str(len(content)),
+            'md5Checksum': hashlib.md5(content).hexdigest(),
+            'description': description,
+            'createdDate': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z'),
+            'etag': self._new_etag(),
+        }
+        if self.root_dir:
+            (self.root_dir / file_id).write_bytes(content)
+        else:
+            self._contents[file_id] = content
+
+    def _new_etag(self) -> str:
+        return f'"{next(self._etags)}"'
+
+    def _read(self, file_id: str) -> bytes:
+        self._get(file_id)
+        if self.root_dir:
+            return (self.root_dir / file_id).read_bytes()
+        return self._contents[file_id]
+
+    def _get(self, file_id: str) -> dict:
+        metadata = self._files.get(file_id)
+        if metadata is None:
+            raise StorageRequestError(f"File not found: {file_id}", status_code=404, reason='notFound')
+        return metadata
+
+    def _simulate_call(self, operation: str, inject_faults: bool = True) -> None:
+        with self._lock:
+            self.calls[operation] += 1
+            now = time.monotonic()
+            self._recent_calls.append(now)
+            while self._recent_calls and self._recent_calls[0] < now - 1:
+                self._recent_calls.popleft()
+            over_quota = self.quota_per_second is not None and len(self._recent_calls) > self.quota_per_second
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        if over_quota:
+            raise StorageRequestError("User rate limit exceeded.", status_code=403, reason='userRateLimitExceeded', retry_after=1.0)
+        if inject_faults:
+            self._inject_fault()
+
+    def _inject_fault(self) -> None:
+        with self._lock:
+            roll = self._random.random()
+        if roll < self.rate_limit_probability:
+            raise StorageRequestError("User rate limit exceeded.", status_code=403, reason='userRateLimitExceeded')
+        if roll < self.rate_limit_probability + self.failure_probability:
+            raise StorageRequestError("Backend error.", status_code=503, reason='backendError')
+
+    def _simulate_transfer(self, size: int, progress_callback: Optional[Callable[[int, int], None]] = None) -> None:
+        chunk_size = 256 * 1024
+        sent = 0
+        while True:
+            if progress_callback:
+                progress_callback(sent, size)
+            if sent >= size:
+                break
+            step = min(chunk_size, size - sent)
+            if self.bandwidth_bytes_per_second:
+                time.sleep(step / self.bandwidth_bytes_per_second)
+            sent += step
+
@@ -0,0 +1,150 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: The gdrive_backend module is the Google Drive implementation of StorageBackend. It uses
+# the process-wide GDriveClientPool for authentication and per-thread http connections, pydrive2 for
+# file listing, metadata and deletion, Drive batch requests for metadata updates, the ResumableUploader
+# for uploads and the RangedDownloader for downloads.
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+from functools import wraps
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from googleapiclient.errors import HttpError
+
+from env_settings_code import get_settings
+from gdrive_client_pool_code import GDriveClientPool
+from gdrive_download_code import RangedDownloader
+from gdrive_upload_code import ResumableUploader
+from storage_backend_code import StorageBackend, StorageRequestError
+
+DRIVE_CONTENT_URL = "https://www.googleapis.com/drive/v2/files/{file_id}?alt=media"
+
+
+def _on_pooled_http(func):
+    """
+    Makes sure the calling (executor) thread has its pooled http connection before the Drive call runs.
+    pydrive2 picks it up from the GoogleAuth thread-local storage.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        GDriveClientPool.get_http()
+        return func(*args, **kwargs)
+    return wrapper
+
+
+class GDriveBackend(StorageBackend):
+    """
+    Stores files in Google Drive.
+
+    read_head() is left out on purpose (supports_read_head is off): it would cost a request per file against the
+    Drive quota, so the duration of Drive files is estimated from their size instead.
+
+    Attributes:
+        gauth (GoogleAuth): The shared, authenticated GoogleAuth instance.
+        drive (GoogleDrive): The shared GoogleDrive instance.
+        uploader (ResumableUploader): Uploads files in resumable chunks.
+        downloader (RangedDownloader): Downloads large files as concurrent Range requests.
+    """
+    def __init__(self):
+        settings = get_settings()
+        self.gauth = GDriveClientPool.get_auth()
+        self.drive = GDriveClientPool.get_drive()
+        self.uploader = ResumableUploader(GDriveClientPool.get_http, Path(settings.gdrive_upload_session_dir),
+                                          chunk_size=settings.gdrive_upload_chunk_size)
+        self.downloader = RangedDownloader(self._auth_headers, segment_count=settings.gdrive_download_segments,
+                                           min_parallel_size=settings.gdrive_parallel_download_min_bytes)
+
+    @staticmethod
+    def _auth_headers() -> dict:
+        """
+        Returns the Authorization header for requests sent with plain HTTP clients. The pool refreshes an expired token first.
+        """
+        return {'Authorization': f"Bearer {GDriveClientPool.get_auth().credentials.access_token}"}
+
+    @_on_pooled_http
+    def list_files(self, folder_id: str) -> List[dict]:
+        query = f"'{folder_id}' in parents and trashed=false"
+        return [dict(gfile) for gfile in self.drive.ListFile({'q': query}).GetList()]
+
+    @_on_pooled_http
+    def get_metadata(self, file_id: str, fields: List[str]) -> dict:
+        gfile = self.drive.CreateFile({'id': file_id})
+        gfile.FetchMetadata(fields=','.join(fields))
+        return {field: gfile[field] for field in fields if field in gfile}
+
+    @_on_pooled_http
+    def upload_file(self, folder_id: str, file_path: Path, progress_callback: Optional[Callable[[int, int], None]] = None) -> str:
+        # Set the name to be the same filename as the local filename.
+        metadata = {'title': file_path.name, 'parents': [{'id': folder_id}]}
+        gfile = self.uploader.upload(file_path, metadata, progress_callback=progress_callback)
+        return gfile['id']
+
+    @_on_pooled_http
+    def download_file(self, file_id: str, directory_path: Path) -> Path:
+        gfile = self.drive.CreateFile({'id': file_id})
+        gfile.FetchMetadata(fields="title,fileSize,md5Checksum")
+        local_file_path = Path(directory_path) / gfile['title']
+        if not gfile.get('md5Checksum'):
+            # Google Docs files have no binary content to fetch with Range requests.
+            gfile.GetContentFile(str(local_file_path))
+            return local_file_path
+        self.downloader.download(DRIVE_CONTENT_URL.format(file_id=file_id), local_file_path,
+                                 total_size=int(gfile['fileSize']), expected_md5=gfile['md5Checksum'])
+        return local_file_path
+
+    @_on_pooled_http
+    def update_metadata(self, updates: Dict[str, dict]) -> Dict[str, Optional[Exception]]:
+        """
+        Sends the metadata updates of several gfiles as one Drive batch request.
+        """
+        service = self.gauth.service
+        results = {}
+        def _on_response(request_id, response, exception): # pylint: disable=unused-argument
+            results[request_id] = exception
+        batch = service.new_batch_http_request(callback=_on_response)
+        for gfile_id, fields in updates.items():
+            batch.add(service.files().patch(fileId=gfile_id, body=fields, fields='id'), request_id=gfile_id)
+        # The service's own http object is shared by all threads. Use this thread's pooled one.
+        batch.execute(http=GDriveClientPool.get_http())
+        return results
+
+    @_on_pooled_http
+    def update_metadata_if_match(self, file_id: str, fields: dict, etag: str) -> str:
+        request = self.gauth.service.files().patch(fileId=file_id, body=fields, fields='etag')
+        request.headers['If-Match'] = etag
+        try:
+            return request.execute(http=GDriveClientPool.get_http())['etag']
+        except HttpError as e:
+            if e.resp.status == 412:
+                raise StorageRequestError(f"The etag of {file_id} is no longer {etag}.", status_code=412, reason='conditionNotMet') from e
+            raise
+
+    @_on_pooled_http
+    def delete_file(self, file_id: str) -> None:
+        gfile = self.drive.CreateFile({'id': file_id})
+        gfile.Delete()
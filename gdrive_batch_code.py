@@ -0,0 +1,179 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: The gdrive_batch module collects Google Drive metadata writes (the description field
+# that carries the workflow status, and file titles) from all active jobs for a short window and
+# sends them to Drive as a single HTTP batch request. Each item in a batch succeeds or fails on its
+# own, so only the failed items are retried. Updates to the same file that arrive within one window
+# are coalesced, since the description holds a full snapshot of the workflow state.
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import asyncio
+from typing import Callable, Dict, List, Optional
+
+from logger_code import LoggerBase
+
+
+class GDriveBatchWriter:
+    """
+    Coalesces Google Drive metadata updates into batch requests.
+
+    Callers await `submit()` and are released once their update has been written to Drive (or has
+    failed for good). Pending updates are flushed when the batch window closes or as soon as a batch
+    is full, whichever comes first. One task sends the batches, one flush at a time, so a failed update
+    that is retried always sees a newer update of its file that has been queued meanwhile.
+
+    Attributes:
+        window_seconds (float): How long to collect updates before sending a batch.
+        max_batch_size (int): The maximum number of files in one batch request (Drive allows 100).
+        max_retries (int): How many times the failed items of a batch are retried.
+        retry_backoff_seconds (float): The base delay between retries. It doubles on every retry.
+    """
+    def __init__(self, send_batch: Callable[[Dict[str, dict]], Dict[str, Optional[Exception]]],
+                 window_seconds: float = 0.05, max_batch_size: int = 100, max_retries: int = 3,
+                 retry_backoff_seconds: float = 0.5, run_blocking: Optional[Callable] = None):
+        """
+        Parameters:
+            send_batch (Callable): A blocking callable that takes a dict of {file_id: {field: value}} and sends it
+                as one batch request. It returns a dict of {file_id: Exception or None} with the outcome of each item.
+            window_seconds (float): How long to collect updates before sending a batch.
+            max_batch_size (int): The maximum number of files in one batch request.
+            max_retries (int): How many times the failed items of a batch are retried.
+            retry_backoff_seconds (float): The base delay between retries.
+            run_blocking (Callable): Optional. An async callable (func, *args) that runs send_batch off the event loop.
+                Defaults to the loop's default executor.
+        """
+        self.logger = LoggerBase.setup_logger('GDriveBatchWriter')
+        self._send_batch = send_batch
+        self.window_seconds = window_seconds
+        self.max_batch_size = max_batch_size
+        self.max_retries = max_retries
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self._pending: Dict[str, dict] = {}
+        self._waiters: Dict[str, List[asyncio.Future]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        # Set to send the pending updates without waiting for the window to close.
+        self._send_now: Optional[asyncio.Event] = None
+        self._run_blocking = run_blocking or self._run_in_executor
+
+    async def submit(self, file_id: str, **fields) -> None:
+        """
+        Queues a metadata update for a Drive file and waits until it has been written.
+
+        Parameters:
+            file_id (str): The Google Drive ID of the file to update.
+            **fields: The metadata fields to set, e.g. description=... or title=...
+
+        Raises:
+            Exception: The error Drive returned for this file if it still failed after all retries.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        # A later update to the same file replaces the fields of an earlier one that hasn't been sent yet.
+        self._pending.setdefault(file_id, {}).update(fields)
+        self._waiters.setdefault(file_id, []).append(future)
+        if self._flush_task is None or self._flush_task.done():
+            self._send_now = asyncio.Event()
+            self._flush_task = loop.create_task(self._flush_after_window())
+        if len(self._pending) >= self.max_batch_size:
+            self._send_now.set()
+        await future
+
+    async def flush(self) -> None:
+        """
+        Sends the pending updates without waiting for the batch window to close, and returns once they have been
+        written (or have failed for good).
+        """
+        if self._flush_task is not None and not self._flush_task.done():
+            self._send_now.set()
+            await asyncio.shield(self._flush_task)
+
+    async def _flush_after_window(self) -> None:
+        # The only task that sends batches. Updates submitted while a flush runs are sent by the next one, until none
+        # are left.
+        while self._pending:
+            if len(self._pending) < self.max_batch_size:
+                try:
+                    await asyncio.wait_for(self._send_now.wait(), self.window_seconds)
+                except asyncio.TimeoutError:
+                    pass
+            self._send_now.clear()
+            await self._send_pending()
+
+    async def _send_pending(self) -> None:
+        """
+        Sends all pending updates, retrying only the items that failed.
+        """
+        pending, waiters = self._pending, self._waiters
+        self._pending, self._waiters = {}, {}
+        attempt = 0
+        while pending:
+            errors = {}
+            file_ids = list(pending)
+            for start in range(0, len(file_ids), self.max_batch_size):
+                chunk = {file_id: pending[file_id] for file_id in file_ids[start:start + self.max_batch_size]}
+                try:
+                    results = await self._run_blocking(self._send_batch, chunk)
+                except Exception as e: # pylint: disable=broad-exception-caught
+                    # The whole batch request failed (e.g. a connection error), so every item in it failed.
+                    results = {file_id: e for file_id in chunk}
+                for file_id in chunk:
+                    error = results.get(file_id)
+                    if error is None:
+                        self._resolve(waiters.pop(file_id, []))
+                    else:
+                        errors[file_id] = error
+            self.logger.debug(f"Sent a Drive metadata batch of {len(pending)} file(s). {len(errors)} failed (attempt {attempt + 1}).")
+            retry = {}
+            for file_id, error in errors.items():
+                if file_id in self._pending:
+                    # A newer update for this file is already queued. Retrying the older one could overwrite it,
+                    # so hand the waiters over to the newer update instead.
+                    self._waiters.setdefault(file_id, []).extend(waiters.pop(file_id, []))
+                elif attempt >= self.max_retries:
+                    self.logger.warning(f"Giving up on the metadata update of gfile {file_id}: {error}")
+                    self._resolve(waiters.pop(file_id, []), error)
+                else:
+                    retry[file_id] = pending[file_id]
+            pending = retry
+            if pending:
+                attempt += 1
+                await asyncio.sleep(self.retry_backoff_seconds * 2 ** (attempt - 1))
+
+    @staticmethod
+    async def _run_in_executor(func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, func, *args)
+
+    @staticmethod
+    def _resolve(futures: List[asyncio.Future], error: Optional[Exception] = None) -> None:
+        for future in futures:
+            if future.done():
+                continue
+            if error is None:
+                future.set_result(None)
+            else:
+                future.set_exception(error)
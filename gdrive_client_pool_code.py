@@ -0,0 +1,150 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: The gdrive_client_pool module keeps one authenticated Google Drive client per process.
+# The service account logs in once and the token is refreshed only when it expires, no matter how
+# many GDriveHelper or AudioTranscriber instances are created. httplib2 is not thread-safe, so each
+# executor thread gets its own authorized keep-alive http object, which it reuses for every request.
+# The pool size and how often connections are reused are available from GDriveClientPool.stats().
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import threading
+
+from pydrive2.auth import GoogleAuth
+from pydrive2.drive import GoogleDrive
+
+from env_settings_code import get_settings
+from logger_code import LoggerBase
+
+
+class GDriveClientPool:
+    """
+    Process-wide pool of the authenticated Google Drive client and its per-thread http objects.
+
+    Like the WorkflowTracker, the pool is used through its class methods and is never instantiated.
+
+    Key Features:
+    - The service account logs in on first use only. The token is cached and refreshed when it expires.
+    - Each thread gets its own authorized httplib2.Http object. pydrive2 keeps its http object in the
+      GoogleAuth thread-local storage, so pydrive2 calls made on the thread use the same keep-alive connection.
+    - stats() reports the pool size and the connection reuse rate.
+    """
+    _lock = threading.Lock()
+    _gauth = None
+    _drive = None
+    _thread_https = {}
+    _http_created = 0
+    _http_reused = 0
+    _logger = LoggerBase.setup_logger('GDriveClientPool')
+
+    @classmethod
+    def get_auth(cls) -> GoogleAuth:
+        """
+        Returns the shared, authenticated GoogleAuth instance. Logs in on the first call and refreshes the
+        access token once it has expired.
+        """
+        with cls._lock:
+            if cls._gauth is None:
+                cls._gauth = cls._login_with_service_account()
+                cls._drive = GoogleDrive(cls._gauth)
+            elif cls._gauth.access_token_expired:
+                cls._logger.debug("The service account's access token expired. Refreshing it.")
+                cls._gauth.Refresh()
+            return cls._gauth
+
+    @classmethod
+    def get_drive(cls) -> GoogleDrive:
+        """
+        Returns the shared GoogleDrive instance.
+        """
+        cls.get_auth()
+        return cls._drive
+
+    @classmethod
+    def get_http(cls):
+        """
+        Returns the calling thread's authorized http object, creating it on the thread's first call.
+        """
+        gauth = cls.get_auth()
+        http = getattr(gauth.thread_local, 'http', None)
+        with cls._lock:
+            if http is None:
+                http = gauth.Get_Http_Object()
+                gauth.thread_local.http = http
+                cls._http_created += 1
+            else:
+                cls._http_reused += 1
+            cls._thread_https[threading.get_ident()] = http
+        return http
+
+    @classmethod
+    def stats(cls) -> dict:
+        """
+        Returns:
+            dict: pool_size (the http objects of live threads), http_created, http_reused and
+            reuse_rate (the share of get_http() calls that reused the thread's connection).
+        """
+        with cls._lock:
+            live_threads = {thread.ident for thread in threading.enumerate()}
+            for ident in list(cls._thread_https):
+                if ident not in live_threads:
+                    del cls._thread_https[ident]
+            requests = cls._http_created + cls._http_reused
+            return {
+                'pool_size': len(cls._thread_https),
+                'http_created': cls._http_created,
+                'http_reused': cls._http_reused,
+                'reuse_rate': cls._http_reused / requests if requests else 0.0,
+            }
+
+    @classmethod
+    def _login_with_service_account(cls) -> GoogleAuth:
+        """
+        Authenticates with Google Drive using a service account.
+
+        This method sets up authentication for Google Drive operations by using service account credentials
+        specified in the environment settings. It configures the authentication process with the necessary
+        OAuth scopes and the path to the service account's JSON credentials file.
+
+        Returns:
+            GoogleAuth: An authenticated GoogleAuth instance ready for use with Google Drive operations.
+
+        Raises:
+            Exception: If authentication fails due to issues with the service account credentials or other
+            related errors, the exception is propagated upwards for handling.
+        """
+        settings = get_settings()
+        login_settings = {
+            "client_config_backend": "service",
+            "oauth_scope": settings.google_drive_oauth_scopes,
+            "service_config": {
+                "client_json_file_path":settings.google_service_account_credentials_path
+            }
+        }
+        gauth = GoogleAuth(settings=login_settings)
+        gauth.ServiceAuth()
+        cls._logger.debug("Logged in to GDrive with the service account.")
+        return gauth
@@ -0,0 +1,202 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: The gdrive_download module downloads large files as several concurrent HTTP Range
+# requests. Each segment is written straight into its place in a preallocated file with os.pwrite.
+# The MD5 of the file is computed incrementally while the download runs, as soon as the segments
+# before it are complete, and is compared against the md5Checksum Drive reports for the file. Small
+# files, servers that ignore Range requests, and platforms without os.pwrite use a single stream.
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import hashlib
+import os
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Optional
+
+from logger_code import LoggerBase
+
+BLOCK_SIZE = 1024 * 1024
+
+
+class DownloadChecksumError(Exception):
+    """
+    Raised when the MD5 of a downloaded file does not match the checksum reported by the server.
+    """
+
+
+class _RangeNotSupported(Exception):
+    pass
+
+
+class _IncrementalMD5:
+    """
+    Computes the MD5 of a file whose segments complete out of order.
+
+    MD5 has to see the bytes in order, so each time a segment completes, every completed segment that
+    directly follows the part already hashed is read back (from the page cache) and fed to the hash.
+    """
+    def __init__(self, fd: int, segments: list):
+        self._fd = fd
+        self._segments = segments
+        self._done = [False] * len(segments)
+        self._next = 0
+        self._md5 = hashlib.md5()
+        self._lock = threading.Lock()
+
+    def segment_done(self, index: int) -> None:
+        with self._lock:
+            self._done[index] = True
+            while self._next < len(self._segments) and self._done[self._next]:
+                start, end = self._segments[self._next]
+                offset = start
+                while offset <= end:
+                    block = os.pread(self._fd, min(BLOCK_SIZE, end - offset + 1), offset)
+                    if not block:
+                        break
+                    self._md5.update(block)
+                    offset += len(block)
+                self._next += 1
+
+    def hexdigest(self) -> str:
+        return self._md5.hexdigest()
+
+
+class RangedDownloader:
+    """
+    Downloads a file over HTTP, using concurrent Range requests for large files, and verifies its MD5.
+
+    Attributes:
+        segment_count (int): How many Range requests run at the same time.
+        min_parallel_size (int): Files smaller than this many bytes are downloaded as one stream.
+        timeout (float): The socket timeout of each request in seconds.
+    """
+    def __init__(self, headers_factory: Optional[Callable[[], dict]] = None, segment_count: int = 4,
+                 min_parallel_size: int = 32 * 1024 * 1024, timeout: float = 60):
+        """
+        Parameters:
+            headers_factory (Callable): Optional. Returns the headers to send with each request, e.g. the
+                Authorization header. It is called once per request so expiring tokens can be refreshed.
+            segment_count (int): How many Range requests run at the same time.
+            min_parallel_size (int): Files smaller than this many bytes are downloaded as one stream.
+            timeout (float): The socket timeout of each request in seconds.
+        """
+        self.logger = LoggerBase.setup_logger('RangedDownloader')
+        self._headers_factory = headers_factory or dict
+        self.segment_count = max(1, segment_count)
+        self.min_parallel_size = min_parallel_size
+        self.timeout = timeout
+
+    def download(self, url: str, file_path: Path, total_size: Optional[int] = None, expected_md5: Optional[str] = None) -> str:
+        """
+        Downloads url to file_path. This is a blocking call.
+
+        The file is written to a '.part' file next to file_path and renamed once it is complete and verified,
+        so file_path never holds a partial download.
+
+        Parameters:
+            url (str): The URL of the file's content.
+            file_path (Path): Where to save the file.
+            total_size (Optional[int]): The size of the file in bytes. Without it, the file is downloaded as one stream.
+            expected_md5 (Optional[str]): The hex MD5 the file should have. If set, a mismatch raises DownloadChecksumError.
+
+        Returns:
+            str: The hex MD5 of the downloaded file.
+
+        Raises:
+            DownloadChecksumError: If the MD5 of the downloaded file does not match expected_md5.
+        """
+        file_path = Path(file_path)
+        part_path = file_path.with_name(file_path.name + '.part')
+        parallel = (total_size is not None and total_size >= self.min_parallel_size
+                    and self.segment_count > 1 and hasattr(os, 'pwrite'))
+        try:
+            md5 = None
+            if parallel:
+                try:
+                    md5 = self._download_segments(url, part_path, total_size)
+                except _RangeNotSupported:
+                    self.logger.debug(f"The server ignored the Range request for {file_path.name}. Downloading it as one stream.")
+            if md5 is None:
+                md5 = self._download_stream(url, part_path)
+            if expected_md5 and md5 != expected_md5.lower():
+                raise DownloadChecksumError(f"The MD5 of {file_path.name} is {md5}, but the server reported {expected_md5}.")
+            os.replace(part_path, file_path)
+        finally:
+            part_path.unlink(missing_ok=True)
+        return md5
+
+    def _open(self, url: str, byte_range: Optional[tuple] = None):
+        headers = dict(self._headers_factory())
+        if byte_range:
+            headers['Range'] = f"bytes={byte_range[0]}-{byte_range[1]}"
+        return urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=self.timeout)
+
+    def _download_stream(self, url: str, part_path: Path) -> str:
+        md5 = hashlib.md5()
+        with self._open(url) as response, open(part_path, 'wb') as f:
+            while True:
+                block = response.read(BLOCK_SIZE)
+                if not block:
+                    break
+                md5.update(block)
+                f.write(block)
+        return md5.hexdigest()
+
+    def _download_segments(self, url: str, part_path: Path, total_size: int) -> str:
+        segment_size = -(-total_size // self.segment_count)
+        segments = [(start, min(start + segment_size, total_size) - 1) for start in range(0, total_size, segment_size)]
+        fd = os.open(part_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            # Preallocate so the segments can be written at their offsets in any order.
+            if hasattr(os, 'posix_fallocate'):
+                os.posix_fallocate(fd, 0, total_size)
+            else:
+                os.ftruncate(fd, total_size)
+            hasher = _IncrementalMD5(fd, segments)
+
+            def _fetch(index):
+                start, end = segments[index]
+                with self._open(url, (start, end)) as response:
+                    if response.status != 206:
+                        raise _RangeNotSupported()
+                    offset = start
+                    while offset <= end:
+                        block = response.read(min(BLOCK_SIZE, end - offset + 1))
+                        if not block:
+                            raise IOError(f"The connection closed at byte {offset} of the segment {start}-{end}.")
+                        os.pwrite(fd, block, offset)
+                        offset += len(block)
+                hasher.segment_done(index)
+
+            with ThreadPoolExecutor(max_workers=len(segments), thread_name_prefix='ranged-download') as pool:
+                # list() re-raises the first error of any segment.
+                list(pool.map(_fetch, range(len(segments))))
+            return hasher.hexdigest()
+        finally:
+            os.close(fd)
@@ -37,68 +37,90 @@
 from pathlib import Path
 import asyncio
 import json
+import weakref
 
 import aiofiles
-from pydrive2.auth import GoogleAuth
-from pydrive2.drive import GoogleDrive
 
 
-from workflow_tracker_code import WorkflowTracker
+from workflow_tracker_code import WorkflowTracker, WorkflowTrackerModel
 from env_settings_code import get_settings
 from logger_code import LoggerBase
 from workflow_error_code import handle_error, async_error_handler
 from pydantic_models import GDriveInput, TranscriptText, MP3filename
 from workflow_states_code import WorkflowEnum
 from status_update_code import update_and_monitor_gdrive_status
+from gdrive_batch_code import GDriveBatchWriter
+from gdrive_scheduler_code import get_drive_scheduler
+from storage_backend_code import StorageBackend, StorageRequestError, get_storage_backend
+from work_lease_code import CAS_ATTEMPTS, PRECONDITION_FAILED, parse_lease
+
+# Upload progress is written to the workflow status every time another 10 percent has been sent.
+UPLOAD_PROGRESS_REPORT_STEP = 10
 
 class GDriveHelper:
     """
     Facilitates interaction with Google Drive for file operations within the transcription process.
 
-    This class provides methods to authenticate via a service account, and perform various Google Drive
-    operations such as uploading, downloading, and updating file descriptions. It is designed to support
-    the workflow of managing audio files and their transcriptions on Google Drive.
+    This class provides methods to perform various Google Drive operations such as uploading, downloading,
+    and updating file descriptions. It is designed to support the workflow of managing audio files and their
+    transcriptions on Google Drive. The storage operations themselves are done by a StorageBackend: Google
+    Drive by default, or another backend selected by the 'storage_backend' setting.
 
     Attributes:
         logger (Logger): Logger instance for logging messages.
-        gauth (GoogleAuth): Authentication object for Google Drive.
-        drive (GoogleDrive): Google Drive service object for interacting with the API.
+        backend (StorageBackend): The storage the files are kept in.
         settings (Settings): Configuration settings loaded from environment variables.
+        batch_writer (GDriveBatchWriter): Batches metadata writes across all GDriveHelper instances of the backend.
+        scheduler (DriveRequestScheduler): Rate limits and retries every Drive request of the process.
     """
-    def __init__(self):
+    # Shared by all instances using the same backend so status writes from concurrent jobs end up in the same batch request.
+    _batch_writers = weakref.WeakKeyDictionary()
+
+    def __init__(self, backend: StorageBackend = None):
         self.settings = get_settings()
         self.logger = LoggerBase.setup_logger()
-        self.gauth = self._login_with_service_account()
-        self.drive = GoogleDrive(self.gauth)
-
-    def _login_with_service_account(self):
+        self.backend = backend if backend is not None else get_storage_backend()
+        self.scheduler = get_drive_scheduler()
+        if self.backend not in GDriveHelper._batch_writers:
+            GDriveHelper._batch_writers[self.backend] = GDriveBatchWriter(
+                self.backend.update_metadata,
+                window_seconds=self.settings.gdrive_batch_window_seconds,
+                max_batch_size=self.settings.gdrive_batch_max_size,
+                max_retries=self.settings.gdrive_batch_max_retries,
+                run_blocking=self._run_metadata_batch)
+        self.batch_writer = GDriveHelper._batch_writers[self.backend]
+
+    @property
+    def gauth(self):
         """
-        Authenticates with Google Drive using a service account.
-
-        This method sets up authentication for Google Drive operations by using service account credentials
-        specified in the environment settings. It configures the authentication process with the necessary
-        OAuth scopes and the path to the service account's JSON credentials file.
+        The GoogleAuth instance of the Google Drive backend. None for other backends.
+        """
+        return getattr(self.backend, 'gauth', None)
 
-        Returns:
-            GoogleAuth: An authenticated GoogleAuth instance ready for use with Google Drive operations.
+    @property
+    def drive(self):
+        """
+        The GoogleDrive instance of the Google Drive backend. None for other backends.
+        """
+        return getattr(self.backend, 'drive', None)
 
-        Raises:
-            Exception: If authentication fails due to issues with the service account credentials or other
-            related errors, the exception is propagated upwards for handling.
+    async def _run_blocking(self, func, *args):
         """
-        try:
-            login_settings = {
-                "client_config_backend": "service",
-                "oauth_scope": self.settings.google_drive_oauth_scopes,
-                "service_config": {
-                    "client_json_file_path":self.settings.google_service_account_credentials_path
-                }
-            }
-            gauth = GoogleAuth(settings=login_settings)
-            gauth.ServiceAuth()
-        except Exception as e:
-            raise e
-        return gauth
+        Runs a blocking storage call in the executor through the process-wide request scheduler, which rate limits
+        the call and retries it when Drive throttles it. Calls to backends without a request quota (e.g. the local
+        file system) skip the scheduler.
+        """
+        if not self.backend.rate_limited:
+            return await asyncio.to_thread(func, *args)
+        return await self.scheduler.run(func, *args)
+
+    async def _run_metadata_batch(self, send_batch, updates: dict) -> dict:
+        results = await self._run_blocking(send_batch, updates)
+        # Items of a batch are throttled one by one. Let the scheduler slow down for them too.
+        for error in results.values():
+            if error is not None:
+                self.scheduler.observe_error(error)
+        return results
 
     @async_error_handler()
     async def update_mp3_gfile_status(self) -> None:
@@ -106,26 +128,73 @@ class GDriveHelper:
         Asynchronously updates the status of the transcription process in the associated Google Drive file's description.
 
         Updates the file's description with the current transcription status if an MP3 file's Google Drive ID is found, and logs the workflow state.
-        This ensures synchronization between the application's tracking and Google Drive.
+        This ensures synchronization between the application's tracking and Google Drive. The write goes through the
+        shared batch writer, so status writes of concurrent jobs are sent to Drive in one batch request. A job holding
+        a lease on the file (see work_lease_code) writes its status with a compare-and-set instead, so it can't
+        overwrite the lease of a worker that has taken the file over.
 
         Decorators:
         - @async_error_handler(): Handles exceptions during the asynchronous operation.
         """
-        loop = asyncio.get_running_loop()
-        def _update_workflow_status():
-            gfile_id = WorkflowTracker.get('mp3_gfile_id')
-            if not gfile_id:
-                return False
-            file_to_update = self.drive.CreateFile({'id': gfile_id})
-            transcription_info_json = WorkflowTracker.get_model().model_dump_json()
-            # The transcription (workflow) status is placed as a json string within the gfile's description field.
-            # This is not ideal, but using labels proved to be way too confusing/difficult.
-            file_to_update['description'] = transcription_info_json
-            file_to_update.Upload()
-            return True
+        gfile_id = WorkflowTracker.get('mp3_gfile_id')
         # If there is no mp3 file in gdrive with the gfile_id, log an error but don't raise an exception.
-        if not await loop.run_in_executor(None, _update_workflow_status):
+        if not gfile_id:
             await handle_error(error_message='There was no mp3 gfile id in WorkflowTracker.  Status info is stored within the description field of the mp3 file.',operation='update_transcription_status_in_mp3_gfile', raise_exception=False)
+            return
+        # The transcription (workflow) status is placed as a json string within the gfile's description field.
+        # This is not ideal, but using labels proved to be way too confusing/difficult.
+        transcription_info_json = WorkflowTracker.get_model().model_dump_json()
+        lease_owner = WorkflowTracker.get('lease_owner')
+        if lease_owner:
+            await self._update_status_under_lease(gfile_id, transcription_info_json, lease_owner, WorkflowTracker.get('lease_version'))
+            return
+        await self.batch_writer.submit(gfile_id, description=transcription_info_json)
+
+    async def _update_status_under_lease(self, gfile_id: str, transcription_info_json: str, lease_owner: str, lease_version: int) -> None:
+        """
+        Writes the workflow status of a job holding a lease on the file, if the lease is still the job's.
+
+        The description is read with its etag and the lease in it checked. The status is only written if the etag
+        hasn't changed meanwhile (If-Match), so a lease taken over between reading and writing isn't overwritten.
+        The write of a job that has lost its lease is dropped.
+
+        Raises:
+            StorageRequestError: If the file kept changing between reading and writing it.
+        """
+        for _ in range(CAS_ATTEMPTS):
+            metadata = await self.get_file_metadata(gfile_id, ['description', 'etag'])
+            owner, _, version = parse_lease(metadata.get('description'))
+            if owner != lease_owner or version != lease_version:
+                self.logger.warning(f"Dropped a status write to gfile {gfile_id}: its lease is held by {owner} (version {version}) now.")
+                return
+            try:
+                await self.update_metadata_if_match(gfile_id, {'description': transcription_info_json}, metadata['etag'])
+                return
+            except StorageRequestError as e:
+                if e.status_code != PRECONDITION_FAILED:
+                    raise
+        raise StorageRequestError(f"Could not write the status of gfile {gfile_id}: the file kept changing.", PRECONDITION_FAILED)
+
+    @async_error_handler(error_message = 'Could not reset the workflow status of the gfiles.')
+    async def reset_mp3_gfiles_status(self, gfile_ids: list) -> None:
+        """
+        Asynchronously resets the workflow status stored in the description field of many mp3 gfiles.
+
+        This is an admin operation, e.g. to have the batch transcriber redo a folder. All the description
+        writes are sent through the shared batch writer, so a folder of files costs a few batch requests
+        instead of one request per file.
+
+        Parameters:
+            gfile_ids (list): The Google Drive IDs of the mp3 files to reset.
+
+        Raises:
+            Exception: Uses the @async_error_handler decorator to handle exceptions.
+        """
+        writes = []
+        for gfile_id in gfile_ids:
+            reset_model = WorkflowTrackerModel(status=WorkflowEnum.NOT_STARTED.name, comment="Workflow status reset.", mp3_gfile_id=gfile_id)
+            writes.append(self.batch_writer.submit(gfile_id, description=reset_model.model_dump_json()))
+        await asyncio.gather(*writes)
 
     @async_error_handler()
     async def upload_mp3_to_gdrive(self, mp3_file_path:Path) -> GDriveInput:
@@ -151,7 +220,8 @@ class GDriveHelper:
         return gfile_id
 
     @async_error_handler(error_message = 'Could not upload the transcript to a gflie.')
-    async def upload_transcript_to_gdrive(self,  transcript_text: TranscriptText) -> None:
+    async def upload_transcript_to_gdrive(self,  transcript_text: TranscriptText, transcript_filename: str = None,
+                                          local_transcript_file_path: Path = None) -> None:
         """
         Asynchronously uploads a transcription text to Google Drive as a text file.
 
@@ -160,6 +230,10 @@ class GDriveHelper:
 
         Parameters:
         - transcript_text (TranscriptText): The transcription text to be uploaded.
+        - transcript_filename (str): Optional. The name of the text file, for a transcript that has no mp3 gfile
+          (e.g. a live session).
+        - local_transcript_file_path (Path): Optional. A transcript saved already by save_transcript_locally(). It is
+          uploaded as it is, and transcript_text is ignored.
 
         Raises:
         - Exception with the message 'Could not upload the transcript to a gflie.' if the upload fails.
@@ -167,31 +241,54 @@ class GDriveHelper:
         Decorators:
         - @async_error_handler(): Handles exceptions that may occur during the upload process, providing a specific error message for upload failures.
         """
-        # Use the name portion of the mp3 filename as the name portion of the transcription file.
-        mp3_gfile_id = WorkflowTracker.get('mp3_gfile_id')
-        mp3_gfile_input = GDriveInput(gdrive_id=mp3_gfile_id)
-        mp3_filename = await self.get_filename(mp3_gfile_input)
-        # Complete the transcription's filename by appending the .txt extension.
-        txt_filename = mp3_filename[:-4] + '.txt'
-        local_transcript_dir = Path(self.settings.local_transcript_dir)
-        local_transcript_dir.mkdir(parents=True, exist_ok=True)
-        local_transcript_file_path = local_transcript_dir / txt_filename
-        # Save the transcript locally within the local_transcript_dir defined in the env settings.
-        async with aiofiles.open(str(local_transcript_file_path), "w") as temp_file:
-            await temp_file.write(str(transcript_text))
+        if local_transcript_file_path is None:
+            local_transcript_file_path = await self.save_transcript_locally(transcript_text, transcript_filename)
         folder_gdrive_id = self.settings.gdrive_transcripts_folder_id
         # We have a PATH variable that contains the transcript bytes.  Upload to GDrive.
         transcription_gfile_id = await self.upload_to_gdrive(GDriveInput(gdrive_id=folder_gdrive_id),local_transcript_file_path)
 
         return transcription_gfile_id,local_transcript_file_path
 
+    @async_error_handler(error_message = 'Could not save the transcript locally.')
+    async def save_transcript_locally(self, transcript_text: TranscriptText, transcript_filename: str = None) -> Path:
+        """
+        Saves a transcription text within the local_transcript_dir defined in the env settings.
+
+        The file is named after the mp3 file (with a '.txt' extension instead of '.mp3'), unless transcript_filename is given.
+
+        Parameters:
+        - transcript_text (TranscriptText): The transcription text.
+        - transcript_filename (str): Optional. The name of the text file, for a transcript that has no mp3 gfile
+          (e.g. a live session).
+
+        Returns:
+        - Path: The path to the local transcript file.
+        """
+        if transcript_filename:
+            txt_filename = Path(transcript_filename).name
+        else:
+            # Use the name portion of the mp3 filename as the name portion of the transcription file.
+            mp3_gfile_id = WorkflowTracker.get('mp3_gfile_id')
+            mp3_gfile_input = GDriveInput(gdrive_id=mp3_gfile_id)
+            mp3_filename = await self.get_filename(mp3_gfile_input)
+            # Complete the transcription's filename by appending the .txt extension.
+            txt_filename = mp3_filename[:-4] + '.txt'
+        local_transcript_dir = Path(self.settings.local_transcript_dir)
+        local_transcript_dir.mkdir(parents=True, exist_ok=True)
+        local_transcript_file_path = local_transcript_dir / txt_filename
+        async with aiofiles.open(str(local_transcript_file_path), "w", encoding="utf-8") as temp_file:
+            await temp_file.write(str(transcript_text))
+        return local_transcript_file_path
+
     @async_error_handler(error_message = 'Could not upload the file to GDrive.')
     async def upload_to_gdrive(self, folder_gdrive_input:GDriveInput, file_path: Path) -> GDriveInput:
         """
         Asynchronously uploads a file to Google Drive, placing it within a specified folder.
 
         This method uploads a local file to a designated Google Drive folder and returns
-        the Google Drive file ID of the uploaded file.
+        the Google Drive file ID of the uploaded file. The Google Drive backend sends the file in chunks using
+        Drive's resumable upload protocol. If the upload fails, uploading the same file again resumes where it
+        stopped, also after a restart of the process. The upload progress is written to the workflow status.
 
         Parameters:
             folder_gdrive_input (GDriveInput): The Google Drive folder ID where the file will be uploaded.
@@ -203,30 +300,38 @@ class GDriveHelper:
         Raises:
             Exception: Uses the @async_error_handler decorator to handle exceptions.
         """
-
-        def _upload():
-            folder_gdrive_id = folder_gdrive_input.gdrive_id
-            gfile = self.drive.CreateFile({'parents': [{'id': folder_gdrive_id}]})
-            gfile.SetContentFile(str(file_path))
-            # Set the name to be the same filename as the local filename.
-            gfile['title'] = file_path.name
-            gfile.Upload()
-            if hasattr(gfile, 'content') and gfile.content:
-                gfile.content.close()
-            gfile_input = GDriveInput(gdrive_id=gfile['id'])
-            gfile_id = gfile_input.gdrive_id
-            return gfile_id
         loop = asyncio.get_running_loop()
-        gfile_id = await loop.run_in_executor(None, _upload)
+        progress_reports = []
+        last_reported = -UPLOAD_PROGRESS_REPORT_STEP
+
+        def _on_progress(bytes_uploaded, total_bytes):
+            nonlocal last_reported
+            percent = 100 if total_bytes == 0 else int(bytes_uploaded * 100 / total_bytes)
+            if percent - last_reported >= UPLOAD_PROGRESS_REPORT_STEP or (percent == 100 and last_reported != 100):
+                last_reported = percent
+                # This runs in the executor thread. Hand the status update over to the event loop.
+                progress_reports.append(asyncio.run_coroutine_threadsafe(self._report_upload_progress(file_path.name, percent), loop))
+
+        try:
+            gfile_id = await self._run_blocking(self.backend.upload_file, folder_gdrive_input.gdrive_id, file_path, _on_progress)
+            gfile_id = GDriveInput(gdrive_id=gfile_id).gdrive_id
+        finally:
+            # Don't let a late progress report overwrite the status updates that follow the upload.
+            await asyncio.gather(*(asyncio.wrap_future(report) for report in progress_reports), return_exceptions=True)
         return gfile_id
 
+    async def _report_upload_progress(self, filename: str, percent: int) -> None:
+        await update_and_monitor_gdrive_status(self, status=WorkflowTracker.get('status'), upload_progress=percent,
+                                               comment=f"Uploading {filename} to GDrive: {percent}% sent.")
+
     @async_error_handler(error_message = 'Could not download_from_gdrive.')
     async def download_from_gdrive(self, gdrive_input:GDriveInput, directory_path: Path):
         """
         Asynchronously downloads a file from Google Drive to a specified local directory.
 
         This method retrieves a file from Google Drive using its file ID and saves it to
-        a local directory.
+        a local directory. The Google Drive backend fetches large files as several concurrent Range requests
+        and checks the MD5 of the downloaded file against the md5Checksum Drive keeps for the file.
 
         Parameters:
             gdrive_input (GDriveInput): An instance containing the Google Drive file ID of the file to be downloaded.
@@ -239,16 +344,7 @@ class GDriveHelper:
             Exception: Uses the @async_error_handler decorator to handle exceptions.
         """
 
-        loop = asyncio.get_running_loop()
-        def _download():
-            gfile = self.drive.CreateFile({'id': gdrive_input.gdrive_id})
-            gfile.FetchMetadata(fields="title")
-            filename = gfile['title']
-            local_file_path = directory_path / filename
-            gfile.GetContentFile(str(local_file_path))
-            return local_file_path
-
-        local_file_path = await loop.run_in_executor(None, _download)
+        local_file_path = await self._run_blocking(self.backend.download_file, gdrive_input.gdrive_id, directory_path)
         return local_file_path
 
     @async_error_handler(error_message = 'Could not get the filename of the gfile.')
@@ -271,17 +367,20 @@ class GDriveHelper:
         """
 
         gfile_id = gfile_input.gdrive_id
-        loop = asyncio.get_running_loop()
-        def _get_filename():
-            file = self.drive.CreateFile({'id': gfile_id})
-            # Fetch the filename from the metadata
-            file.FetchMetadata(fields='title')
-            filename = file['title']
-            return filename
-        filename = await loop.run_in_executor(None, _get_filename)
+        # Fetch the filename from the metadata
+        metadata = await self._run_blocking(self.backend.get_metadata, gfile_id, ['title'])
+        filename = metadata['title']
         verified_filename = MP3filename(filename=filename)
         return verified_filename.filename
 
+    @async_error_handler(error_message = 'Could not get the MD5 checksum of the gfile.')
+    async def get_md5_checksum(self, gfile_input: GDriveInput) -> str:
+        """
+        Returns the MD5 checksum Drive keeps for the content of a file, as a lowercase hex string.
+        """
+        metadata = await self._run_blocking(self.backend.get_metadata, gfile_input.gdrive_id, ['md5Checksum'])
+        return (metadata.get('md5Checksum') or '').lower()
+
     @async_error_handler(error_message = 'Could not fetch the transcription status from the description field of the gfile.')
     async def sync_workflowTracker_from_gfile_description(self, gdrive_input: GDriveInput) -> dict:
         """
@@ -300,21 +399,16 @@ class GDriveHelper:
         """
 
         gfile_id = gdrive_input.gdrive_id
-        loop = asyncio.get_running_loop()
 
-        def _get_stored_workflowTracker() -> str:
-            file_metadata = self.drive.CreateFile({'id': gfile_id})
-            # Fetch metadata for the file
-            try:
-                file_metadata.FetchMetadata(fields='description')
-                description = file_metadata.get('description', '{}')
-                workflowTracker_dict = json.loads(description)
-            except Exception as e:
-                self.logger.warning("The Worflowtracker dictionary was not loaded from the description field.  Creating an empty dictionary.")
-                workflowTracker_dict = {}
-            return workflowTracker_dict
-
-        workflowTracker_dict = await loop.run_in_executor(None, _get_stored_workflowTracker)
+        # Fetch metadata for the file. Errors fetching it (e.g. rate limits) are raised so the scheduler can
+        # retry them. Treating them as an empty description would reset the file's workflow status.
+        file_metadata = await self._run_blocking(self.backend.get_metadata, gfile_id, ['description'])
+        try:
+            description = file_metadata.get('description', '{}')
+            workflowTracker_dict = json.loads(description)
+        except Exception as e: # pylint: disable=broad-exception-caught
+            self.logger.warning("The Worflowtracker dictionary was not loaded from the description field.  Creating an empty dictionary.")
+            workflowTracker_dict = {}
         # Add the gdrive_input to workflowTracker_dict.
         workflowTracker_dict['input_mp3'] = gdrive_input
         status = workflowTracker_dict.get('status','unknown')
@@ -345,24 +439,65 @@ class GDriveHelper:
             gdrive_folder_id (str): The Google Drive folder ID from which to retrieve MP3 files.
 
         Returns:
-            list: A list of Google Drive file objects representing MP3 files ready for transcription.
+            list: A list of file metadata dicts (with the 'id' and 'title' keys) representing MP3 files ready for transcription.
 
         Raises:
             Exception: If the list of MP3 files could not be retrieved, with a custom error message.
         """
 
-        loop = asyncio.get_running_loop()
-        def _get_file_info():
-            # Assuming get_gfile_state is properly defined as an async function
-            gfiles_to_transcribe_list = []
-            query = f"'{gdrive_folder_id}' in parents and trashed=false"
-            file_list = self.drive.ListFile({'q': query}).GetList()
-            for file in file_list:
-                gfiles_to_transcribe_list.append(file)
-            return gfiles_to_transcribe_list
-        gfiles_to_transcribe_list = await loop.run_in_executor(None, _get_file_info)
+        gfiles_to_transcribe_list = await self._run_blocking(self.backend.list_files, gdrive_folder_id)
         return gfiles_to_transcribe_list
 
+    async def get_file_metadata(self, gfile_id: str, fields: list) -> dict:
+        """
+        Asynchronously fetches metadata fields of a file, e.g. to check that it exists before a job is queued for it.
+
+        Parameters:
+            gfile_id (str): The ID of the file.
+            fields (list): The metadata fields to fetch, e.g. ['title', 'fileSize'].
+
+        Returns:
+            dict: The fields the file has.
+
+        Raises:
+            StorageRequestError: If the file doesn't exist (status_code 404) or the request fails. It isn't wrapped by
+            @async_error_handler, so callers can tell the cases apart.
+        """
+        return await self._run_blocking(self.backend.get_metadata, gfile_id, fields)
+
+    async def update_metadata_if_match(self, gfile_id: str, fields: dict, etag: str) -> str:
+        """
+        Asynchronously sets metadata fields of a file if it hasn't changed since its etag was read (compare-and-set).
+        Unlike status writes, it isn't batched, so the caller learns straight away whether it won.
+
+        Parameters:
+            gfile_id (str): The ID of the file.
+            fields (dict): The metadata fields to set, e.g. {'description': ...}.
+            etag (str): The etag the file must still have.
+
+        Returns:
+            str: The file's new etag.
+
+        Raises:
+            StorageRequestError: With status_code 412 if the file has changed. Not wrapped by @async_error_handler.
+        """
+        return await self._run_blocking(self.backend.update_metadata_if_match, gfile_id, fields, etag)
+
+    async def read_file_head(self, gfile_id: str, length: int):
+        """
+        Asynchronously reads the first length bytes of a file, e.g. the frame headers of an mp3 file.
+
+        Parameters:
+            gfile_id (str): The ID of the file.
+            length (int): The number of bytes to read.
+
+        Returns:
+            Optional[bytes]: The bytes, or None if the storage backend can't read part of a file cheaply (Google Drive).
+        """
+        if not self.backend.supports_read_head:
+            return None
+        return await self._run_blocking(self.backend.read_head, gfile_id, length)
+
     @async_error_handler(error_message = 'Error attempting to delete gfile.')
     async def delete_file(self, file_id: str):
         """
@@ -375,5 +510,4 @@ class GDriveHelper:
             Exception: Uses the @async_error_handler decorator to handle exceptions (i.e.: gfile could not be deleted).
         """
 
-        file = self.drive.CreateFile({'id': file_id})
-        file.Delete()
+        await self._run_blocking(self.backend.delete_file, file_id)
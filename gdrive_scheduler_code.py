@@ -0,0 +1,292 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: The gdrive_scheduler module sends every Google Drive request of the process through one
+# scheduler. A client-side token bucket keeps the request rate within our Drive quota. Requests that
+# fail with a rate limit (403 userRateLimitExceeded/rateLimitExceeded, 429), a server error or a
+# dropped connection are retried with exponential backoff and full jitter, honoring Retry-After when
+# Drive sends it. Each throttle response halves the request rate, and successful requests slowly raise
+# it back to the configured quota. Throttle events and the achieved request rate are kept as metrics.
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import asyncio
+import collections
+import contextvars
+import email.utils
+import functools
+import http.client
+import json
+import random
+import socket
+import threading
+import time
+import urllib.error
+from typing import Optional, Tuple
+
+from httplib2 import HttpLib2Error
+
+from env_settings_code import get_settings
+from logger_code import LoggerBase
+from metrics_code import get_metrics_registry
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = {'userRateLimitExceeded', 'rateLimitExceeded'}
+TRANSIENT_ERRORS = (ConnectionError, TimeoutError, socket.timeout, http.client.HTTPException, urllib.error.URLError, HttpLib2Error)
+# The achieved request rate is measured over this many seconds.
+RATE_WINDOW_SECONDS = 60
+
+
+def describe_drive_error(error: Exception) -> Tuple[Optional[int], Optional[str], Optional[float]]:
+    """
+    Pulls the HTTP status code, the Drive error reason and the Retry-After delay out of an exception raised
+    by googleapiclient, pydrive2, urllib or our own upload/download code.
+
+    Returns:
+        Tuple[Optional[int], Optional[str], Optional[float]]: (status_code, reason, retry_after_seconds). Each is None if unknown.
+    """
+    details = getattr(error, 'drive_error_details', None)
+    if details is None:
+        details = _describe_drive_error(error)
+        try:
+            # Cache the details. The body of a urllib HTTPError can only be read once.
+            error.drive_error_details = details
+        except AttributeError:
+            pass
+    return details
+
+def _describe_drive_error(error: Exception) -> Tuple[Optional[int], Optional[str], Optional[float]]:
+    # pydrive2's ApiRequestError wraps the googleapiclient HttpError.
+    http_error = error.args[0] if error.args and hasattr(error.args[0], 'resp') else error
+    resp = getattr(http_error, 'resp', None)
+    if resp is not None and hasattr(http_error, 'content'):
+        return int(resp.status), _reason_from_content(http_error.content), _parse_retry_after(resp.get('retry-after'))
+    if isinstance(error, urllib.error.HTTPError):
+        try:
+            content = error.read()
+        except Exception: # pylint: disable=broad-exception-caught
+            content = None
+        return error.code, _reason_from_content(content), _parse_retry_after(error.headers.get('Retry-After'))
+    status_code = getattr(error, 'status_code', None)
+    if status_code is not None:
+        return status_code, getattr(error, 'reason', None), getattr(error, 'retry_after', None)
+    return None, None, None
+
+def is_throttle_error(error: Exception) -> bool:
+    status_code, reason, _ = describe_drive_error(error)
+    return status_code == 429 or (status_code == 403 and reason in RATE_LIMIT_REASONS)
+
+def is_retryable_error(error: Exception) -> bool:
+    status_code, _, _ = describe_drive_error(error)
+    if status_code is None:
+        return isinstance(error, TRANSIENT_ERRORS)
+    return status_code in RETRYABLE_STATUS_CODES or is_throttle_error(error)
+
+def _reason_from_content(content) -> Optional[str]:
+    try:
+        error = json.loads(content).get('error', {})
+        return error.get('errors', [{}])[0].get('reason') or error.get('status')
+    except (TypeError, ValueError, AttributeError, IndexError):
+        return None
+
+def _parse_retry_after(value) -> Optional[float]:
+    """
+    Retry-After is either a number of seconds or an HTTP date.
+    """
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class DriveRequestScheduler:
+    """
+    Rate limits and retries blocking Google Drive calls.
+
+    The token bucket refills at `rate` requests per second, up to `burst` tokens. The rate adapts with additive
+    increase/multiplicative decrease: every throttle response halves it (down to `min_rate`), every successful
+    request adds max_rate/100 to it (up to `max_rate`, the configured quota).
+
+    There is one scheduler per process, and its callers aren't all on one event loop (e.g. the job service and a
+    command run with asyncio.run in another thread), so the token bucket, the rate and the counts are only changed
+    under a lock. Waiting for a token or a retry happens outside it.
+
+    Attributes:
+        max_rate (float): The quota in requests per second.
+        rate (float): The current request rate.
+        burst (int): The size of the token bucket.
+        max_retries (int): How many times a retryable request is retried.
+    """
+    def __init__(self, requests_per_second: float = 10.0, burst: int = 20, max_retries: int = 5,
+                 base_backoff_seconds: float = 1.0, max_backoff_seconds: float = 64.0, min_rate: float = 0.5):
+        self.logger = LoggerBase.setup_logger('DriveRequestScheduler')
+        self.max_rate = requests_per_second
+        self.rate = requests_per_second
+        self.min_rate = min(min_rate, requests_per_second)
+        self.burst = max(1, burst)
+        self.max_retries = max_retries
+        self.base_backoff_seconds = base_backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self._tokens = float(self.burst)
+        self._last_refill = time.monotonic()
+        self._completed = collections.deque()
+        self.requests = 0
+        self.retries = 0
+        self.throttle_events = 0
+        self.failures = 0
+        # The requests waiting for a token, for a retry or for the executor, or running in it.
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        registry = get_metrics_registry()
+        self._errors_counter = registry.counter('gdrive_request_errors_total', "Drive requests that raised an error, by HTTP status.", ('status',))
+        self._throttles_counter = registry.counter('gdrive_throttle_events_total', "Drive responses asking to slow down.")
+        self._requests_counter = registry.counter('gdrive_requests_total', "Drive request attempts.")
+
+    async def run(self, func, *args):
+        """
+        Runs the blocking callable func(*args) in the executor once a token is available, retrying it on
+        rate limits, server errors and dropped connections.
+
+        Returns:
+            The return value of func.
+
+        Raises:
+            Exception: The error of the last attempt if the error isn't retryable or the retries are used up.
+        """
+        with self._lock:
+            self.in_flight += 1
+        try:
+            return await self._run(func, *args)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        attempt = 0
+        while True:
+            await self._acquire()
+            with self._lock:
+                self.requests += 1
+            self._requests_counter.inc()
+            try:
+                # Run it in a copy of the caller's context (like asyncio.to_thread), so callbacks from the executor
+                # thread (e.g. upload progress) still see the job's WorkflowTracker state.
+                result = await loop.run_in_executor(None, functools.partial(contextvars.copy_context().run, func, *args))
+            except Exception as e:
+                self.observe_error(e)
+                if not is_retryable_error(e) or attempt >= self.max_retries:
+                    with self._lock:
+                        self.failures += 1
+                    raise
+                _, _, retry_after = describe_drive_error(e)
+                # Full jitter: a random delay between 0 and the exponential backoff, so throttled callers spread out.
+                delay = retry_after if retry_after is not None else random.uniform(0, min(self.max_backoff_seconds, self.base_backoff_seconds * 2 ** attempt))
+                attempt += 1
+                with self._lock:
+                    self.retries += 1
+                self.logger.warning(f"Drive request {getattr(func, '__name__', func)} failed ({e}). Retry {attempt} of {self.max_retries} in {delay:.1f}s.")
+                await asyncio.sleep(delay)
+                continue
+            self.observe_success()
+            return result
+
+    def observe_error(self, error: Exception) -> None:
+        """
+        Slows the request rate down if error is a throttle response. Also used for the per-item errors of batch requests.
+        """
+        status_code, _, _ = describe_drive_error(error)
+        self._errors_counter.inc(status=status_code if status_code is not None else type(error).__name__)
+        if is_throttle_error(error):
+            self._throttles_counter.inc()
+            with self._lock:
+                self.throttle_events += 1
+                self.rate = max(self.min_rate, self.rate / 2)
+            self.logger.debug(f"Drive throttled a request. Lowering the request rate to {self.rate:.2f}/s.")
+
+    def observe_success(self) -> None:
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 100)
+            now = time.monotonic()
+            self._completed.append(now)
+            while self._completed and self._completed[0] < now - RATE_WINDOW_SECONDS:
+                self._completed.popleft()
+
+    async def _acquire(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+            self._last_refill = now
+            # Take the token right away, even if it puts the bucket in debt. Callers that find the bucket in debt
+            # wait for their place in line, which keeps the order first come, first served.
+            self._tokens -= 1
+            wait_seconds = -self._tokens / self.rate
+        if wait_seconds > 0:
+            await asyncio.sleep(wait_seconds)
+
+    def metrics(self) -> dict:
+        """
+        Returns:
+            dict: The request, retry, failure and throttle event counts, the requests in flight, the current rate
+            limit and the achieved rate (successful requests per second over the last minute).
+        """
+        with self._lock:
+            now = time.monotonic()
+            recent = sum(1 for completed in self._completed if completed >= now - RATE_WINDOW_SECONDS)
+            return {
+                'requests': self.requests,
+                'retries': self.retries,
+                'failures': self.failures,
+                'throttle_events': self.throttle_events,
+                'in_flight': self.in_flight,
+                'rate_limit': round(self.rate, 3),
+                'achieved_rate': round(recent / RATE_WINDOW_SECONDS, 3),
+            }
+
+
+_scheduler = None
+
+def get_drive_scheduler() -> DriveRequestScheduler:
+    """
+    Returns the process-wide DriveRequestScheduler, configured from the environment settings.
+    """
+    global _scheduler # pylint: disable=global-statement
+    if _scheduler is None:
+        settings = get_settings()
+        _scheduler = DriveRequestScheduler(requests_per_second=settings.gdrive_requests_per_second,
+                                           burst=settings.gdrive_request_burst,
+                                           max_retries=settings.gdrive_max_retries)
+        registry = get_metrics_registry()
+        registry.gauge('gdrive_requests_in_flight', "Drive requests waiting for the rate limit or the executor, or running.",
+                       callback=lambda: _scheduler.in_flight)
+        registry.gauge('gdrive_rate_limit', "The adaptive Drive request rate limit (requests per second).",
+                       callback=lambda: _scheduler.rate)
+    return _scheduler
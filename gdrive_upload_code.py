@@ -0,0 +1,257 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: The gdrive_upload module uploads files to Google Drive with the resumable upload protocol.
+# The file is sent in fixed-size chunks, and the upload session URI is saved in a small JSON file in a
+# local directory. After a failed chunk, a retry or a process restart, the upload asks Drive how many
+# bytes it already has and continues from there instead of starting over from byte zero.
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import hashlib
+import json
+import mimetypes
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+from logger_code import LoggerBase
+
+# Drive requires every chunk except the last one to be a multiple of 256 KiB.
+CHUNK_SIZE_MULTIPLE = 256 * 1024
+# Drive expires upload sessions after a week. Don't try to resume sessions that are close to that.
+SESSION_MAX_AGE_SECONDS = 6 * 24 * 60 * 60
+
+
+class ResumableUploadError(Exception):
+    """
+    Raised when Drive answers a resumable upload request with an unexpected status code.
+
+    Attributes:
+        status_code (int): The HTTP status code of the response.
+        reason (Optional[str]): The Drive error reason, e.g. 'userRateLimitExceeded', if the response had one.
+        retry_after (Optional[float]): The value of the response's Retry-After header in seconds, if set.
+    """
+    def __init__(self, message: str, status_code: int = None, reason: str = None, retry_after: float = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class ResumableUploader:
+    """
+    Uploads a local file to Google Drive in chunks, resuming interrupted uploads.
+
+    The upload session URI is persisted to `session_dir`, keyed by the file's path, size, modification time and
+    the Drive metadata of the upload. Uploading the same unchanged file again (e.g. on a retry, or after the
+    process restarted) resumes the saved session.
+
+    Attributes:
+        UPLOAD_URL (str): The Drive v2 resumable upload endpoint.
+        session_dir (Path): The directory where upload session URIs are saved.
+        chunk_size (int): The number of bytes sent per request.
+        max_chunk_retries (int): How many times in a row a failed chunk is resumed before giving up.
+    """
+    UPLOAD_URL = "https://www.googleapis.com/upload/drive/v2/files?uploadType=resumable"
+
+    def __init__(self, http_factory: Callable, session_dir: Path, chunk_size: int = 8 * 1024 * 1024, max_chunk_retries: int = 3):
+        """
+        Parameters:
+            http_factory (Callable): Returns an authorized httplib2.Http-like object to send the requests with.
+            session_dir (Path): The directory where upload session URIs are saved.
+            chunk_size (int): The number of bytes sent per request. Must be a multiple of 256 KiB.
+            max_chunk_retries (int): How many times in a row a failed chunk is resumed before giving up.
+        """
+        if chunk_size <= 0 or chunk_size % CHUNK_SIZE_MULTIPLE:
+            raise ValueError(f"The upload chunk size must be a multiple of {CHUNK_SIZE_MULTIPLE} bytes. It is {chunk_size}.")
+        self.logger = LoggerBase.setup_logger('ResumableUploader')
+        self._http_factory = http_factory
+        self.session_dir = Path(session_dir)
+        self.chunk_size = chunk_size
+        self.max_chunk_retries = max_chunk_retries
+
+    def upload(self, file_path: Path, metadata: dict, progress_callback: Optional[Callable[[int, int], None]] = None) -> dict:
+        """
+        Uploads a file to Drive, resuming a previously saved upload session for this file if there is one.
+        This is a blocking call.
+
+        Parameters:
+            file_path (Path): The local file to upload.
+            metadata (dict): The Drive v2 file resource to create, e.g. {'title': ..., 'parents': [{'id': ...}]}.
+            progress_callback (Callable): Optional. Called with (bytes_uploaded, total_bytes) after every chunk.
+
+        Returns:
+            dict: The Drive file resource of the uploaded file. The gfile id is in the 'id' key.
+
+        Raises:
+            ResumableUploadError: If Drive rejects the upload. The session is kept so a later call can resume.
+
+        A failed chunk is retried up to max_chunk_retries times in a row: after a wait (Drive's Retry-After if it
+        sent one, otherwise an exponential backoff), Drive is asked how many bytes it has and the upload carries on
+        from there. A failed request asking that counts as a failed attempt too.
+        """
+        file_path = Path(file_path)
+        total_size = file_path.stat().st_size
+        session_file = self._session_file(file_path, total_size, metadata)
+        http = self._http_factory()
+        session_uri = self._load_session(session_file)
+        offset = 0
+        if session_uri:
+            finished, offset = self._query_offset(http, session_uri, total_size)
+            if finished is not None:
+                session_file.unlink(missing_ok=True)
+                return finished
+            if offset is None:
+                # Drive no longer knows the session. Start a new one.
+                session_uri = None
+            else:
+                self.logger.info(f"Resuming the upload of {file_path.name} at byte {offset} of {total_size}.")
+        if not session_uri:
+            session_uri = self._start_session(http, file_path, total_size, metadata)
+            self._save_session(session_file, session_uri)
+            offset = 0
+        if progress_callback:
+            progress_callback(offset, total_size)
+        failed_attempts = 0
+        # Whether to ask Drive where to carry on, after a failed request.
+        resume = False
+        with open(file_path, 'rb') as f:
+            while True:
+                try:
+                    if resume:
+                        # The connection may be broken. Get a fresh http object.
+                        http = self._http_factory()
+                        finished, next_offset = self._query_offset(http, session_uri, total_size)
+                    else:
+                        f.seek(offset)
+                        chunk = f.read(self.chunk_size)
+                        finished, next_offset = self._send_chunk(http, session_uri, chunk, offset, total_size)
+                        failed_attempts = 0
+                except Exception as e: # pylint: disable=broad-exception-caught
+                    # A failed offset query (e.g. the network is still down) counts as a failed attempt too.
+                    failed_attempts += 1
+                    if failed_attempts > self.max_chunk_retries:
+                        raise
+                    retry_after = getattr(e, 'retry_after', None)
+                    wait_seconds = retry_after if retry_after is not None else min(2 ** failed_attempts, 30)
+                    self.logger.warning(f"Upload request at byte {offset} of {file_path.name} failed ({e}). "
+                                        f"Asking Drive where to resume in {wait_seconds:.0f}s.")
+                    time.sleep(wait_seconds)
+                    resume = True
+                    continue
+                if resume and finished is None and next_offset is None:
+                    session_file.unlink(missing_ok=True)
+                    raise ResumableUploadError(f"Drive no longer knows the upload session of {file_path.name}.", status_code=404)
+                resume = False
+                if finished is not None:
+                    session_file.unlink(missing_ok=True)
+                    if progress_callback:
+                        progress_callback(total_size, total_size)
+                    return finished
+                offset = next_offset
+                if progress_callback:
+                    progress_callback(offset, total_size)
+
+    def _start_session(self, http, file_path: Path, total_size: int, metadata: dict) -> str:
+        mime_type = mimetypes.guess_type(file_path.name)[0] or 'application/octet-stream'
+        headers = {
+            'Content-Type': 'application/json; charset=UTF-8',
+            'X-Upload-Content-Type': mime_type,
+            'X-Upload-Content-Length': str(total_size),
+        }
+        resp, content = http.request(self.UPLOAD_URL, method='POST', body=json.dumps(metadata), headers=headers)
+        if resp.status != 200 or 'location' not in resp:
+            raise ResumableUploadError(f"Could not start a resumable upload session for {file_path.name}: {content!r}",
+                                       status_code=resp.status, reason=_error_reason(content), retry_after=_retry_after(resp))
+        return resp['location']
+
+    def _send_chunk(self, http, session_uri: str, chunk: bytes, offset: int, total_size: int):
+        """
+        Sends one chunk. Returns (file_resource, None) when the upload is finished, or (None, next_offset).
+        """
+        if chunk:
+            content_range = f"bytes {offset}-{offset + len(chunk) - 1}/{total_size}"
+        else:
+            content_range = f"bytes */{total_size}"
+        headers = {'Content-Length': str(len(chunk)), 'Content-Range': content_range}
+        resp, content = http.request(session_uri, method='PUT', body=chunk, headers=headers)
+        return self._parse_upload_response(resp, content)
+
+    def _query_offset(self, http, session_uri: str, total_size: int):
+        """
+        Asks Drive how many bytes of the session it has. Returns (file_resource, None) if the upload already
+        finished, (None, None) if the session is gone, or (None, next_offset).
+        """
+        headers = {'Content-Length': '0', 'Content-Range': f"bytes */{total_size}"}
+        resp, content = http.request(session_uri, method='PUT', body=b'', headers=headers)
+        if resp.status in (404, 410):
+            return None, None
+        return self._parse_upload_response(resp, content)
+
+    @staticmethod
+    def _parse_upload_response(resp, content):
+        if resp.status in (200, 201):
+            return json.loads(content), None
+        if resp.status == 308:
+            # The Range header ("bytes=0-1234") holds the bytes Drive has. No header means none yet.
+            received = resp.get('range')
+            next_offset = int(received.split('-')[-1]) + 1 if received else 0
+            return None, next_offset
+        raise ResumableUploadError(f"Drive answered the upload request with status {resp.status}: {content!r}",
+                                   status_code=resp.status, reason=_error_reason(content), retry_after=_retry_after(resp))
+
+    def _session_file(self, file_path: Path, total_size: int, metadata: dict) -> Path:
+        stat = file_path.stat()
+        key = f"{file_path.resolve()}|{total_size}|{stat.st_mtime_ns}|{json.dumps(metadata, sort_keys=True)}"
+        return self.session_dir / f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.json"
+
+    @staticmethod
+    def _load_session(session_file: Path) -> Optional[str]:
+        try:
+            session = json.loads(session_file.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+        if time.time() - session.get('created_at', 0) > SESSION_MAX_AGE_SECONDS:
+            session_file.unlink(missing_ok=True)
+            return None
+        return session.get('session_uri')
+
+    def _save_session(self, session_file: Path, session_uri: str) -> None:
+        self.session_dir.mkdir(parents=True, exist_ok=True)
+        session_file.write_text(json.dumps({'session_uri': session_uri, 'created_at': time.time()}), encoding='utf-8')
+
+
+def _error_reason(content) -> Optional[str]:
+    try:
+        return json.loads(content)['error']['errors'][0]['reason']
+    except (TypeError, ValueError, KeyError, IndexError):
+        return None
+
+def _retry_after(resp) -> Optional[float]:
+    try:
+        return float(resp.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
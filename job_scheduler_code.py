@@ -0,0 +1,350 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: The job_scheduler module orders transcription jobs by their estimated cost, so one long
+# recording doesn't hold up many short ones. The cost of a job is the audio duration times the
+# real-time factor (processing seconds per audio second) measured on this host for the model used.
+# Jobs run shortest first, and waiting jobs age so a long job is not starved. New jobs are turned
+# away while the estimated backlog is over a configured limit.
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import heapq
+import itertools
+import json
+import math
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from audio_duration_code import HEAD_SIZE, duration_from_size_seconds, mp3_duration_seconds
+from env_settings_code import get_settings
+from logger_code import LoggerBase
+
+# Processing seconds per second of audio on a CUDA GPU at float16, used until a model has been measured on this host.
+DEFAULT_REAL_TIME_FACTORS = {
+    "openai/whisper-tiny": 0.01, "openai/whisper-tiny.en": 0.01,
+    "openai/whisper-base": 0.015, "openai/whisper-base.en": 0.015,
+    "openai/whisper-small": 0.03, "openai/whisper-small.en": 0.03,
+    "openai/whisper-medium": 0.06, "openai/whisper-medium.en": 0.06,
+    "openai/whisper-large": 0.1, "openai/whisper-large-v2": 0.1, "openai/whisper-large-v3": 0.1,
+    "distil-whisper/distil-large-v2": 0.05, "distil-whisper/distil-medium.en": 0.03, "distil-whisper/distil-small.en": 0.02,
+}
+UNKNOWN_MODEL_REAL_TIME_FACTOR = 0.1
+# float32 roughly doubles the time of a model that wasn't measured at float32.
+FLOAT32_SLOWDOWN = 2.0
+# Weight of a new measurement in the moving average of a real-time factor.
+REAL_TIME_FACTOR_SMOOTHING = 0.3
+
+
+class BacklogFullError(Exception):
+    """
+    Raised when a job isn't admitted because the estimated backlog is over the limit.
+
+    Attributes:
+        retry_after (float): The estimated seconds until the backlog has room for the job.
+    """
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RealTimeFactorTracker:
+    """
+    Keeps the real-time factor (processing seconds per second of audio) of each model and compute type measured on
+    this host, as a moving average. The factors are saved to a JSON file, so they carry over to the next run.
+
+    Attributes:
+        path (Optional[Path]): The JSON file the factors are kept in. None keeps them in memory only.
+    """
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else None
+        self._factors: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        if self.path and self.path.exists():
+            try:
+                self._factors = {key: float(value) for key, value in json.loads(self.path.read_text()).items()}
+            except (ValueError, AttributeError):
+                LoggerBase.setup_logger('RealTimeFactorTracker').warning(f"Ignoring the unreadable real-time factors in {self.path}.")
+
+    @staticmethod
+    def _key(model_name: str, compute_type: str) -> str:
+        return f"{model_name}/{compute_type}"
+
+    def is_measured(self, model_name: str, compute_type: str) -> bool:
+        return self._key(model_name, compute_type) in self._factors
+
+    def has_measurements(self) -> bool:
+        return bool(self._factors)
+
+    def get(self, model_name: str, compute_type: str) -> float:
+        """
+        Returns the real-time factor of a model (a Hugging Face model name from AUDIO_QUALITY_MAP) and compute type
+        ('float16' or 'float32').
+        Unmeasured combinations get a default: the factor measured at the other compute type if there is one,
+        else the DEFAULT_REAL_TIME_FACTORS entry scaled by the speed of this host.
+        """
+        with self._lock:
+            factor = self._factors.get(self._key(model_name, compute_type))
+            if factor is not None:
+                return factor
+            if compute_type == 'float32':
+                float16_factor = self._factors.get(self._key(model_name, 'float16'))
+                if float16_factor is not None:
+                    return float16_factor * FLOAT32_SLOWDOWN
+            elif (float32_factor := self._factors.get(self._key(model_name, 'float32'))) is not None:
+                return float32_factor / FLOAT32_SLOWDOWN
+        factor = DEFAULT_REAL_TIME_FACTORS.get(model_name, UNKNOWN_MODEL_REAL_TIME_FACTOR) * self.host_speed_factor()
+        return factor * FLOAT32_SLOWDOWN if compute_type == 'float32' else factor
+
+    def host_speed_factor(self) -> float:
+        """
+        Returns how much slower (above 1) or faster (below 1) this host is than the DEFAULT_REAL_TIME_FACTORS: the
+        geometric mean of the measured factors over their defaults. 1.0 until a model has been measured.
+        """
+        with self._lock:
+            ratios = []
+            for key, factor in self._factors.items():
+                model_name, _, compute_type = key.rpartition('/')
+                default = DEFAULT_REAL_TIME_FACTORS.get(model_name)
+                if default:
+                    ratios.append(factor / (default * FLOAT32_SLOWDOWN if compute_type == 'float32' else default))
+        if not ratios:
+            return 1.0
+        return math.exp(sum(math.log(ratio) for ratio in ratios) / len(ratios))
+
+    def record(self, model_name: str, compute_type: str, audio_seconds: float, processing_seconds: float) -> None:
+        """
+        Adds a measurement: transcribing audio_seconds of audio took processing_seconds.
+        """
+        if audio_seconds <= 0:
+            return
+        measured = processing_seconds / audio_seconds
+        key = self._key(model_name, compute_type)
+        with self._lock:
+            previous = self._factors.get(key)
+            self._factors[key] = measured if previous is None else (1 - REAL_TIME_FACTOR_SMOOTHING) * previous + REAL_TIME_FACTOR_SMOOTHING * measured
+            factors = dict(self._factors)
+        if self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(f".{self.path.name}.tmp")
+            tmp_path.write_text(json.dumps(factors, indent=2))
+            os.replace(tmp_path, self.path)
+
+    def estimate_seconds(self, audio_seconds: float, model_name: str, compute_type: str) -> float:
+        """
+        Returns the estimated processing time of audio_seconds of audio.
+        """
+        return audio_seconds * self.get(model_name, compute_type)
+
+
+class ScheduledJob:
+    """
+    A job waiting in or taken from a ShortestJobFirstScheduler.
+
+    Attributes:
+        job_id (str): Identifies the job, e.g. the gfile ID of the mp3 file.
+        payload (Any): What the caller needs to run the job.
+        cost_seconds (float): The estimated processing time.
+        submitted_at (float): When the job was submitted (scheduler clock).
+    """
+    __slots__ = ('job_id', 'payload', 'cost_seconds', 'submitted_at')
+
+    def __init__(self, job_id: str, payload: Any, cost_seconds: float, submitted_at: float):
+        self.job_id = job_id
+        self.payload = payload
+        self.cost_seconds = cost_seconds
+        self.submitted_at = submitted_at
+
+    def __repr__(self):
+        return f"ScheduledJob({self.job_id!r}, cost_seconds={self.cost_seconds:.1f})"
+
+
+class ShortestJobFirstScheduler:
+    """
+    Hands out jobs shortest (estimated cost) first, with aging.
+
+    A waiting job's priority is its cost minus aging_factor times the seconds it has waited. With an aging factor
+    of 1, a long job waits at most the difference between its cost and that of the shorter jobs submitted after it.
+    Since all waiting jobs age at the same rate, the order only depends on cost + aging_factor * submit time,
+    which is what the heap is keyed on.
+
+    Admission control: submit() raises BacklogFullError when the estimated cost of the waiting and running jobs plus
+    the new job is over max_backlog_seconds. A job is always admitted when the backlog is empty, so a job longer
+    than the limit can still run.
+
+    Attributes:
+        max_backlog_seconds (float): The admission limit. None admits every job.
+        aging_factor (float): How fast waiting jobs gain priority. 0 is plain shortest job first.
+    """
+    def __init__(self, max_backlog_seconds: Optional[float] = None, aging_factor: float = 1.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_backlog_seconds = max_backlog_seconds
+        self.aging_factor = aging_factor
+        self._clock = clock
+        self._heap = []
+        self._sequence = itertools.count()
+        self._running: Dict[int, ScheduledJob] = {}
+        self._backlog_seconds = 0.0
+        self.rejected = 0
+
+    @property
+    def backlog_seconds(self) -> float:
+        """
+        The estimated processing time of the waiting and running jobs.
+        """
+        return self._backlog_seconds if self._heap or self._running else 0.0
+
+    def __len__(self):
+        return len(self._heap)
+
+    def submit(self, job_id: str, payload: Any, cost_seconds: float) -> ScheduledJob:
+        """
+        Adds a job.
+
+        Raises:
+            BacklogFullError: If the backlog has no room for the job.
+        """
+        backlog_seconds = self.backlog_seconds
+        if self.max_backlog_seconds is not None and backlog_seconds > 0 and backlog_seconds + cost_seconds > self.max_backlog_seconds:
+            self.rejected += 1
+            retry_after = backlog_seconds + cost_seconds - self.max_backlog_seconds
+            raise BacklogFullError(f"The backlog of {backlog_seconds:.0f}s has no room for job {job_id} ({cost_seconds:.0f}s).", retry_after=retry_after)
+        job = ScheduledJob(job_id, payload, cost_seconds, self._clock())
+        heapq.heappush(self._heap, (cost_seconds + self.aging_factor * job.submitted_at, next(self._sequence), job))
+        self._backlog_seconds += cost_seconds
+        return job
+
+    def next_job(self) -> Optional[ScheduledJob]:
+        """
+        Takes the job with the highest priority, or returns None if no job is waiting. Call job_done() when it has finished.
+        """
+        if not self._heap:
+            return None
+        _, _, job = heapq.heappop(self._heap)
+        self._running[id(job)] = job
+        return job
+
+    def job_done(self, job: ScheduledJob) -> None:
+        """
+        Removes a finished (or failed) job from the backlog.
+        """
+        if self._running.pop(id(job), None) is not None:
+            self._backlog_seconds -= job.cost_seconds
+
+    def stats(self) -> dict:
+        return {
+            'waiting': len(self._heap),
+            'running': len(self._running),
+            'backlog_seconds': round(self.backlog_seconds, 1),
+            'rejected': self.rejected,
+        }
+
+
+class InferenceLoad:
+    """
+    Tracks the transcriptions running in this process and their estimated processing time.
+
+    The transcriptions share the GPU (or CPU), so a transcription that starts now finishes roughly after its own
+    processing time plus the time the running ones still need.
+    """
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._running: Dict[int, tuple] = {}
+        self._tokens = itertools.count()
+        self._lock = threading.Lock()
+
+    def start(self, estimated_seconds: float) -> int:
+        """
+        Registers a transcription that is starting. Returns the token to pass to finish().
+        """
+        token = next(self._tokens)
+        with self._lock:
+            self._running[token] = (self._clock(), estimated_seconds)
+        return token
+
+    def finish(self, token: int) -> None:
+        with self._lock:
+            self._running.pop(token, None)
+
+    def remaining_seconds(self) -> float:
+        """
+        Returns the estimated processing time the running transcriptions still need.
+        """
+        now = self._clock()
+        with self._lock:
+            return sum(max(0.0, estimated - (now - started)) for started, estimated in self._running.values())
+
+
+async def estimate_gfile_audio_seconds(gh, g_file: dict) -> Optional[float]:
+    """
+    Estimates the duration of an mp3 file in storage, without downloading it.
+
+    The frame headers are read when the storage backend can read the start of a file cheaply (local and fake
+    storage). Otherwise, and when the headers don't tell, the duration is worked out from the listed fileSize and
+    the 'assumed_mp3_bitrate_kbps' setting.
+
+    Parameters:
+        gh (GDriveHelper): The helper of the storage the file is in.
+        g_file (dict): The file's metadata from a folder listing ('id' and 'fileSize').
+
+    Returns:
+        Optional[float]: The duration in seconds, or None if not even the size is known.
+    """
+    file_size = int(g_file.get('fileSize') or 0)
+    try:
+        head = await gh.read_file_head(g_file['id'], HEAD_SIZE)
+    except Exception: # pylint: disable=broad-exception-caught
+        # Only an estimate. Fall back to the file size.
+        head = None
+    if head:
+        audio_seconds = mp3_duration_seconds(head, file_size or len(head))
+        if audio_seconds is not None:
+            return audio_seconds
+    if not file_size:
+        return None
+    return duration_from_size_seconds(file_size, get_settings().assumed_mp3_bitrate_kbps)
+
+
+_real_time_factors = None
+
+def get_real_time_factor_tracker() -> RealTimeFactorTracker:
+    """
+    Returns the process-wide RealTimeFactorTracker, kept in the file set by the 'real_time_factors_path' setting.
+    """
+    global _real_time_factors # pylint: disable=global-statement
+    if _real_time_factors is None:
+        _real_time_factors = RealTimeFactorTracker(Path(get_settings().real_time_factors_path))
+    return _real_time_factors
+
+_inference_load = InferenceLoad()
+
+def get_inference_load() -> InferenceLoad:
+    """
+    Returns the process-wide InferenceLoad.
+    """
+    return _inference_load
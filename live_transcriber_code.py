@@ -0,0 +1,282 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: The live_transcriber module transcribes audio while it is being captured (e.g. a live Q&A stream).
+# Audio frames (16-bit PCM, or Opus in WebM/Ogg decoded by ffmpeg) are decoded by Whisper over a rolling
+# window every step, using a warm model from a pool. Interim text is replaced at every step, and
+# segments are finalized once the window has moved past them.
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import asyncio
+import shutil
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from env_settings_code import get_settings
+from logger_code import LoggerBase
+from workflow_tracker_code import torch_dtype
+
+# Whisper models take 16 kHz mono audio.
+SAMPLE_RATE = 16_000
+PCM_S16LE = 'pcm_s16le'
+OPUS = 'opus'
+
+
+class LiveSegment(NamedTuple):
+    """
+    A piece of text and where it is in the audio stream, in seconds since the stream started.
+    """
+    start: float
+    end: float
+    text: str
+
+
+def pcm_s16le_to_float32(frame: bytes, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Converts 16-bit little-endian mono PCM (an even number of bytes) to the float32 samples in [-1, 1] Whisper
+    takes, resampled to 16 kHz (by linear interpolation) if needed.
+    """
+    samples = np.frombuffer(frame, dtype='<i2').astype(np.float32) / 32768.0
+    if sample_rate != SAMPLE_RATE and len(samples):
+        resampled_length = int(round(len(samples) * SAMPLE_RATE / sample_rate))
+        samples = np.interp(np.arange(resampled_length) * sample_rate / SAMPLE_RATE, np.arange(len(samples)), samples).astype(np.float32)
+    return samples
+
+
+class WhisperModelPool:
+    """
+    Keeps Whisper pipelines loaded between live sessions, so a session doesn't wait for a model to load.
+
+    At most `size` pipelines of each (model, compute type) are loaded. A session holds one only while it decodes a
+    window, so many sessions can share a few models. The compute type is a key of COMPUTE_TYPE_MAP, e.g. 'float32'.
+    torch and transformers are imported when the first pipeline is loaded.
+    """
+    def __init__(self, size: int = 1, loader: Optional[Callable] = None):
+        self.size = size
+        self._loader = loader or self._load_pipeline
+        self._idle: Dict[Tuple[str, str], List] = {}
+        self._semaphores: Dict[Tuple[str, str], asyncio.Semaphore] = {}
+        self.loads = 0
+        self.logger = LoggerBase.setup_logger('WhisperModelPool')
+
+    @staticmethod
+    def _load_pipeline(model_name: str, compute_type: str):
+        # pylint: disable=import-outside-toplevel
+        import torch
+        from transformers import pipeline
+        return pipeline("automatic-speech-recognition", model=model_name,
+                        device=0 if torch.cuda.is_available() else -1, torch_dtype=torch_dtype(compute_type))
+
+    @asynccontextmanager
+    async def acquire(self, model_name: str, compute_type: str):
+        """
+        Lends out a pipeline of the model, loading it first if none is idle.
+        """
+        key = (model_name, compute_type)
+        semaphore = self._semaphores.setdefault(key, asyncio.Semaphore(self.size))
+        async with semaphore:
+            idle = self._idle.setdefault(key, [])
+            if idle:
+                pipe = idle.pop()
+            else:
+                self.logger.debug(f"Loading {model_name} ({compute_type}) into the model pool.")
+                pipe = await asyncio.to_thread(self._loader, model_name, compute_type)
+                self.loads += 1
+            try:
+                yield pipe
+            finally:
+                idle.append(pipe)
+
+    async def warm_up(self, model_name: str, compute_type: str) -> None:
+        """
+        Loads a pipeline of the model ahead of the first session.
+        """
+        async with self.acquire(model_name, compute_type):
+            pass
+
+
+def pipeline_decoder(model_pool: WhisperModelPool, model_name: str, compute_type: str) -> Callable[[np.ndarray], Awaitable[List[LiveSegment]]]:
+    """
+    Returns a decode function for LiveTranscriptionSession that runs a pooled Whisper pipeline with segment timestamps.
+    """
+    async def _decode(samples: np.ndarray) -> List[LiveSegment]:
+        async with model_pool.acquire(model_name, compute_type) as pipe:
+            result = await asyncio.to_thread(pipe, {'raw': samples, 'sampling_rate': SAMPLE_RATE}, return_timestamps=True)
+        duration = len(samples) / SAMPLE_RATE
+        chunks = result.get('chunks') or [{'timestamp': (0.0, duration), 'text': result['text']}]
+        # The last chunk has no end time when Whisper stopped within it.
+        return [LiveSegment(start or 0.0, duration if end is None else min(end, duration), chunk['text'])
+                for chunk in chunks for start, end in [chunk['timestamp']]]
+    return _decode
+
+
+class LiveTranscriptionSession:
+    """
+    Transcribes an audio stream with a rolling window.
+
+    Whenever step_seconds of new audio has arrived, the audio not finalized yet (at most window_seconds) is decoded
+    and its text sent as interim text. Once the window holds commit_seconds of audio, its segments but the last are
+    finalized and their audio dropped from the window: the last segment may still change as more audio arrives.
+    When the window is full, all of it is finalized. When the stream ends, the rest is decoded and finalized.
+
+    Decoding never queues up: if a decode takes longer than a step, the next decode covers all the audio that
+    arrived meanwhile. So the text lags the audio by about a step plus the decode time.
+
+    Messages passed to `send`:
+        {'type': 'interim', 'text': ..., 'start': ..., 'end': ...}: The text of the audio not finalized yet.
+        {'type': 'final', 'text': ..., 'start': ..., 'end': ...}: A finalized segment.
+
+    Attributes:
+        final_segments (List[LiveSegment]): The finalized segments, in order.
+    """
+    def __init__(self, decode: Callable[[np.ndarray], Awaitable[List[LiveSegment]]], send: Callable[[dict], Awaitable[None]],
+                 window_seconds: float = 15.0, step_seconds: float = 1.0, commit_seconds: Optional[float] = None):
+        self.decode = decode
+        self.send = send
+        self.window_seconds = window_seconds
+        self.step_seconds = step_seconds
+        self.commit_seconds = window_seconds / 2 if commit_seconds is None else commit_seconds
+        self.final_segments: List[LiveSegment] = []
+        self._window = np.zeros(0, dtype=np.float32)
+        # The stream time of the first sample of the window.
+        self._window_start = 0.0
+        self._decoded_samples = 0
+        self._audio_arrived = asyncio.Event()
+        self._ended = False
+
+    @property
+    def transcript(self) -> str:
+        return ' '.join(segment.text.strip() for segment in self.final_segments if segment.text.strip())
+
+    def add_audio(self, samples: np.ndarray) -> None:
+        """
+        Appends 16 kHz float32 samples to the stream.
+        """
+        if len(samples):
+            self._window = np.concatenate([self._window, samples])
+            self._audio_arrived.set()
+
+    def end(self) -> None:
+        """
+        Marks the end of the stream. run() then finalizes the rest and returns.
+        """
+        self._ended = True
+        self._audio_arrived.set()
+
+    async def run(self) -> str:
+        """
+        Decodes the stream until end() is called. Returns the finalized transcript.
+        """
+        step_samples = int(self.step_seconds * SAMPLE_RATE)
+        while True:
+            while not self._ended and len(self._window) - self._decoded_samples < step_samples:
+                self._audio_arrived.clear()
+                await self._audio_arrived.wait()
+            # end() may be called while the window is decoded. Then the next round finalizes.
+            final = self._ended
+            await self._decode_window(final)
+            if final:
+                return self.transcript
+
+    async def _decode_window(self, final: bool) -> None:
+        window = self._window
+        if not len(window):
+            return
+        segments = await self.decode(window)
+        self._decoded_samples = len(window)
+        window_seconds = len(window) / SAMPLE_RATE
+        window_end = self._window_start + window_seconds
+        if final or window_seconds >= self.window_seconds:
+            # Drop the whole window, even if nothing was said in it.
+            to_finalize, pending, cut = segments, [], len(window)
+        elif window_seconds >= self.commit_seconds and len(segments) > 1:
+            to_finalize, pending = segments[:-1], segments[-1:]
+            cut = min(len(window), int(to_finalize[-1].end * SAMPLE_RATE))
+        else:
+            to_finalize, pending, cut = [], segments, 0
+        for segment in to_finalize:
+            final_segment = LiveSegment(self._window_start + segment.start, self._window_start + segment.end, segment.text)
+            self.final_segments.append(final_segment)
+            await self.send({'type': 'final', **final_segment._asdict()})
+        # Audio that arrived while decoding stays in the window.
+        self._window = self._window[cut:]
+        self._window_start += cut / SAMPLE_RATE
+        self._decoded_samples = len(window) - cut
+        if pending:
+            await self.send({'type': 'interim', 'text': ''.join(segment.text for segment in pending).strip(),
+                             'start': self._window_start, 'end': window_end})
+
+
+class FFmpegAudioDecoder:
+    """
+    Decodes a compressed audio stream (e.g. Opus in WebM or Ogg, as browsers record it) to 16 kHz PCM with an
+    ffmpeg process, and passes the samples to a callback as they come out.
+    """
+    def __init__(self, on_samples: Callable[[np.ndarray], None]):
+        self.on_samples = on_samples
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._reader: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def available() -> bool:
+        return shutil.which('ffmpeg') is not None
+
+    async def start(self) -> None:
+        self._process = await asyncio.create_subprocess_exec(
+            'ffmpeg', '-loglevel', 'error', '-fflags', 'nobuffer', '-i', 'pipe:0',
+            '-f', 's16le', '-ac', '1', '-ar', str(SAMPLE_RATE), 'pipe:1',
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE)
+        self._reader = asyncio.create_task(self._read())
+
+    async def write(self, frame: bytes) -> None:
+        self._process.stdin.write(frame)
+        await self._process.stdin.drain()
+
+    async def close(self) -> None:
+        """
+        Ends the input and waits until ffmpeg has passed on the last samples.
+        """
+        self._process.stdin.close()
+        await self._reader
+        await self._process.wait()
+
+    async def _read(self) -> None:
+        while chunk := await self._process.stdout.read(SAMPLE_RATE // 5 * 2):
+            self.on_samples(pcm_s16le_to_float32(chunk))
+
+
+_model_pool = None
+
+def get_model_pool() -> WhisperModelPool:
+    """
+    Returns the process-wide WhisperModelPool, holding 'live_model_pool_size' pipelines of each model.
+    """
+    global _model_pool # pylint: disable=global-statement
+    if _model_pool is None:
+        _model_pool = WhisperModelPool(size=get_settings().live_model_pool_size)
+    return _model_pool
@@ -0,0 +1,336 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: The local_storage_backend module implements StorageBackend on a local or network (e.g. NFS)
+# file system, for deployments where the mp3 files are already on a mounted volume. Drive folders
+# map to directories. The workflow status is kept in a JSON sidecar file next to each file, and
+# files (transcripts included) are written to a temporary file and moved into place, so readers
+# never see a partial file. No network requests are made.
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import base64
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:
+    # Windows. Compare-and-set is then only atomic within this process.
+    fcntl = None
+
+from env_settings_code import get_settings
+from storage_backend_code import StorageBackend, StorageRequestError
+
+SIDECAR_SUFFIX = '.workflow.json'
+# Held while a compare-and-set reads and writes a sidecar file, so hosts sharing a network file system take turns.
+CAS_LOCK_NAME = '.workflow.lock'
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def _path_id(folder_id: str, title: str) -> str:
+    """
+    Returns an ID for a file that has none yet. It is derived from the folder and file name, so it is the same
+    every time the folder is listed, and it has the format of a Drive ID (32 characters), so it passes
+    GDriveInput validation.
+    """
+    digest = hashlib.sha256(f"{folder_id}/{title}".encode()).digest()
+    return base64.urlsafe_b64encode(digest).decode()[:32]
+
+def _write_atomically(path: Path, write: Callable) -> None:
+    """
+    Calls write(file) on a temporary file in the directory of path, then renames the temporary file to path.
+    A rename within a directory is atomic, so path is either the old or the complete new file.
+    """
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix='.tmp', dir=path.parent)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+class LocalStorageBackend(StorageBackend):
+    """
+    Stores files in directories of a local or network file system.
+
+    Each folder ID maps to a directory: the one given for it in `folders`, or else `root_dir`/<folder ID>.
+    A file's metadata other than its name and size (its ID and the workflow status in 'description') is kept
+    in the sidecar file '.<file name>.workflow.json' next to it. The ID is saved there when the file is first
+    updated, so it stays the same when the file is renamed. Files and folders starting with '.' are ignored.
+    The etag is a hash of the file name and the sidecar. update_metadata_if_match() holds an fcntl lock on the
+    folder's '.workflow.lock' file while it compares and writes, which works across hosts on NFS.
+
+    Storage calls don't need rate limiting, so GDriveHelper runs them without the Drive request scheduler.
+
+    Attributes:
+        root_dir (Path): The directory holding the folders that aren't listed in `folders`.
+        folders (dict): {folder_id: directory}.
+    """
+    rate_limited = False
+    supports_read_head = True
+
+    def __init__(self, root_dir: Path, folders: Optional[Dict[str, str]] = None):
+        self.root_dir = Path(root_dir)
+        self.folders = {folder_id: Path(directory) for folder_id, directory in (folders or {}).items()}
+        self._paths: Dict[str, Path] = {}
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_settings(cls) -> 'LocalStorageBackend':
+        """
+        Creates the backend from the 'local_storage_root' and 'local_storage_folders' settings.
+        """
+        settings = get_settings()
+        return cls(Path(settings.local_storage_root), settings.local_storage_folders)
+
+    def folder_path(self, folder_id: str) -> Path:
+        """
+        Returns the directory of a folder, creating it if needed.
+        """
+        directory = self.folders.get(folder_id, self.root_dir / folder_id)
+        directory.mkdir(parents=True, exist_ok=True)
+        return directory
+
+    def list_files(self, folder_id: str) -> List[dict]:
+        directory = self.folder_path(folder_id)
+        with self._lock:
+            return [self._metadata(folder_id, path) for path in sorted(directory.iterdir())
+                    if path.is_file() and not path.name.startswith('.')]
+
+    def get_metadata(self, file_id: str, fields: List[str]) -> dict:
+        with self._lock:
+            folder_id, path = self._find(file_id)
+            metadata = self._metadata(folder_id, path)
+        if 'md5Checksum' in fields:
+            metadata['md5Checksum'] = self._md5(path)
+        return {field: metadata[field] for field in fields if field in metadata}
+
+    def upload_file(self, folder_id: str, file_path: Path, progress_callback: Optional[Callable[[int, int], None]] = None) -> str:
+        file_path = Path(file_path)
+        total_size = file_path.stat().st_size
+        def _copy(destination):
+            copied = 0
+            with open(file_path, 'rb') as source:
+                while True:
+                    if progress_callback:
+                        progress_callback(copied, total_size)
+                    chunk = source.read(COPY_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    destination.write(chunk)
+                    copied += len(chunk)
+        directory = self.folder_path(folder_id)
+        fd, tmp_name = tempfile.mkstemp(prefix=f".{file_path.name}.", suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                _copy(f)
+                f.flush()
+                os.fsync(f.fileno())
+            with self._lock:
+                # Like Drive, uploading a file with a name that is taken keeps both files. os.link never replaces an
+                # existing file, so a file another program created meanwhile isn't overwritten either.
+                for path in self._candidate_paths(directory, file_path.name):
+                    try:
+                        os.link(tmp_name, path)
+                        break
+                    except FileExistsError:
+                        continue
+                    except OSError:
+                        # The file system has no hard links (e.g. some network shares). Rename instead.
+                        if path.exists():
+                            continue
+                        os.replace(tmp_name, path)
+                        break
+                file_id = self._metadata(folder_id, path)['id']
+        finally:
+            Path(tmp_name).unlink(missing_ok=True)
+        return file_id
+
+    def download_file(self, file_id: str, directory_path: Path) -> Path:
+        with self._lock:
+            _, path = self._find(file_id)
+        local_file_path = Path(directory_path) / path.name
+        if local_file_path.resolve() == path.resolve():
+            raise ValueError(f"{local_file_path} is the stored file itself. The download directory must not be a storage folder.")
+        local_file_path.unlink(missing_ok=True)
+        try:
+            # A hard link costs no copying. It fails across file systems.
+            os.link(path, local_file_path)
+        except OSError:
+            shutil.copyfile(path, local_file_path)
+        return local_file_path
+
+    def read_head(self, file_id: str, length: int) -> Optional[bytes]:
+        with self._lock:
+            _, path = self._find(file_id)
+        with open(path, 'rb') as f:
+            return f.read(length)
+
+    def update_metadata(self, updates: Dict[str, dict]) -> Dict[str, Optional[Exception]]:
+        results = {}
+        for file_id, fields in updates.items():
+            try:
+                with self._lock:
+                    self._update(file_id, dict(fields))
+                results[file_id] = None
+            except (StorageRequestError, OSError) as e:
+                results[file_id] = e
+        return results
+
+    def update_metadata_if_match(self, file_id: str, fields: dict, etag: str) -> str:
+        with self._lock:
+            _, path = self._find(file_id)
+            with self._folder_lock(path.parent):
+                folder_id, path = self._find(file_id)
+                if self._metadata(folder_id, path)['etag'] != etag:
+                    raise StorageRequestError(f"The etag of {file_id} is no longer {etag}.", status_code=412, reason='conditionNotMet')
+                self._update(file_id, dict(fields))
+                return self._metadata(folder_id, self._paths[file_id])['etag']
+
+    def delete_file(self, file_id: str) -> None:
+        with self._lock:
+            _, path = self._find(file_id)
+            path.unlink()
+            self._sidecar_path(path).unlink(missing_ok=True)
+            del self._paths[file_id]
+
+    def _update(self, file_id: str, fields: dict) -> None:
+        folder_id, path = self._find(file_id)
+        sidecar = self._read_sidecar(path)
+        sidecar['id'] = file_id
+        title = fields.pop('title', None)
+        if title and title != path.name:
+            new_path = path.with_name(title)
+            if new_path.exists():
+                raise StorageRequestError(f"A file named {title} already exists in folder {folder_id}.", status_code=409, reason='conflict')
+            os.rename(path, new_path)
+            self._sidecar_path(path).unlink(missing_ok=True)
+            self._paths[file_id] = path = new_path
+        sidecar.update(fields)
+        self._write_sidecar(path, sidecar)
+
+    def _metadata(self, folder_id: str, path: Path) -> dict:
+        sidecar = self._read_sidecar(path)
+        stat = path.stat()
+        metadata = {
+            'id': sidecar.get('id') or _path_id(folder_id, path.name),
+            'title': path.name,
+            'parents': [folder_id],
+            'fileSize': str(stat.st_size),
+            # File systems don't reliably keep a creation time. The modification time is when the file was written.
+            'createdDate': datetime.datetime.fromtimestamp(stat.st_mtime, datetime.timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z'),
+        }
+        metadata['etag'] = self._etag(path, sidecar)
+        metadata.update({field: value for field, value in sidecar.items() if field not in metadata})
+        self._paths[metadata['id']] = path
+        return metadata
+
+    def _find(self, file_id: str) -> tuple:
+        """
+        Returns (folder_id, path) of a file. Unknown IDs are looked up by listing every folder again, since
+        files can be added to the directories by other programs.
+        """
+        path = self._paths.get(file_id)
+        if path is None or not path.exists():
+            self._paths.pop(file_id, None)
+            for folder_id in self._known_folder_ids():
+                self.list_files(folder_id)
+            path = self._paths.get(file_id)
+            if path is None:
+                raise StorageRequestError(f"File not found: {file_id}", status_code=404, reason='notFound')
+        return self._folder_id(path), path
+
+    def _known_folder_ids(self) -> List[str]:
+        folder_ids = set(self.folders)
+        if self.root_dir.is_dir():
+            folder_ids.update(path.name for path in self.root_dir.iterdir() if path.is_dir() and not path.name.startswith('.'))
+        return sorted(folder_ids)
+
+    def _folder_id(self, path: Path) -> str:
+        for folder_id, directory in self.folders.items():
+            if directory == path.parent:
+                return folder_id
+        return path.parent.name
+
+    @staticmethod
+    def _etag(path: Path, sidecar: dict) -> str:
+        digest = hashlib.sha256(json.dumps([path.name, sidecar], sort_keys=True).encode()).hexdigest()
+        return f'"{digest[:32]}"'
+
+    @staticmethod
+    @contextmanager
+    def _folder_lock(directory: Path):
+        if fcntl is None:
+            yield
+            return
+        with open(directory / CAS_LOCK_NAME, 'a+b') as lock_file:
+            fcntl.lockf(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.lockf(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _candidate_paths(directory: Path, name: str):
+        yield directory / name
+        copy_number = 1
+        while True:
+            yield directory / f"{Path(name).stem} ({copy_number}){Path(name).suffix}"
+            copy_number += 1
+
+    @staticmethod
+    def _sidecar_path(path: Path) -> Path:
+        return path.with_name(f".{path.name}{SIDECAR_SUFFIX}")
+
+    def _read_sidecar(self, path: Path) -> dict:
+        try:
+            return json.loads(self._sidecar_path(path).read_text(encoding='utf-8'))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _write_sidecar(self, path: Path, sidecar: dict) -> None:
+        content = json.dumps(sidecar).encode('utf-8')
+        _write_atomically(self._sidecar_path(path), lambda f: f.write(content))
+
+    @staticmethod
+    def _md5(path: Path) -> str:
+        md5 = hashlib.md5()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(COPY_CHUNK_SIZE), b''):
+                md5.update(chunk)
+        return md5.hexdigest()
@@ -7,6 +7,8 @@
 # including caller information like filename and line number in logs for better debugging and
 # monitoring. The LoggerBase class facilitates easy setup of these enhanced loggers, promoting
 # consistent logging practices with visual cues for severity and context across applications.
+# In production (LOG_MODE=production), records are instead handed to a background thread through a
+# QueueHandler and written as compact JSON lines, with caller information taken from the LogRecord.
 
 # License Information: MIT License
 
@@ -31,10 +33,22 @@
 # SOFTWARE.
 ###########################################################################################
 
+import atexit
 import inspect
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import sys
 import colorlog
 
+# LOG_MODE=production logs JSON lines through a background thread instead of colorized lines through the
+# calling thread. LOG_CALLER_INFO=false leaves the file, line and function of the call out of production logs.
+# These are read from the environment rather than the Settings, since loggers are set up at import time.
+LOG_MODE_DEV = 'dev'
+LOG_MODE_PRODUCTION = 'production'
+
 # Step 1: Define the custom logging level
 FLOW_LEVEL_NUM = 15
 logging.addLevelName(FLOW_LEVEL_NUM, "FLOW")
@@ -54,6 +68,8 @@ def flow(self, message, *args, **kwargs):
     """
     # Utility method for logging messages at the custom FLOW level
     if self.isEnabledFor(FLOW_LEVEL_NUM):
+        # stacklevel 2: the caller of flow() is the source of the record, not flow() itself.
+        kwargs.setdefault('stacklevel', 2)
         self._log(FLOW_LEVEL_NUM, message, args, **kwargs) # pylint: disable=protected-access
 
 logging.Logger.flow = flow
@@ -89,6 +105,93 @@ class CustomFormatter(colorlog.ColoredFormatter):
         # Now format the message with these custom attributes
         return super(CustomFormatter, self).format(record)
 
+class JsonLineFormatter(logging.Formatter):
+    """
+    Formats a log record as one compact JSON line: the time (Unix seconds), level, logger name and message, the
+    file, line and function of the logging call when the record has them, and the traceback of an exception.
+
+    The caller information is the LogRecord's own (found by the logging call, without reading source files),
+    so formatting doesn't walk the stack.
+    """
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 6),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        if record.funcName is not None:
+            entry.update(file=record.filename, line=record.lineno, func=record.funcName)
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, separators=(',', ':'), default=str)
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        """
+        Merges the arguments into the message and renders the traceback, so the record can be formatted on the
+        listener thread. Unlike QueueHandler.prepare(), the traceback stays out of the message, for the JSON formatter.
+        """
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+_queue_handler = None
+_queue_listener = None
+
+def log_mode() -> str:
+    """
+    Returns LOG_MODE_PRODUCTION if the LOG_MODE environment variable says so, otherwise LOG_MODE_DEV.
+    """
+    return LOG_MODE_PRODUCTION if os.environ.get('LOG_MODE', '').lower() == LOG_MODE_PRODUCTION else LOG_MODE_DEV
+
+def start_queue_logging(stream=None, caller_info=None) -> logging.Handler:
+    """
+    Starts the background thread that writes JSON log lines, if it isn't running, and returns the QueueHandler
+    that hands records to it. All the production loggers share the handler and the thread.
+
+    Args:
+        stream (optional): Where the lines are written. Defaults to sys.stderr.
+        caller_info (bool, optional): Whether the logging calls look up their file, line and function. Defaults
+            to the LOG_CALLER_INFO environment variable (true unless 'false'). Turning it off saves the frame
+            lookup of each call, for every logger in the process.
+
+    Returns:
+        logging.Handler: The shared QueueHandler.
+    """
+    global _queue_handler, _queue_listener # pylint: disable=global-statement
+    if _queue_handler is None:
+        if caller_info is None:
+            caller_info = os.environ.get('LOG_CALLER_INFO', 'true').lower() != 'false'
+        if not caller_info:
+            # The logging module's documented switch for skipping the caller lookup.
+            logging._srcfile = None # pylint: disable=protected-access
+        stream_handler = logging.StreamHandler(sys.stderr if stream is None else stream)
+        stream_handler.setFormatter(JsonLineFormatter())
+        log_queue = queue.SimpleQueue()
+        _queue_handler = _QueueHandler(log_queue)
+        _queue_listener = logging.handlers.QueueListener(log_queue, stream_handler)
+        _queue_listener.start()
+    return _queue_handler
+
+def stop_queue_logging() -> None:
+    """
+    Writes the records still queued and stops the background thread. Loggers set up since keep their handler,
+    which then queues records nobody writes; start_queue_logging() starts a new thread with a new handler.
+    """
+    global _queue_handler, _queue_listener # pylint: disable=global-statement
+    if _queue_listener is not None:
+        _queue_listener.stop()
+    _queue_handler = _queue_listener = None
+
+atexit.register(stop_queue_logging)
+
 class LoggerBase:
     @staticmethod
     def setup_logger(name=None,level=logging.DEBUG):
@@ -97,6 +200,9 @@ class LoggerBase:
         FLOW log level and enhances log messages with detailed source information (file, line, function).
         Ensures unique logger instances through named retrieval, avoiding duplicate log entries.
 
+        With LOG_MODE=production, the logger instead gets the shared QueueHandler (see start_queue_logging()),
+        so the calling thread only queues the record, and a background thread writes it as a JSON line.
+
         Args:
             name (str, optional): The name of the logger. Defaults to 'TranscriptionLogger'.
             level (int, optional): The logging level. Defaults to logging.DEBUG.
@@ -112,7 +218,9 @@ class LoggerBase:
         logger.setLevel(level)  # Set the logging level
 
         # Check if the logger already has handlers to avoid duplicate messages
-        if not logger.handlers:
+        if not logger.handlers and log_mode() == LOG_MODE_PRODUCTION:
+            logger.addHandler(start_queue_logging())
+        elif not logger.handlers:
             # Define log format
             log_format = (
             "%(log_color)s[%(levelname)-3s]%(reset)s "
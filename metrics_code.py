@@ -0,0 +1,351 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: A small in-process metrics registry: counters, gauges and histograms with labels, rendered in
+# the Prometheus text format (the job service's /metrics) or as a summary (the end of a batch run).
+# Functions decorated with @async_error_handler are timed as pipeline stages, labeled with the model and
+# compute type of the job.
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from workflow_tracker_code import AUDIO_QUALITY_MAP, WorkflowTracker
+
+# Seconds, from a status write to a whole job.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0)
+# Processing seconds per second of audio.
+REAL_TIME_FACTOR_BUCKETS = (0.01, 0.02, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 5.0)
+
+# The pipeline stages of the @async_error_handler-decorated functions (by __qualname__). Other decorated functions
+# are timed under their own name.
+STAGE_NAMES = {
+    'AudioTranscriber.transcribe': 'job',
+    'GDriveHelper.download_from_gdrive': 'download',
+    'AudioTranscriber.copy_uploadfile_to_local_mp3': 'upload_copy',
+    'AudioTranscriber.transcribe_mp3': 'transcription',
+    'GDriveHelper.upload_transcript_to_gdrive': 'transcript_write',
+    'GDriveHelper.save_transcript_locally': 'transcript_save',
+    'index_transcript': 'transcript_index',
+    'embed_transcript': 'semantic_index',
+    'assign_topics': 'topic_model',
+    'AudioDecodePool.decode': 'audio_decode',
+    'GDriveHelper.upload_to_gdrive': 'drive_upload',
+    'GDriveHelper.update_mp3_gfile_status': 'status_write',
+}
+
+LabelValues = Tuple[str, ...]
+
+
+class Metric:
+    """
+    The base of Counter, Gauge and Histogram: a named metric with one value (or set of values) per combination
+    of label values. Safe to update from executor threads.
+
+    Attributes:
+        name (str): The Prometheus metric name.
+        description (str): The HELP text.
+        labelnames (Tuple[str, ...]): The names of the labels.
+    """
+    kind = 'untyped'
+
+    def __init__(self, name: str, description: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> LabelValues:
+        unknown = set(labels) - set(self.labelnames)
+        if unknown:
+            raise ValueError(f"{self.name} has no labels {sorted(unknown)}.")
+        return tuple('' if labels.get(name) is None else str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        """
+        Returns:
+            List[Tuple[str, Dict[str, str], float]]: (sample name, labels, value) of each sample to expose.
+        """
+        raise NotImplementedError
+
+
+class _ValueMetric(Metric):
+    """
+    A metric with one number per combination of label values. A metric with a callback reads its values when it
+    is collected, from a count kept elsewhere: the callback returns a number, or a dict of {label values: number}
+    for a metric with labels.
+    """
+    def __init__(self, name: str, description: str, labelnames: Iterable[str] = (), callback: Optional[Callable] = None):
+        super().__init__(name, description, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self.callback = callback
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return dict(self._collect()).get(self._key(labels), 0.0)
+
+    def _collect(self) -> List[Tuple[LabelValues, float]]:
+        if self.callback is None:
+            with self._lock:
+                return list(self._values.items())
+        values = self.callback()
+        if isinstance(values, dict):
+            return [(tuple(str(value) for value in key), value) for key, value in values.items()]
+        return [((), values)]
+
+    def samples(self):
+        return [(self.name, dict(zip(self.labelnames, key)), value) for key, value in self._collect()]
+
+
+class Counter(_ValueMetric):
+    """
+    A value that only goes up, like the number of requests.
+    """
+    kind = 'counter'
+
+
+class Gauge(_ValueMetric):
+    """
+    A value that goes up and down, like a queue depth.
+    """
+    kind = 'gauge'
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    """
+    Counts observations, like latencies, in cumulative buckets, and keeps their sum, count and maximum.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name: str, description: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, description, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label values: [count per bucket (the last one +Inf)], sum, count, max.
+        self._series: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0, -math.inf]
+            index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+            series[3] = max(series[3], value)
+
+    def snapshot(self, **labels) -> Optional[dict]:
+        """
+        Returns:
+            Optional[dict]: The count, sum, mean, max and the p50 and p95 estimated from the buckets (their upper
+            bounds) of the series, or None if nothing was observed.
+        """
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return self._summarize(series) if series else None
+
+    def _summarize(self, series: list) -> dict:
+        counts, total, count, maximum = series
+        return {'count': count, 'sum': total, 'mean': total / count, 'max': maximum,
+                'p50': self._quantile(counts, count, 0.5, maximum), 'p95': self._quantile(counts, count, 0.95, maximum)}
+
+    def _quantile(self, counts: List[int], count: int, q: float, maximum: float) -> float:
+        seen = 0
+        for bound, bucket_count in zip(self.buckets + (maximum,), counts):
+            seen += bucket_count
+            if seen >= q * count:
+                return min(bound, maximum)
+        return maximum
+
+    def series(self) -> List[Tuple[Dict[str, str], dict]]:
+        """
+        Returns:
+            List[Tuple[Dict[str, str], dict]]: The labels and snapshot() of each series.
+        """
+        with self._lock:
+            return [(dict(zip(self.labelnames, key)), self._summarize(series)) for key, series in self._series.items()]
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, (counts, total, count, _) in self._series.items():
+                labels = dict(zip(self.labelnames, key))
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                    cumulative += bucket_count
+                    samples.append((f'{self.name}_bucket', {**labels, 'le': _format_value(bound)}, cumulative))
+                samples.append((f'{self.name}_sum', labels, total))
+                samples.append((f'{self.name}_count', labels, count))
+        return samples
+
+
+class MetricsRegistry:
+    """
+    Holds the metrics of the process by name. counter(), gauge() and histogram() return the metric with the
+    name, creating it the first time.
+    """
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, description: str, labelnames: Iterable[str], **kwargs) -> Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, description, labelnames, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"{name} is a {metric.kind}, not a {cls.kind}.")
+            return metric
+
+    def counter(self, name: str, description: str, labelnames: Iterable[str] = (), callback: Optional[Callable] = None) -> Counter:
+        return self._with_callback(self._get_or_create(Counter, name, description, labelnames), callback)
+
+    def gauge(self, name: str, description: str, labelnames: Iterable[str] = (), callback: Optional[Callable] = None) -> Gauge:
+        return self._with_callback(self._get_or_create(Gauge, name, description, labelnames), callback)
+
+    @staticmethod
+    def _with_callback(metric, callback: Optional[Callable]):
+        # The latest callback wins, e.g. that of the service started last.
+        if callback is not None:
+            metric.callback = callback
+        return metric
+
+    def histogram(self, name: str, description: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, description, labelnames, buckets=buckets)
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render_prometheus(self) -> str:
+        """
+        Returns:
+            str: All the metrics in the Prometheus text exposition format (version 0.0.4).
+        """
+        lines = []
+        for metric in sorted(self._metrics.values(), key=lambda metric: metric.name):
+            lines.append(f"# HELP {metric.name} {_escape(metric.description, help_text=True)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for sample_name, labels, value in metric.samples():
+                label_text = ','.join(f'{name}="{_escape(label)}"' for name, label in labels.items())
+                lines.append(f"{sample_name}{{{label_text}}} {_format_value(value)}" if label_text else f"{sample_name} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+    def summary(self) -> str:
+        """
+        Returns:
+            str: A table for the log: the count, mean, p95 and max of each histogram series, then the value of
+            each counter and gauge series.
+        """
+        lines = []
+        for metric in sorted(self._metrics.values(), key=lambda metric: metric.name):
+            if isinstance(metric, Histogram):
+                for labels, stats in metric.series():
+                    lines.append(f"{metric.name}{_format_labels(labels)}: count={stats['count']} mean={stats['mean']:.3f} "
+                                 f"p95<={stats['p95']:.3f} max={stats['max']:.3f}")
+            else:
+                for _, labels, value in metric.samples():
+                    lines.append(f"{metric.name}{_format_labels(labels)}: {_format_value(value)}")
+        return '\n'.join(lines)
+
+
+def _escape(text: str, help_text: bool = False) -> str:
+    text = str(text).replace('\\', '\\\\').replace('\n', '\\n')
+    return text if help_text else text.replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if value == -math.inf:
+        return '-Inf'
+    return repr(int(value)) if float(value).is_integer() else repr(float(value))
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    return '{' + ','.join(f'{name}={value}' for name, value in labels.items()) + '}' if labels else ''
+
+
+_registry = None
+
+def get_metrics_registry() -> MetricsRegistry:
+    """
+    Returns the process-wide MetricsRegistry.
+    """
+    global _registry # pylint: disable=global-statement
+    if _registry is None:
+        _registry = MetricsRegistry()
+    return _registry
+
+def job_labels() -> Dict[str, str]:
+    """
+    Returns:
+        Dict[str, str]: The 'model' (Hugging Face name) and 'dtype' labels of the current job's WorkflowTracker state.
+    """
+    # The model AudioTranscriber.transcribe_mp3() runs for the audio quality.
+    model = AUDIO_QUALITY_MAP.get(WorkflowTracker.get('transcript_audio_quality'), "distil-whisper/distil-large-v2")
+    return {'model': model,
+            'dtype': WorkflowTracker.get_compute_type_string(WorkflowTracker.get('transcript_compute_type'))}
+
+def record_stage(stage: str, seconds: float, failed: bool = False, model: Optional[str] = None, dtype: Optional[str] = None) -> None:
+    """
+    Records how long a pipeline stage took, labeled with the model and compute type. Without a model and dtype,
+    those of the current job are used, so pass them from executor threads, which don't see the job's state.
+    """
+    labels = job_labels() if model is None or dtype is None else {'model': model, 'dtype': dtype}
+    registry = get_metrics_registry()
+    registry.histogram('transcriber_stage_seconds', "How long each pipeline stage took.",
+                       ('stage', 'model', 'dtype')).observe(seconds, stage=stage, **labels)
+    if failed:
+        registry.counter('transcriber_stage_errors_total', "Pipeline stages that raised an error.",
+                         ('stage', 'model', 'dtype')).inc(stage=stage, **labels)
+
+def record_function_call(qualname: str, seconds: float, failed: bool) -> None:
+    """
+    Called by @async_error_handler after each call of the function it decorates.
+    """
+    record_stage(STAGE_NAMES.get(qualname, qualname), seconds, failed)
+
+def record_transcription(model: str, dtype: str, audio_seconds: float, processing_seconds: float) -> None:
+    """
+    Records the real-time factor of a transcription, and the audio seconds transcribed (throughput).
+    """
+    registry = get_metrics_registry()
+    registry.histogram('transcriber_real_time_factor', "Processing seconds per second of audio.", ('model', 'dtype'),
+                       buckets=REAL_TIME_FACTOR_BUCKETS).observe(processing_seconds / audio_seconds, model=model, dtype=dtype)
+    registry.counter('transcriber_audio_seconds_total', "Seconds of audio transcribed.",
+                     ('model', 'dtype')).inc(audio_seconds, model=model, dtype=dtype)
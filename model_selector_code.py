@@ -0,0 +1,119 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: The model_selector module picks the Whisper model and compute type for a transcription that has
+# to be done by a deadline. It predicts the processing time of each AUDIO_QUALITY_MAP model from
+# the audio duration, the real-time factors measured on this host and the load of the transcriptions
+# already running, and picks the most accurate model predicted to finish in time.
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from job_scheduler_code import RealTimeFactorTracker
+from workflow_tracker_code import AUDIO_QUALITY_MAP
+
+# AUDIO_QUALITY_MAP keys from the most to the least accurate model.
+MODELS_BY_ACCURACY = [
+    "large-v3", "large-v2", "large", "distil-large-v2", "medium", "medium.en", "distil-medium.en",
+    "small", "small.en", "distil-small.en", "base", "base.en", "tiny", "tiny.en",
+]
+# Before any model has been measured on a host without CUDA, the default (GPU) real-time factors are this much too low.
+CPU_SLOWDOWN = 20.0
+# Part of the time to the deadline kept back for the steps around the transcription (e.g. uploading the transcript).
+DEADLINE_SAFETY_MARGIN = 0.1
+
+
+class ModelChoice(BaseModel):
+    """
+    The model and compute type picked for a transcription.
+
+    Attributes:
+        audio_quality (str): The AUDIO_QUALITY_MAP key of the model.
+        compute_type (str): 'float16' or 'float32'.
+        model_name (str): The Hugging Face model name.
+        predicted_seconds (float): The predicted time until the transcription is done, queue wait included.
+        meets_deadline (bool): False if no model is predicted to finish in time, in which case the fastest was picked.
+    """
+    audio_quality: str
+    compute_type: str
+    model_name: str
+    predicted_seconds: float
+    meets_deadline: bool
+
+    def predicted_completion(self, now: Optional[datetime.datetime] = None) -> datetime.datetime:
+        """
+        Returns the predicted (UTC) time the transcription is done.
+        """
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        return now + datetime.timedelta(seconds=self.predicted_seconds)
+
+
+def choose_model(audio_seconds: float, deadline_seconds: float, real_time_factors: RealTimeFactorTracker,
+                 queue_seconds: float = 0.0, cuda_available: bool = False, english_only: bool = False,
+                 candidates: Optional[List[str]] = None) -> ModelChoice:
+    """
+    Picks the most accurate model predicted to transcribe audio_seconds of audio within deadline_seconds.
+
+    On a GPU, float16 is tried before float32: it is about twice as fast at no cost in accuracy. Without a GPU only
+    float32 is used, since float16 is slower than float32 (or unsupported) on a CPU.
+
+    Parameters:
+        audio_seconds (float): The duration of the audio.
+        deadline_seconds (float): The time left until the transcription has to be done.
+        real_time_factors (RealTimeFactorTracker): The processing speed of the models on this host.
+        queue_seconds (float): The processing time the transcriptions already running still need.
+        cuda_available (bool): Whether the transcription runs on a GPU.
+        english_only (bool): Whether the English-only ('.en') models may be used.
+        candidates (list): The AUDIO_QUALITY_MAP keys to choose from, most accurate first. Defaults to MODELS_BY_ACCURACY.
+
+    Returns:
+        ModelChoice: The model picked. If none is predicted to make the deadline, the fastest one.
+    """
+    candidates = [audio_quality for audio_quality in (candidates or MODELS_BY_ACCURACY)
+                  if english_only or not audio_quality.endswith('.en')]
+    compute_types = ['float16', 'float32'] if cuda_available else ['float32']
+    host_slowdown = 1.0
+    if not cuda_available and not real_time_factors.has_measurements():
+        host_slowdown = CPU_SLOWDOWN
+    time_available = deadline_seconds * (1 - DEADLINE_SAFETY_MARGIN)
+    fastest = None
+    for audio_quality in candidates:
+        model_name = AUDIO_QUALITY_MAP[audio_quality]
+        for compute_type in compute_types:
+            factor = real_time_factors.get(model_name, compute_type)
+            if not real_time_factors.is_measured(model_name, compute_type):
+                factor *= host_slowdown
+            predicted_seconds = queue_seconds + audio_seconds * factor
+            choice = ModelChoice(audio_quality=audio_quality, compute_type=compute_type, model_name=model_name,
+                                 predicted_seconds=predicted_seconds, meets_deadline=predicted_seconds <= time_available)
+            if choice.meets_deadline:
+                return choice
+            if fastest is None or predicted_seconds < fastest.predicted_seconds:
+                fastest = choice
+    return fastest
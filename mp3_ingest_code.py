@@ -0,0 +1,207 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: The mp3_ingest module copies an uploaded (FastAPI UploadFile) mp3 file to a local file in one
+# streaming pass. The upload is read in fixed-size chunks into one reused buffer, so memory use
+# doesn't grow with the file size. The size is checked against the limits before copying, and the
+# SHA-256 and mp3 header check are done on the chunks while they are copied.
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import asyncio
+import hashlib
+import os
+from pathlib import Path
+
+from fastapi import UploadFile
+from pydantic import BaseModel
+
+ID3_HEADER_SIZE = 10
+
+
+class IngestedMP3(BaseModel):
+    """
+    The local copy of an uploaded mp3 file.
+
+    Attributes:
+        path (Path): Where the file was copied to.
+        size (int): The size in bytes.
+        sha256 (str): The hex SHA-256 of the content.
+    """
+    path: Path
+    size: int
+    sha256: str
+
+
+class MP3HeaderSniffer:
+    """
+    Checks incrementally that a byte stream starts like an mp3 file: with an MPEG audio frame header, or with an
+    ID3v2 tag followed by one. The tag (e.g. with cover art) can be larger than a chunk, so the frame header
+    after it is checked when the stream gets there.
+
+    Attributes:
+        is_mp3 (Optional[bool]): True or False once decided, None while more bytes are needed.
+    """
+    def __init__(self):
+        self.is_mp3 = None
+        self._offset = 0
+        self._head = b''
+        self._frame_offset = None
+        self._frame_header = b''
+
+    def feed(self, chunk) -> None:
+        """
+        Passes the next chunk of the stream (bytes or a memoryview).
+        """
+        if self.is_mp3 is not None:
+            return
+        chunk_start = self._offset
+        self._offset += len(chunk)
+        # The first bytes tell whether there is an ID3 tag, and how large it is.
+        if len(self._head) < ID3_HEADER_SIZE:
+            self._head += bytes(chunk[:ID3_HEADER_SIZE - len(self._head)])
+        if self._frame_offset is None:
+            if self._head[:3] != b'ID3'[:len(self._head)]:
+                self._frame_offset = 0
+            elif len(self._head) < ID3_HEADER_SIZE:
+                return
+            else:
+                self._frame_offset = self._id3_tag_end(self._head)
+                if self._frame_offset is None:
+                    self.is_mp3 = False
+                    return
+            self._frame_header = self._head[self._frame_offset:self._frame_offset + 2]
+        # Collect the two bytes of the first frame header.
+        needed_from = self._frame_offset + len(self._frame_header)
+        needed_to = self._frame_offset + 2
+        if chunk_start <= needed_from < self._offset:
+            self._frame_header += bytes(chunk[needed_from - chunk_start:needed_to - chunk_start])
+        if len(self._frame_header) == 2:
+            self.is_mp3 = self._is_frame_sync(self._frame_header)
+
+    def finish(self) -> bool:
+        """
+        Returns whether the stream is an mp3 file once it has been fed completely.
+        """
+        return bool(self.is_mp3)
+
+    @staticmethod
+    def _is_frame_sync(header: bytes) -> bool:
+        # An MPEG audio frame starts with 11 set bits.
+        return len(header) == 2 and header[0] == 0xFF and header[1] & 0xE0 == 0xE0
+
+    @staticmethod
+    def _id3_tag_end(header: bytes):
+        # 'ID3', major and minor version, flags, then the tag size as four 7-bit (synchsafe) bytes.
+        major_version, minor_version, flags = header[3], header[4], header[5]
+        size_bytes = header[6:10]
+        if major_version == 0xFF or minor_version == 0xFF or any(b & 0x80 for b in size_bytes):
+            return None
+        size = 0
+        for b in size_bytes:
+            size = (size << 7) | b
+        footer_size = ID3_HEADER_SIZE if flags & 0x10 else 0
+        return ID3_HEADER_SIZE + size + footer_size
+
+
+def upload_file_size(upload_file: UploadFile) -> int:
+    """
+    Returns the size of an uploaded file without reading it: the size FastAPI recorded, else the size of the
+    spooled file on disk (fstat), else the end position of the in-memory file.
+    """
+    if upload_file.size is not None:
+        return upload_file.size
+    try:
+        return os.fstat(upload_file.file.fileno()).st_size
+    except (AttributeError, OSError, ValueError):
+        # In-memory files (e.g. io.BytesIO, or a SpooledTemporaryFile that wasn't rolled over) have no file descriptor.
+        position = upload_file.file.tell()
+        size = upload_file.file.seek(0, os.SEEK_END)
+        upload_file.file.seek(position)
+        return size
+
+async def ingest_upload_file(upload_file: UploadFile, destination: Path, min_size: int, max_size: int,
+                             chunk_size: int = 1024 * 1024) -> IngestedMP3:
+    """
+    Copies an uploaded mp3 file to destination in one pass, computing its SHA-256 and checking its mp3 header on
+    the way.
+
+    The size limits are checked before anything is copied, and again while copying in case the reported size
+    was wrong. The copy is written to a temporary file next to destination and renamed when complete, so a
+    failed copy leaves nothing behind.
+
+    Parameters:
+        upload_file (UploadFile): The uploaded file.
+        destination (Path): The local file to create.
+        min_size (int): Smaller files are rejected.
+        max_size (int): Larger files are rejected.
+        chunk_size (int): The bytes copied at a time.
+
+    Returns:
+        IngestedMP3: The path, size and SHA-256 of the copy.
+
+    Raises:
+        ValueError: If the file is too small, too large, or not an mp3 file.
+    """
+    size = upload_file_size(upload_file)
+    if size < min_size:
+        raise ValueError("File size too small to be a valid MP3 file.")
+    if size > max_size:
+        raise ValueError(f"The file is {size} bytes. The largest mp3 file accepted is {max_size} bytes.")
+    # The whole copy runs in one executor call. Reading from the upload's file directly into one buffer
+    # avoids an executor round trip and a new bytes object per chunk.
+    return await asyncio.get_running_loop().run_in_executor(
+        None, _copy_upload, upload_file.file, Path(destination), max_size, chunk_size)
+
+def _copy_upload(source, destination: Path, max_size: int, chunk_size: int) -> IngestedMP3:
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    sha256 = hashlib.sha256()
+    sniffer = MP3HeaderSniffer()
+    copied = 0
+    tmp_path = destination.with_name(f".{destination.name}.part")
+    source.seek(0)
+    try:
+        with open(tmp_path, 'wb') as f:
+            while True:
+                read = source.readinto(view)
+                if not read:
+                    break
+                copied += read
+                if copied > max_size:
+                    raise ValueError(f"The file is larger than the largest mp3 file accepted ({max_size} bytes).")
+                chunk = view[:read]
+                sha256.update(chunk)
+                sniffer.feed(chunk)
+                if sniffer.is_mp3 is False:
+                    raise ValueError("The file content is not mp3 audio.")
+                f.write(chunk)
+        if not sniffer.finish():
+            raise ValueError("The file content is not mp3 audio.")
+        os.replace(tmp_path, destination)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+        source.seek(0)
+    return IngestedMP3(path=destination, size=copied, sha256=sha256.hexdigest())
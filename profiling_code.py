@@ -0,0 +1,207 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: On-demand profiling of single jobs. A profiled job's workflow runs under cProfile (and tracemalloc
+# if memory tracking is on), and its inference under torch.profiler. The profiles are written to a directory
+# of the job, under a size cap. Jobs are profiled on request, all of them, or one in N by sampling.
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import contextvars
+import cProfile
+import io
+import itertools
+import pstats
+import shutil
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+from env_settings_code import get_settings
+from logger_code import LoggerBase
+
+# The number of functions (and memory allocation sites) listed in the text reports.
+REPORT_LINES = 50
+
+_logger = LoggerBase.setup_logger('JobProfiler')
+# The JobProfiler of the job running in this context.
+_current_profiler = contextvars.ContextVar('current_profiler', default=None)
+# cProfile and tracemalloc hook the whole thread (the event loop), so one job at a time is profiled with them.
+_workflow_profile_lock = threading.Lock()
+_job_counter = itertools.count(1)
+
+
+class JobProfiler:
+    """
+    The profiles of one job, written to its directory:
+        - workflow.prof and workflow.txt: cProfile stats of the workflow (pstats format, for snakeviz and the like,
+          and the top functions by cumulative time). cProfile sees the whole event loop thread, so the other jobs
+          that ran meanwhile show up too.
+        - memory.txt: the allocation sites that grew the most over the workflow (if memory tracking is on).
+        - inference_trace.json and inference_ops.txt: the torch.profiler trace of the inference call (for
+          chrome://tracing or Perfetto) and its operators by total time.
+
+    Attributes:
+        job_id (str): The job's ID.
+        directory (Path): Where the profiles are written.
+        memory (bool): Whether memory is tracked.
+    """
+    def __init__(self, job_id: str, directory: Path, memory: bool = False):
+        self.job_id = job_id
+        self.directory = directory
+        self.memory = memory
+
+    @contextmanager
+    def profile_workflow(self):
+        """
+        Runs the block under cProfile (and tracemalloc if memory is on). If another job is being profiled,
+        the block runs without them: only the inference of this job is profiled.
+        """
+        if not _workflow_profile_lock.acquire(blocking=False):
+            _logger.warning(f"Another job is being profiled. Only the inference of job {self.job_id} will be.")
+            yield
+            return
+        profile = cProfile.Profile()
+        memory_before = None
+        try:
+            if self.memory:
+                tracemalloc.start()
+                memory_before = tracemalloc.take_snapshot()
+            profile.enable()
+            try:
+                yield
+            finally:
+                profile.disable()
+                self.directory.mkdir(parents=True, exist_ok=True)
+                profile.dump_stats(self.directory / 'workflow.prof')
+                report = io.StringIO()
+                pstats.Stats(profile, stream=report).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(REPORT_LINES)
+                (self.directory / 'workflow.txt').write_text(report.getvalue(), encoding='utf-8')
+                if memory_before is not None:
+                    growth = tracemalloc.take_snapshot().compare_to(memory_before, 'lineno')
+                    peak = tracemalloc.get_traced_memory()[1]
+                    lines = [f"Peak traced memory: {peak / 1024 / 1024:.1f} MiB"] + [str(stat) for stat in growth[:REPORT_LINES]]
+                    (self.directory / 'memory.txt').write_text('\n'.join(lines) + '\n', encoding='utf-8')
+        finally:
+            if memory_before is not None:
+                tracemalloc.stop()
+            _workflow_profile_lock.release()
+
+    @contextmanager
+    def profile_inference(self):
+        """
+        Runs the block (the inference call) under torch.profiler, recording CUDA kernels when CUDA is available,
+        and tensor memory and shapes if memory is on.
+        """
+        import torch # pylint: disable=import-outside-toplevel
+        from torch.profiler import ProfilerActivity, profile # pylint: disable=import-outside-toplevel
+        activities = [ProfilerActivity.CPU] + ([ProfilerActivity.CUDA] if torch.cuda.is_available() else [])
+        with profile(activities=activities, profile_memory=self.memory, record_shapes=self.memory) as profiler:
+            yield
+        self.directory.mkdir(parents=True, exist_ok=True)
+        profiler.export_chrome_trace(str(self.directory / 'inference_trace.json'))
+        sort_by = 'cuda_time_total' if torch.cuda.is_available() else 'cpu_time_total'
+        table = profiler.key_averages().table(sort_by=sort_by, row_limit=REPORT_LINES)
+        (self.directory / 'inference_ops.txt').write_text(table, encoding='utf-8')
+
+
+def profile_root() -> Path:
+    settings = get_settings()
+    return Path(settings.profile_dir) if settings.profile_dir else Path(settings.local_transcript_dir) / 'profiles'
+
+def should_profile(requested: Optional[bool] = None) -> bool:
+    """
+    Decides whether a job is profiled: if requested, if the profile_jobs setting is on, or if it is the
+    profile_sample_every'th job since the last sampled one.
+    """
+    settings = get_settings()
+    if requested or settings.profile_jobs:
+        return True
+    return settings.profile_sample_every > 0 and next(_job_counter) % settings.profile_sample_every == 0
+
+@contextmanager
+def profile_job(job_id: str, requested: Optional[bool] = None):
+    """
+    Profiles the job run in the block, if should_profile(). Yields its JobProfiler, or None if the job isn't
+    profiled. The inference call of the job finds the profiler with current_profiler().
+    """
+    if not should_profile(requested):
+        yield None
+        return
+    settings = get_settings()
+    root = profile_root()
+    profiler = JobProfiler(job_id, root / job_id, memory=settings.profile_memory)
+    _logger.info(f"Profiling job {job_id} into {profiler.directory}.")
+    token = _current_profiler.set(profiler)
+    try:
+        with profiler.profile_workflow():
+            yield profiler
+    finally:
+        _current_profiler.reset(token)
+        enforce_size_cap(root, settings.profile_max_bytes, keep=profiler.directory)
+
+def current_profiler() -> Optional[JobProfiler]:
+    return _current_profiler.get()
+
+@contextmanager
+def profile_inference():
+    """
+    Profiles the block with torch.profiler if the job running in this context is profiled.
+    """
+    profiler = current_profiler()
+    if profiler is None:
+        yield
+        return
+    with profiler.profile_inference():
+        yield
+
+def enforce_size_cap(root: Path, max_bytes: int, keep: Optional[Path] = None) -> None:
+    """
+    Removes the oldest job directories in root until the profiles take at most max_bytes. If the profiles of the
+    job just written (keep) are over the cap on their own, its largest files go instead, down to the text reports.
+    """
+    if not root.exists():
+        return
+    def _size(path: Path) -> int:
+        return sum(file.stat().st_size for file in path.rglob('*') if file.is_file())
+    directories = sorted((path for path in root.iterdir() if path.is_dir()), key=lambda path: path.stat().st_mtime)
+    sizes = {directory: _size(directory) for directory in directories}
+    total = sum(sizes.values())
+    for directory in directories:
+        if total <= max_bytes:
+            return
+        if directory == keep:
+            continue
+        shutil.rmtree(directory, ignore_errors=True)
+        total -= sizes[directory]
+    if keep is not None and total > max_bytes and keep.exists():
+        for file in sorted((file for file in keep.iterdir() if file.suffix != '.txt'), key=lambda file: -file.stat().st_size):
+            if total <= max_bytes:
+                break
+            total -= file.stat().st_size
+            _logger.warning(f"Removing {file}: the profiles are over profile_max_bytes.")
+            file.unlink()
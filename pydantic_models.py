@@ -31,11 +31,17 @@
 
 import os
 import re
-from typing import Union
+from pathlib import Path
+from typing import Optional, Union
 
 from pydantic import BaseModel, field_validator, Field, ValidationError
 from fastapi import UploadFile
 
+from mp3_ingest_code import upload_file_size
+
+
+# Minimum mp3 size in bytes (10KB)
+MIN_MP3_FILE_SIZE = 10_240
 
 # Asynchronous UploadeFile validation function
 async def validate_upload_file(upload_file: UploadFile):
@@ -45,13 +51,9 @@ async def validate_upload_file(upload_file: UploadFile):
     if file_extension not in valid_extensions:
         raise ValueError(f"Invalid file extension. It should be .mp3 but it is {file_extension}.")
 
-    # Validate file size (async operation)
-    await upload_file.seek(0)  # Move to end of file to get size
-    file_size = len(upload_file.file.read()) # read to the end
-    await upload_file.seek(0)  # Reset file pointer to beginning
-    # Define your file size limit here
-    min_size = 10_240  # Minimum mp3 size in bytes (10KB)
-    if file_size < min_size:
+    # Validate file size without reading the file (the content is checked while it is copied).
+    file_size = upload_file_size(upload_file)
+    if file_size < MIN_MP3_FILE_SIZE:
         raise ValueError("File size too small to be a valid MP3 file.")
     # Return the file if all validations pass
     return upload_file
@@ -59,8 +61,26 @@ async def validate_upload_file(upload_file: UploadFile):
 class GDriveInput(BaseModel):
     gdrive_id: str = Field(..., pattern=r'^[a-zA-Z0-9_-]{25,33}$')
 
+class LocalMP3Input(BaseModel):
+    """
+    An mp3 file that is already in local_mp3_dir, e.g. an upload the job service copied there when the job
+    was submitted. Like an uploaded file, it is uploaded to GDrive while it is transcribed.
+    """
+    path: Path
+    sha256: Optional[str] = None
+
+class LocalAudioInput(BaseModel):
+    """
+    A local audio or video file of any format ffmpeg reads, decoded into the decode cache (see audio_decode_code)
+    rather than converted to mp3. The file stays where it is: it isn't uploaded to GDrive or deleted, and its
+    transcript is named after it. duration_seconds is the duration of the decoded audio.
+    """
+    path: Path
+    sha256: Optional[str] = None
+    duration_seconds: Optional[float] = None
+
 class ValidFileInput(BaseModel):
-    input_file: Union[UploadFile, GDriveInput]
+    input_file: Union[UploadFile, GDriveInput, LocalMP3Input, LocalAudioInput]
 
 
 
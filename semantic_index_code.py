@@ -0,0 +1,663 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: A persistent semantic index of the transcripts. Each transcript is split into chunks of a few sentences,
+# and each chunk is embedded once by a local CPU model (a sentence-transformers model loaded with transformers).
+# The embeddings are rows of an append-only float16 matrix in a memory-mapped .npy file, next to an SQLite table
+# of the chunks' transcripts and text. A query is embedded the same way and matched by cosine similarity, over
+# the whole matrix or, once it is large, over the nearest partitions of an inverted file (IVF) index. A
+# transcript is added when its job reaches TRANSCRIPTION_UPLOAD_COMPLETE, without rebuilding the index.
+# 
+# Usage: python semantic_index_code.py search "how safe is bone meal" [--limit 10]
+#        python semantic_index_code.py backfill [--local] [--drive]
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import argparse
+import asyncio
+import io
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from env_settings_code import get_settings
+from transcript_index_code import backfill_from_directory, backfill_from_drive
+from workflow_error_code import async_error_handler
+
+EMBEDDINGS_FILE = 'embeddings.npy'
+CHUNKS_FILE = 'chunks.sqlite3'
+# A chunk is CHUNK_SENTENCES sentences, or fewer if they're longer than MAX_CHUNK_WORDS words (a transcript
+# without punctuation would otherwise be one chunk).
+CHUNK_SENTENCES = 3
+MAX_CHUNK_WORDS = 160
+# The matrix is scored this many rows at a time: converting float16 to float32 costs more than the products, and
+# it's fastest a block that stays in the cache at a time. Scoring takes about 0.7 µs a chunk on one core.
+SCAN_BLOCK_ROWS = 1024
+# Once this many chunks are indexed, queries only score the chunks in the IVF_PROBES partitions whose centroids
+# are the nearest to the query. The partitions are trained again when the index is IVF_RETRAIN_GROWTH times as
+# large as when they were last trained.
+IVF_MIN_CHUNKS = 20000
+IVF_PROBES = 16
+IVF_RETRAIN_GROWTH = 4
+IVF_TRAIN_ITERATIONS = 10
+# The most chunks the partitions are trained on, per partition.
+IVF_SAMPLE_PER_LIST = 64
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    row INTEGER PRIMARY KEY,
+    file_id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    chunk INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    live INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS chunks_file_id ON chunks(file_id);
+CREATE INDEX IF NOT EXISTS chunks_title ON chunks(title);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value
+);
+"""
+
+
+class SemanticHit(NamedTuple):
+    """
+    A chunk of a transcript similar to a query: the transcript's file ID and title, the chunk's number within the
+    transcript, its text, and its cosine similarity to the query (1 is the most similar).
+    """
+    file_id: str
+    title: str
+    chunk: int
+    score: float
+    text: str
+
+
+class TransformerEmbedder:
+    """
+    Embeds texts with a sentence-transformers model (e.g. sentence-transformers/all-MiniLM-L6-v2), loaded with
+    transformers' AutoModel: the mean of the token embeddings of the last layer, normalized to unit length.
+
+    torch and transformers are imported, and the model loaded, on the first call. The model runs on the CPU, so
+    embedding doesn't compete with transcription for the GPU.
+    """
+    def __init__(self, model_name: str, batch_size: int = 32, max_tokens: int = 256):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_tokens = max_tokens
+        self._model = None
+        self._tokenizer = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        # pylint: disable=import-outside-toplevel
+        from transformers import AutoModel, AutoTokenizer
+        with self._lock:
+            if self._model is None:
+                self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+                self._model = AutoModel.from_pretrained(self.model_name).eval()
+        return self._tokenizer, self._model
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Returns the embeddings of the texts, as the float32 rows of a matrix.
+        """
+        import torch # pylint: disable=import-outside-toplevel
+        tokenizer, model = self._load()
+        # Texts of about the same length are batched together, so there's little padding.
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors = np.empty((len(texts), model.config.hidden_size), dtype=np.float32)
+        with torch.inference_mode():
+            for start in range(0, len(order), self.batch_size):
+                batch = order[start:start + self.batch_size]
+                tokens = tokenizer([texts[i] for i in batch], padding=True, truncation=True, max_length=self.max_tokens,
+                                   return_tensors='pt')
+                hidden = model(**tokens).last_hidden_state
+                mask = tokens['attention_mask'].unsqueeze(-1).to(hidden.dtype)
+                vectors[batch] = ((hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)).numpy()
+        return normalize(vectors)
+
+
+class AppendOnlyArray:
+    """
+    An array in a .npy file that grows along its first axis, read through a memory map.
+
+    Appending writes the new rows at the end of the file and then the new shape into the header, in place (numpy
+    pads the header so the shape can grow), so the rows already written are never copied. A reader that maps the
+    file before the header is rewritten sees the rows it had. The file is created by the first append.
+    """
+    def __init__(self, path, dtype):
+        self.path = Path(path)
+        self.dtype = np.dtype(dtype)
+        self.row_shape: Optional[Tuple[int, ...]] = None
+        self.rows = 0
+        self._offset = 0
+        self._map: Optional[np.ndarray] = None
+        self.refresh()
+
+    def refresh(self) -> bool:
+        """
+        Reads the shape from the header again, in case another process appended. Returns whether it changed.
+        """
+        if not self.path.exists():
+            return False
+        with open(self.path, 'rb') as f:
+            np.lib.format.read_magic(f)
+            shape, _, dtype = np.lib.format.read_array_header_1_0(f)
+            self._offset = f.tell()
+        if dtype != self.dtype:
+            raise ValueError(f"{self.path} holds {dtype}, not {self.dtype}.")
+        changed = (shape[0], shape[1:]) != (self.rows, self.row_shape)
+        self.rows, self.row_shape = shape[0], shape[1:]
+        if changed:
+            self._map = None
+        return changed
+
+    def array(self) -> np.ndarray:
+        """
+        The rows, memory-mapped read-only.
+        """
+        if self._map is None:
+            if self.rows == 0:
+                self._map = np.empty((0,) + (self.row_shape or ()), dtype=self.dtype)
+            else:
+                self._map = np.memmap(self.path, dtype=self.dtype, mode='r', offset=self._offset, shape=(self.rows,) + self.row_shape)
+        return self._map
+
+    def append(self, rows: np.ndarray) -> int:
+        """
+        Appends rows, which are converted to the array's dtype. Returns the index of the first one.
+        """
+        rows = np.ascontiguousarray(rows, dtype=self.dtype)
+        if self.row_shape is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'wb') as f:
+                self._offset = self._write_header(f, (0,) + rows.shape[1:])
+            self.row_shape = rows.shape[1:]
+        elif rows.shape[1:] != self.row_shape:
+            raise ValueError(f"Rows of shape {rows.shape[1:]} can't be appended to rows of shape {self.row_shape}.")
+        first = self.rows
+        with open(self.path, 'r+b') as f:
+            f.seek(self._offset + first * self._row_bytes())
+            f.write(rows.tobytes())
+            f.truncate()
+            f.flush()
+            os.fsync(f.fileno())
+            f.seek(0)
+            self._write_header(f, (first + len(rows),) + self.row_shape)
+        self.rows = first + len(rows)
+        self._map = None
+        return first
+
+    def truncate(self, rows: int) -> None:
+        """
+        Drops the rows after the first `rows`, e.g. rows appended by a process that stopped before recording them.
+        """
+        if self.row_shape is None or rows >= self.rows:
+            return
+        with open(self.path, 'r+b') as f:
+            self._write_header(f, (rows,) + self.row_shape)
+            f.truncate(self._offset + rows * self._row_bytes())
+        self.rows = rows
+        self._map = None
+
+    def _row_bytes(self) -> int:
+        return int(np.prod(self.row_shape, dtype=np.int64)) * self.dtype.itemsize
+
+    def _write_header(self, f, shape: Tuple[int, ...]) -> int:
+        header = io.BytesIO()
+        np.lib.format.write_array_header_1_0(header, {'descr': np.lib.format.dtype_to_descr(self.dtype),
+                                                      'fortran_order': False, 'shape': shape})
+        if self._offset and header.tell() != self._offset:
+            raise ValueError(f"The header of {self.path} can't be rewritten in place for shape {shape}.")
+        f.write(header.getvalue())
+        return header.tell()
+
+
+class SemanticIndex:
+    """
+    An index of transcript chunks by the meaning of their text, searchable by cosine similarity to a query.
+
+    The index is a directory:
+    - embeddings.npy: An AppendOnlyArray of float16 rows, one per chunk, normalized to unit length so their dot
+      product with a query's embedding is the cosine similarity.
+    - chunks.sqlite3: The table of the chunks by row of the matrix: the transcript's file ID and title, the
+      chunk's number and text, and whether the chunk is live. Adding a transcript again (e.g. from Drive after it
+      was indexed from local_transcript_dir) appends its chunks and marks the old ones dead; they're skipped by
+      searches. The meta table holds the model the index was built with, and the IVF partitions.
+    - ivf_lists.<rows>.npy: Once there are ivf_min_chunks chunks, an AppendOnlyArray of the IVF partition of each row.
+      The partitions' centroids are trained by spherical k-means on a sample of the chunks; new chunks are assigned
+      to the nearest centroid as they're added. A query scores the chunks of the ivf_probes partitions nearest
+      to it instead of every chunk.
+
+    The rows are appended to the matrix before their chunks are committed to the table. Rows without a chunk (a
+    process stopped between the two, or is between the two right now) aren't searched, and the next add
+    overwrites them. One process adds to the index; others can search it at the same time, and pick up what it
+    added. The calls block: call them from a thread in async code.
+
+    Parameters:
+        directory: The index's directory.
+        embedder: Embeds texts as unit float32 rows (embed(texts) -> np.ndarray), e.g. a TransformerEmbedder. The
+            index remembers its model_name, and won't mix the embeddings of different models.
+        chunk_sentences (int): The sentences of a chunk.
+        ivf_min_chunks (int): The number of chunks from which the IVF partitions are used. 0 never uses them.
+        ivf_probes (int): The partitions a query scores.
+    """
+    def __init__(self, directory, embedder, chunk_sentences: int = CHUNK_SENTENCES, ivf_min_chunks: int = IVF_MIN_CHUNKS,
+                 ivf_probes: int = IVF_PROBES):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.embedder = embedder
+        self.chunk_sentences = chunk_sentences
+        self.ivf_min_chunks = ivf_min_chunks
+        self.ivf_probes = ivf_probes
+        self._connection = sqlite3.connect(str(self.directory / CHUNKS_FILE), check_same_thread=False)
+        self._lock = threading.Lock()
+        self._embeddings = AppendOnlyArray(self.directory / EMBEDDINGS_FILE, np.float16)
+        # The rows of the matrix with a chunk in the table.
+        self._rows = 0
+        self._dead = np.zeros(0, dtype=bool)
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: Optional[AppendOnlyArray] = None
+        # The rows of each IVF partition, in the order of _list_rows, for the first _sorted_rows rows. The rows
+        # assigned since are looked up in _lists, and rows not assigned yet are always scored.
+        self._list_rows = np.zeros(0, dtype=np.int64)
+        self._list_bounds = np.zeros(1, dtype=np.int64)
+        self._sorted_rows = 0
+        self._data_version = None
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.executescript(_SCHEMA)
+            with self._connection:
+                model_name = getattr(embedder, 'model_name', None)
+                indexed_model = self._meta('model_name')
+                if indexed_model is None:
+                    self._set_meta('model_name', model_name)
+                elif indexed_model != model_name:
+                    raise ValueError(f"The semantic index in {self.directory} holds embeddings of {indexed_model}, not {model_name}. "
+                                     "Index the transcripts into a new directory.")
+            self._load()
+
+    def _meta(self, key: str):
+        row = self._connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value) -> None:
+        self._connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def _load(self) -> None:
+        """
+        Reads the state of the index from its files.
+        """
+        self._embeddings.refresh()
+        recorded = self._connection.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM chunks").fetchone()[0]
+        self._rows = min(self._embeddings.rows, recorded)
+        self._dead = np.zeros(self._rows, dtype=bool)
+        self._dead[[row for row, in self._connection.execute("SELECT row FROM chunks WHERE live = 0 AND row < ?", (self._rows,))]] = True
+        centroids, lists_file = self._meta('ivf_centroids'), self._meta('ivf_lists')
+        self._centroids, self._lists, self._sorted_rows = None, None, 0
+        if centroids is not None:
+            self._centroids = np.load(io.BytesIO(centroids))
+            self._lists = AppendOnlyArray(self.directory / lists_file, np.int32)
+            self._sort_lists()
+        self._data_version = self._connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def _refresh(self) -> None:
+        # data_version changes when another connection commits, i.e. another process added to the index.
+        if self._connection.execute("PRAGMA data_version").fetchone()[0] != self._data_version:
+            self._load()
+
+    @property
+    def ivf_trained(self) -> bool:
+        return self._centroids is not None
+
+    def add(self, file_id: str, title: str, text: str, mp3_file_id: Optional[str] = None) -> None: # pylint: disable=unused-argument
+        """
+        Embeds a transcript's chunks and appends them, replacing the chunks indexed under the same file ID. The
+        IVF partitions are trained when the index gets large enough. (mp3_file_id is accepted so the backfills of
+        transcript_index_code work with either index.)
+        """
+        chunks = split_into_chunks(text, self.chunk_sentences)
+        vectors = self.embedder.embed(chunks) if chunks else None
+        with self._lock:
+            self._refresh()
+            first = self._rows
+            try:
+                # Drop any rows without a chunk, and assign any rows without a partition.
+                self._embeddings.truncate(first)
+                if self._lists is not None:
+                    self._lists.truncate(first)
+                    if self._lists.rows < first:
+                        self._lists.append(self._assign(self._embeddings.array()[self._lists.rows:first]))
+                with self._connection:
+                    self._remove(file_id)
+                    if chunks:
+                        self._connection.executemany("INSERT INTO chunks (row, file_id, title, chunk, text) VALUES (?, ?, ?, ?, ?)",
+                                                     ((first + n, file_id, title, n, chunk) for n, chunk in enumerate(chunks)))
+                        self._embeddings.append(vectors)
+                        if self._lists is not None:
+                            self._lists.append(self._assign(vectors))
+            except Exception:
+                self._load()
+                raise
+            self._rows = self._embeddings.rows
+            self._dead = np.concatenate([self._dead, np.zeros(self._rows - len(self._dead), dtype=bool)])
+            self._data_version = self._connection.execute("PRAGMA data_version").fetchone()[0]
+            live = self._rows - int(self._dead.sum())
+            trained_rows = self._meta('ivf_trained_rows') or 0
+            if self.ivf_min_chunks and live >= self.ivf_min_chunks and (not self.ivf_trained or live >= trained_rows * IVF_RETRAIN_GROWTH):
+                self._train_ivf()
+
+    def remove(self, file_id: str) -> bool:
+        """
+        Marks a transcript's chunks dead. Returns False if it wasn't indexed.
+        """
+        with self._lock:
+            self._refresh()
+            with self._connection:
+                removed = self._remove(file_id)
+            self._data_version = self._connection.execute("PRAGMA data_version").fetchone()[0]
+            return removed
+
+    def _remove(self, file_id: str) -> bool:
+        rows = [row for row, in self._connection.execute("SELECT row FROM chunks WHERE file_id = ? AND live = 1", (file_id,))]
+        if not rows:
+            return False
+        self._connection.execute("UPDATE chunks SET live = 0 WHERE file_id = ?", (file_id,))
+        self._dead[rows] = True
+        return True
+
+    def contains(self, file_id: str = None, title: str = None) -> bool:
+        """
+        Returns whether a transcript with the file ID (or else the title) is indexed.
+        """
+        column, value = ('file_id', file_id) if file_id is not None else ('title', title)
+        with self._lock:
+            return self._connection.execute(f"SELECT 1 FROM chunks WHERE {column} = ? AND live = 1", (value,)).fetchone() is not None
+
+    def count(self) -> int:
+        """
+        The number of live chunks.
+        """
+        with self._lock:
+            self._refresh()
+            return self._rows - int(self._dead.sum())
+
+    def search(self, query: str, limit: int = 10) -> List[SemanticHit]:
+        """
+        Returns the chunks most similar to the query, most similar first.
+
+        Parameters:
+            query (str): E.g. 'is bone meal safe to use'.
+            limit (int): The most chunks returned.
+
+        Returns:
+            List[SemanticHit]: The chunks, with their transcripts.
+        """
+        if not query.strip():
+            return []
+        with self._lock:
+            self._refresh()
+            if self._rows == 0:
+                return []
+        vector = self.embedder.embed([query])[0]
+        with self._lock:
+            self._refresh()
+            matrix = self._embeddings.array()[:self._rows]
+            rows = self._probe(vector) if self.ivf_trained else None
+            scores = score_rows(matrix, vector, rows)
+            scores[self._dead[rows] if rows is not None else self._dead] = -np.inf
+            best = top_k(scores, limit)
+            best = best[np.isfinite(scores[best])]
+            hit_rows = (rows[best] if rows is not None else best).tolist()
+            if not hit_rows:
+                return []
+            chunks = {row: (file_id, title, chunk, text) for row, file_id, title, chunk, text in self._connection.execute(
+                f"SELECT row, file_id, title, chunk, text FROM chunks WHERE row IN ({','.join('?' * len(hit_rows))})", hit_rows)}
+            return [SemanticHit(chunks[row][0], chunks[row][1], chunks[row][2], float(score), chunks[row][3])
+                    for row, score in zip(hit_rows, scores[best].tolist())]
+
+    def train_ivf(self, lists: Optional[int] = None) -> None:
+        """
+        Trains the IVF partitions on the chunks indexed (there's about one partition per sqrt(chunks) by default),
+        and assigns every chunk to one. From then on, searches only score the chunks of the nearest partitions.
+        """
+        with self._lock:
+            self._refresh()
+            self._train_ivf(lists)
+
+    def _train_ivf(self, lists: Optional[int] = None) -> None:
+        matrix = self._embeddings.array()[:self._rows]
+        live_rows = np.flatnonzero(~self._dead)
+        if len(live_rows) == 0:
+            return
+        lists = max(1, min(lists or int(np.sqrt(len(live_rows))), len(live_rows)))
+        rng = np.random.default_rng(0)
+        sample_rows = np.sort(rng.choice(live_rows, size=min(len(live_rows), lists * IVF_SAMPLE_PER_LIST), replace=False))
+        centroids = train_centroids(np.asarray(matrix[sample_rows], dtype=np.float32), lists, rng)
+        # The assignments go to a new file, recorded in the same commit as the centroids they refer to.
+        lists_file = f'ivf_lists.{self._rows}.npy'
+        new_lists = AppendOnlyArray(self.directory / lists_file, np.int32)
+        new_lists.truncate(0)
+        self._centroids = centroids
+        new_lists.append(self._assign(matrix))
+        old_lists_file = self._meta('ivf_lists')
+        buffer = io.BytesIO()
+        np.save(buffer, centroids)
+        with self._connection:
+            self._set_meta('ivf_centroids', buffer.getvalue())
+            self._set_meta('ivf_lists', lists_file)
+            self._set_meta('ivf_trained_rows', len(live_rows))
+        if old_lists_file and old_lists_file != lists_file:
+            (self.directory / old_lists_file).unlink(missing_ok=True)
+        self._lists = new_lists
+        self._sort_lists()
+        self._data_version = self._connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        The partition of each row: the centroid with the largest dot product.
+        """
+        assignments = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), SCAN_BLOCK_ROWS):
+            block = np.asarray(vectors[start:start + SCAN_BLOCK_ROWS], dtype=np.float32)
+            assignments[start:start + len(block)] = np.argmax(block @ self._centroids.T, axis=1)
+        return assignments
+
+    def _sort_lists(self) -> None:
+        assignments = np.asarray(self._lists.array()[:self._rows])
+        self._list_rows = np.argsort(assignments, kind='stable')
+        self._list_bounds = np.searchsorted(assignments[self._list_rows], np.arange(len(self._centroids) + 1))
+        self._sorted_rows = len(assignments)
+
+    def _probe(self, vector: np.ndarray) -> np.ndarray:
+        """
+        The rows of the partitions nearest to the vector, in ascending order.
+        """
+        probes = top_k(self._centroids @ vector, self.ivf_probes)
+        assigned = min(self._lists.rows, self._rows)
+        # Rows assigned since the partitions were last sorted are looked up directly; once there are many, sort again.
+        if assigned - self._sorted_rows > self._sorted_rows // 10:
+            self._sort_lists()
+        tail = self._sorted_rows + np.flatnonzero(np.isin(self._lists.array()[self._sorted_rows:assigned], probes))
+        rows = np.concatenate([self._list_rows[self._list_bounds[probe]:self._list_bounds[probe + 1]] for probe in probes]
+                              + [tail, np.arange(assigned, self._rows)])
+        rows.sort()
+        return rows
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """
+    Scales the rows to unit length (rows of zeros stay zeros).
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def score_rows(matrix: np.ndarray, vector: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    The dot products of the rows of the (float16) matrix with the vector, or of only the given rows, converted to
+    float32 SCAN_BLOCK_ROWS rows at a time so BLAS does the products.
+    """
+    count = len(matrix) if rows is None else len(rows)
+    scores = np.empty(count, dtype=np.float32)
+    converted = np.empty((min(count, SCAN_BLOCK_ROWS),) + matrix.shape[1:], dtype=np.float32)
+    for start in range(0, count, SCAN_BLOCK_ROWS):
+        block = matrix[start:start + SCAN_BLOCK_ROWS] if rows is None else matrix[rows[start:start + SCAN_BLOCK_ROWS]]
+        np.copyto(converted[:len(block)], block)
+        np.dot(converted[:len(block)], vector, out=scores[start:start + len(block)])
+    return scores
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    The indexes of the k largest scores, largest first, without sorting all of them.
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    best = np.argpartition(scores, len(scores) - k)[len(scores) - k:]
+    return best[np.argsort(-scores[best], kind='stable')]
+
+def train_centroids(sample: np.ndarray, lists: int, rng: np.random.Generator, iterations: int = IVF_TRAIN_ITERATIONS) -> np.ndarray:
+    """
+    Spherical k-means: `lists` unit centroids of the unit rows of the sample, starting from a random choice of them.
+    """
+    centroids = sample[rng.choice(len(sample), size=lists, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        # A centroid without rows keeps its place.
+        filled = np.bincount(assignments, minlength=lists) > 0
+        centroids[filled] = normalize(sums[filled])
+    return centroids
+
+def split_into_chunks(text: str, sentences: int = CHUNK_SENTENCES, max_words: int = MAX_CHUNK_WORDS) -> List[str]:
+    """
+    Splits a text into chunks of `sentences` sentences (ending in '.', '!' or '?'), breaking up any chunk of more
+    than `max_words` words.
+    """
+    split = [sentence for sentence in re.split(r'(?<=[.!?])\s+', text.strip()) if sentence]
+    chunks = []
+    for start in range(0, len(split), sentences):
+        words = ' '.join(split[start:start + sentences]).split()
+        chunks.extend(' '.join(words[n:n + max_words]) for n in range(0, len(words), max_words))
+    return chunks
+
+def semantic_index_dir() -> Path:
+    """
+    The semantic_index_dir setting, by default semantic_index in local_transcript_dir.
+    """
+    settings = get_settings()
+    return Path(settings.semantic_index_dir or Path(settings.local_transcript_dir) / 'semantic_index')
+
+def open_semantic_index(directory=None) -> 'SemanticIndex':
+    """
+    Opens the semantic index in the directory (by default semantic_index_dir), with the settings' model.
+    """
+    settings = get_settings()
+    return SemanticIndex(directory or semantic_index_dir(), TransformerEmbedder(settings.semantic_index_model),
+                         chunk_sentences=settings.semantic_index_chunk_sentences, ivf_min_chunks=settings.semantic_index_ivf_min_chunks,
+                         ivf_probes=settings.semantic_index_ivf_probes)
+
+_index: Optional[SemanticIndex] = None
+_index_configured = False
+_index_lock = threading.Lock()
+
+def get_semantic_index() -> Optional[SemanticIndex]:
+    """
+    Returns the process-wide SemanticIndex, or None if the semantic_index_enabled setting is off.
+    """
+    global _index, _index_configured # pylint: disable=global-statement
+    with _index_lock:
+        if not _index_configured:
+            if get_settings().semantic_index_enabled:
+                _index = open_semantic_index()
+            _index_configured = True
+        return _index
+
+def set_semantic_index(index: Optional[SemanticIndex]) -> None:
+    """
+    Replaces the process-wide SemanticIndex (None turns it off). Closing the old one is up to the caller.
+    """
+    global _index, _index_configured # pylint: disable=global-statement
+    with _index_lock:
+        _index, _index_configured = index, True
+
+@async_error_handler(error_message='Could not add the transcript to the semantic index.', raise_exception=False)
+async def embed_transcript(file_id: str, title: str, text: str) -> None:
+    """
+    Embeds an uploaded transcript into the process-wide semantic index, if it is on. A failure is logged, not
+    raised, as with index_transcript.
+    """
+    index = await asyncio.to_thread(get_semantic_index)
+    if index is not None:
+        await asyncio.to_thread(index.add, file_id, title, text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search the transcripts by meaning, or backfill their semantic index.")
+    parser.add_argument('--index', help="The index directory. Defaults to the semantic_index_dir setting.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    search_parser = commands.add_parser('search', help="Find the transcript chunks most similar to a query.")
+    search_parser.add_argument('query')
+    search_parser.add_argument('--limit', type=int, default=10)
+    backfill_parser = commands.add_parser('backfill', help="Embed the transcripts not indexed yet.")
+    backfill_parser.add_argument('--local', action='store_true', help="From local_transcript_dir.")
+    backfill_parser.add_argument('--drive', action='store_true', help="From gdrive_transcripts_folder_id.")
+    args = parser.parse_args()
+
+    index = open_semantic_index(args.index)
+    try:
+        if args.command == 'search':
+            started = time.perf_counter()
+            hits = index.search(args.query, args.limit)
+            print(f"{len(hits)} chunk(s) in {(time.perf_counter() - started) * 1000:.1f} ms")
+            for hit in hits:
+                print(f"\n{hit.score:5.3f}  {hit.title} #{hit.chunk}  ({hit.file_id})\n       {hit.text}")
+        else:
+            settings = get_settings()
+            if args.local or not args.drive:
+                print(f"Embedded {backfill_from_directory(index, settings.local_transcript_dir)} local transcript(s).")
+            if args.drive:
+                from gdrive_helper_code import GDriveHelper # pylint: disable=import-outside-toplevel
+                added = asyncio.run(backfill_from_drive(index, GDriveHelper(), settings.gdrive_transcripts_folder_id))
+                print(f"Embedded {added} Drive transcript(s).")
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,8 +5,11 @@ from workflow_error_code import async_error_handler
 from logger_code import LoggerBase
 from workflow_tracker_code import WorkflowTracker
 
+# Set up once: monitor_status_update() runs on every status update.
+_monitor_logger = LoggerBase.setup_logger('monitor_status_update')
+
 @async_error_handler()
-async def update_and_monitor_gdrive_status(gh, status, comment=None, mp3_gfile_id=None, local_mp3_path=None, transcript_audio_quality=None, transcript_compute_type=None, transcript_gdrive_id=None, local_transcript_path=None):
+async def update_and_monitor_gdrive_status(gh, status, comment=None, mp3_gfile_id=None, local_mp3_path=None, transcript_audio_quality=None, transcript_compute_type=None, transcript_gdrive_id=None, local_transcript_path=None, upload_progress=None):
     """
     Asynchronously updates the transcription workflow status and monitors Google Drive (gDrive) status changes.
 
@@ -25,6 +28,7 @@ async def update_and_monitor_gdrive_status(gh, status, comment=None, mp3_gfile_i
     - transcript_compute_type (Optional[str]): The compute type setting used for the transcription. This is tracked in the WorkflowTracker for reference.
     - transcript_gdrive_id (Optional[str]): The Google Drive file ID of the transcript file. This is tracked in the WorkflowTracker for reference.
     - local_transcript_path (Optional[str]): The filename of the transcript in Google Drive. This is tracked in the WorkflowTracker for reference.
+    - upload_progress (Optional[int]): Percent of the current upload to Google Drive that has been sent.
 
     Raises:
     - This method is decorated with `@async_error_handler()`, which handles any exceptions that occur during its execution.
@@ -41,7 +45,8 @@ async def update_and_monitor_gdrive_status(gh, status, comment=None, mp3_gfile_i
         'transcript_audio_quality': transcript_audio_quality,
         'transcript_compute_type': transcript_compute_type,
         'transcript_gdrive_id': transcript_gdrive_id,
-        'local_transcript_path': local_transcript_path
+        'local_transcript_path': local_transcript_path,
+        'upload_progress': upload_progress
     }
     # Filter out None values
     filtered_kwargs = {k: v for k, v in update_kwargs.items() if v is not None}
@@ -54,7 +59,6 @@ async def update_and_monitor_gdrive_status(gh, status, comment=None, mp3_gfile_i
 
 @async_error_handler()
 async def monitor_status_update():
-    logger = LoggerBase.setup_logger('monitor_status_update')
 
     def _statusRepeatCounter():
         # This dictionary will hold the count of each status update attempt
@@ -77,5 +81,5 @@ async def monitor_status_update():
         count = status_repeat_counter(state)
         log_message = {"state": state, "comment":WorkflowTracker.get('comment'), "count": count}
         # Log the message with the state count appended
-        logger.debug(json.dumps(log_message))
+        _monitor_logger.debug(json.dumps(log_message))
     _monitor_status_update_repeat(WorkflowTracker.get('status'))
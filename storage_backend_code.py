@@ -0,0 +1,179 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: The storage_backend module defines the storage operations the transcription workflow needs
+# from Google Drive (list, metadata, upload, download, metadata update and delete) as the
+# StorageBackend interface. GDriveHelper adds the workflow logic on top of whichever backend the
+# settings select, so the same workflow can run against Drive or against a fake for offline
+# tests and benchmarks.
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from env_settings_code import get_settings
+
+
+class StorageRequestError(Exception):
+    """
+    Raised by storage backends for errors that mirror a Drive HTTP error, so the request scheduler can tell
+    rate limits and server errors (which it retries) from other errors.
+
+    Attributes:
+        status_code (int): The HTTP status code Drive would have answered with.
+        reason (Optional[str]): The Drive error reason, e.g. 'userRateLimitExceeded'.
+        retry_after (Optional[float]): Seconds to wait before retrying, if known.
+    """
+    def __init__(self, message: str, status_code: int, reason: str = None, retry_after: float = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class StorageBackend(ABC):
+    """
+    The storage operations behind GDriveHelper.
+
+    All methods are blocking. GDriveHelper runs them in the executor through the request scheduler.
+    Files and folders are identified by Drive-style IDs. File metadata uses Drive v2 field names
+    ('id', 'title', 'description', 'fileSize', 'md5Checksum', 'etag'). A file's etag changes whenever its
+    metadata does.
+
+    Attributes:
+        rate_limited (bool): Whether calls count against a request quota. GDriveHelper sends the calls of such
+            backends through the Drive request scheduler.
+        supports_read_head (bool): Whether read_head() reads the start of a file cheaply. GDriveHelper only calls
+            read_head() on such backends.
+    """
+    rate_limited = True
+    supports_read_head = False
+
+    @abstractmethod
+    def list_files(self, folder_id: str) -> List[dict]:
+        """
+        Returns the metadata of every file (not trashed) within the folder.
+        """
+
+    @abstractmethod
+    def get_metadata(self, file_id: str, fields: List[str]) -> dict:
+        """
+        Returns the requested metadata fields of a file. Fields the file doesn't have are left out.
+        """
+
+    @abstractmethod
+    def upload_file(self, folder_id: str, file_path: Path, progress_callback: Optional[Callable[[int, int], None]] = None) -> str:
+        """
+        Uploads a local file into the folder, named like the local file. Returns the new file's ID.
+        progress_callback, if given, is called with (bytes_uploaded, total_bytes) as the upload progresses.
+        """
+
+    @abstractmethod
+    def download_file(self, file_id: str, directory_path: Path) -> Path:
+        """
+        Downloads a file into directory_path under its title. Returns the local path.
+        """
+
+    @abstractmethod
+    def update_metadata(self, updates: Dict[str, dict]) -> Dict[str, Optional[Exception]]:
+        """
+        Sets metadata fields (e.g. 'description', 'title') on several files at once.
+
+        Parameters:
+            updates (dict): {file_id: {field: value}}.
+
+        Returns:
+            dict: {file_id: Exception or None}. Each file's update succeeds or fails on its own.
+        """
+
+    @abstractmethod
+    def update_metadata_if_match(self, file_id: str, fields: dict, etag: str) -> str:
+        """
+        Sets metadata fields of a file only if its etag is still `etag` (compare-and-set), like a Drive request
+        with an If-Match header. Used for the work leases of several hosts sharing a folder.
+
+        Returns:
+            str: The file's new etag.
+
+        Raises:
+            StorageRequestError: With status_code 412 if the file has changed since etag was read.
+        """
+
+    @abstractmethod
+    def delete_file(self, file_id: str) -> None:
+        """
+        Deletes a file.
+        """
+
+    def read_head(self, file_id: str, length: int) -> Optional[bytes]: # pylint: disable=unused-argument
+        """
+        Returns the first length bytes of a file, or None if the backend can't read part of a file cheaply (see
+        supports_read_head). Used to estimate the duration of mp3 files from their frame headers.
+        """
+        return None
+
+    def update_description(self, file_id: str, description: str) -> None:
+        """
+        Sets the description of one file, raising the error if it failed.
+        """
+        error = self.update_metadata({file_id: {'description': description}}).get(file_id)
+        if error is not None:
+            raise error
+
+
+_backend = None
+
+def get_storage_backend() -> StorageBackend:
+    """
+    Returns the process-wide storage backend selected by the 'storage_backend' setting:
+    'gdrive' (the default), 'local' (a LocalStorageBackend) or 'fake' (an in-memory FakeDriveBackend with no
+    latency or faults).
+    """
+    global _backend # pylint: disable=global-statement
+    if _backend is None:
+        backend_name = get_settings().storage_backend
+        if backend_name == 'gdrive':
+            # Imported here so the other backends don't need the Google libraries.
+            from gdrive_backend_code import GDriveBackend # pylint: disable=import-outside-toplevel
+            _backend = GDriveBackend()
+        elif backend_name == 'local':
+            from local_storage_backend_code import LocalStorageBackend # pylint: disable=import-outside-toplevel
+            _backend = LocalStorageBackend.from_settings()
+        elif backend_name == 'fake':
+            from fake_drive_backend_code import FakeDriveBackend # pylint: disable=import-outside-toplevel
+            _backend = FakeDriveBackend()
+        else:
+            raise ValueError(f"{backend_name} is not a valid storage backend.")
+    return _backend
+
+def set_storage_backend(backend: Optional[StorageBackend]) -> None:
+    """
+    Replaces the process-wide storage backend, e.g. with a configured FakeDriveBackend in tests and benchmarks.
+    Passing None makes the next get_storage_backend() call create the backend from the settings again.
+    """
+    global _backend # pylint: disable=global-statement
+    _backend = backend
@@ -0,0 +1,102 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: Shared pytest fixtures for the offline workflow tests: the environment settings the workflow
+# needs, a fake Drive, and a stub ASR so the tests don't load a Whisper model.
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import json
+
+import pytest
+
+STUB_TRANSCRIPT = "A stub transcript that is long enough to pass the transcript text checks. " * 3
+
+
+@pytest.fixture
+def workflow_env(monkeypatch, tmp_path):
+    """
+    Returns a function that sets the environment settings of an offline workflow run: the two folder IDs,
+    local directories within tmp_path, and any other settings given as keyword arguments. The real-time
+    factors measured during the run are kept in tmp_path too.
+    """
+    import job_scheduler_code # pylint: disable=import-outside-toplevel
+    import semantic_index_code # pylint: disable=import-outside-toplevel
+    import topic_model_code # pylint: disable=import-outside-toplevel
+    import transcript_index_code # pylint: disable=import-outside-toplevel
+    monkeypatch.setattr(job_scheduler_code, '_real_time_factors', None)
+    # Each test gets transcript indexes of its own, in its local_transcript_dir.
+    monkeypatch.setattr(transcript_index_code, '_index', None)
+    monkeypatch.setattr(transcript_index_code, '_index_configured', False)
+    monkeypatch.setattr(semantic_index_code, '_index', None)
+    monkeypatch.setattr(semantic_index_code, '_index_configured', False)
+    monkeypatch.setattr(topic_model_code, '_pipeline', None)
+    monkeypatch.setattr(topic_model_code, '_pipeline_configured', False)
+    def _set_env(mp3_folder_id: str, transcripts_folder_id: str, **settings):
+        env = {
+            'GDRIVE_MP3_FOLDER_ID': mp3_folder_id,
+            'GDRIVE_TRANSCRIPTS_FOLDER_ID': transcripts_folder_id,
+            'GOOGLE_SERVICE_ACCOUNT_CREDENTIALS_PATH': str(tmp_path / 'unused.json'),
+            'GOOGLE_DRIVE_OAUTH_SCOPES': json.dumps(['https://www.googleapis.com/auth/drive']),
+            'LOCAL_MP3_DIR': str(tmp_path / 'mp3'),
+            'LOCAL_TRANSCRIPT_DIR': str(tmp_path / 'transcripts'),
+            'REMOVE_TEMP_MP3': 'true',
+            'REMOVE_TEMP_TRANSCRIPTION': 'false',
+            'GDRIVE_BATCH_WINDOW_SECONDS': '0.01',
+            'REAL_TIME_FACTORS_PATH': str(tmp_path / 'real_time_factors.json'),
+        }
+        env.update({name.upper(): str(value) for name, value in settings.items()})
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+    return _set_env
+
+@pytest.fixture
+def fake_drive(monkeypatch, workflow_env):
+    """
+    Stores the workflow's files in a FakeDriveBackend, which rate limits 10% of the calls, and returns it.
+    """
+    # pylint: disable=import-outside-toplevel
+    import gdrive_scheduler_code
+    from fake_drive_backend_code import FakeDriveBackend
+    from storage_backend_code import set_storage_backend
+    fake_drive = FakeDriveBackend(rate_limit_probability=0.1, seed=7)
+    workflow_env(fake_drive.new_id(), fake_drive.new_id())
+    # A fresh scheduler with short backoffs, so the injected rate limits don't slow the test down.
+    monkeypatch.setattr(gdrive_scheduler_code, '_scheduler',
+                        gdrive_scheduler_code.DriveRequestScheduler(requests_per_second=1000, burst=1000, base_backoff_seconds=0.01))
+    set_storage_backend(fake_drive)
+    yield fake_drive
+    set_storage_backend(None)
+
+@pytest.fixture
+def stub_asr(monkeypatch):
+    """
+    Replaces the Whisper pipeline of AudioTranscriber with one that returns STUB_TRANSCRIPT, which it returns.
+    """
+    from audio_transcriber_code import AudioTranscriber # pylint: disable=import-outside-toplevel
+    async def _stub_transcribe_pipeline(self, audio_filename, model_name, compute_float_type): # pylint: disable=unused-argument
+        return STUB_TRANSCRIPT
+    monkeypatch.setattr(AudioTranscriber, '_transcribe_pipeline', _stub_transcribe_pipeline)
+    return STUB_TRANSCRIPT
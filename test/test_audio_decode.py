@@ -0,0 +1,165 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: Tests the ingestion of audio files: decoding into the decode cache (with a stand-in for ffmpeg that
+# reads wav files), cache hits and damaged cache files, pruning, a directory decoded by the process pool,
+# and an ingested file transcribed without an mp3 ever being written.
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import os
+import shutil
+import sys
+import wave
+
+import numpy as np
+import pytest
+
+from audio_decode_code import (AudioDecodeError, AudioDecodePool, DecodeCache, DecodedAudio, decode_file, file_sha256, ingest,
+                               load_decoded_audio)
+from workflow_tracker_code import WorkflowTracker
+
+# Stands in for ffmpeg: writes the frames of a 16-bit mono wav file at the requested rate to stdout, as ffmpeg's s16le
+# output would be, and logs each call.
+FAKE_FFMPEG = '''#!{python}
+import sys, wave
+args = sys.argv[1:]
+source, rate = args[args.index('-i') + 1], int(args[args.index('-ar') + 1])
+with open({log!r}, 'a') as log:
+    log.write(source + '\\n')
+try:
+    with wave.open(source, 'rb') as audio:
+        assert (audio.getnchannels(), audio.getsampwidth(), audio.getframerate()) == (1, 2, rate)
+        frames = audio.readframes(audio.getnframes())
+except (wave.Error, EOFError, AssertionError):
+    sys.stderr.write(source + ': Invalid data found when processing input\\n')
+    sys.exit(1)
+sys.stdout.buffer.write(frames)
+'''
+
+
+class FakeFFmpeg:
+    def __init__(self, directory):
+        self.log = directory / 'ffmpeg.log'
+        self.path = directory / 'ffmpeg'
+        self.path.write_text(FAKE_FFMPEG.format(python=sys.executable, log=str(self.log)))
+        self.path.chmod(0o755)
+
+    def calls(self):
+        return self.log.read_text().splitlines() if self.log.exists() else []
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path):
+    return FakeFFmpeg(tmp_path)
+
+def _write_wav(path, seconds, rate=16_000, channels=1, frequency=440.0):
+    t = np.arange(int(seconds * rate)) / rate
+    samples = (np.sin(2 * np.pi * frequency * t) * 10_000).astype('<i2')
+    with wave.open(str(path), 'wb') as audio:
+        audio.setnchannels(channels)
+        audio.setsampwidth(2)
+        audio.setframerate(rate)
+        audio.writeframes(np.repeat(samples, channels).tobytes())
+    return samples
+
+def test_decode_file_caches_the_samples(tmp_path, fake_ffmpeg):
+    samples = _write_wav(tmp_path / 'talk.wav', 1.5)
+    cache = DecodeCache(tmp_path / 'cache')
+    decoded = decode_file(tmp_path / 'talk.wav', cache, str(fake_ffmpeg.path))
+    assert decoded == DecodedAudio(tmp_path / 'talk.wav', file_sha256(tmp_path / 'talk.wav'), cache.path(decoded.sha256), 24_000, 16_000, False)
+    assert decoded.duration_seconds == 1.5 and np.array_equal(np.load(decoded.pcm_path), samples)
+    assert np.allclose(cache.load(decoded.sha256), samples / 32768.0)
+    # Decoded once: a copy of the file (same content, same SHA-256) is found in the cache.
+    shutil.copy(tmp_path / 'talk.wav', tmp_path / 'copy.wav')
+    assert decode_file(tmp_path / 'copy.wav', cache, str(fake_ffmpeg.path)).cached and len(fake_ffmpeg.calls()) == 1
+    # A cached file cut short (e.g. by a crash) is decoded again.
+    with open(decoded.pcm_path, 'r+b') as f:
+        f.truncate(1000)
+    assert not decode_file(tmp_path / 'talk.wav', cache, str(fake_ffmpeg.path), sha256=decoded.sha256).cached
+    assert np.array_equal(np.load(decoded.pcm_path), samples)
+    # A file ffmpeg can't decode raises with what ffmpeg said, and leaves nothing in the cache.
+    (tmp_path / 'broken.wav').write_bytes(b'RIFF not really')
+    with pytest.raises(AudioDecodeError, match='Invalid data found'):
+        decode_file(tmp_path / 'broken.wav', cache, str(fake_ffmpeg.path))
+    with pytest.raises(AudioDecodeError, match='Could not run'):
+        decode_file(tmp_path / 'broken.wav', cache, str(tmp_path / 'no-ffmpeg'))
+    assert os.listdir(tmp_path / 'cache') == [decoded.pcm_path.name]
+
+def test_prune_deletes_the_least_recently_used(tmp_path):
+    cache = DecodeCache(tmp_path / 'cache', max_bytes=2500)
+    for n, name in enumerate(['old', 'used', 'new']):
+        cache.store(name, [b'\0' * 1000])
+        os.utime(cache.path(name), (n, n))
+    # Reading a file marks it as used.
+    assert cache.samples('old') == 500
+    assert cache.prune() == 1 and cache.samples('used') is None and cache.samples('old') == cache.samples('new') == 500
+    # The file being read is kept even if it alone is over the limit.
+    cache.max_bytes = 1
+    assert cache.prune(keep=cache.path('new')) == 1 and cache.samples('new') == 500 and cache.samples('old') is None
+    # An odd trailing byte (a stream cut off within a sample) is dropped.
+    assert cache.store('odd', [b'\1\0\2', b'\0\3']) == 2 and list(np.load(cache.path('odd'))) == [1, 2]
+
+@pytest.mark.asyncio
+async def test_pool_decodes_a_directory(tmp_path, fake_ffmpeg, workflow_env):
+    workflow_env('mp3-folder', 'transcripts-folder')
+    (tmp_path / 'inbox').mkdir()
+    for n in range(4):
+        _write_wav(tmp_path / 'inbox' / f'talk_{n}.wav', 0.5 + n / 4, frequency=200.0 + n)
+    (tmp_path / 'inbox' / 'broken.m4a').write_bytes(b'not audio')
+    (tmp_path / 'inbox' / 'notes.txt').write_text('not decoded')
+    pool = AudioDecodePool(DecodeCache(tmp_path / 'cache'), workers=2, ffmpeg=str(fake_ffmpeg.path))
+    try:
+        results = await pool.decode_directory(tmp_path / 'inbox')
+    finally:
+        pool.close()
+    assert isinstance(results[0], Exception) and 'Invalid data found' in str(results[0])
+    assert [(result.source.name, result.samples) for result in results[1:]] == \
+        [(f'talk_{n}.wav', 8000 + n * 4000) for n in range(4)]
+    assert sorted(os.path.basename(call) for call in fake_ffmpeg.calls()) == ['broken.m4a'] + [f'talk_{n}.wav' for n in range(4)]
+
+@pytest.mark.asyncio
+async def test_ingested_audio_is_transcribed_without_an_mp3(fake_drive, stub_asr, fake_ffmpeg, tmp_path, monkeypatch):
+    fake_drive.rate_limit_probability = 0
+    monkeypatch.setenv('FFMPEG_PATH', str(fake_ffmpeg.path))
+    (tmp_path / 'inbox').mkdir()
+    _write_wav(tmp_path / 'inbox' / 'interview.wav', 2.0)
+    assert await ingest([tmp_path / 'inbox'], workers=1, transcribe=True) == 0
+    transcripts = fake_drive.list_files(os.environ['GDRIVE_TRANSCRIPTS_FOLDER_ID'])
+    assert [gfile['title'] for gfile in transcripts] == ['interview.txt']
+    assert fake_drive.get_content(transcripts[0]['id']).decode() == stub_asr
+    # No mp3 was written or uploaded, and the source file was left where it was (though remove_temp_mp3 is on).
+    assert fake_drive.list_files(os.environ['GDRIVE_MP3_FOLDER_ID']) == [] and (tmp_path / 'inbox' / 'interview.wav').exists()
+    assert not list(tmp_path.rglob('*.mp3')) and WorkflowTracker.get('audio_duration_seconds') == 2.0
+    # The transcription reads the samples from the decode cache: ffmpeg isn't run again.
+    audio = load_decoded_audio(tmp_path / 'inbox' / 'interview.wav', WorkflowTracker.get('mp3_sha256'))
+    assert audio.dtype == np.float32 and len(audio) == 32_000 and len(fake_ffmpeg.calls()) == 1
+    assert (tmp_path / 'mp3' / 'decode_cache').is_dir()
+
+@pytest.mark.skipif(shutil.which('ffmpeg') is None, reason="ffmpeg is not installed")
+def test_ffmpeg_resamples_and_mixes_down(tmp_path):
+    _write_wav(tmp_path / 'stereo.wav', 1.0, rate=44_100, channels=2)
+    decoded = decode_file(tmp_path / 'stereo.wav', DecodeCache(tmp_path / 'cache'))
+    assert abs(decoded.samples - 16_000) <= 16 and np.abs(np.load(decoded.pcm_path)).max() > 5000
@@ -0,0 +1,230 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: Tests the transcription workflow against the FakeDriveBackend, without Google credentials:
+# the GDriveHelper operations, and the batch transcriber end to end with a stub ASR while the fake
+# Drive throttles some calls.
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import asyncio
+import hashlib
+import io
+import json
+import os
+import time
+
+import pytest
+from fastapi import UploadFile
+
+from conftest import STUB_TRANSCRIPT
+import job_scheduler_code
+from gdrive_helper_code import GDriveHelper
+from pydantic_models import GDriveInput
+from workflow_states_code import WorkflowEnum
+from workflow_tracker_code import WorkflowTracker, AUDIO_QUALITY_MAP
+
+
+@pytest.mark.asyncio
+async def test_gdrive_helper_operations(fake_drive, tmp_path):
+    gh = GDriveHelper()
+    folder_id = os.environ['GDRIVE_MP3_FOLDER_ID']
+    local_mp3 = tmp_path / 'episode.mp3'
+    local_mp3.write_bytes(os.urandom(4096))
+    gfile_id = await gh.upload_to_gdrive(GDriveInput(gdrive_id=folder_id), local_mp3)
+    assert [gfile['id'] for gfile in await gh.list_files_to_transcribe(folder_id)] == [gfile_id]
+    assert await gh.get_filename(GDriveInput(gdrive_id=gfile_id)) == 'episode.mp3'
+    download_dir = tmp_path / 'download'
+    download_dir.mkdir()
+    downloaded = await gh.download_from_gdrive(GDriveInput(gdrive_id=gfile_id), download_dir)
+    assert downloaded.read_bytes() == local_mp3.read_bytes()
+    await gh.reset_mp3_gfiles_status([gfile_id])
+    fake_drive.rate_limit_probability = 0
+    assert json.loads(fake_drive.get_metadata(gfile_id, ['description'])['description'])['status'] == WorkflowEnum.NOT_STARTED.name
+    await gh.delete_file(gfile_id)
+    assert not await gh.list_files_to_transcribe(folder_id)
+
+@pytest.mark.asyncio
+async def test_batch_transcriber_end_to_end(fake_drive, stub_asr):
+    from audio_batch_transcriber_code import main # pylint: disable=import-outside-toplevel
+    mp3_folder_id = os.environ['GDRIVE_MP3_FOLDER_ID']
+    gfile_ids = [fake_drive.add_file(mp3_folder_id, f'episode_{i}.mp3', os.urandom(20_000)) for i in range(3)]
+    await main()
+    # Check the results without injected faults.
+    fake_drive.rate_limit_probability = 0
+    transcripts = fake_drive.list_files(os.environ['GDRIVE_TRANSCRIPTS_FOLDER_ID'])
+    assert sorted(gfile['title'] for gfile in transcripts) == ['episode_0.txt', 'episode_1.txt', 'episode_2.txt']
+    assert fake_drive.get_content(transcripts[0]['id']).decode() == stub_asr
+    for gfile_id in gfile_ids:
+        status = json.loads(fake_drive.get_metadata(gfile_id, ['description'])['description'])['status']
+        assert status == WorkflowEnum.TRANSCRIPTION_UPLOAD_COMPLETE.name
+    assert WorkflowTracker.get('status') == WorkflowEnum.TRANSCRIPTION_UPLOAD_COMPLETE.name
+
+@pytest.mark.asyncio
+async def test_upload_overlaps_transcription(fake_drive, monkeypatch):
+    from audio_transcriber_code import AudioTranscriber # pylint: disable=import-outside-toplevel
+    transcription_seconds = upload_seconds = 1.0
+    async def _slow_transcribe_pipeline(self, audio_filename, model_name, compute_float_type): # pylint: disable=unused-argument
+        await asyncio.sleep(transcription_seconds)
+        # Nothing was written to the description of the mp3 gfile while it was still being uploaded.
+        assert fake_drive.calls['update_metadata'] == 0
+        return STUB_TRANSCRIPT
+    monkeypatch.setattr(AudioTranscriber, '_transcribe_pipeline', _slow_transcribe_pipeline)
+    fake_drive.rate_limit_probability = 0
+    content = b'\xff\xfb\x90\x64' + os.urandom(50_000)
+    fake_drive.bandwidth_bytes_per_second = len(content) / upload_seconds
+    upload_file = UploadFile(filename='episode.mp3', file=io.BytesIO(content))
+    start = time.monotonic()
+    assert await AudioTranscriber().transcribe(input_mp3=upload_file) == STUB_TRANSCRIPT
+    assert time.monotonic() - start < 0.8 * (transcription_seconds + upload_seconds)
+    mp3_gfile_id = WorkflowTracker.get('mp3_gfile_id')
+    assert fake_drive.get_content(mp3_gfile_id) == content
+    description = json.loads(fake_drive.get_metadata(mp3_gfile_id, ['description'])['description'])
+    assert description['status'] == WorkflowEnum.TRANSCRIPTION_UPLOAD_COMPLETE.name
+    assert description['mp3_sha256'] == hashlib.sha256(content).hexdigest()
+    # The local copy was removed only after the upload was done with it.
+    assert not os.listdir(os.environ['LOCAL_MP3_DIR'])
+
+@pytest.mark.asyncio
+async def test_batch_transcriber_runs_shortest_first(fake_drive, stub_asr, monkeypatch): # pylint: disable=unused-argument
+    from audio_batch_transcriber_code import main # pylint: disable=import-outside-toplevel
+    from audio_transcriber_code import AudioTranscriber # pylint: disable=import-outside-toplevel
+    # 64 kbps, so 8 KB is a second of audio: the backlog limit fits the 40 and 20 second files, not the 60 second one.
+    monkeypatch.setenv('JOB_MAX_BACKLOG_SECONDS', str(61 * 0.1))
+    monkeypatch.setenv('ASSUMED_MP3_BITRATE_KBPS', '64')
+    monkeypatch.setattr(job_scheduler_code, '_real_time_factors', job_scheduler_code.RealTimeFactorTracker())
+    monkeypatch.setitem(job_scheduler_code.DEFAULT_REAL_TIME_FACTORS, AUDIO_QUALITY_MAP['default'], 0.1)
+    transcribed = []
+    transcribe = AudioTranscriber.transcribe
+    async def _recording_transcribe(self, input_mp3=None, **kwargs):
+        transcribed.append(fake_drive.get_metadata(input_mp3.gdrive_id, ['title'])['title'])
+        return await transcribe(self, input_mp3=input_mp3, **kwargs)
+    monkeypatch.setattr(AudioTranscriber, 'transcribe', _recording_transcribe)
+    fake_drive.rate_limit_probability = 0
+    mp3_folder_id = os.environ['GDRIVE_MP3_FOLDER_ID']
+    for title, seconds in [('forty.mp3', 40), ('twenty.mp3', 20), ('sixty.mp3', 60)]:
+        fake_drive.add_file(mp3_folder_id, title, os.urandom(seconds * 8000))
+    await main()
+    assert transcribed == ['twenty.mp3', 'forty.mp3']
+
+@pytest.mark.asyncio
+async def test_transcribe_with_deadline(fake_drive, stub_asr): # pylint: disable=unused-argument
+    from audio_transcriber_code import AudioTranscriber # pylint: disable=import-outside-toplevel
+    fake_drive.rate_limit_probability = 0
+    # A minute of 64 kbps audio.
+    content = b'\xff\xf3\x88\xc0' + os.urandom(8000 * 60)
+    gfile_id = fake_drive.add_file(os.environ['GDRIVE_MP3_FOLDER_ID'], 'episode.mp3', content)
+    await AudioTranscriber().transcribe(input_mp3=GDriveInput(gdrive_id=gfile_id), deadline_seconds=600)
+    model = WorkflowTracker.get_model()
+    assert model.chosen_model == AUDIO_QUALITY_MAP[model.transcript_audio_quality]
+    assert model.audio_duration_seconds == pytest.approx(60, rel=0.01)
+    assert model.predicted_completion <= model.deadline
+    description = json.loads(fake_drive.get_metadata(gfile_id, ['description'])['description'])
+    assert description['chosen_model'] == model.chosen_model
+
+@pytest.mark.asyncio
+async def test_choosing_a_model_for_a_deadline_does_not_block_the_event_loop(fake_drive, stub_asr, monkeypatch): # pylint: disable=unused-argument
+    import audio_transcriber_code # pylint: disable=import-outside-toplevel
+    fake_drive.rate_limit_probability = 0
+    # The first GPU check imports torch, which takes a while.
+    def _slow_cuda_available():
+        time.sleep(0.5)
+        return False
+    monkeypatch.setattr(audio_transcriber_code, '_cuda_available', _slow_cuda_available)
+    gfile_id = fake_drive.add_file(os.environ['GDRIVE_MP3_FOLDER_ID'], 'episode.mp3', b'\xff\xf3\x88\xc0' + os.urandom(8000 * 60))
+    transcription = asyncio.create_task(audio_transcriber_code.AudioTranscriber().transcribe(
+        input_mp3=GDriveInput(gdrive_id=gfile_id), deadline_seconds=600))
+    ticks = [time.monotonic()]
+    while not transcription.done():
+        await asyncio.sleep(0.01)
+        ticks.append(time.monotonic())
+    await transcription
+    assert WorkflowTracker.get('transcript_compute_type') == 'float32'
+    assert max(later - earlier for earlier, later in zip(ticks, ticks[1:])) < 0.25
+
+@pytest.mark.asyncio
+async def test_failed_transcript_upload_is_resumed_without_redoing_inference(fake_drive, monkeypatch):
+    from audio_batch_transcriber_code import main # pylint: disable=import-outside-toplevel
+    from audio_transcriber_code import AudioTranscriber # pylint: disable=import-outside-toplevel
+    monkeypatch.setenv('STAGE_RETRY_POLICY', json.dumps({'transcript_write': {'attempts': 2, 'backoff_seconds': 0}}))
+    transcriptions = []
+    async def _counting_transcribe_pipeline(self, audio_filename, model_name, compute_float_type): # pylint: disable=unused-argument
+        transcriptions.append(audio_filename)
+        return STUB_TRANSCRIPT
+    monkeypatch.setattr(AudioTranscriber, '_transcribe_pipeline', _counting_transcribe_pipeline)
+    transcript_uploads = []
+    upload_to_gdrive = GDriveHelper.upload_to_gdrive
+    async def _failing_upload_to_gdrive(self, folder_gdrive_input, file_path):
+        if folder_gdrive_input.gdrive_id == os.environ['GDRIVE_TRANSCRIPTS_FOLDER_ID']:
+            transcript_uploads.append(file_path)
+            if len(transcript_uploads) <= 2:
+                raise RuntimeError('Drive is having a bad day.')
+        return await upload_to_gdrive(self, folder_gdrive_input, file_path)
+    monkeypatch.setattr(GDriveHelper, 'upload_to_gdrive', _failing_upload_to_gdrive)
+    fake_drive.rate_limit_probability = 0
+    gfile_id = fake_drive.add_file(os.environ['GDRIVE_MP3_FOLDER_ID'], 'episode.mp3', os.urandom(20_000))
+    # Both tries of the transcript upload fail.
+    with pytest.raises(Exception):
+        await main()
+    assert len(transcript_uploads) == 2
+    description = json.loads(fake_drive.get_metadata(gfile_id, ['description'])['description'])
+    assert description['status'] == WorkflowEnum.TRANSCRIPTION_COMPLETE.name
+    # The next run only uploads the transcript.
+    await main()
+    assert len(transcriptions) == 1
+    assert fake_drive.calls['download_file'] == 1
+    transcripts = fake_drive.list_files(os.environ['GDRIVE_TRANSCRIPTS_FOLDER_ID'])
+    assert [fake_drive.get_content(gfile['id']).decode() for gfile in transcripts] == [STUB_TRANSCRIPT]
+    description = json.loads(fake_drive.get_metadata(gfile_id, ['description'])['description'])
+    assert description['status'] == WorkflowEnum.TRANSCRIPTION_UPLOAD_COMPLETE.name
+
+@pytest.mark.asyncio
+async def test_failed_transcription_is_resumed_with_the_local_mp3(fake_drive, monkeypatch):
+    from audio_batch_transcriber_code import main # pylint: disable=import-outside-toplevel
+    from audio_transcriber_code import AudioTranscriber # pylint: disable=import-outside-toplevel
+    monkeypatch.setenv('STAGE_RETRY_POLICY', json.dumps({}))
+    transcriptions = []
+    async def _flaky_transcribe_pipeline(self, audio_filename, model_name, compute_float_type): # pylint: disable=unused-argument
+        transcriptions.append(audio_filename)
+        if len(transcriptions) == 1:
+            raise RuntimeError('Out of GPU memory.')
+        return STUB_TRANSCRIPT
+    monkeypatch.setattr(AudioTranscriber, '_transcribe_pipeline', _flaky_transcribe_pipeline)
+    fake_drive.rate_limit_probability = 0
+    mp3_folder_id = os.environ['GDRIVE_MP3_FOLDER_ID']
+    gfile_ids = [fake_drive.add_file(mp3_folder_id, f'episode_{i}.mp3', os.urandom(20_000)) for i in range(2)]
+    with pytest.raises(Exception):
+        await main()
+    failed_id = next(gfile_id for gfile_id in gfile_ids
+                     if json.loads(fake_drive.get_metadata(gfile_id, ['description'])['description'])['status'] == WorkflowEnum.TRANSCRIBING.name)
+    local_mp3 = transcriptions[0]
+    assert os.path.basename(local_mp3) == fake_drive.get_metadata(failed_id, ['title'])['title']
+    await main()
+    # The local copy of the failed file matched the gfile, so it was transcribed without being downloaded again.
+    assert transcriptions.count(local_mp3) == 2
+    assert fake_drive.calls['download_file'] == 2
+    for gfile_id in gfile_ids:
+        description = json.loads(fake_drive.get_metadata(gfile_id, ['description'])['description'])
+        assert description['status'] == WorkflowEnum.TRANSCRIPTION_UPLOAD_COMPLETE.name
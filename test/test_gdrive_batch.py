@@ -0,0 +1,117 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: Tests the GDriveBatchWriter: updates from concurrent callers are coalesced into one
+# batch, and only the items that failed are retried.
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import asyncio
+
+import pytest
+
+from gdrive_batch_code import GDriveBatchWriter
+
+
+class FlakySender:
+    """Records each batch and fails the listed gfile ids the first time (or every time) they are sent."""
+    def __init__(self, fail_once=(), fail_always=()):
+        self.batches = []
+        self.fail_once = set(fail_once)
+        self.fail_always = set(fail_always)
+
+    def __call__(self, updates):
+        self.batches.append(dict(updates))
+        results = {}
+        for gfile_id in updates:
+            if gfile_id in self.fail_always:
+                results[gfile_id] = IOError(f"internal error: {gfile_id}")
+            elif gfile_id in self.fail_once:
+                self.fail_once.discard(gfile_id)
+                results[gfile_id] = IOError(f"rate limited: {gfile_id}")
+            else:
+                results[gfile_id] = None
+        return results
+
+@pytest.mark.asyncio
+async def test_concurrent_updates_share_one_batch():
+    sender = FlakySender()
+    writer = GDriveBatchWriter(sender, window_seconds=0.01)
+    await asyncio.gather(*(writer.submit(f"file_{i}", description=str(i)) for i in range(5)))
+    assert len(sender.batches) == 1
+    assert sender.batches[0]["file_3"] == {"description": "3"}
+
+@pytest.mark.asyncio
+async def test_updates_to_the_same_file_are_coalesced():
+    sender = FlakySender()
+    writer = GDriveBatchWriter(sender, window_seconds=0.01)
+    await asyncio.gather(writer.submit("file_a", description="old"), writer.submit("file_a", title="a.mp3"),
+                         writer.submit("file_a", description="new"))
+    assert sender.batches == [{"file_a": {"description": "new", "title": "a.mp3"}}]
+
+@pytest.mark.asyncio
+async def test_only_failed_items_are_retried():
+    sender = FlakySender(fail_once=["file_b"])
+    writer = GDriveBatchWriter(sender, window_seconds=0.01, retry_backoff_seconds=0.01)
+    await asyncio.gather(*(writer.submit(f"file_{c}", description=c) for c in "abc"))
+    assert len(sender.batches) == 2
+    assert list(sender.batches[1]) == ["file_b"]
+
+@pytest.mark.asyncio
+async def test_error_is_raised_after_retries_are_exhausted():
+    sender = FlakySender(fail_always=["file_a"])
+    writer = GDriveBatchWriter(sender, window_seconds=0.01, max_retries=2, retry_backoff_seconds=0.01)
+    with pytest.raises(IOError):
+        await writer.submit("file_a", description="x")
+    assert len(sender.batches) == 3
+
+@pytest.mark.asyncio
+async def test_updates_submitted_during_a_retry_are_written():
+    sender = FlakySender(fail_once=["file_a"])
+    writer = GDriveBatchWriter(sender, window_seconds=0.01, retry_backoff_seconds=0.05)
+    first = asyncio.create_task(writer.submit("file_a", description="old"))
+    # While the failed update waits for its retry, newer updates arrive: one for the same file, one for another.
+    await asyncio.sleep(0.03)
+    await asyncio.wait_for(asyncio.gather(first, writer.submit("file_a", description="new"),
+                                          writer.submit("file_b", description="b")), timeout=2)
+    assert sender.batches[-1] == {"file_a": {"description": "new"}, "file_b": {"description": "b"}}
+
+@pytest.mark.asyncio
+async def test_a_full_batch_waits_for_the_flush_that_is_running():
+    sends = []
+    async def _slow_send(func, updates):
+        sends.append(dict(updates))
+        first_send = len(sends) == 1
+        await asyncio.sleep(0.05)
+        # The first write of file_a fails, after a full batch with a newer one has been submitted.
+        return {file_id: IOError("rate limited") if first_send and file_id == "file_a" else None for file_id in updates}
+    writer = GDriveBatchWriter(None, window_seconds=0.01, max_batch_size=2, retry_backoff_seconds=0.01, run_blocking=_slow_send)
+    first = asyncio.gather(writer.submit("file_a", description="old"), writer.submit("file_b", description="b"))
+    await asyncio.sleep(0.02)
+    await asyncio.wait_for(asyncio.gather(first, writer.submit("file_a", description="new"),
+                                          writer.submit("file_c", description="c")), timeout=2)
+    # The batches went one at a time, and the older description wasn't retried over the newer one.
+    assert sends == [{"file_a": {"description": "old"}, "file_b": {"description": "b"}},
+                     {"file_a": {"description": "new"}, "file_c": {"description": "c"}}]
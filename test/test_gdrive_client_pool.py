@@ -0,0 +1,102 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: Tests the GDriveClientPool with a stand-in for the service account login: one login per process,
+# token refreshes, an http object per thread, and the pool statistics.
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import threading
+
+import pytest
+
+import gdrive_client_pool_code
+from gdrive_client_pool_code import GDriveClientPool
+
+
+class FakeAuth:
+    """Stands in for pydrive2's GoogleAuth: counts refreshes and the http objects it makes."""
+    def __init__(self):
+        self.thread_local = threading.local()
+        self.access_token_expired = False
+        self.refreshes = 0
+        self.https = []
+
+    def Refresh(self): # pylint: disable=invalid-name
+        self.refreshes += 1
+        self.access_token_expired = False
+
+    def Get_Http_Object(self): # pylint: disable=invalid-name
+        http = object()
+        self.https.append(http)
+        return http
+
+
+@pytest.fixture
+def fake_login(monkeypatch):
+    logins = []
+    def _login_with_service_account():
+        logins.append(FakeAuth())
+        return logins[-1]
+    # A fresh pool, logging in with the stand-in.
+    monkeypatch.setattr(GDriveClientPool, '_login_with_service_account', _login_with_service_account)
+    monkeypatch.setattr(gdrive_client_pool_code, 'GoogleDrive', lambda gauth: ('drive', gauth))
+    monkeypatch.setattr(GDriveClientPool, '_gauth', None)
+    monkeypatch.setattr(GDriveClientPool, '_drive', None)
+    monkeypatch.setattr(GDriveClientPool, '_thread_https', {})
+    monkeypatch.setattr(GDriveClientPool, '_http_created', 0)
+    monkeypatch.setattr(GDriveClientPool, '_http_reused', 0)
+    return logins
+
+def test_one_login_and_an_http_object_per_thread(fake_login):
+    threads_https = {}
+    started = threading.Barrier(4)
+    def _work(n):
+        started.wait()
+        threads_https[n] = [GDriveClientPool.get_http() for _ in range(3)]
+    threads = [threading.Thread(target=_work, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(fake_login) == 1
+    gauth = fake_login[0]
+    # Each thread reused its own http object. No two threads shared one.
+    assert all(len(set(map(id, https))) == 1 for https in threads_https.values())
+    assert len({id(https[0]) for https in threads_https.values()}) == 4 and len(gauth.https) == 4
+    assert GDriveClientPool.get_drive() == ('drive', gauth)
+    # The threads have ended: their http objects are dropped from the pool.
+    assert GDriveClientPool.stats() == {'pool_size': 0, 'http_created': 4, 'http_reused': 8, 'reuse_rate': 8 / 12}
+    # pydrive2 calls on this thread find the http object in the GoogleAuth thread-local storage.
+    http = GDriveClientPool.get_http()
+    assert gauth.thread_local.http is http and GDriveClientPool.get_http() is http
+    assert GDriveClientPool.stats() == {'pool_size': 1, 'http_created': 5, 'http_reused': 9, 'reuse_rate': 9 / 14}
+
+def test_an_expired_token_is_refreshed(fake_login):
+    gauth = GDriveClientPool.get_auth()
+    assert GDriveClientPool.get_auth() is gauth and gauth.refreshes == 0
+    gauth.access_token_expired = True
+    assert GDriveClientPool.get_auth() is gauth
+    assert gauth.refreshes == 1 and not gauth.access_token_expired and len(fake_login) == 1
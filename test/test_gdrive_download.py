@@ -0,0 +1,67 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: Tests the RangedDownloader against the local Drive stand-in server: segmented downloads,
+# the single-stream fallback, and MD5 verification.
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import hashlib
+import os
+
+import pytest
+
+from benchmarks.local_drive_server import LocalDriveServer
+from gdrive_download_code import RangedDownloader, DownloadChecksumError
+
+
+@pytest.fixture
+def payload():
+    return os.urandom(3 * 1024 * 1024 + 17)
+
+def test_large_file_is_downloaded_in_segments(tmp_path, payload):
+    with LocalDriveServer(payload) as server:
+        downloader = RangedDownloader(segment_count=4, min_parallel_size=1024)
+        md5 = downloader.download(server.url, tmp_path / "a.mp3", total_size=len(payload), expected_md5=hashlib.md5(payload).hexdigest())
+    assert (tmp_path / "a.mp3").read_bytes() == payload
+    assert md5 == hashlib.md5(payload).hexdigest()
+    assert len([r for r in server.requests if r]) == 4
+
+def test_small_file_is_downloaded_as_one_stream(tmp_path, payload):
+    with LocalDriveServer(payload) as server:
+        RangedDownloader(segment_count=4, min_parallel_size=len(payload) + 1).download(server.url, tmp_path / "a.mp3", total_size=len(payload))
+    assert server.requests == [None]
+    assert (tmp_path / "a.mp3").read_bytes() == payload
+
+def test_server_without_range_support_falls_back_to_one_stream(tmp_path, payload):
+    with LocalDriveServer(payload, ignore_range=True) as server:
+        RangedDownloader(segment_count=4, min_parallel_size=1024).download(server.url, tmp_path / "a.mp3", total_size=len(payload))
+    assert (tmp_path / "a.mp3").read_bytes() == payload
+
+def test_checksum_mismatch_raises_and_leaves_no_file(tmp_path, payload):
+    with LocalDriveServer(payload) as server:
+        with pytest.raises(DownloadChecksumError):
+            RangedDownloader(segment_count=4, min_parallel_size=1024).download(server.url, tmp_path / "a.mp3", total_size=len(payload), expected_md5="0" * 32)
+    assert not list(tmp_path.iterdir())
@@ -0,0 +1,113 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: Tests the DriveRequestScheduler: throttled requests are retried after Retry-After and
+# slow the request rate down, other errors are raised right away, and the token bucket paces requests.
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from gdrive_scheduler_code import DriveRequestScheduler, describe_drive_error, is_retryable_error
+from gdrive_upload_code import ResumableUploadError
+
+
+class FailingCall:
+    """A blocking call that raises the given errors in turn, then returns 'done'."""
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "done"
+
+def rate_limited(retry_after=None):
+    return ResumableUploadError("throttled", status_code=403, reason="userRateLimitExceeded", retry_after=retry_after)
+
+@pytest.mark.asyncio
+async def test_throttled_request_is_retried_and_slows_the_rate():
+    scheduler = DriveRequestScheduler(requests_per_second=100, burst=100)
+    call = FailingCall(rate_limited(retry_after=0.01), ResumableUploadError("busy", status_code=429, retry_after=0.01))
+    assert await scheduler.run(call) == "done"
+    assert call.calls == 3
+    metrics = scheduler.metrics()
+    assert metrics["throttle_events"] == 2
+    assert metrics["retries"] == 2
+    assert metrics["rate_limit"] < 100
+
+@pytest.mark.asyncio
+async def test_non_retryable_error_is_raised_right_away():
+    scheduler = DriveRequestScheduler()
+    call = FailingCall(ResumableUploadError("not found", status_code=404))
+    with pytest.raises(ResumableUploadError):
+        await scheduler.run(call)
+    assert call.calls == 1
+    assert scheduler.metrics()["failures"] == 1
+
+@pytest.mark.asyncio
+async def test_retries_are_limited():
+    scheduler = DriveRequestScheduler(max_retries=2)
+    call = FailingCall(*[rate_limited(retry_after=0) for _ in range(5)])
+    with pytest.raises(ResumableUploadError):
+        await scheduler.run(call)
+    assert call.calls == 3
+
+@pytest.mark.asyncio
+async def test_token_bucket_paces_requests():
+    scheduler = DriveRequestScheduler(requests_per_second=50, burst=1)
+    started = time.monotonic()
+    for _ in range(6):
+        await scheduler.run(FailingCall())
+    # The first request uses the bucket's token. The other five wait 1/50 s each.
+    assert time.monotonic() - started >= 0.09
+
+def test_event_loops_in_several_threads_share_the_bucket():
+    scheduler = DriveRequestScheduler(requests_per_second=200, burst=1)
+    async def _requests():
+        for _ in range(5):
+            await scheduler.run(FailingCall())
+    threads = [threading.Thread(target=asyncio.run, args=(_requests(),)) for _ in range(4)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # One bucket paces the 20 requests of the four loops together: the 19 after the first wait 1/200 s each.
+    assert time.monotonic() - started >= 0.09
+    metrics = scheduler.metrics()
+    assert (metrics['requests'], metrics['in_flight']) == (20, 0)
+
+def test_error_classification():
+    assert describe_drive_error(rate_limited(retry_after=3)) == (403, "userRateLimitExceeded", 3)
+    assert is_retryable_error(ConnectionResetError())
+    assert not is_retryable_error(FileNotFoundError())
+    assert not is_retryable_error(ResumableUploadError("forbidden", status_code=403, reason="insufficientFilePermissions"))
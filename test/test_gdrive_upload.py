@@ -0,0 +1,155 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: Tests the ResumableUploader against a stand-in for Drive's resumable upload endpoint:
+# chunked uploads, resuming after a failed chunk, and resuming a saved session after a restart.
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import json
+
+import pytest
+
+from gdrive_upload_code import ResumableUploader, ResumableUploadError, CHUNK_SIZE_MULTIPLE
+
+
+class Response(dict):
+    """Mimics httplib2's response: a dict of lower-case headers with a status attribute."""
+    def __init__(self, status, headers=None):
+        super().__init__(headers or {})
+        self.status = status
+
+
+class FakeResumableDrive:
+    """A stand-in for Drive's resumable upload endpoint. Fails the PUT requests listed in fail_puts."""
+    SESSION_URI = "https://upload.example/session/1"
+
+    def __init__(self, fail_puts=()):
+        self.received = b""
+        self.sessions_started = 0
+        self.puts = 0
+        self.fail_puts = set(fail_puts)
+
+    def request(self, uri, method="GET", body=None, headers=None):
+        if method == "POST":
+            self.sessions_started += 1
+            self.received = b""
+            return Response(200, {"location": self.SESSION_URI}), b""
+        self.puts += 1
+        if self.puts in self.fail_puts:
+            raise ConnectionResetError("connection reset by peer")
+        content_range = headers["Content-Range"]
+        total = int(content_range.split("/")[-1])
+        if not content_range.startswith("bytes */"):
+            start = int(content_range.split(" ")[1].split("-")[0])
+            assert start == len(self.received), "chunks must continue where Drive stopped"
+            self.received += body
+        if len(self.received) == total:
+            return Response(200), json.dumps({"id": "1" * 28, "fileSize": str(total)}).encode()
+        headers = {"range": f"bytes=0-{len(self.received) - 1}"} if self.received else {}
+        return Response(308, headers), b""
+
+
+@pytest.fixture
+def mp3_file(tmp_path):
+    file_path = tmp_path / "episode.mp3"
+    file_path.write_bytes(bytes(range(256)) * (CHUNK_SIZE_MULTIPLE * 3 // 256 + 100))
+    return file_path
+
+def test_upload_is_sent_in_chunks(tmp_path, mp3_file):
+    drive = FakeResumableDrive()
+    progress = []
+    uploader = ResumableUploader(lambda: drive, tmp_path / "sessions", chunk_size=CHUNK_SIZE_MULTIPLE)
+    gfile = uploader.upload(mp3_file, {"title": mp3_file.name}, progress_callback=lambda sent, total: progress.append(sent))
+    assert gfile["id"] == "1" * 28
+    assert drive.received == mp3_file.read_bytes()
+    assert drive.puts == 4
+    assert progress[-1] == mp3_file.stat().st_size
+    # The finished session is forgotten.
+    assert not list((tmp_path / "sessions").glob("*.json"))
+
+def test_failed_chunk_is_resumed(tmp_path, mp3_file, monkeypatch):
+    monkeypatch.setattr("gdrive_upload_code.time.sleep", lambda seconds: None)
+    drive = FakeResumableDrive(fail_puts={2})
+    uploader = ResumableUploader(lambda: drive, tmp_path / "sessions", chunk_size=CHUNK_SIZE_MULTIPLE)
+    uploader.upload(mp3_file, {"title": mp3_file.name})
+    assert drive.sessions_started == 1
+    assert drive.received == mp3_file.read_bytes()
+
+def test_failed_offset_query_is_retried(tmp_path, mp3_file, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr("gdrive_upload_code.time.sleep", sleeps.append)
+    # The network is still down when Drive is first asked where to resume (PUT 3, "bytes */N").
+    drive = FakeResumableDrive(fail_puts={2, 3})
+    uploader = ResumableUploader(lambda: drive, tmp_path / "sessions", chunk_size=CHUNK_SIZE_MULTIPLE)
+    uploader.upload(mp3_file, {"title": mp3_file.name})
+    assert drive.sessions_started == 1 and sleeps == [2, 4]
+    assert drive.received == mp3_file.read_bytes()
+    # Without retries left, the error of the query is raised.
+    drive = FakeResumableDrive(fail_puts={2, 3})
+    uploader = ResumableUploader(lambda: drive, tmp_path / "other_sessions", chunk_size=CHUNK_SIZE_MULTIPLE, max_chunk_retries=1)
+    with pytest.raises(ConnectionResetError):
+        uploader.upload(mp3_file, {"title": mp3_file.name})
+
+def test_retry_waits_as_long_as_drive_asks(tmp_path, mp3_file, monkeypatch):
+    class ThrottlingDrive(FakeResumableDrive):
+        def request(self, uri, method="GET", body=None, headers=None):
+            if method == "PUT" and self.puts == 1:
+                self.puts += 1
+                return Response(429, {"retry-after": "7"}), b'{"error": {"errors": [{"reason": "userRateLimitExceeded"}]}}'
+            return super().request(uri, method, body, headers)
+    sleeps = []
+    monkeypatch.setattr("gdrive_upload_code.time.sleep", sleeps.append)
+    drive = ThrottlingDrive()
+    uploader = ResumableUploader(lambda: drive, tmp_path / "sessions", chunk_size=CHUNK_SIZE_MULTIPLE)
+    uploader.upload(mp3_file, {"title": mp3_file.name})
+    assert sleeps == [7.0] and drive.received == mp3_file.read_bytes()
+
+def test_saved_session_is_resumed_after_restart(tmp_path, mp3_file):
+    drive = FakeResumableDrive(fail_puts={3})
+    uploader = ResumableUploader(lambda: drive, tmp_path / "sessions", chunk_size=CHUNK_SIZE_MULTIPLE, max_chunk_retries=0)
+    with pytest.raises(ConnectionResetError):
+        uploader.upload(mp3_file, {"title": mp3_file.name})
+    bytes_before_restart = len(drive.received)
+    assert bytes_before_restart == 2 * CHUNK_SIZE_MULTIPLE
+    # A new uploader (i.e. a restarted process) picks up the saved session.
+    uploader = ResumableUploader(lambda: drive, tmp_path / "sessions", chunk_size=CHUNK_SIZE_MULTIPLE)
+    uploader.upload(mp3_file, {"title": mp3_file.name})
+    assert drive.sessions_started == 1
+    assert drive.received == mp3_file.read_bytes()
+
+def test_chunk_size_must_be_a_multiple_of_256_kib(tmp_path):
+    with pytest.raises(ValueError):
+        ResumableUploader(lambda: None, tmp_path, chunk_size=1000)
+
+def test_rejected_upload_raises(tmp_path, mp3_file):
+    class RejectingDrive(FakeResumableDrive):
+        def request(self, uri, method="GET", body=None, headers=None):
+            return Response(403, {"retry-after": "7"}), b'{"error": "userRateLimitExceeded"}'
+    uploader = ResumableUploader(lambda: RejectingDrive(), tmp_path / "sessions", chunk_size=CHUNK_SIZE_MULTIPLE)
+    with pytest.raises(ResumableUploadError) as error:
+        uploader.upload(mp3_file, {"title": mp3_file.name})
+    assert error.value.status_code == 403
+    assert error.value.retry_after == 7.0
@@ -0,0 +1,123 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: Tests the duration-aware job scheduling: mp3 durations from frame headers, the real-time
+# factors measured per model, and the shortest-job-first order with aging and admission control.
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import os
+
+import pytest
+
+from audio_duration_code import duration_from_size_seconds, mp3_duration_seconds
+from gdrive_helper_code import GDriveHelper
+from job_scheduler_code import BacklogFullError, RealTimeFactorTracker, ShortestJobFirstScheduler, estimate_gfile_audio_seconds
+
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz, joint stereo.
+CBR_FRAME_HEADER = b'\xff\xfb\x90\x64'
+# MPEG-2 Layer III, 64 kbps, 16 kHz, mono: what utilities/to_mp3 writes.
+MONO_16K_FRAME_HEADER = b'\xff\xf3\x88\xc0'
+
+
+def _xing_frame(frames: int) -> bytes:
+    # The Xing header follows the 9 bytes of side information of an MPEG-2 mono frame.
+    return MONO_16K_FRAME_HEADER + b'\x00' * 9 + b'Xing' + (1).to_bytes(4, 'big') + frames.to_bytes(4, 'big') + b'\x00' * 100
+
+def test_mp3_duration_from_frame_headers():
+    assert mp3_duration_seconds(CBR_FRAME_HEADER + b'\x00' * 1000, 1_600_000) == pytest.approx(100)
+    id3_tag = b'ID3\x04\x00\x00\x00\x00\x00\x14' + b'\x00' * 20
+    assert mp3_duration_seconds(id3_tag + CBR_FRAME_HEADER + b'\x00' * 1000, 1_600_000 + len(id3_tag)) == pytest.approx(100)
+    # The Xing frame count gives the duration of a variable bitrate file, whatever its size.
+    assert mp3_duration_seconds(_xing_frame(1000), 10_000_000) == pytest.approx(1000 * 576 / 16000)
+    assert mp3_duration_seconds(b'RIFF' + b'\x00' * 1000, 1000) is None
+    assert duration_from_size_seconds(8_000_000, 64) == pytest.approx(1000)
+
+def test_real_time_factors_are_measured_and_saved(tmp_path):
+    path = tmp_path / 'real_time_factors.json'
+    tracker = RealTimeFactorTracker(path)
+    default_factor = tracker.get('openai/whisper-tiny', 'float16')
+    assert tracker.get('openai/whisper-tiny', 'float32') == pytest.approx(2 * default_factor)
+    tracker.record('openai/whisper-tiny', 'float16', audio_seconds=100, processing_seconds=50)
+    assert tracker.get('openai/whisper-tiny', 'float16') == pytest.approx(0.5)
+    tracker.record('openai/whisper-tiny', 'float16', audio_seconds=100, processing_seconds=150)
+    assert tracker.get('openai/whisper-tiny', 'float16') == pytest.approx(0.7 * 0.5 + 0.3 * 1.5)
+    reloaded = RealTimeFactorTracker(path)
+    assert reloaded.is_measured('openai/whisper-tiny', 'float16')
+    assert reloaded.estimate_seconds(100, 'openai/whisper-tiny', 'float16') == pytest.approx(80)
+    # A measured float16 factor is a better guess for float32 than the default.
+    assert reloaded.get('openai/whisper-tiny', 'float32') == pytest.approx(1.6)
+
+def test_shortest_job_first_with_aging():
+    now = 0.0
+    scheduler = ShortestJobFirstScheduler(aging_factor=1.0, clock=lambda: now)
+    for job_id, cost in [('long', 100), ('short', 10), ('medium', 50)]:
+        scheduler.submit(job_id, None, cost)
+    assert [scheduler.next_job().job_id for _ in range(3)] == ['short', 'medium', 'long']
+    # A long job that has waited long enough goes before short jobs that just arrived.
+    scheduler = ShortestJobFirstScheduler(aging_factor=1.0, clock=lambda: now)
+    scheduler.submit('long', None, 100)
+    now = 95.0
+    scheduler.submit('short', None, 10)
+    assert scheduler.next_job().job_id == 'long'
+    # Without aging it would still be waiting.
+    scheduler = ShortestJobFirstScheduler(aging_factor=0.0, clock=lambda: now)
+    scheduler.submit('long', None, 100)
+    scheduler.submit('short', None, 10)
+    assert scheduler.next_job().job_id == 'short'
+
+def test_admission_control():
+    scheduler = ShortestJobFirstScheduler(max_backlog_seconds=100)
+    # A job longer than the limit still runs when nothing else is queued.
+    huge = scheduler.submit('huge', None, 500)
+    with pytest.raises(BacklogFullError):
+        scheduler.submit('small', None, 1)
+    scheduler.job_done(scheduler.next_job())
+    assert scheduler.next_job() is None and huge.cost_seconds == 500
+    scheduler.submit('a', None, 60)
+    with pytest.raises(BacklogFullError) as excinfo:
+        scheduler.submit('b', None, 50)
+    assert excinfo.value.retry_after == pytest.approx(10)
+    job = scheduler.next_job()
+    # A running job still counts until it is done.
+    assert scheduler.backlog_seconds == 60
+    scheduler.job_done(job)
+    scheduler.submit('b', None, 50)
+    assert scheduler.stats() == {'waiting': 1, 'running': 0, 'backlog_seconds': 50, 'rejected': 2}
+
+@pytest.mark.asyncio
+async def test_durations_are_read_from_the_head_only_where_the_backend_supports_it(fake_drive, monkeypatch):
+    fake_drive.rate_limit_probability = 0
+    monkeypatch.setenv('ASSUMED_MP3_BITRATE_KBPS', '64')
+    gfile_id = fake_drive.add_file(os.environ['GDRIVE_MP3_FOLDER_ID'], 'vbr.mp3', _xing_frame(1000) + b'\x00' * 80_000)
+    g_file = fake_drive.list_files(os.environ['GDRIVE_MP3_FOLDER_ID'])[0]
+    assert g_file['id'] == gfile_id
+    # 1000 frames of 576 samples at 16 kHz.
+    assert await estimate_gfile_audio_seconds(GDriveHelper(), g_file) == pytest.approx(36)
+    # A backend without cheap partial reads (like Google Drive) isn't asked: the size gives the duration.
+    fake_drive.supports_read_head = False
+    reads = fake_drive.calls['read_head']
+    assert await estimate_gfile_audio_seconds(GDriveHelper(), g_file) == pytest.approx(duration_from_size_seconds(int(g_file['fileSize']), 64))
+    assert fake_drive.calls['read_head'] == reads
@@ -0,0 +1,139 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: Tests live transcription: the rolling-window session finalizes every second of a stream exactly once
+# and doesn't queue decodes, and the /live WebSocket streams text back and uploads the transcript.
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import asyncio
+import json
+import math
+import os
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from live_transcriber_code import SAMPLE_RATE, LiveSegment, LiveTranscriptionSession, WhisperModelPool
+from transcription_service_code import TranscriptionJobService, create_app
+
+
+def _counting_audio(first_second: int, seconds: float) -> np.ndarray:
+    """
+    Audio whose level encodes the number of the second of the stream it is in, so a fake decoder can tell which
+    part of the stream it was given.
+    """
+    second_numbers = first_second + np.arange(int(seconds * SAMPLE_RATE)) // SAMPLE_RATE
+    return ((second_numbers + 1) / 1000).astype(np.float32)
+
+def _fake_segments(samples: np.ndarray) -> list:
+    # One word per second of audio, named after the second of the stream.
+    return [LiveSegment(k, min(k + 1, len(samples) / SAMPLE_RATE), f" word{round(samples[k * SAMPLE_RATE] * 1000) - 1}")
+            for k in range(math.ceil(len(samples) / SAMPLE_RATE))]
+
+@pytest.mark.asyncio
+async def test_rolling_window_finalizes_each_second_once():
+    messages = []
+    decoded_lengths = []
+    async def _decode(samples):
+        decoded_lengths.append(len(samples) / SAMPLE_RATE)
+        await asyncio.sleep(0)
+        return _fake_segments(samples)
+    async def _send(message):
+        messages.append(message)
+    session = LiveTranscriptionSession(_decode, _send, window_seconds=6, step_seconds=1, commit_seconds=3)
+    running = asyncio.create_task(session.run())
+    # 20.5 seconds of audio in quarter-second frames.
+    audio = _counting_audio(0, 20.5)
+    for start in range(0, len(audio), SAMPLE_RATE // 4):
+        session.add_audio(audio[start:start + SAMPLE_RATE // 4])
+        await asyncio.sleep(0)
+    session.end()
+    transcript = await running
+    assert transcript == ' '.join(f'word{n}' for n in range(21))
+    finals = [message for message in messages if message['type'] == 'final']
+    assert [message['start'] for message in finals] == list(range(21))
+    assert any(message['type'] == 'interim' for message in messages)
+    # The window stays bounded, and a decode is only started once a step of new audio has arrived.
+    assert max(decoded_lengths) <= 6 + 1
+    assert len(decoded_lengths) <= 21
+
+@pytest.mark.asyncio
+async def test_slow_decodes_do_not_queue_up():
+    decodes = 0
+    async def _slow_decode(samples):
+        nonlocal decodes
+        decodes += 1
+        await asyncio.sleep(0.05)
+        return _fake_segments(samples)
+    async def _send(message): # pylint: disable=unused-argument
+        pass
+    session = LiveTranscriptionSession(_slow_decode, _send, window_seconds=30, step_seconds=0.5)
+    running = asyncio.create_task(session.run())
+    # 10 seconds of audio arrive during about 2 decodes.
+    for second in range(10):
+        session.add_audio(_counting_audio(second, 1))
+        await asyncio.sleep(0.01)
+    session.end()
+    assert await running == ' '.join(f'word{n}' for n in range(10))
+    assert decodes <= 4
+
+
+class _FakePipeline:
+    def __call__(self, inputs, return_timestamps):
+        assert inputs['sampling_rate'] == SAMPLE_RATE and return_timestamps
+        segments = _fake_segments(inputs['raw'])
+        return {'text': ''.join(segment.text for segment in segments),
+                'chunks': [{'timestamp': (segment.start, segment.end), 'text': segment.text} for segment in segments]}
+
+def test_live_websocket(fake_drive, monkeypatch):
+    fake_drive.rate_limit_probability = 0
+    monkeypatch.setenv('LIVE_WINDOW_SECONDS', '4')
+    monkeypatch.setenv('LIVE_STEP_SECONDS', '0.5')
+    model_pool = WhisperModelPool(loader=lambda model_name, torch_dtype: _FakePipeline())
+    pcm = (_counting_audio(0, 6) * 32768).astype('<i2').tobytes()
+    with TestClient(create_app(TranscriptionJobService(), model_pool=model_pool)) as client:
+        with client.websocket_connect('/live?audio_quality=tiny.en&title=session') as websocket:
+            # Odd-sized messages, so samples are split across messages.
+            for start in range(0, len(pcm), 7_999):
+                websocket.send_bytes(pcm[start:start + 7_999])
+            websocket.send_text(json.dumps({'type': 'end'}))
+            messages = []
+            while not messages or messages[-1]['type'] != 'transcript':
+                messages.append(websocket.receive_json())
+    expected = ' '.join(f'word{n}' for n in range(6))
+    assert messages[-1]['text'] == expected
+    assert ' '.join(message['text'].strip() for message in messages if message['type'] == 'final') == expected
+    transcripts = fake_drive.list_files(os.environ['GDRIVE_TRANSCRIPTS_FOLDER_ID'])
+    assert [gfile['title'] for gfile in transcripts] == ['session.txt']
+    assert fake_drive.get_content(messages[-1]['gdrive_id']).decode() == expected
+    # The model was loaded once and stays warm in the pool.
+    assert model_pool.loads == 1
+
+def test_live_websocket_rejects_unknown_encoding(fake_drive): # pylint: disable=unused-argument
+    with TestClient(create_app(TranscriptionJobService(), model_pool=WhisperModelPool(loader=lambda *args: _FakePipeline()))) as client:
+        with client.websocket_connect('/live?encoding=mulaw') as websocket:
+            assert websocket.receive()['code'] == 1003
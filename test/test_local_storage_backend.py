@@ -0,0 +1,113 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: Tests the LocalStorageBackend: the storage operations on plain directories, and the batch
+# transcriber end to end on it with a stub ASR and every network connection refused.
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import json
+import os
+import socket
+
+import pytest
+
+from gdrive_helper_code import GDriveHelper
+from local_storage_backend_code import LocalStorageBackend
+from pydantic_models import GDriveInput
+from storage_backend_code import StorageRequestError, get_storage_backend, set_storage_backend
+from workflow_states_code import WorkflowEnum
+
+MP3_FOLDER_ID = 'localMp3Folder0000000000000'
+TRANSCRIPTS_FOLDER_ID = 'localTranscriptsFolder00000'
+
+
+def test_local_backend_operations(tmp_path):
+    backend = LocalStorageBackend(tmp_path / 'root')
+    source = tmp_path / 'episode.mp3'
+    source.write_bytes(os.urandom(4096))
+    first_id = backend.upload_file(MP3_FOLDER_ID, source)
+    second_id = backend.upload_file(MP3_FOLDER_ID, source)
+    assert first_id != second_id
+    GDriveInput(gdrive_id=first_id)
+    assert [gfile['title'] for gfile in backend.list_files(MP3_FOLDER_ID)] == ['episode (1).mp3', 'episode.mp3']
+    # Renaming keeps the ID, and the workflow status moves along in the sidecar file.
+    assert backend.update_metadata({first_id: {'title': 'renamed.mp3', 'description': '{"status": "NOT_STARTED"}'}}) == {first_id: None}
+    assert backend.get_metadata(first_id, ['title', 'description']) == {'title': 'renamed.mp3', 'description': '{"status": "NOT_STARTED"}'}
+    assert not list((tmp_path / 'root' / MP3_FOLDER_ID).glob('.episode.mp3*'))
+    assert isinstance(backend.update_metadata({second_id: {'title': 'renamed.mp3'}})[second_id], Exception)
+    # A new backend finds the renamed file under the same ID.
+    backend = LocalStorageBackend(tmp_path / 'root')
+    download_dir = tmp_path / 'download'
+    download_dir.mkdir()
+    downloaded = backend.download_file(first_id, download_dir)
+    assert downloaded.name == 'renamed.mp3' and downloaded.read_bytes() == source.read_bytes()
+    with pytest.raises(ValueError):
+        backend.download_file(first_id, tmp_path / 'root' / MP3_FOLDER_ID)
+    backend.delete_file(first_id)
+    assert os.listdir(tmp_path / 'root' / MP3_FOLDER_ID) == ['episode (1).mp3']
+    assert downloaded.exists()
+    # A compare-and-set fails once the file has changed since its etag was read.
+    etag = backend.get_metadata(second_id, ['etag'])['etag']
+    assert backend.update_metadata_if_match(second_id, {'description': '{"lease_owner": "a"}'}, etag) != etag
+    with pytest.raises(StorageRequestError) as error:
+        backend.update_metadata_if_match(second_id, {'description': '{"lease_owner": "b"}'}, etag)
+    assert error.value.status_code == 412
+
+@pytest.fixture
+def no_network(monkeypatch):
+    def _refuse(*args, **kwargs):
+        raise AssertionError("The local storage backend must not open network connections.")
+    monkeypatch.setattr(socket.socket, 'connect', _refuse)
+    monkeypatch.setattr(socket, 'create_connection', _refuse)
+
+@pytest.mark.asyncio
+async def test_batch_transcriber_on_local_storage(workflow_env, stub_asr, no_network, tmp_path): # pylint: disable=unused-argument
+    from audio_batch_transcriber_code import main # pylint: disable=import-outside-toplevel
+    mp3_dir, transcripts_dir = tmp_path / 'drive' / 'mp3_files', tmp_path / 'drive' / 'transcripts'
+    workflow_env(MP3_FOLDER_ID, TRANSCRIPTS_FOLDER_ID, storage_backend='local', local_storage_root=tmp_path / 'root',
+                 local_storage_folders=json.dumps({MP3_FOLDER_ID: str(mp3_dir), TRANSCRIPTS_FOLDER_ID: str(transcripts_dir)}))
+    set_storage_backend(None)
+    try:
+        # The mp3 files are written straight into the folder, like utilities/to_mp3 does.
+        mp3_dir.mkdir(parents=True)
+        for i in range(3):
+            (mp3_dir / f'episode_{i}.mp3').write_bytes(os.urandom(20_000))
+        await main()
+        backend = get_storage_backend()
+        assert isinstance(backend, LocalStorageBackend)
+    finally:
+        set_storage_backend(None)
+    assert sorted(os.listdir(transcripts_dir)) == ['episode_0.txt', 'episode_1.txt', 'episode_2.txt']
+    assert (transcripts_dir / 'episode_0.txt').read_text() == stub_asr
+    for i in range(3):
+        assert (mp3_dir / f'episode_{i}.mp3').exists()
+        sidecar = json.loads((mp3_dir / f'.episode_{i}.mp3.workflow.json').read_text())
+        assert json.loads(sidecar['description'])['status'] == WorkflowEnum.TRANSCRIPTION_UPLOAD_COMPLETE.name
+    # A second run finds every file transcribed.
+    gh = GDriveHelper(backend)
+    for gfile in await gh.list_files_to_transcribe(MP3_FOLDER_ID):
+        workflow = await gh.sync_workflowTracker_from_gfile_description(GDriveInput(gdrive_id=gfile['id']))
+        assert workflow['status'] == WorkflowEnum.TRANSCRIPTION_UPLOAD_COMPLETE.name
@@ -0,0 +1,60 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: Tests the production logging mode: records queued by the logging call and written as JSON
+# lines, with the caller information of the call, by the background thread.
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import io
+import json
+import logging
+
+from logger_code import LoggerBase, start_queue_logging, stop_queue_logging
+
+
+def test_production_logger_writes_json_lines(monkeypatch):
+    monkeypatch.setenv('LOG_MODE', 'production')
+    stream = io.StringIO()
+    handler = start_queue_logging(stream=stream, caller_info=True)
+    logger = LoggerBase.setup_logger('test_production_logger', logging.INFO)
+    logger.propagate = False
+    try:
+        assert logger.handlers == [handler]
+        logger.debug("Not logged at INFO.")
+        logger.info("Transcribed %d chunks of %s.", 3, 'episode.mp3')
+        try:
+            raise ValueError("bad chunk")
+        except ValueError:
+            logger.exception("Transcription failed.")
+    finally:
+        stop_queue_logging()
+        logger.handlers.clear()
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [line['msg'] for line in lines] == ["Transcribed 3 chunks of episode.mp3.", "Transcription failed."]
+    assert lines[0]['level'] == 'INFO' and lines[0]['logger'] == 'test_production_logger'
+    assert lines[0]['file'] == 'test_logger.py' and lines[0]['func'] == 'test_production_logger_writes_json_lines'
+    assert 'exc' not in lines[0]
+    assert lines[1]['exc'].splitlines()[-1] == 'ValueError: bad chunk'
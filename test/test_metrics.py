@@ -0,0 +1,92 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: Tests the metrics registry: the Prometheus text format, the summary, and the stage timings that
+# @async_error_handler records, as the job service's /metrics endpoint exposes them after a job.
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import os
+
+import pytest
+
+from metrics_code import MetricsRegistry, get_metrics_registry
+from transcription_service_code import TranscriptionJobService
+from workflow_error_code import async_error_handler
+from workflow_tracker_code import WorkflowTracker
+
+from test_transcription_service import MP3_CONTENT, _client, _wait_until_finished
+
+
+def test_prometheus_text_format():
+    registry = MetricsRegistry()
+    registry.counter('requests_total', "Requests.", ('status',)).inc(status=200)
+    registry.counter('requests_total', "Requests.", ('status',)).inc(2, status='500')
+    registry.gauge('queue_depth', "Waiting jobs.", callback=lambda: 3)
+    latency = registry.histogram('latency_seconds', 'Latency with a "quote".', ('stage',), buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.5, 5.0):
+        latency.observe(seconds, stage='decode')
+    text = registry.render_prometheus()
+    assert '# TYPE requests_total counter\nrequests_total{status="200"} 1\nrequests_total{status="500"} 2\n' in text
+    assert '# TYPE queue_depth gauge\nqueue_depth 3\n' in text
+    assert '# HELP latency_seconds Latency with a "quote".\n' in text
+    for line in ('latency_seconds_bucket{stage="decode",le="0.1"} 1', 'latency_seconds_bucket{stage="decode",le="1"} 2',
+                 'latency_seconds_bucket{stage="decode",le="+Inf"} 3', 'latency_seconds_sum{stage="decode"} 5.55',
+                 'latency_seconds_count{stage="decode"} 3'):
+        assert line in text.splitlines()
+    snapshot = latency.snapshot(stage='decode')
+    assert (snapshot['count'], snapshot['max'], snapshot['p50']) == (3, 5.0, 1.0)
+    assert 'latency_seconds{stage=decode}: count=3 mean=1.850 p95<=5.000 max=5.000' in registry.summary()
+    with pytest.raises(ValueError):
+        registry.gauge('requests_total', "Not a gauge.")
+
+@pytest.mark.asyncio
+async def test_decorated_functions_are_timed():
+    WorkflowTracker.start_job()
+    @async_error_handler()
+    async def failing_stage():
+        raise IOError("disk full")
+    # The error handler raises its own exception with the details.
+    with pytest.raises(Exception, match="disk full"):
+        await failing_stage()
+    labels = {'stage': failing_stage.__qualname__, 'model': 'openai/whisper-large-v3', 'dtype': 'float16'}
+    assert get_metrics_registry().get('transcriber_stage_seconds').snapshot(**labels)['count'] == 1
+    assert get_metrics_registry().get('transcriber_stage_errors_total').value(**labels) == 1
+
+@pytest.mark.asyncio
+async def test_service_exposes_stage_metrics(fake_drive, stub_asr):
+    fake_drive.rate_limit_probability = 0
+    gfile_id = fake_drive.add_file(os.environ['GDRIVE_MP3_FOLDER_ID'], 'episode.mp3', MP3_CONTENT)
+    async with _client(TranscriptionJobService()) as client:
+        job_id = (await client.post('/jobs', data={'gdrive_id': gfile_id, 'audio_quality': 'medium'})).json()['job_id']
+        assert (await _wait_until_finished(client, job_id))['state'] == 'succeeded'
+        response = await client.get('/metrics')
+    assert response.headers['content-type'].startswith('text/plain; version=0.0.4')
+    samples = {line.split(' ')[0]: float(line.split(' ')[1]) for line in response.text.splitlines() if not line.startswith('#')}
+    for stage in ('job', 'download', 'transcription', 'transcript_write', 'drive_upload', 'status_write'):
+        assert samples[f'transcriber_stage_seconds_count{{stage="{stage}",model="openai/whisper-medium",dtype="float16"}}'] >= 1
+    assert samples['transcription_jobs_total{state="succeeded"}'] >= 1
+    assert samples['transcription_jobs_waiting'] == 0
+    assert samples['gdrive_requests_total'] >= 1
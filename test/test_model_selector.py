@@ -0,0 +1,77 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: Tests the deadline-driven model selection: the most accurate model that meets the deadline,
+# the compute types tried on GPU and CPU hosts, and the load of running transcriptions.
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import pytest
+
+from job_scheduler_code import InferenceLoad, RealTimeFactorTracker
+from model_selector_code import choose_model
+from workflow_tracker_code import AUDIO_QUALITY_MAP
+
+CANDIDATES = ['large-v3', 'distil-large-v2', 'tiny']
+
+
+@pytest.fixture
+def measured():
+    tracker = RealTimeFactorTracker()
+    for audio_quality, factor in [('large-v3', 0.5), ('distil-large-v2', 0.1), ('tiny', 0.01)]:
+        tracker.record(AUDIO_QUALITY_MAP[audio_quality], 'float16', audio_seconds=100, processing_seconds=100 * factor)
+    return tracker
+
+def _choose(tracker, deadline_seconds, **kwargs):
+    kwargs.setdefault('cuda_available', True)
+    choice = choose_model(600, deadline_seconds, tracker, candidates=CANDIDATES, **kwargs)
+    return choice.audio_quality, choice.compute_type, choice.meets_deadline
+
+def test_most_accurate_model_that_meets_the_deadline(measured):
+    assert _choose(measured, 1000) == ('large-v3', 'float16', True)
+    # large-v3 needs 300s (600s at float32), more than the 180s left after the safety margin.
+    assert _choose(measured, 200) == ('distil-large-v2', 'float16', True)
+    # The transcriptions already running push distil-large-v2 past the deadline.
+    assert _choose(measured, 200, queue_seconds=150) == ('tiny', 'float16', True)
+    # Nothing makes it: the fastest model is used.
+    assert _choose(measured, 5) == ('tiny', 'float16', False)
+    # Without a GPU, only float32 is used.
+    assert _choose(measured, 2000, cuda_available=False) == ('large-v3', 'float32', True)
+
+def test_unmeasured_cpu_host_is_assumed_slow():
+    choice = choose_model(60, 60, RealTimeFactorTracker(), cuda_available=False)
+    assert (choice.audio_quality, choice.compute_type) == ('base', 'float32')
+    assert choice.predicted_seconds == pytest.approx(60 * 0.015 * 2 * 20)
+
+def test_inference_load():
+    now = 0.0
+    load = InferenceLoad(clock=lambda: now)
+    first = load.start(100)
+    load.start(50)
+    now = 30.0
+    assert load.remaining_seconds() == pytest.approx(70 + 20)
+    load.finish(first)
+    now = 60.0
+    assert load.remaining_seconds() == 0
@@ -0,0 +1,105 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: Tests the streaming ingestion of uploaded mp3 files: the mp3 header check across chunk
+# boundaries, the single-pass copy with SHA-256, the size limits, and that memory use doesn't
+# grow with the upload size.
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import hashlib
+import io
+import os
+import tracemalloc
+
+import pytest
+from fastapi import UploadFile
+
+from mp3_ingest_code import MP3HeaderSniffer, ingest_upload_file, upload_file_size
+
+FRAME_HEADER = b'\xff\xfb\x90\x64'
+
+
+def _id3_tag(size: int) -> bytes:
+    synchsafe = bytes((size >> shift) & 0x7F for shift in (21, 14, 7, 0))
+    return b'ID3\x04\x00\x00' + synchsafe + b'\x00' * size
+
+def _sniff(content: bytes, chunk_size: int) -> bool:
+    sniffer = MP3HeaderSniffer()
+    for start in range(0, len(content), chunk_size):
+        sniffer.feed(memoryview(content)[start:start + chunk_size])
+    return sniffer.finish()
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 11, 4096])
+def test_mp3_header_sniffer(chunk_size):
+    audio = FRAME_HEADER + os.urandom(1000)
+    assert _sniff(audio, chunk_size)
+    # The frame header after a large ID3 tag (e.g. cover art) ends up in a later chunk.
+    assert _sniff(_id3_tag(3000) + audio, chunk_size)
+    assert not _sniff(_id3_tag(3000) + b'\x00' * 1000, chunk_size)
+    assert not _sniff(b'RIFF' + os.urandom(1000), chunk_size)
+    assert not _sniff(FRAME_HEADER[:1], chunk_size)
+
+def _upload_file(content: bytes, size=None) -> UploadFile:
+    return UploadFile(filename='episode.mp3', file=io.BytesIO(content), size=size)
+
+@pytest.mark.asyncio
+async def test_ingest_upload_file(tmp_path):
+    content = _id3_tag(500) + FRAME_HEADER + os.urandom(300_000)
+    upload_file = _upload_file(content)
+    assert upload_file_size(upload_file) == len(content)
+    destination = tmp_path / 'episode.mp3'
+    ingested = await ingest_upload_file(upload_file, destination, min_size=10_240, max_size=1_000_000, chunk_size=64 * 1024)
+    assert ingested.size == len(content)
+    assert ingested.sha256 == hashlib.sha256(content).hexdigest()
+    assert destination.read_bytes() == content
+    assert os.listdir(tmp_path) == ['episode.mp3']
+
+@pytest.mark.asyncio
+async def test_ingest_upload_file_rejects(tmp_path):
+    destination = tmp_path / 'episode.mp3'
+    with pytest.raises(ValueError, match='largest'):
+        await ingest_upload_file(_upload_file(FRAME_HEADER + os.urandom(200_000)), destination, min_size=10_240, max_size=100_000)
+    # An upload that turns out larger than its reported size is stopped while it is copied.
+    with pytest.raises(ValueError, match='larger'):
+        await ingest_upload_file(_upload_file(FRAME_HEADER + os.urandom(200_000), size=20_000), destination,
+                                 min_size=10_240, max_size=100_000, chunk_size=16 * 1024)
+    with pytest.raises(ValueError, match='not mp3'):
+        await ingest_upload_file(_upload_file(os.urandom(20_000)), destination, min_size=10_240, max_size=100_000)
+    with pytest.raises(ValueError, match='too small'):
+        await ingest_upload_file(_upload_file(FRAME_HEADER), destination, min_size=10_240, max_size=100_000)
+    assert not os.listdir(tmp_path)
+
+@pytest.mark.asyncio
+async def test_ingest_memory_does_not_grow_with_upload_size(tmp_path):
+    content = FRAME_HEADER + os.urandom(32 * 1024 * 1024)
+    upload_file = _upload_file(content)
+    tracemalloc.start()
+    try:
+        await ingest_upload_file(upload_file, tmp_path / 'episode.mp3', min_size=10_240, max_size=len(content), chunk_size=256 * 1024)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert peak < 2 * 1024 * 1024
@@ -0,0 +1,89 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: Tests per-job profiling: a job submitted with profile=true gets its cProfile and memory reports,
+# inference runs under torch.profiler, 1-in-N sampling, and the size cap of the profile directory.
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import os
+import time
+
+import pytest
+import torch
+
+from profiling_code import enforce_size_cap, profile_inference, profile_job, should_profile
+from transcription_service_code import TranscriptionJobService
+
+from test_transcription_service import MP3_CONTENT, _client, _wait_until_finished
+
+
+@pytest.mark.asyncio
+async def test_profiled_job_writes_reports(fake_drive, stub_asr, tmp_path, monkeypatch):
+    monkeypatch.setenv('PROFILE_DIR', str(tmp_path / 'profiles'))
+    monkeypatch.setenv('PROFILE_MEMORY', 'true')
+    fake_drive.rate_limit_probability = 0
+    gfile_id = fake_drive.add_file(os.environ['GDRIVE_MP3_FOLDER_ID'], 'episode.mp3', MP3_CONTENT)
+    async with _client(TranscriptionJobService()) as client:
+        profiled = (await client.post('/jobs', data={'gdrive_id': gfile_id, 'profile': 'true'})).json()['job_id']
+        profiled_job = await _wait_until_finished(client, profiled)
+        plain = (await client.post('/jobs', data={'gdrive_id': gfile_id})).json()['job_id']
+        assert (await _wait_until_finished(client, plain))['profile_dir'] is None
+    assert profiled_job['profile_dir'] == str(tmp_path / 'profiles' / profiled)
+    assert sorted(os.listdir(profiled_job['profile_dir'])) == ['memory.txt', 'workflow.prof', 'workflow.txt']
+    with open(os.path.join(profiled_job['profile_dir'], 'workflow.txt'), encoding='utf-8') as report:
+        assert 'transcribe' in report.read()
+
+def test_inference_is_profiled_with_torch(workflow_env, tmp_path):
+    workflow_env('mp3', 'transcripts', profile_dir=tmp_path)
+    with profile_job('job', requested=True) as profiler:
+        with profile_inference():
+            torch.ones(64, 64) @ torch.ones(64, 64)
+    assert (profiler.directory / 'inference_trace.json').stat().st_size > 0
+    assert 'aten::' in (profiler.directory / 'inference_ops.txt').read_text(encoding='utf-8')
+    # Outside a profiled job, inference isn't profiled.
+    with profile_inference():
+        pass
+
+def test_one_in_n_jobs_is_sampled(workflow_env):
+    workflow_env('mp3', 'transcripts', profile_sample_every=3)
+    assert sum(should_profile() for _ in range(9)) == 3
+    workflow_env('mp3', 'transcripts', profile_sample_every=0)
+    assert not any(should_profile() for _ in range(5))
+    assert should_profile(requested=True)
+
+def test_size_cap_removes_the_oldest_profiles(tmp_path):
+    for age, job_id in enumerate(['new', 'old', 'older']):
+        (tmp_path / job_id).mkdir()
+        (tmp_path / job_id / 'workflow.txt').write_bytes(b'x' * 100)
+        (tmp_path / job_id / 'inference_trace.json').write_bytes(b'x' * 1000)
+        mtime = time.time() - age * 60
+        os.utime(tmp_path / job_id, (mtime, mtime))
+    enforce_size_cap(tmp_path, 2500, keep=tmp_path / 'new')
+    assert sorted(os.listdir(tmp_path)) == ['new', 'old']
+    # The job just profiled is over the cap on its own: its trace goes, its text report stays.
+    enforce_size_cap(tmp_path, 500, keep=tmp_path / 'new')
+    assert os.listdir(tmp_path) == ['new']
+    assert os.listdir(tmp_path / 'new') == ['workflow.txt']
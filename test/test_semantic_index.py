@@ -0,0 +1,144 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: Tests the semantic index: cosine search over the append-only embedding matrix, adding and replacing
+# transcripts without a rebuild, rows left by an interrupted add, the IVF partitions, and embedding the
+# transcript of a completed job, with a bag-of-words embedder in place of the model.
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import os
+import re
+import zlib
+
+import numpy as np
+import pytest
+
+from semantic_index_code import EMBEDDINGS_FILE, AppendOnlyArray, SemanticIndex, normalize, set_semantic_index, split_into_chunks
+from transcription_service_code import TranscriptionJobService
+
+from test_transcription_service import MP3_CONTENT, _client, _wait_until_finished
+
+
+class BagOfWordsEmbedder:
+    """
+    Embeds a text as its hashed word counts, so texts sharing words are similar.
+    """
+    model_name = 'bag-of-words'
+    dimension = 256
+
+    def __init__(self):
+        self.texts = 0
+
+    def embed(self, texts):
+        self.texts += len(texts)
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in re.findall(r'\w+', text.lower()):
+                vectors[row, zlib.crc32(word.encode()) % self.dimension] += 1
+        return normalize(vectors)
+
+
+@pytest.fixture
+def index(tmp_path):
+    semantic_index = SemanticIndex(tmp_path / 'semantic', BagOfWordsEmbedder(), chunk_sentences=2)
+    yield semantic_index
+    semantic_index.close()
+
+def test_search_and_incremental_add(index, tmp_path):
+    assert split_into_chunks("One. Two! Three? Four.", 2) == ["One. Two!", "Three? Four."]
+    assert len(split_into_chunks(' '.join(['word'] * 300) + '.', 3, max_words=100)) == 3
+    assert index.search('tomatoes') == []
+    index.add('a', 'tomatoes.txt', "Feed tomatoes with bone meal. Water them early. Prune the suckers of tomatoes. Stake them.")
+    index.add('b', 'roses.txt', "Roses like bone meal too. Mulch them in the fall.")
+    embeddings = tmp_path / 'semantic' / EMBEDDINGS_FILE
+    assert np.load(embeddings).dtype == np.float16 and np.load(embeddings).shape == (3, 256)
+    first_rows = np.load(embeddings).copy()
+    hits = index.search('prune the tomato suckers', limit=2)
+    assert len(hits) == 2 and (hits[0].file_id, hits[0].title, hits[0].chunk) == ('a', 'tomatoes.txt', 1)
+    assert hits[0].text == "Prune the suckers of tomatoes. Stake them." and 0 < hits[1].score < hits[0].score <= 1.001
+    # A new transcript is appended: the rows already written stay as they were.
+    index.add('c', 'compost.txt', "Turn the compost pile. Keep it moist.")
+    assert np.array_equal(np.load(embeddings)[:3], first_rows) and index.count() == 4
+    assert index.search('compost pile')[0].file_id == 'c'
+    # Adding a transcript again replaces its chunks, which are appended; the old ones are no longer found.
+    index.add('b', 'roses.txt', "Roses need pruning in spring.")
+    assert np.load(embeddings).shape[0] == 5 and index.count() == 4
+    assert [hit.text for hit in index.search('roses', limit=10) if hit.file_id == 'b'] == ["Roses need pruning in spring."]
+    assert index.remove('c') and not index.remove('c') and index.count() == 3
+    assert index.contains(file_id='a') and index.contains(title='roses.txt') and not index.contains(file_id='c')
+    # Another instance (e.g. the CLI in another process) sees the same index, and what the first one adds later.
+    reader = SemanticIndex(tmp_path / 'semantic', BagOfWordsEmbedder())
+    assert [hit.file_id for hit in reader.search('compost pile')] != ['c'] and reader.count() == 3
+    index.add('d', 'peppers.txt', "Peppers love heat.")
+    assert reader.search('peppers heat')[0].file_id == 'd'
+    reader.close()
+    with pytest.raises(ValueError):
+        SemanticIndex(tmp_path / 'semantic', type('OtherEmbedder', (BagOfWordsEmbedder,), {'model_name': 'other'})())
+
+def test_rows_of_an_interrupted_add_are_ignored(index, tmp_path):
+    index.add('a', 'tomatoes.txt', "Feed tomatoes. Water them.")
+    # Rows appended to the matrix by a process that stopped before recording their chunks.
+    AppendOnlyArray(tmp_path / 'semantic' / EMBEDDINGS_FILE, np.float16).append(BagOfWordsEmbedder().embed(['orphan words'] * 2))
+    reopened = SemanticIndex(tmp_path / 'semantic', BagOfWordsEmbedder())
+    assert reopened.count() == 1 and [hit.file_id for hit in reopened.search('orphan words tomatoes')] == ['a']
+    # The next add writes over them.
+    reopened.add('b', 'orphans.txt', "Orphan words.")
+    assert np.load(tmp_path / 'semantic' / EMBEDDINGS_FILE).shape[0] == 2
+    assert [hit.file_id for hit in reopened.search('orphan words')] == ['b', 'a']
+    reopened.close()
+
+def test_ivf_partitions(tmp_path):
+    rng = np.random.default_rng(1)
+    vocabulary = [f"w{n}" for n in range(400)]
+    texts = [' '.join(rng.choice(vocabulary, size=12)) + '.' for _ in range(600)]
+    index = SemanticIndex(tmp_path / 'semantic', BagOfWordsEmbedder(), chunk_sentences=1, ivf_min_chunks=500, ivf_probes=8)
+    for n in range(0, 600, 50):
+        index.add(f'file{n}', f'{n}.txt', ' '.join(texts[n:n + 50]))
+    # The partitions were trained once 500 chunks were indexed; the chunks after were assigned as they came.
+    assert index.ivf_trained and index.count() == 600
+    found = sum(index.search(text, limit=1)[0].text == text for text in texts[::10])
+    assert found >= 0.9 * len(texts[::10])
+    # A reopened index uses the same partitions, and embeds nothing but the query.
+    embedder = BagOfWordsEmbedder()
+    reopened = SemanticIndex(tmp_path / 'semantic', embedder, ivf_probes=8)
+    assert reopened.ivf_trained and reopened.search(texts[590], limit=1)[0].text == texts[590] and embedder.texts == 1
+    reopened.close()
+    index.close()
+
+@pytest.mark.asyncio
+async def test_completed_jobs_are_embedded(fake_drive, stub_asr, tmp_path):
+    fake_drive.rate_limit_probability = 0
+    gfile_id = fake_drive.add_file(os.environ['GDRIVE_MP3_FOLDER_ID'], 'episode.mp3', MP3_CONTENT)
+    async with _client(TranscriptionJobService()) as client:
+        assert (await client.get('/transcripts/semantic-search', params={'q': 'stub'})).status_code == 503
+        index = SemanticIndex(tmp_path / 'semantic', BagOfWordsEmbedder())
+        set_semantic_index(index)
+        job_id = (await client.post('/jobs', data={'gdrive_id': gfile_id})).json()['job_id']
+        job = await _wait_until_finished(client, job_id)
+        result = (await client.get('/transcripts/semantic-search', params={'q': 'a stub transcript', 'limit': 1})).json()
+    assert [(hit['file_id'], hit['title'], hit['chunk']) for hit in result['hits']] == \
+        [(job['workflow']['transcript_gdrive_id'], 'episode.txt', 0)]
+    index.close()
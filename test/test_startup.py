@@ -0,0 +1,48 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: Tests the startup cost of the tooling: the status and listing paths don't import torch or
+# transformers, and the settings are loaded once until the environment changes.
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+from benchmarks.bench_import_time import STARTUP_PATHS, measure_cold_import
+from env_settings_code import get_settings
+
+
+def test_status_and_listing_paths_start_without_torch():
+    for modules in STARTUP_PATHS.values():
+        result = measure_cold_import(modules, runs=1)
+        assert result['heavy'] == []
+        # Generous, so a busy test host doesn't fail it. The benchmark checks the real budget.
+        assert result['seconds'] < 5
+
+def test_settings_are_loaded_once_per_environment(workflow_env, monkeypatch):
+    workflow_env('mp3', 'transcripts')
+    settings = get_settings()
+    assert get_settings() is settings
+    monkeypatch.setenv('SERVICE_WORKERS', '3')
+    assert get_settings() is not settings
+    assert get_settings().service_workers == 3
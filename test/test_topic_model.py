@@ -0,0 +1,147 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: Tests the topic pipeline: online LDA learning the topics of a synthetic corpus, folding new transcripts
+# in batch by batch, persistence, parallel preprocessing, and the topics written into the workflow status
+# of a completed job and of the mp3 gfiles of a Drive corpus.
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+from conftest import STUB_TRANSCRIPT
+from gdrive_helper_code import GDriveHelper
+from topic_model_code import (TopicPipeline, digamma, preprocess_texts, set_topic_pipeline, tokenize, update_from_drive,
+                              write_topics_to_mp3_gfiles)
+from transcription_service_code import TranscriptionJobService
+
+from test_transcription_service import MP3_CONTENT, _client, _wait_until_finished
+
+SYLLABLES = ['ka', 'lo', 'mi', 'ran', 'te', 'su', 'vo', 'ne']
+
+
+def _corpus(documents: int, seed: int = 0):
+    """
+    Transcripts about two of five topics each, each topic 30 words of a made-up vocabulary.
+    """
+    rng = np.random.default_rng(seed)
+    vocabulary = sorted({''.join(rng.choice(SYLLABLES, 3)) for _ in range(2000)})[:400]
+    topic_words = [[vocabulary[word] for word in rng.choice(len(vocabulary), 30, replace=False)] for _ in range(5)]
+    transcripts, topics = [], {}
+    for n in range(documents):
+        chosen = rng.choice(5, 2, replace=False)
+        words = [word for topic in chosen for word in rng.choice(topic_words[topic], 100)]
+        transcripts.append((f'gfile-{n}', f'episode_{n}.txt', ' '.join(words)))
+        topics[f'gfile-{n}'] = set(chosen.tolist())
+    return transcripts, topics, topic_words
+
+def test_online_lda_learns_topics_and_folds_in(tmp_path):
+    transcripts, true_topics, topic_words = _corpus(216)
+    pipeline = TopicPipeline(tmp_path / 'topics', topics=5, batch_size=16, workers=1)
+    assert pipeline.add('first', 'first.txt', transcripts[0][2]) is None
+    topics = pipeline.fold_in(transcripts[:200], passes=3)
+    assert len(topics) == 201 and pipeline.model.documents == 201 and not pipeline.contains('gfile-200')
+    # Each learned topic is one of the made-up topics, and each transcript gets the two it is about.
+    learned = [next(topic for topic, words in enumerate(topic_words) if set(described) <= set(words))
+               for described in pipeline.describe(10)]
+    assert sorted(learned) == list(range(5))
+    assert all({learned[topic] for topic, _ in topics[file_id][:2]} == true_topics[file_id] for file_id in true_topics if file_id in topics)
+    # New transcripts wait for a batch; their topics are inferred meanwhile.
+    updates = pipeline.model.updates
+    for file_id, title, text in transcripts[200:215]:
+        assert {learned[topic] for topic, _ in pipeline.add(file_id, title, text)[:2]} == true_topics[file_id]
+    assert pipeline.model.updates == updates and pipeline.contains('gfile-214')
+    # A new process picks up the model and the pending transcripts. The 16th transcript makes a batch.
+    reopened = TopicPipeline(tmp_path / 'topics', batch_size=16, workers=1)
+    assert reopened.describe(10) == pipeline.describe(10)
+    file_id, title, text = transcripts[215]
+    assert {learned[topic] for topic, _ in reopened.add(file_id, title, text)[:2]} == true_topics[file_id]
+    assert reopened.model.updates == updates + 1 and reopened.model.documents == 217
+    assert reopened.contains(title='episode_214.txt') and reopened.transcripts['gfile-214']['topics']
+
+def test_preprocessing(tmp_path):
+    assert tokenize("Um, you know, the COMPOST is like really compost-y. Worms!") == {'compost': 2, 'worms': 1}
+    texts = [f"Compost number {n} with worms, mulch and {'bone meal ' * n}" for n in range(40)]
+    assert preprocess_texts(texts, workers=2) == [tokenize(text) for text in texts]
+    assert np.allclose(digamma(np.array([0.01, 1.0, 7.0, 100.0])), [-100.56088545786866, -0.5772156649015329, 1.8727843350984672,
+                                                                    4.600161852738087])
+
+@pytest.mark.asyncio
+async def test_topics_in_the_workflow_status(fake_drive, stub_asr, tmp_path):
+    fake_drive.rate_limit_probability = 0
+    transcripts, _, _ = _corpus(48)
+    transcripts += [(f'stub-{n}', f'stub_{n}.txt', STUB_TRANSCRIPT) for n in range(16)]
+    pipeline = TopicPipeline(tmp_path / 'topics', topics=5, batch_size=16, workers=1)
+    pipeline.fold_in(transcripts, passes=3)
+    stub_topics = pipeline.topics_of(STUB_TRANSCRIPT)
+    set_topic_pipeline(pipeline)
+    # A completed job.
+    gfile_id = fake_drive.add_file(os.environ['GDRIVE_MP3_FOLDER_ID'], 'episode.mp3', MP3_CONTENT)
+    async with _client(TranscriptionJobService()) as client:
+        job_id = (await client.post('/jobs', data={'gdrive_id': gfile_id})).json()['job_id']
+        job = await _wait_until_finished(client, job_id)
+    status = json.loads(fake_drive.get_metadata(gfile_id, ['description'])['description'])
+    assert status['status'] == 'TRANSCRIPTION_UPLOAD_COMPLETE' and [tuple(topic) for topic in status['topics']] == stub_topics
+    assert pipeline.contains(job['workflow']['transcript_gdrive_id'])
+    # A Drive corpus: the topics go to the mp3 gfile whose status names the transcript.
+    transcript_id = fake_drive.add_file(os.environ['GDRIVE_TRANSCRIPTS_FOLDER_ID'], 'old.txt', STUB_TRANSCRIPT.encode())
+    old_mp3_id = fake_drive.add_file(os.environ['GDRIVE_MP3_FOLDER_ID'], 'old.mp3', MP3_CONTENT, description=json.dumps(
+        {'status': 'TRANSCRIPTION_UPLOAD_COMPLETE', 'comment': 'Old.', 'transcript_gdrive_id': transcript_id}))
+    topics, written = await update_from_drive(pipeline, GDriveHelper(), os.environ['GDRIVE_TRANSCRIPTS_FOLDER_ID'],
+                                              os.environ['GDRIVE_MP3_FOLDER_ID'])
+    # The job's transcript was waiting for a batch, and is folded in too: its topics are rewritten if they changed.
+    job_transcript_id = job['workflow']['transcript_gdrive_id']
+    assert set(topics) == {transcript_id, job_transcript_id} and written == 1 + (topics[job_transcript_id] != stub_topics)
+    status = json.loads(fake_drive.get_metadata(old_mp3_id, ['description'])['description'])
+    assert status['comment'] == 'Old.' and [tuple(topic) for topic in status['topics']] == topics[transcript_id]
+
+@pytest.mark.asyncio
+async def test_topics_are_merged_into_statuses_changed_since_the_listing(fake_drive, monkeypatch):
+    fake_drive.rate_limit_probability = 0
+    folder_id = os.environ['GDRIVE_MP3_FOLDER_ID']
+    idle_id, busy_id = (fake_drive.add_file(folder_id, f'{name}.mp3', MP3_CONTENT, description=json.dumps(
+        {'status': 'TRANSCRIPTION_UPLOAD_COMPLETE', 'transcript_gdrive_id': f'{name}-transcript'})) for name in ('idle', 'busy'))
+    gh = GDriveHelper()
+    list_files = gh.list_files_to_transcribe
+    async def _list_then_claim(folder_id):
+        listed = await list_files(folder_id)
+        # A worker writes its lease into one of the statuses after the listing.
+        status = json.loads(fake_drive.get_metadata(busy_id, ['description'])['description'])
+        fake_drive.update_metadata({busy_id: {'description': json.dumps({**status, 'lease_owner': 'worker'})}})
+        return listed
+    monkeypatch.setattr(gh, 'list_files_to_transcribe', _list_then_claim)
+    topics = {'idle-transcript': [(1, 0.75)], 'busy-transcript': [(2, 0.5)], 'gone-transcript': [(3, 1.0)]}
+    assert await write_topics_to_mp3_gfiles(gh, folder_id, topics) == 2
+    # Besides the read above that wrote the lease, only the changed status was read again. The lease was kept.
+    assert fake_drive.calls['get_metadata'] == 1 + 1
+    idle, busy = (json.loads(fake_drive.get_metadata(gfile_id, ['description'])['description']) for gfile_id in (idle_id, busy_id))
+    assert idle['topics'] == [[1, 0.75]] and (busy['topics'], busy['lease_owner']) == ([[2, 0.5]], 'worker')
+    # Topics already written aren't written again.
+    monkeypatch.setattr(gh, 'list_files_to_transcribe', list_files)
+    assert await write_topics_to_mp3_gfiles(gh, folder_id, topics) == 0
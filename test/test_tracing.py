@@ -0,0 +1,114 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: Tests tracing: the spans of a job run by the job service, with their parent/child links and job
+# attributes, spans across an executor hop and a process boundary, and the timeline and Chrome trace made
+# from a trace file.
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import asyncio
+import contextvars
+import functools
+import os
+
+import pytest
+
+from tracing_code import (SpanExporter, job_timeline, load_spans, set_span_exporter, span_context, to_chrome_trace,
+                          tracing_span)
+from transcription_service_code import TranscriptionJobService
+from workflow_error_code import async_error_handler
+
+from test_transcription_service import MP3_CONTENT, _client, _wait_until_finished
+
+
+@pytest.fixture
+def exporter(tmp_path):
+    span_exporter = SpanExporter(str(tmp_path / 'traces' / 'spans.jsonl'), max_bytes=1024 * 1024, backup_count=2)
+    set_span_exporter(span_exporter)
+    yield span_exporter
+    span_exporter.close()
+    set_span_exporter(None)
+
+def _exported_spans(exporter: SpanExporter) -> list:
+    exporter.close()
+    return load_spans(exporter.path)
+
+@pytest.mark.asyncio
+async def test_job_spans(exporter, fake_drive, stub_asr):
+    fake_drive.rate_limit_probability = 0
+    gfile_id = fake_drive.add_file(os.environ['GDRIVE_MP3_FOLDER_ID'], 'episode.mp3', MP3_CONTENT)
+    async with _client(TranscriptionJobService()) as client:
+        job_id = (await client.post('/jobs', data={'gdrive_id': gfile_id})).json()['job_id']
+        assert (await _wait_until_finished(client, job_id))['state'] == 'succeeded'
+    spans = [span for span in _exported_spans(exporter) if span['trace_id'] == job_id]
+    by_id = {span['span_id']: span for span in spans}
+    roots = [span for span in spans if span['parent_id'] is None]
+    assert [root['name'] for root in roots] == ['AudioTranscriber.transcribe']
+    names = {span['name']: span for span in spans}
+    for name in ('AudioTranscriber.create_local_mp3_from_input', 'AudioTranscriber.transcribe_mp3'):
+        assert by_id[names[name]['parent_id']]['name'] == 'AudioTranscriber.transcribe'
+    assert by_id[names['GDriveHelper.download_from_gdrive']['parent_id']]['name'] == 'AudioTranscriber.copy_gfile_to_local_mp3'
+    assert 'GDriveHelper.upload_transcript_to_gdrive' in names
+    for span in spans:
+        assert span['attributes']['job_id'] == job_id
+        assert span['wall_seconds'] >= 0 and span['cpu_seconds'] >= 0
+    assert roots[0]['attributes']['gfile_id'] == gfile_id
+    assert roots[0]['attributes']['file'] == 'episode.mp3'
+
+@pytest.mark.asyncio
+async def test_spans_cross_executor_and_process_hops(exporter):
+    def _blocking_work():
+        with tracing_span('executor_work'):
+            return span_context()
+
+    @async_error_handler()
+    async def traced_stage():
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(contextvars.copy_context().run, _blocking_work))
+
+    parent = await traced_stage()
+    # Another process continues the trace from the span context it was handed.
+    with tracing_span('worker_process', parent=parent, pid=1234):
+        pass
+    spans = {span['name']: span for span in _exported_spans(exporter)}
+    stage, work, process = spans[traced_stage.__qualname__], spans['executor_work'], spans['worker_process']
+    assert work['parent_id'] == stage['span_id'] and work['thread'] != stage['thread']
+    assert process['parent_id'] == work['span_id'] and process['trace_id'] == stage['trace_id']
+    assert process['attributes']['pid'] == 1234
+
+def test_timeline_and_chrome_trace():
+    spans = [
+        {'trace_id': 'job', 'span_id': 'a', 'parent_id': None, 'name': 'transcribe', 'start': 100.0, 'wall_seconds': 4.0,
+         'cpu_seconds': 0.5, 'thread': 'MainThread', 'error': None, 'attributes': {'job_id': 'job'}},
+        {'trace_id': 'job', 'span_id': 'b', 'parent_id': 'a', 'name': 'inference', 'start': 101.0, 'wall_seconds': 2.0,
+         'cpu_seconds': 1.9, 'thread': 'worker', 'error': 'RuntimeError: out of memory', 'attributes': {'job_id': 'job'}},
+    ]
+    timeline = job_timeline(spans, 'job', width=8).splitlines()
+    assert timeline[0] == 'trace job: 4.000s'
+    assert timeline[1].startswith('######## |   0.000s    4.000s cpu   0.500s transcribe')
+    assert timeline[2].startswith('  ####   |   1.000s    2.000s cpu   1.900s   inference ERROR RuntimeError: out of memory')
+    events = to_chrome_trace(spans)['traceEvents']
+    assert events[1]['ts'] == 101_000_000 and events[1]['dur'] == 2_000_000 and events[1]['ph'] == 'X'
@@ -119,6 +119,9 @@ def _run_asserts_for_local_mp3_path(mp3_gdrive_id, local_mp3_path):
 async def test_copy_UploadFile_to_local_mp3_path(valid_UploadFile):
     transcriber = AudioTranscriber()
     mp3_gdrive_id, local_mp3_path = await transcriber.copy_uploadfile_to_local_mp3(valid_UploadFile)
+    # The uploaded file is sent to GDrive separately, while it is transcribed.
+    assert mp3_gdrive_id is None
+    mp3_gdrive_id = await transcriber.upload_mp3_in_background(local_mp3_path)
     _run_asserts_for_local_mp3_path(mp3_gdrive_id, local_mp3_path)
 
 @pytest.mark.asyncio
@@ -0,0 +1,108 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: Tests the transcript search index: word, phrase and prefix searches ranked by BM25, queries
+# with FTS5 syntax characters, indexing when a job completes, the search endpoint, and backfills
+# from local_transcript_dir and Drive.
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import os
+
+import pytest
+
+from conftest import STUB_TRANSCRIPT
+from gdrive_helper_code import GDriveHelper
+from transcript_index_code import (PASSAGE_WORDS, TranscriptIndex, backfill_from_directory, backfill_from_drive, get_transcript_index,
+                                   split_passages)
+from transcription_service_code import TranscriptionJobService
+
+from test_transcription_service import MP3_CONTENT, _client, _wait_until_finished
+
+
+@pytest.fixture
+def index(tmp_path):
+    transcript_index = TranscriptIndex(tmp_path / 'index.sqlite3')
+    yield transcript_index
+    transcript_index.close()
+
+def test_search_ranks_and_snippets(index):
+    index.add('a', 'tomatoes.txt', "Feed tomatoes with bone meal in spring. Composting kitchen scraps helps too.", mp3_file_id='mp3-a')
+    index.add('b', 'roses.txt', "Roses like bone meal. Meal worms are a different story, and so is bone broth.")
+    index.add('c', 'bone meal.txt', "An episode all about bone meal.")
+    assert [hit.file_id for hit in index.search('"bone meal"')] == ['c', 'a', 'b']
+    hit = index.search('"bone meal" tomatoes')[0]
+    assert (hit.file_id, hit.title, hit.mp3_file_id) == ('a', 'tomatoes.txt', 'mp3-a')
+    assert '[bone meal]' in hit.snippet and hit.score > 0
+    # Stemming and prefixes.
+    assert [hit.file_id for hit in index.search('composted')] == ['a']
+    assert [hit.file_id for hit in index.search('kitch*')] == ['a']
+    # FTS5 syntax in a query is searched for as text.
+    assert not index.search('roses AND NOT) "unclosed')
+    assert index.search('') == []
+    # Adding a transcript again replaces it.
+    index.add('b', 'roses.txt', "Roses need pruning.")
+    assert [hit.file_id for hit in index.search('bone')] == ['c', 'a']
+    # Long transcripts are kept as passages. The snippet is made from one with all the terms.
+    long_text = "compost " + ' \n'.join(f"word{n}" for n in range(3 * PASSAGE_WORDS)) + " compost mulch "
+    assert ''.join(split_passages(long_text)) == long_text and len(split_passages(long_text)) == 4
+    index.add('d', 'long.txt', long_text)
+    assert '[compost] [mulch]' in index.search('compost mulch')[0].snippet
+    assert index.search('long')[0].snippet.startswith('compost word0 word1')
+    index.add('d', 'long.txt', "Short now.")
+    assert not index.search('mulch')
+    index.remove('d')
+    assert index.remove('c') and not index.remove('c')
+    assert index.count() == 2
+
+@pytest.mark.asyncio
+async def test_completed_jobs_are_searchable(fake_drive, stub_asr):
+    fake_drive.rate_limit_probability = 0
+    gfile_id = fake_drive.add_file(os.environ['GDRIVE_MP3_FOLDER_ID'], 'episode.mp3', MP3_CONTENT)
+    async with _client(TranscriptionJobService()) as client:
+        job_id = (await client.post('/jobs', data={'gdrive_id': gfile_id})).json()['job_id']
+        job = await _wait_until_finished(client, job_id)
+        result = (await client.get('/transcripts/search', params={'q': 'stub transcript'})).json()
+    assert [(hit['file_id'], hit['title'], hit['mp3_file_id']) for hit in result['hits']] == \
+        [(job['workflow']['transcript_gdrive_id'], 'episode.txt', gfile_id)]
+    assert '[stub] [transcript]' in result['hits'][0]['snippet']
+    assert result['took_ms'] < 1000
+
+@pytest.mark.asyncio
+async def test_backfill_from_local_transcripts_and_drive(fake_drive, tmp_path):
+    fake_drive.rate_limit_probability = 0
+    local_dir = tmp_path / 'transcripts'
+    local_dir.mkdir(exist_ok=True)
+    (local_dir / 'episode_1.txt').write_text(STUB_TRANSCRIPT, encoding='utf-8')
+    (local_dir / 'episode_2.txt').write_text("Only on this host.", encoding='utf-8')
+    index = get_transcript_index()
+    assert backfill_from_directory(index, local_dir) == 2
+    assert backfill_from_directory(index, local_dir) == 0
+    drive_id = fake_drive.add_file(os.environ['GDRIVE_TRANSCRIPTS_FOLDER_ID'], 'episode_1.txt', STUB_TRANSCRIPT.encode())
+    assert await backfill_from_drive(index, GDriveHelper(), os.environ['GDRIVE_TRANSCRIPTS_FOLDER_ID']) == 1
+    assert await backfill_from_drive(index, GDriveHelper(), os.environ['GDRIVE_TRANSCRIPTS_FOLDER_ID']) == 0
+    # The transcript found in Drive now goes by its file ID.
+    assert [hit.file_id for hit in index.search('stub')] == [drive_id]
+    assert [hit.file_id for hit in index.search('host')] == ['local:episode_2.txt']
@@ -0,0 +1,247 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: Tests the transcription job service through its HTTP API, against the FakeDriveBackend and a stub
+# ASR: 202 submission and polling, the SSE event stream, queue-depth limits, concurrent jobs
+# keeping their own workflow state, and coalescing requests for audio already in flight.
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+import pytest
+
+from conftest import STUB_TRANSCRIPT
+from transcription_service_code import TranscriptionJobService, create_app
+from workflow_states_code import WorkflowEnum
+
+MP3_CONTENT = b'\xff\xfb\x90\x64' + b'\x00' * 20_000
+
+
+@asynccontextmanager
+async def _client(service: TranscriptionJobService):
+    app = create_app(service)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+            yield client
+
+async def _wait_until_finished(client: httpx.AsyncClient, job_id: str, timeout: float = 10.0) -> dict:
+    async with asyncio.timeout(timeout):
+        while True:
+            job = (await client.get(f'/jobs/{job_id}')).json()
+            if job['state'] in ('succeeded', 'failed'):
+                return job
+            await asyncio.sleep(0.02)
+
+def _parse_sse(body: str) -> list:
+    events = []
+    for message in body.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in message.splitlines() if not line.startswith(':'))
+        if fields:
+            events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+@pytest.mark.asyncio
+async def test_upload_job_is_accepted_and_polled(fake_drive, stub_asr):
+    fake_drive.rate_limit_probability = 0
+    async with _client(TranscriptionJobService()) as client:
+        response = await client.post('/jobs', files={'file': ('episode.mp3', MP3_CONTENT, 'audio/mpeg')})
+        assert response.status_code == 202
+        submitted = response.json()
+        assert submitted['state'] == 'queued'
+        assert submitted['status_url'].endswith(f"/jobs/{submitted['job_id']}")
+        job = await _wait_until_finished(client, submitted['job_id'])
+        assert job['state'] == 'succeeded'
+        assert job['text'] == stub_asr
+        assert job['workflow']['status'] == WorkflowEnum.TRANSCRIPTION_UPLOAD_COMPLETE.name
+        assert job['workflow']['mp3_sha256'] == hashlib.sha256(MP3_CONTENT).hexdigest()
+        assert fake_drive.get_content(job['workflow']['mp3_gfile_id']) == MP3_CONTENT
+        assert (await client.get('/jobs/unknown')).status_code == 404
+        assert (await client.post('/jobs', data={'gdrive_id': 'not an id'})).status_code == 422
+        assert (await client.post('/jobs', data={'gdrive_id': fake_drive.new_id()})).status_code == 404
+    # The staged copy of the upload is gone.
+    assert not os.listdir(os.path.join(os.environ['LOCAL_MP3_DIR'], 'jobs'))
+
+@pytest.mark.asyncio
+async def test_kept_uploads_are_moved_out_of_the_staging_directory(fake_drive, stub_asr, monkeypatch): # pylint: disable=unused-argument
+    fake_drive.rate_limit_probability = 0
+    monkeypatch.setenv('REMOVE_TEMP_MP3', 'false')
+    async with _client(TranscriptionJobService()) as client:
+        for _ in range(2):
+            job_id = (await client.post('/jobs', files={'file': ('episode.mp3', MP3_CONTENT, 'audio/mpeg')})).json()['job_id']
+            assert (await _wait_until_finished(client, job_id))['state'] == 'succeeded'
+    # The staging directories are gone. The mp3 files are kept in local_mp3_dir, the second under a name of its own.
+    local_mp3_dir = os.environ['LOCAL_MP3_DIR']
+    assert not os.listdir(os.path.join(local_mp3_dir, 'jobs'))
+    assert set(os.listdir(local_mp3_dir)) == {'episode.mp3', f'{job_id}_episode.mp3', 'jobs'}
+    assert open(os.path.join(local_mp3_dir, f'{job_id}_episode.mp3'), 'rb').read() == MP3_CONTENT
+
+@pytest.mark.asyncio
+async def test_event_stream(fake_drive, stub_asr):
+    fake_drive.rate_limit_probability = 0
+    gfile_id = fake_drive.add_file(os.environ['GDRIVE_MP3_FOLDER_ID'], 'episode.mp3', MP3_CONTENT)
+    async with _client(TranscriptionJobService()) as client:
+        submitted = (await client.post('/jobs', data={'gdrive_id': gfile_id})).json()
+        response = await client.get(submitted['events_url'])
+        assert response.headers['content-type'].startswith('text/event-stream')
+    events = _parse_sse(response.text)
+    assert [data['state'] for event, data in events if event == 'state'] == ['queued', 'running', 'succeeded']
+    statuses = [data['status'] for event, data in events if event == 'status']
+    assert statuses[0] == WorkflowEnum.START.name
+    assert statuses[-1] == WorkflowEnum.TRANSCRIPTION_UPLOAD_COMPLETE.name
+    assert WorkflowEnum.TRANSCRIPTION_COMPLETE.name in statuses
+    assert ('text', {'text': stub_asr}) in events
+    assert events[-1] == ('state', {'state': 'succeeded'})
+
+@pytest.mark.asyncio
+async def test_queue_depth_limit(fake_drive, monkeypatch):
+    from audio_transcriber_code import AudioTranscriber # pylint: disable=import-outside-toplevel
+    release = asyncio.Event()
+    async def _blocked_transcribe_pipeline(self, audio_filename, model_name, compute_float_type): # pylint: disable=unused-argument
+        await release.wait()
+        return STUB_TRANSCRIPT
+    monkeypatch.setattr(AudioTranscriber, '_transcribe_pipeline', _blocked_transcribe_pipeline)
+    fake_drive.rate_limit_probability = 0
+    gfile_ids = [fake_drive.add_file(os.environ['GDRIVE_MP3_FOLDER_ID'], f'episode_{i}.mp3', MP3_CONTENT) for i in range(3)]
+    async with _client(TranscriptionJobService(workers=1, max_queued_jobs=1)) as client:
+        running = (await client.post('/jobs', data={'gdrive_id': gfile_ids[0]})).json()
+        async with asyncio.timeout(5):
+            while (await client.get(f"/jobs/{running['job_id']}")).json()['state'] != 'running':
+                await asyncio.sleep(0.01)
+        queued = await client.post('/jobs', data={'gdrive_id': gfile_ids[1]})
+        assert queued.status_code == 202
+        refused = await client.post('/jobs', data={'gdrive_id': gfile_ids[2]})
+        assert refused.status_code == 429
+        assert int(refused.headers['Retry-After']) >= 1
+        assert (await client.get('/stats')).json()['rejected'] == 1
+        release.set()
+        for job_id in (running['job_id'], queued.json()['job_id']):
+            assert (await _wait_until_finished(client, job_id))['state'] == 'succeeded'
+
+@pytest.mark.asyncio
+async def test_concurrent_jobs_keep_their_own_workflow_state(fake_drive, monkeypatch):
+    from audio_transcriber_code import AudioTranscriber # pylint: disable=import-outside-toplevel
+    both_started = asyncio.Barrier(2)
+    async def _concurrent_transcribe_pipeline(self, audio_filename, model_name, compute_float_type): # pylint: disable=unused-argument
+        # Only returns once both jobs are transcribing at the same time.
+        await both_started.wait()
+        return f"The transcript of {os.path.basename(audio_filename)}, long enough to pass the transcript text checks."
+    monkeypatch.setattr(AudioTranscriber, '_transcribe_pipeline', _concurrent_transcribe_pipeline)
+    fake_drive.rate_limit_probability = 0
+    gfile_ids = [fake_drive.add_file(os.environ['GDRIVE_MP3_FOLDER_ID'], f'episode_{i}.mp3', MP3_CONTENT) for i in range(2)]
+    async with _client(TranscriptionJobService(workers=2)) as client:
+        job_ids = [(await client.post('/jobs', data={'gdrive_id': gfile_id})).json()['job_id'] for gfile_id in gfile_ids]
+        async with asyncio.timeout(10):
+            jobs = [await _wait_until_finished(client, job_id) for job_id in job_ids]
+    for i, (job, gfile_id) in enumerate(zip(jobs, gfile_ids)):
+        assert job['state'] == 'succeeded'
+        assert job['text'].startswith(f'The transcript of episode_{i}.mp3')
+        assert job['workflow']['mp3_gfile_id'] == gfile_id
+        description = json.loads(fake_drive.get_metadata(gfile_id, ['description'])['description'])
+        assert description['status'] == WorkflowEnum.TRANSCRIPTION_UPLOAD_COMPLETE.name
+    transcripts = fake_drive.list_files(os.environ['GDRIVE_TRANSCRIPTS_FOLDER_ID'])
+    assert sorted(gfile['title'] for gfile in transcripts) == ['episode_0.txt', 'episode_1.txt']
+
+@pytest.mark.asyncio
+async def test_concurrent_uploads_of_the_same_audio_are_coalesced(fake_drive, monkeypatch):
+    import transcription_service_code # pylint: disable=import-outside-toplevel
+    from audio_transcriber_code import AudioTranscriber # pylint: disable=import-outside-toplevel
+    release = asyncio.Event()
+    pipeline_calls = []
+    async def _blocked_transcribe_pipeline(self, audio_filename, model_name, compute_float_type): # pylint: disable=unused-argument
+        pipeline_calls.append(os.path.basename(audio_filename))
+        await release.wait()
+        return STUB_TRANSCRIPT
+    monkeypatch.setattr(AudioTranscriber, '_transcribe_pipeline', _blocked_transcribe_pipeline)
+    # A slow duration read: both uploads are past their first in-flight check before either is admitted.
+    duration_seconds = transcription_service_code.mp3_file_duration_seconds
+    def _slow_duration_seconds(path):
+        time.sleep(0.2)
+        return duration_seconds(path)
+    monkeypatch.setattr(transcription_service_code, 'mp3_file_duration_seconds', _slow_duration_seconds)
+    fake_drive.rate_limit_probability = 0
+    service = TranscriptionJobService(workers=2)
+    async with _client(service) as client:
+        responses = await asyncio.gather(*(client.post('/jobs', files={'file': (f'copy_{i}.mp3', MP3_CONTENT, 'audio/mpeg')})
+                                           for i in range(2)))
+        jobs = [response.json() for response in responses]
+        assert len({job['job_id'] for job in jobs}) == 1
+        assert sorted(job['coalesced'] for job in jobs) == [False, True]
+        # The copy of the coalesced upload was removed.
+        assert os.listdir(os.path.join(os.environ['LOCAL_MP3_DIR'], 'jobs')) == [jobs[0]['job_id']]
+        release.set()
+        assert (await _wait_until_finished(client, jobs[0]['job_id']))['requesters'] == 2
+    assert len(pipeline_calls) == 1
+    assert len(fake_drive.list_files(os.environ['GDRIVE_MP3_FOLDER_ID'])) == 1
+
+@pytest.mark.asyncio
+async def test_requests_for_the_same_audio_are_coalesced(fake_drive, monkeypatch):
+    from audio_transcriber_code import AudioTranscriber # pylint: disable=import-outside-toplevel
+    release = asyncio.Event()
+    pipeline_calls = []
+    async def _blocked_transcribe_pipeline(self, audio_filename, model_name, compute_float_type): # pylint: disable=unused-argument
+        pipeline_calls.append(os.path.basename(audio_filename))
+        await release.wait()
+        return STUB_TRANSCRIPT
+    monkeypatch.setattr(AudioTranscriber, '_transcribe_pipeline', _blocked_transcribe_pipeline)
+    fake_drive.rate_limit_probability = 0
+    gfile_id = fake_drive.add_file(os.environ['GDRIVE_MP3_FOLDER_ID'], 'episode.mp3', MP3_CONTENT)
+    service = TranscriptionJobService(workers=2)
+    async with _client(service) as client:
+        gdrive_responses = await asyncio.gather(*(client.post('/jobs', data={'gdrive_id': gfile_id}) for _ in range(3)))
+        gdrive_jobs = [response.json() for response in gdrive_responses]
+        assert len({job['job_id'] for job in gdrive_jobs}) == 1
+        assert sorted(job['coalesced'] for job in gdrive_jobs) == [False, True, True]
+        upload_jobs = [(await client.post('/jobs', files={'file': (f'copy_{i}.mp3', MP3_CONTENT, 'audio/mpeg')})).json()
+                       for i in range(2)]
+        assert upload_jobs[0]['job_id'] == upload_jobs[1]['job_id']
+        assert upload_jobs[1]['coalesced']
+        # Other options make another transcript.
+        other_quality = (await client.post('/jobs', data={'gdrive_id': gfile_id, 'audio_quality': 'medium'})).json()
+        assert other_quality['job_id'] != gdrive_jobs[0]['job_id'] and not other_quality['coalesced']
+        # A requester joining late still gets the whole event stream.
+        waiter = asyncio.create_task(service.get_job(gdrive_jobs[0]['job_id']).wait())
+        release.set()
+        events = _parse_sse((await client.get(gdrive_jobs[1]['events_url'])).text)
+        assert await waiter == STUB_TRANSCRIPT
+        assert events[0] == ('state', {'state': 'queued'}) and events[-1] == ('state', {'state': 'succeeded'})
+        job = await _wait_until_finished(client, gdrive_jobs[0]['job_id'])
+        assert job['requesters'] == 3
+        stats = (await client.get('/stats')).json()
+        assert stats['coalesced'] == 3
+        for other in (upload_jobs[0], other_quality):
+            await _wait_until_finished(client, other['job_id'])
+        assert (await client.get('/stats')).json()['in_flight'] == 0
+        # Once the job has finished, a new request starts a new job.
+        again = (await client.post('/jobs', data={'gdrive_id': gfile_id})).json()
+        assert again['job_id'] != gdrive_jobs[0]['job_id'] and not again['coalesced']
+        await _wait_until_finished(client, again['job_id'])
+    assert len(pipeline_calls) == 4
@@ -0,0 +1,167 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: Tests the work leases against the FakeDriveBackend with simulated races: concurrent claims of one
+# file, takeover of expired leases, heartbeats, and several batch transcriber "hosts" sharing a folder
+# without transcribing any file twice.
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import asyncio
+import collections
+import json
+import os
+from datetime import datetime, timezone
+
+import pytest
+
+from conftest import STUB_TRANSCRIPT
+from gdrive_helper_code import GDriveHelper
+from work_lease_code import LeaseLostError, LeaseManager, parse_lease
+from workflow_states_code import WorkflowEnum
+from workflow_tracker_code import WorkflowTracker
+
+
+@pytest.fixture
+def racy_drive(fake_drive):
+    # Latency in every call lets the reads and writes of concurrent workers interleave.
+    fake_drive.latency_seconds = 0.005
+    fake_drive.rate_limit_probability = 0.05
+    return fake_drive
+
+def _add_mp3(fake_drive, title: str) -> str:
+    return fake_drive.add_file(os.environ['GDRIVE_MP3_FOLDER_ID'], title, b'\xff\xfb\x90\x64' + os.urandom(20_000))
+
+@pytest.mark.asyncio
+async def test_one_of_concurrent_claims_wins(racy_drive):
+    gfile_id = _add_mp3(racy_drive, 'episode.mp3')
+    managers = [LeaseManager(GDriveHelper(), owner=f'worker-{n}') for n in range(8)]
+    leases = await asyncio.gather(*(manager.try_claim(gfile_id) for manager in managers))
+    winners = [lease for lease in leases if lease is not None]
+    assert len(winners) == 1
+    racy_drive.rate_limit_probability = 0
+    owner, _, version = parse_lease(racy_drive.get_metadata(gfile_id, ['description'])['description'])
+    assert (owner, version) == (winners[0].owner, 1)
+
+@pytest.mark.asyncio
+async def test_expired_lease_is_taken_over(racy_drive):
+    gfile_id = _add_mp3(racy_drive, 'episode.mp3')
+    crashed = LeaseManager(GDriveHelper(), owner='crashed', ttl_seconds=0.3)
+    idle = LeaseManager(GDriveHelper(), owner='idle', ttl_seconds=0.3)
+    crashed_lease = await crashed.try_claim(gfile_id)
+    assert await idle.try_claim(gfile_id) is None
+    await asyncio.sleep(0.35)
+    lease = await idle.try_claim(gfile_id)
+    assert lease.version == crashed_lease.version + 1
+    with pytest.raises(LeaseLostError):
+        await crashed.renew(crashed_lease)
+
+@pytest.mark.asyncio
+async def test_heartbeats_keep_the_lease_and_a_lost_lease_stops_the_work(racy_drive):
+    gfile_id = _add_mp3(racy_drive, 'episode.mp3')
+    holder = LeaseManager(GDriveHelper(), owner='holder', ttl_seconds=0.3)
+    other = LeaseManager(GDriveHelper(), owner='other', ttl_seconds=0.3)
+    lease = await holder.try_claim(gfile_id)
+    async with holder.hold(lease):
+        # Longer than the TTL: the heartbeats renew the lease meanwhile.
+        for _ in range(8):
+            await asyncio.sleep(0.1)
+            assert await other.try_claim(gfile_id) is None
+    # Another worker takes the file over, e.g. because this one was partitioned from Drive for too long.
+    lease = await holder.try_claim(gfile_id)
+    racy_drive.rate_limit_probability = 0
+    description = json.loads(racy_drive.get_metadata(gfile_id, ['description'])['description'])
+    racy_drive.update_metadata({gfile_id: {'description': json.dumps({**description, 'lease_owner': 'other', 'lease_version': 99})}})
+    with pytest.raises(LeaseLostError):
+        async with holder.hold(lease):
+            await asyncio.sleep(2)
+
+@pytest.mark.asyncio
+async def test_a_lease_that_cannot_be_renewed_is_given_up_a_heartbeat_early(racy_drive, monkeypatch):
+    gfile_id = _add_mp3(racy_drive, 'episode.mp3')
+    holder = LeaseManager(GDriveHelper(), owner='holder', ttl_seconds=0.6, heartbeat_seconds=0.15)
+    lease = await holder.try_claim(gfile_id)
+    expires_at = lease.expires_at
+    # Drive stops answering: the renewals hang.
+    async def _hanging_renew(lease): # pylint: disable=unused-argument
+        await asyncio.Event().wait()
+    monkeypatch.setattr(holder, 'renew', _hanging_renew)
+    with pytest.raises(LeaseLostError):
+        async with holder.hold(lease):
+            await asyncio.sleep(2)
+    seconds_left = (expires_at - datetime.now(timezone.utc)).total_seconds()
+    assert 0 < seconds_left <= 0.16
+    with pytest.raises(ValueError):
+        LeaseManager(GDriveHelper(), ttl_seconds=0.6, heartbeat_seconds=0.3)
+
+@pytest.mark.asyncio
+async def test_status_writes_do_not_overwrite_a_lease_taken_over(racy_drive):
+    gfile_id = _add_mp3(racy_drive, 'episode.mp3')
+    gh = GDriveHelper()
+    WorkflowTracker.start_job()
+    WorkflowTracker.update(mp3_gfile_id=gfile_id, status=WorkflowEnum.TRANSCRIBING.name)
+    await LeaseManager(gh, owner='holder').try_claim(gfile_id)
+    # Renewals and status writes interleave: each write still lands.
+    await gh.update_mp3_gfile_status()
+    racy_drive.rate_limit_probability = 0
+    description = json.loads(racy_drive.get_metadata(gfile_id, ['description'])['description'])
+    assert (description['status'], description['lease_owner']) == (WorkflowEnum.TRANSCRIBING.name, 'holder')
+    # Another worker takes the file over. The old holder's next write is dropped.
+    racy_drive.update_metadata({gfile_id: {'description': json.dumps({**description, 'lease_owner': 'other', 'lease_version': 2})}})
+    WorkflowTracker.update(status=WorkflowEnum.TRANSCRIPTION_COMPLETE.name)
+    await gh.update_mp3_gfile_status()
+    description = json.loads(racy_drive.get_metadata(gfile_id, ['description'])['description'])
+    assert (description['status'], description['lease_owner']) == (WorkflowEnum.TRANSCRIBING.name, 'other')
+
+@pytest.mark.asyncio
+async def test_hosts_share_a_folder_without_double_transcription(racy_drive, monkeypatch):
+    from audio_batch_transcriber_code import main # pylint: disable=import-outside-toplevel
+    from audio_transcriber_code import AudioTranscriber # pylint: disable=import-outside-toplevel
+    monkeypatch.setenv('LEASE_TTL_SECONDS', '2')
+    transcriptions = collections.Counter()
+    workers = set()
+    async def _counting_transcribe_pipeline(self, audio_filename, model_name, compute_float_type): # pylint: disable=unused-argument
+        transcriptions[os.path.basename(audio_filename)] += 1
+        workers.add(WorkflowTracker.get('lease_owner'))
+        await asyncio.sleep(0.1)
+        return STUB_TRANSCRIPT
+    monkeypatch.setattr(AudioTranscriber, '_transcribe_pipeline', _counting_transcribe_pipeline)
+    titles = [f'episode_{i}.mp3' for i in range(6)]
+    gfile_ids = [_add_mp3(racy_drive, title) for title in titles]
+    # A worker that died while transcribing: its lease runs out after a second.
+    crashed = LeaseManager(GDriveHelper(), owner='crashed', ttl_seconds=1)
+    await crashed.try_claim(gfile_ids[0])
+
+    async def _host():
+        # Each host has its own workflow state, as separate processes would.
+        WorkflowTracker.start_job()
+        await main()
+    await asyncio.wait_for(asyncio.gather(*(_host() for _ in range(3))), timeout=30)
+    assert transcriptions == {title: 1 for title in titles}
+    assert len(workers) > 1 and 'crashed' not in workers
+    racy_drive.rate_limit_probability = 0
+    for gfile_id in gfile_ids:
+        status = json.loads(racy_drive.get_metadata(gfile_id, ['description'])['description'])['status']
+        assert status == WorkflowEnum.TRANSCRIPTION_UPLOAD_COMPLETE.name
@@ -0,0 +1,587 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: Topic modelling over the whole transcript corpus with online LDA (Hoffman, Blei and Bach's online
+# variational Bayes, in numpy). The dictionary, the model and the topics of each transcript are kept in a
+# directory. New transcripts are folded in with an online update per batch of transcripts instead of a
+# retrain, and a corpus is preprocessed in a process pool. A job's transcript gets its topics as it
+# completes, and they are written to the mp3 gfile's workflow status ('topics').
+# 
+# Usage: python topic_model_code.py update [--local] [--drive] [--passes 5] [--workers 4]
+#        python topic_model_code.py topics [--words 10]
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from env_settings_code import get_settings
+from storage_backend_code import StorageRequestError
+from transcript_index_code import LOCAL_FILE_ID_PREFIX
+from work_lease_code import CAS_ATTEMPTS, PRECONDITION_FAILED
+from workflow_error_code import async_error_handler
+
+MODEL_FILE = 'topic_model.npz'
+PENDING_FILE = 'pending.json'
+TOPICS = 20
+# Transcripts are folded into the model BATCH_SIZE at a time: one online update per batch.
+BATCH_SIZE = 16
+# The learning rate of the update after `updates` updates is (TAU0 + updates) ** -KAPPA (Hoffman et al. 2010). These
+# are gensim's defaults, which learn the topics of a corpus of a few hundred transcripts better than the paper's
+# (1024, 0.7), tuned for millions of documents.
+TAU0 = 1.0
+KAPPA = 0.5
+# The E-step of a document stops when its topic weights change less than this on average.
+E_STEP_TOLERANCE = 1e-3
+E_STEP_ITERATIONS = 100
+MAX_VOCABULARY = 100_000
+MIN_WORD_LENGTH = 3
+# A transcript's topics are its TOPICS_PER_TRANSCRIPT heaviest topics weighing at least MIN_TOPIC_WEIGHT.
+TOPICS_PER_TRANSCRIPT = 3
+MIN_TOPIC_WEIGHT = 0.1
+# Fewer texts than this are preprocessed in the calling process: starting the pool costs more.
+PARALLEL_MIN_TEXTS = 16
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are aren't as at be because been before being below
+between both but by can can't cannot could couldn't did didn't do does doesn't doing don't down during each even
+ever every few for from further get gets getting got had hadn't has hasn't have haven't having he he'd he'll he's
+her here here's hers herself him himself his how how's however i i'd i'll i'm i've if in into is isn't it it's its
+itself just let's may me might more most much must mustn't my myself never no nor not now of off on once one only
+or other ought our ours ourselves out over own same shan't she she'd she'll she's should shouldn't so some still
+such than that that's the their theirs them themselves then there there's these they they'd they'll they're
+they've this those through to too under until up upon us very was wasn't we we'd we'll we're we've were weren't
+what what's when when's where where's whether which while who who's whom whose why why's will with within without
+won't would wouldn't yes yet you you'd you'll you're you've your yours yourself yourselves
+""".split())
+# The filler of speech, which a transcript is full of.
+FILLER_WORDS = frozenset("""
+actually alright anyway basically bit come definitely going gonna gotta guess guys hey kind kinda know like
+literally lot maybe mean okay pretty probably really right said say saying see sort stuff sure thank thanks thing
+things think totally want wanna way well yeah yep yup
+""".split())
+
+_WORD = re.compile(r"[a-z][a-z']*[a-z]")
+
+
+def tokenize(text: str) -> Dict[str, int]:
+    """
+    The bag of words of a text: the count of each lowercase word of MIN_WORD_LENGTH letters or more that isn't a
+    stopword or filler word.
+    """
+    return dict(Counter(word for word in _WORD.findall(text.lower())
+                        if len(word) >= MIN_WORD_LENGTH and word not in STOPWORDS and word not in FILLER_WORDS))
+
+def preprocess_texts(texts: Sequence[str], workers: int = 0) -> List[Dict[str, int]]:
+    """
+    Tokenizes the texts in a pool of `workers` processes (0: one per core), or in this process if there are only
+    a few texts or one worker.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(texts) < PARALLEL_MIN_TEXTS:
+        return [tokenize(text) for text in texts]
+    with ProcessPoolExecutor(max_workers=min(workers, len(texts))) as pool:
+        return list(pool.map(tokenize, texts, chunksize=max(1, len(texts) // (workers * 4))))
+
+def digamma(x: np.ndarray) -> np.ndarray:
+    """
+    The digamma function of positive values: the recurrence up to 6, then its asymptotic series.
+    """
+    x = np.array(x, dtype=np.float64)
+    result = np.zeros_like(x)
+    for _ in range(6):
+        small = x < 6
+        result -= np.where(small, 1 / x, 0)
+        x = np.where(small, x + 1, x)
+    inverse_square = 1 / (x * x)
+    return result + np.log(x) - 0.5 / x - inverse_square * (1 / 12 - inverse_square * (1 / 120 - inverse_square / 252))
+
+def dirichlet_expectation(parameters: np.ndarray) -> np.ndarray:
+    """
+    E[log x] for x ~ Dirichlet(parameters), of each row if the parameters are a matrix.
+    """
+    if parameters.ndim == 1:
+        return digamma(parameters) - digamma(parameters.sum())
+    return digamma(parameters) - digamma(parameters.sum(axis=1))[:, np.newaxis]
+
+
+class Vocabulary:
+    """
+    The dictionary of the topic model: the ID of each word (its column in the model) and the number of transcripts
+    it's in. It grows as transcripts with new words are folded in, up to max_words words.
+    """
+    def __init__(self, words: Iterable[str] = (), document_frequency: Iterable[int] = (), max_words: int = MAX_VOCABULARY):
+        self.words = list(words)
+        self.ids = {word: word_id for word_id, word in enumerate(self.words)}
+        self.document_frequency = list(document_frequency) or [0] * len(self.words)
+        self.max_words = max_words
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def add_documents(self, bags: Sequence[Dict[str, int]]) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Adds the new words of the bags of words, and returns the bags as word IDs and counts.
+        """
+        for bag in bags:
+            for word in bag:
+                word_id = self.ids.get(word)
+                if word_id is None and len(self.words) < self.max_words:
+                    word_id = self.ids[word] = len(self.words)
+                    self.words.append(word)
+                    self.document_frequency.append(0)
+                if word_id is not None:
+                    self.document_frequency[word_id] += 1
+        return [self.to_ids(bag) for bag in bags]
+
+    def to_ids(self, bag: Dict[str, int]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        A bag of words as the IDs and counts of the words in the vocabulary.
+        """
+        known = [(self.ids[word], count) for word, count in bag.items() if word in self.ids]
+        ids = np.array([word_id for word_id, _ in known], dtype=np.int64)
+        return ids, np.array([count for _, count in known], dtype=np.float64)
+
+
+class OnlineLDA:
+    """
+    Latent Dirichlet allocation fitted by online variational Bayes (Hoffman, Blei and Bach, 2010): each update takes
+    a batch of documents, finds their topic weights (the E-step), and moves the topics' word weights (lambda) toward
+    what the batch suggests for a corpus of `documents` documents, by a learning rate that decreases with each
+    update. So new documents are folded in at the cost of their E-step, without going over the corpus again.
+
+    Attributes:
+        topics (int): The number of topics.
+        lam (np.ndarray): The variational parameters of the topics' word distributions, one row per topic.
+        updates (int): The updates so far.
+        documents (int): The documents folded in so far, which is the size of the corpus the updates scale to.
+    """
+    def __init__(self, topics: int, words: int = 0, alpha: Optional[float] = None, eta: Optional[float] = None,
+                 tau0: float = TAU0, kappa: float = KAPPA, seed: int = 0, lam: Optional[np.ndarray] = None):
+        self.topics = topics
+        self.alpha = alpha if alpha is not None else 1 / topics
+        self.eta = eta if eta is not None else 1 / topics
+        self.tau0 = tau0
+        self.kappa = kappa
+        self.updates = 0
+        self.documents = 0
+        self._rng = np.random.default_rng(seed)
+        self.lam = lam if lam is not None else self._rng.gamma(100.0, 1 / 100.0, (topics, words))
+        self._exp_elog_beta = self._expected_beta()
+
+    def grow(self, words: int) -> None:
+        """
+        Adds columns for the words added to the vocabulary, initialized as the first columns were.
+        """
+        if words > self.lam.shape[1]:
+            self.lam = np.hstack([self.lam, self._rng.gamma(100.0, 1 / 100.0, (self.topics, words - self.lam.shape[1]))])
+            self._exp_elog_beta = self._expected_beta()
+
+    def _expected_beta(self) -> np.ndarray:
+        # exp(E[log beta]), the topics' word weights the E-step uses.
+        return np.exp(dirichlet_expectation(self.lam)) if self.lam.shape[1] else self.lam.copy()
+
+    def _e_step(self, documents: Sequence[Tuple[np.ndarray, np.ndarray]], statistics: bool) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        gamma = self._rng.gamma(100.0, 1 / 100.0, (len(documents), self.topics))
+        sufficient = np.zeros_like(self.lam) if statistics else None
+        for d, (ids, counts) in enumerate(documents):
+            if len(ids) == 0:
+                gamma[d] = self.alpha
+                continue
+            gamma_d = gamma[d]
+            exp_elog_theta_d = np.exp(dirichlet_expectation(gamma_d))
+            exp_elog_beta_d = self._exp_elog_beta[:, ids]
+            phi_norm = exp_elog_theta_d @ exp_elog_beta_d + 1e-100
+            for _ in range(E_STEP_ITERATIONS):
+                last_gamma = gamma_d
+                gamma_d = self.alpha + exp_elog_theta_d * ((counts / phi_norm) @ exp_elog_beta_d.T)
+                exp_elog_theta_d = np.exp(dirichlet_expectation(gamma_d))
+                phi_norm = exp_elog_theta_d @ exp_elog_beta_d + 1e-100
+                if np.mean(np.abs(gamma_d - last_gamma)) < E_STEP_TOLERANCE:
+                    break
+            gamma[d] = gamma_d
+            if statistics:
+                sufficient[:, ids] += np.outer(exp_elog_theta_d, counts / phi_norm)
+        if statistics:
+            sufficient *= self._exp_elog_beta
+        return gamma, sufficient
+
+    def infer(self, documents: Sequence[Tuple[np.ndarray, np.ndarray]]) -> np.ndarray:
+        """
+        The topic weights of the documents (word IDs and counts), one normalized row per document.
+        """
+        gamma, _ = self._e_step(documents, statistics=False)
+        return gamma / gamma.sum(axis=1, keepdims=True)
+
+    def update(self, documents: Sequence[Tuple[np.ndarray, np.ndarray]]) -> np.ndarray:
+        """
+        Folds a batch of documents into the model. Returns their topic weights, as infer does.
+        """
+        if not documents:
+            return np.zeros((0, self.topics))
+        self.documents += len(documents)
+        gamma, sufficient = self._e_step(documents, statistics=True)
+        rho = (self.tau0 + self.updates) ** -self.kappa
+        self.lam = (1 - rho) * self.lam + rho * (self.eta + self.documents * sufficient / len(documents))
+        self._exp_elog_beta = self._expected_beta()
+        self.updates += 1
+        return gamma / gamma.sum(axis=1, keepdims=True)
+
+    def top_words(self, topic: int, count: int) -> np.ndarray:
+        """
+        The IDs of the topic's `count` most likely words, most likely first.
+        """
+        return np.argsort(-self.lam[topic])[:count]
+
+
+def main_topics(weights: np.ndarray) -> List[Tuple[int, float]]:
+    """
+    The heaviest topics of a row of topic weights, as (topic, weight) pairs: the TOPICS_PER_TRANSCRIPT heaviest
+    that weigh at least MIN_TOPIC_WEIGHT.
+    """
+    heaviest = np.argsort(-weights)[:TOPICS_PER_TRANSCRIPT]
+    return [(int(topic), round(float(weights[topic]), 3)) for topic in heaviest if weights[topic] >= MIN_TOPIC_WEIGHT]
+
+
+class TopicPipeline:
+    """
+    Keeps an online LDA model of the transcript corpus in a directory, and the topics of each transcript folded in.
+
+    - topic_model.npz: The vocabulary, the model, and the title and topics of each transcript folded in (by file
+      ID), written (atomically) after each update.
+    - pending.json: The bags of words of the transcripts waiting for the next update, which is made once there are
+      batch_size of them. A transcript's topics are inferred with the model as it is when the transcript is added,
+      and replaced with those of its update.
+
+    The calls block: call them from a thread in async code. One process updates the model at a time.
+
+    Parameters:
+        directory: The pipeline's directory.
+        topics (int): The number of topics of a new model. A model loaded from the directory keeps its own.
+        batch_size (int): The transcripts of an online update.
+        workers (int): The processes that preprocess a corpus (0: one per core).
+    """
+    def __init__(self, directory, topics: int = TOPICS, batch_size: int = BATCH_SIZE, workers: int = 0):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self.workers = workers
+        self._lock = threading.Lock()
+        self.vocabulary = Vocabulary()
+        self.model = OnlineLDA(topics)
+        # {file_id: {'title': ..., 'topics': [[topic, weight], ...]}}
+        self.transcripts: Dict[str, dict] = {}
+        model_path = self.directory / MODEL_FILE
+        if model_path.exists():
+            with np.load(model_path, allow_pickle=False) as saved:
+                self.vocabulary = Vocabulary(saved['words'].tolist(), saved['document_frequency'].tolist())
+                state = json.loads(str(saved['state']))
+                self.model = OnlineLDA(int(saved['lam'].shape[0]), alpha=state['alpha'], eta=state['eta'], tau0=state['tau0'],
+                                       kappa=state['kappa'], seed=state['updates'], lam=saved['lam'])
+                self.model.updates, self.model.documents = state['updates'], state['documents']
+                self.transcripts = state['transcripts']
+        pending_path = self.directory / PENDING_FILE
+        # [[file_id, title, bag], ...]. Transcripts already in the model were pending when the process stopped.
+        self._pending = [entry for entry in json.loads(pending_path.read_text(encoding='utf-8')) if entry[0] not in self.transcripts] \
+            if pending_path.exists() else []
+
+    @property
+    def trained(self) -> bool:
+        return self.model.updates > 0
+
+    def contains(self, file_id: str = None, title: str = None) -> bool:
+        """
+        Returns whether a transcript with the file ID (or else the title) is folded in or pending.
+        """
+        with self._lock:
+            if file_id is not None:
+                return file_id in self.transcripts or any(entry[0] == file_id for entry in self._pending)
+            return any(entry['title'] == title for entry in self.transcripts.values()) or any(entry[1] == title for entry in self._pending)
+
+    def add(self, file_id: str, title: str, text: str) -> Optional[List[Tuple[int, float]]]:
+        """
+        Adds a transcript, folding the pending transcripts into the model once there are batch_size of them.
+
+        Returns:
+            Optional[List[Tuple[int, float]]]: The transcript's main topics, or None if the model hasn't been
+            trained yet.
+        """
+        bag = tokenize(text)
+        with self._lock:
+            if file_id in self.transcripts:
+                return [tuple(topic) for topic in self.transcripts[file_id]['topics']]
+            self._pending = [entry for entry in self._pending if entry[0] != file_id]
+            self._pending.append([file_id, title, bag])
+            if len(self._pending) >= self.batch_size:
+                self._update_pending(passes=1)
+            else:
+                self._write_pending()
+            if file_id in self.transcripts:
+                return [tuple(topic) for topic in self.transcripts[file_id]['topics']]
+            return self._infer(bag) if self.trained else None
+
+    def fold_in(self, transcripts: Sequence[Tuple[str, str, str]], passes: int = 1) -> Dict[str, List[Tuple[int, float]]]:
+        """
+        Folds a corpus of transcripts, and any pending ones, into the model, in online updates of batch_size
+        transcripts. The transcripts are preprocessed in a process pool. Transcripts already in the model are
+        skipped.
+
+        Parameters:
+            transcripts: (file_id, title, text) of each transcript.
+            passes (int): The passes over the batches. A new model learns its topics better from a few passes
+                over a first corpus; after that, one pass is enough.
+
+        Returns:
+            Dict[str, List[Tuple[int, float]]]: The main topics of the transcripts folded in, by file ID.
+        """
+        with self._lock:
+            transcripts = [transcript for transcript in transcripts if transcript[0] not in self.transcripts]
+        bags = preprocess_texts([text for _, _, text in transcripts], self.workers)
+        with self._lock:
+            folded = {file_id for file_id, _, _ in transcripts} | {entry[0] for entry in self._pending}
+            self._pending = [entry for entry in self._pending if entry[0] not in {file_id for file_id, _, _ in transcripts}]
+            self._pending.extend([file_id, title, bag] for (file_id, title, _), bag in zip(transcripts, bags))
+            self._update_pending(passes)
+            return {file_id: [tuple(topic) for topic in self.transcripts[file_id]['topics']] for file_id in folded}
+
+    def _update_pending(self, passes: int) -> None:
+        documents = self.vocabulary.add_documents([bag for _, _, bag in self._pending])
+        self.model.grow(len(self.vocabulary))
+        for n in range(passes):
+            batches = range(0, len(documents), self.batch_size)
+            if n > 0:
+                # A pass over documents already folded in doesn't add to the corpus size.
+                self.model.documents -= len(documents)
+            for start in batches:
+                weights = self.model.update(documents[start:start + self.batch_size])
+                if n == passes - 1:
+                    for (file_id, title, _), row in zip(self._pending[start:start + self.batch_size], weights):
+                        self.transcripts[file_id] = {'title': title, 'topics': [list(topic) for topic in main_topics(row)]}
+        self._pending = []
+        self._save()
+
+    def _infer(self, bag: Dict[str, int]) -> List[Tuple[int, float]]:
+        return main_topics(self.model.infer([self.vocabulary.to_ids(bag)])[0])
+
+    def topics_of(self, text: str) -> List[Tuple[int, float]]:
+        """
+        The main topics of a text, inferred without adding it to the model.
+        """
+        bag = tokenize(text)
+        with self._lock:
+            return self._infer(bag) if self.trained else []
+
+    def describe(self, words: int = 10) -> List[List[str]]:
+        """
+        The most likely words of each topic.
+        """
+        with self._lock:
+            return [[self.vocabulary.words[word_id] for word_id in self.model.top_words(topic, words) if word_id < len(self.vocabulary)]
+                    for topic in range(self.model.topics)]
+
+    def _save(self) -> None:
+        state = {'alpha': self.model.alpha, 'eta': self.model.eta, 'tau0': self.model.tau0, 'kappa': self.model.kappa,
+                 'updates': self.model.updates, 'documents': self.model.documents, 'transcripts': self.transcripts}
+        buffer = io.BytesIO()
+        np.savez(buffer, lam=self.model.lam, words=np.array(self.vocabulary.words, dtype=str),
+                 document_frequency=np.array(self.vocabulary.document_frequency, dtype=np.int64), state=np.array(json.dumps(state)))
+        _write_atomically(self.directory / MODEL_FILE, buffer.getvalue())
+        self._write_pending()
+
+    def _write_pending(self) -> None:
+        _write_atomically(self.directory / PENDING_FILE, json.dumps(self._pending).encode('utf-8'))
+
+
+def _write_atomically(path: Path, content: bytes) -> None:
+    with tempfile.NamedTemporaryFile(dir=path.parent, prefix=path.name, suffix='.tmp', delete=False) as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(f.name, path)
+
+def topic_model_dir() -> Path:
+    """
+    The topic_model_dir setting, by default topic_model in local_transcript_dir.
+    """
+    settings = get_settings()
+    return Path(settings.topic_model_dir or Path(settings.local_transcript_dir) / 'topic_model')
+
+def open_topic_pipeline(directory=None) -> TopicPipeline:
+    """
+    Opens the topic pipeline in the directory (by default topic_model_dir), with the settings.
+    """
+    settings = get_settings()
+    return TopicPipeline(directory or topic_model_dir(), topics=settings.topic_model_topics,
+                         batch_size=settings.topic_model_batch_size, workers=settings.topic_model_workers)
+
+_pipeline: Optional[TopicPipeline] = None
+_pipeline_configured = False
+_pipeline_lock = threading.Lock()
+
+def get_topic_pipeline() -> Optional[TopicPipeline]:
+    """
+    Returns the process-wide TopicPipeline, or None if the topic_model_enabled setting is off.
+    """
+    global _pipeline, _pipeline_configured # pylint: disable=global-statement
+    with _pipeline_lock:
+        if not _pipeline_configured:
+            if get_settings().topic_model_enabled:
+                _pipeline = open_topic_pipeline()
+            _pipeline_configured = True
+        return _pipeline
+
+def set_topic_pipeline(pipeline: Optional[TopicPipeline]) -> None:
+    """
+    Replaces the process-wide TopicPipeline (None turns topic modelling off).
+    """
+    global _pipeline, _pipeline_configured # pylint: disable=global-statement
+    with _pipeline_lock:
+        _pipeline, _pipeline_configured = pipeline, True
+
+@async_error_handler(error_message='Could not fold the transcript into the topic model.', raise_exception=False)
+async def assign_topics(file_id: str, title: str, text: str) -> Optional[List[Tuple[int, float]]]:
+    """
+    Adds a transcript to the process-wide topic pipeline, if topic modelling is on, and returns its main topics
+    (None until the model has had its first update). A failure is logged, not raised.
+    """
+    pipeline = await asyncio.to_thread(get_topic_pipeline)
+    if pipeline is None:
+        return None
+    return await asyncio.to_thread(pipeline.add, file_id, title, text)
+
+def _workflow_status(description: Optional[str]) -> dict:
+    try:
+        status = json.loads(description or '{}')
+    except ValueError:
+        return {}
+    return status if isinstance(status, dict) else {}
+
+async def write_topics_to_mp3_gfiles(gh, mp3_folder_id: str, topics: Dict[str, List[Tuple[int, float]]]) -> int:
+    """
+    Writes the topics of transcripts into the workflow status of their mp3 gfiles (the gfile whose status has
+    the transcript's ID as transcript_gdrive_id). The statuses are those of the folder listing, so no file is read
+    on its own unless it has changed since.
+
+    Each write is a compare-and-set on the etag listed: a status changed meanwhile (by a job's workflow or a worker's
+    lease) is read again and only the topics are merged into it, so those changes aren't overwritten.
+
+    Returns:
+        int: The number of mp3 gfiles written.
+    """
+    async def _write_topics(gfile: dict) -> bool:
+        description, etag = gfile.get('description'), gfile.get('etag')
+        for _ in range(CAS_ATTEMPTS):
+            status = _workflow_status(description)
+            transcript_topics = topics.get(status.get('transcript_gdrive_id'))
+            if transcript_topics is None or status.get('topics') == [list(topic) for topic in transcript_topics]:
+                return False
+            status['topics'] = transcript_topics
+            try:
+                await gh.update_metadata_if_match(gfile['id'], {'description': json.dumps(status)}, etag)
+                return True
+            except StorageRequestError as e:
+                if e.status_code != PRECONDITION_FAILED:
+                    raise
+            metadata = await gh.get_file_metadata(gfile['id'], ['description', 'etag'])
+            description, etag = metadata.get('description'), metadata['etag']
+        raise StorageRequestError(f"Could not write the topics of gfile {gfile['id']}: the file kept changing.", PRECONDITION_FAILED)
+
+    written = await asyncio.gather(*(_write_topics(gfile) for gfile in await gh.list_files_to_transcribe(mp3_folder_id)))
+    return sum(written)
+
+async def update_from_drive(pipeline: TopicPipeline, gh, transcripts_folder_id: str, mp3_folder_id: str, passes: int = 1,
+                            transcripts: Sequence[Tuple[str, str, str]] = ()) -> Tuple[Dict[str, List[Tuple[int, float]]], int]:
+    """
+    Downloads the transcripts in a Drive folder that aren't in the model yet, folds them (and any others given) into
+    it, and writes their topics into the workflow status of their mp3 gfiles.
+
+    Returns:
+        Tuple[Dict[str, List[Tuple[int, float]]], int]: The topics of the transcripts folded in, by file ID, and the
+        number of mp3 gfiles written.
+    """
+    # pylint: disable=import-outside-toplevel
+    from pydantic_models import GDriveInput
+    transcripts = list(transcripts)
+    with tempfile.TemporaryDirectory() as download_dir:
+        for gfile in await gh.list_files_to_transcribe(transcripts_folder_id):
+            if gfile.get('title', '').endswith('.txt') and not await asyncio.to_thread(pipeline.contains, gfile['id']):
+                local_path = await gh.download_from_gdrive(GDriveInput(gdrive_id=gfile['id']), Path(download_dir))
+                transcripts.append((gfile['id'], gfile['title'], local_path.read_text(encoding='utf-8', errors='replace')))
+                local_path.unlink()
+    topics = await asyncio.to_thread(pipeline.fold_in, transcripts, passes)
+    return topics, await write_topics_to_mp3_gfiles(gh, mp3_folder_id, topics)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fold the transcripts into the topic model, or show its topics.")
+    parser.add_argument('--model', help="The model directory. Defaults to the topic_model_dir setting.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    update_parser = commands.add_parser('update', help="Fold the transcripts not in the model yet into it.")
+    update_parser.add_argument('--local', action='store_true', help="From local_transcript_dir.")
+    update_parser.add_argument('--drive', action='store_true', help="From gdrive_transcripts_folder_id, writing their topics "
+                                                                   "into the workflow status of their mp3 gfiles.")
+    update_parser.add_argument('--passes', type=int, default=1, help="Passes over the transcripts, e.g. 5 for a new model.")
+    update_parser.add_argument('--workers', type=int, help="Preprocessing processes. Defaults to the topic_model_workers setting.")
+    topics_parser = commands.add_parser('topics', help="Show the most likely words of each topic.")
+    topics_parser.add_argument('--words', type=int, default=10)
+    args = parser.parse_args()
+
+    pipeline = open_topic_pipeline(args.model)
+    settings = get_settings()
+    if args.command == 'topics':
+        for topic, words in enumerate(pipeline.describe(args.words)):
+            print(f"{topic:3d}  {' '.join(words)}")
+        return
+    if args.workers is not None:
+        pipeline.workers = args.workers
+    transcripts = []
+    if args.local or not args.drive:
+        transcripts += [(LOCAL_FILE_ID_PREFIX + path.name, path.name, path.read_text(encoding='utf-8', errors='replace'))
+                        for path in sorted(Path(settings.local_transcript_dir).glob('*.txt')) if not pipeline.contains(title=path.name)]
+    if args.drive:
+        from gdrive_helper_code import GDriveHelper # pylint: disable=import-outside-toplevel
+        topics, written = asyncio.run(update_from_drive(pipeline, GDriveHelper(), settings.gdrive_transcripts_folder_id,
+                                                        settings.gdrive_mp3_folder_id, args.passes, transcripts))
+    else:
+        topics, written = pipeline.fold_in(transcripts, passes=args.passes), 0
+    print(f"Folded {len(topics)} transcript(s) into the model ({pipeline.model.documents} in all, {pipeline.model.updates} updates).")
+    if args.drive:
+        print(f"Wrote the topics of {written} mp3 gfile(s).")
+
+
+if __name__ == "__main__":
+    main()
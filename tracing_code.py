@@ -0,0 +1,350 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: Lightweight per-job tracing. Each @async_error_handler-decorated call (and each block run in
+# tracing_span()) is a span with parent/child links, wall and CPU time, and the job ID and file of its
+# job. Spans follow contextvars into executor threads, and span_context() carries them into other
+# processes. Spans are written as JSON lines to a rotating file by a background thread, and the
+# command line turns a file into a per-job timeline or a Chrome trace (a flame chart in chrome://tracing or
+# Perfetto).
+# 
+# Usage: python tracing_code.py traces.jsonl [--job JOB_ID] [--chrome trace.json]
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import argparse
+import contextvars
+import glob
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+
+from env_settings_code import get_settings
+from workflow_tracker_code import WorkflowTracker
+
+# The span running in this context, and the trace (job) it belongs to.
+_current_span = contextvars.ContextVar('current_span', default=None)
+_current_trace = contextvars.ContextVar('current_trace', default=None)
+
+
+class Span:
+    """
+    A timed unit of work in a trace.
+
+    Attributes:
+        name (str): What ran, e.g. 'AudioTranscriber.transcribe_mp3'.
+        trace_id (str): The job the span belongs to.
+        span_id (str): The span's ID.
+        parent_id (Optional[str]): The ID of the span it ran in, or None for the root span of a trace.
+        attributes (dict): The job ID, the file, and anything else set with set_attribute().
+    """
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id', 'attributes', 'start_time', 'wall_seconds',
+                 'cpu_seconds', 'error', 'thread', '_perf_start', '_cpu_start')
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: dict):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.error: Optional[str] = None
+        self.wall_seconds: Optional[float] = None
+        self.cpu_seconds: Optional[float] = None
+        self.thread = threading.current_thread().name
+        self.start_time = time.time()
+        self._perf_start = time.perf_counter()
+        self._cpu_start = time.thread_time()
+
+    def set_attribute(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        """
+        Stops the clocks. The CPU time is that of the thread the span started on: for a coroutine, the event
+        loop's, which includes the other tasks that ran while it was waiting.
+        """
+        self.wall_seconds = time.perf_counter() - self._perf_start
+        self.cpu_seconds = time.thread_time() - self._cpu_start
+        if error is not None:
+            self.error = f"{type(error).__name__}: {str(error).splitlines()[0] if str(error) else ''}"
+
+    def to_dict(self) -> dict:
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start': round(self.start_time, 6),
+            'wall_seconds': round(self.wall_seconds, 6),
+            'cpu_seconds': round(self.cpu_seconds, 6),
+            'thread': self.thread,
+            'error': self.error,
+            'attributes': self.attributes,
+        }
+
+
+class _JsonLine:
+    """
+    A log message that serializes the span when it is written, on the exporter's thread.
+    """
+    __slots__ = ('span',)
+
+    def __init__(self, span: Span):
+        self.span = span
+
+    def __str__(self):
+        return json.dumps(self.span.to_dict(), separators=(',', ':'), default=str)
+
+
+class SpanExporter:
+    """
+    Writes finished spans as JSON lines to a rotating file. Spans are queued, and serialized and written by a
+    background thread, so exporting a span costs the traced code a queue put.
+    """
+    def __init__(self, path: str, max_bytes: int = 50 * 1024 * 1024, backup_count: int = 5):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+        self._handler.setFormatter(logging.Formatter('%(message)s'))
+        self._queue = queue.SimpleQueue()
+        self._listener = logging.handlers.QueueListener(self._queue, self._handler)
+        self._listener.start()
+
+    def export(self, span: Span) -> None:
+        if self._listener is None:
+            return
+        self._queue.put_nowait(logging.makeLogRecord({'msg': _JsonLine(span), 'levelno': logging.INFO, 'levelname': 'INFO'}))
+
+    def close(self) -> None:
+        """
+        Writes the queued spans and closes the file. Spans exported afterwards are dropped.
+        """
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+            self._handler.close()
+
+
+_exporter: Optional[SpanExporter] = None
+_exporter_configured = False
+
+def get_span_exporter() -> Optional[SpanExporter]:
+    """
+    Returns the process-wide SpanExporter, or None if the trace_file setting is empty (tracing is off).
+    """
+    global _exporter, _exporter_configured # pylint: disable=global-statement
+    if not _exporter_configured:
+        settings = get_settings()
+        if settings.trace_file:
+            _exporter = SpanExporter(settings.trace_file, settings.trace_max_bytes, settings.trace_backup_count)
+        _exporter_configured = True
+    return _exporter
+
+def set_span_exporter(exporter: Optional[SpanExporter]) -> None:
+    """
+    Replaces the process-wide SpanExporter (None turns tracing off). Closing the old one is up to the caller.
+    """
+    global _exporter, _exporter_configured # pylint: disable=global-statement
+    _exporter, _exporter_configured = exporter, True
+
+def start_trace(job_id: str, **attributes) -> None:
+    """
+    Starts the trace of a job in the current context: the spans started from here on belong to it and carry its
+    job ID and attributes. Call it at the top of the job's own task, so its trace doesn't leak into other jobs.
+    """
+    _current_trace.set((job_id, {'job_id': job_id, **attributes}))
+    _current_span.set(None)
+
+@contextmanager
+def job_trace(job_id: str, **attributes):
+    """
+    Runs the block as the trace of a job, like start_trace(), then restores the trace and span it ran in. For jobs
+    that run in the task of their caller.
+    """
+    trace_token = _current_trace.set((job_id, {'job_id': job_id, **attributes}))
+    span_token = _current_span.set(None)
+    try:
+        yield
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+
+def span_context() -> Optional[Dict[str, str]]:
+    """
+    Returns:
+        Optional[Dict[str, str]]: The trace and span IDs and the job attributes of the current span, to pass to a
+        process that continues the trace with tracing_span(parent=...), or None if there is no span.
+    """
+    span = _current_span.get()
+    if span is None:
+        return None
+    trace = _current_trace.get()
+    return {'trace_id': span.trace_id, 'span_id': span.span_id, 'attributes': trace[1] if trace else {}}
+
+def start_span(name: str, parent: Optional[dict] = None, **attributes) -> Optional[tuple]:
+    """
+    Starts a span as the child of the current span (or of parent, a span_context() from another process) and
+    makes it the current span. Returns a handle for end_span(), or None if tracing is off.
+    """
+    exporter = get_span_exporter()
+    if exporter is None:
+        return None
+    if parent is not None:
+        trace_id, parent_id, job_attributes = parent['trace_id'], parent['span_id'], dict(parent.get('attributes') or {})
+    else:
+        parent_span = _current_span.get()
+        trace = _current_trace.get()
+        if trace is None:
+            # Work outside a job (e.g. listing files) is a trace of its own.
+            trace = (os.urandom(8).hex(), {})
+        trace_id = parent_span.trace_id if parent_span is not None else trace[0]
+        parent_id = parent_span.span_id if parent_span is not None else None
+        job_attributes = dict(trace[1])
+    span = Span(name, trace_id, parent_id, {**job_attributes, **attributes})
+    return span, _current_span.set(span), exporter
+
+def end_span(handle: Optional[tuple], error: Optional[BaseException] = None) -> None:
+    """
+    Finishes the span started by start_span(), adds the file of the job, exports the span, and makes its parent
+    the current span again.
+    """
+    if handle is None:
+        return
+    span, token, exporter = handle
+    span.finish(error)
+    gfile_id = WorkflowTracker.get('mp3_gfile_id')
+    local_mp3_path = WorkflowTracker.get('local_mp3_path')
+    if gfile_id:
+        span.attributes.setdefault('gfile_id', gfile_id)
+    if local_mp3_path:
+        span.attributes.setdefault('file', os.path.basename(str(local_mp3_path)))
+    try:
+        _current_span.reset(token)
+    except ValueError:
+        # Ended in another context than it started in (e.g. a generator finalized elsewhere).
+        _current_span.set(None)
+    exporter.export(span)
+
+@contextmanager
+def tracing_span(name: str, parent: Optional[dict] = None, **attributes):
+    """
+    Runs the block as a span. Yields the Span, or None if tracing is off.
+    """
+    handle = start_span(name, parent=parent, **attributes)
+    try:
+        yield handle[0] if handle else None
+    except BaseException as e:
+        end_span(handle, e)
+        raise
+    end_span(handle)
+
+
+def load_spans(path: str) -> List[dict]:
+    """
+    Reads the spans of a trace file and its rotated files (path.1, path.2, ...).
+    """
+    spans = []
+    for file_path in sorted(glob.glob(f'{glob.escape(path)}.*'), reverse=True) + [path]:
+        if not os.path.exists(file_path):
+            continue
+        with open(file_path, encoding='utf-8') as trace_file:
+            spans.extend(json.loads(line) for line in trace_file if line.strip())
+    return spans
+
+def job_timeline(spans: Iterable[dict], trace_id: str, width: int = 40) -> str:
+    """
+    Renders the spans of one trace as an indented tree: the start (seconds from the start of the trace), wall and
+    CPU time of each span, and a bar showing where it falls in the trace.
+    """
+    spans = sorted((span for span in spans if span['trace_id'] == trace_id), key=lambda span: span['start'])
+    if not spans:
+        return f"No spans for {trace_id}."
+    trace_start = spans[0]['start']
+    trace_end = max(span['start'] + span['wall_seconds'] for span in spans)
+    scale = width / max(trace_end - trace_start, 1e-9)
+    children: Dict[Optional[str], List[dict]] = {}
+    span_ids = {span['span_id'] for span in spans}
+    for span in spans:
+        parent_id = span['parent_id'] if span['parent_id'] in span_ids else None
+        children.setdefault(parent_id, []).append(span)
+    lines = [f"trace {trace_id}: {trace_end - trace_start:.3f}s"]
+
+    def _render(span: dict, depth: int) -> None:
+        offset = span['start'] - trace_start
+        bar_start = int(offset * scale)
+        bar = ' ' * bar_start + '#' * max(1, int(span['wall_seconds'] * scale))
+        error = f" ERROR {span['error']}" if span.get('error') else ''
+        lines.append(f"{bar:<{width}} |{offset:8.3f}s {span['wall_seconds']:8.3f}s cpu {span['cpu_seconds']:7.3f}s "
+                     f"{'  ' * depth}{span['name']}{error}")
+        for child in children.get(span['span_id'], []):
+            _render(child, depth + 1)
+
+    for root in children.get(None, []):
+        _render(root, 0)
+    return '\n'.join(lines)
+
+def to_chrome_trace(spans: Iterable[dict]) -> dict:
+    """
+    Converts spans to the Chrome trace event format: a complete ('X') event per span, one process per trace and
+    one thread row per thread, which chrome://tracing and Perfetto show as a flame chart.
+    """
+    events = []
+    pids: Dict[str, int] = {}
+    for span in spans:
+        pid = pids.setdefault(span['trace_id'], len(pids) + 1)
+        events.append({'name': span['name'], 'ph': 'X', 'pid': pid, 'tid': span['thread'],
+                       'ts': span['start'] * 1e6, 'dur': span['wall_seconds'] * 1e6,
+                       'args': {**span['attributes'], 'cpu_seconds': span['cpu_seconds'], 'error': span.get('error')}})
+    for trace_id, pid in pids.items():
+        events.append({'name': 'process_name', 'ph': 'M', 'pid': pid, 'args': {'name': f'job {trace_id}'}})
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the spans of a trace file as a per-job timeline.")
+    parser.add_argument('path', help="The trace file (its rotated files are read too).")
+    parser.add_argument('--job', help="The job (trace) ID. Defaults to every job in the file.")
+    parser.add_argument('--chrome', help="Also write the spans as a Chrome trace to this file.")
+    args = parser.parse_args()
+    spans = load_spans(args.path)
+    if args.job:
+        spans = [span for span in spans if span['trace_id'] == args.job]
+    trace_ids = list(dict.fromkeys(span['trace_id'] for span in spans))
+    for trace_id in trace_ids:
+        print(job_timeline(spans, trace_id))
+        print()
+    if args.chrome:
+        with open(args.chrome, 'w', encoding='utf-8') as chrome_file:
+            json.dump(to_chrome_trace(spans), chrome_file)
+
+
+if __name__ == "__main__":
+    main()
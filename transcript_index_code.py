@@ -0,0 +1,363 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: A local full-text search index of the transcripts, kept in an SQLite FTS5 table. A transcript is
+# added when its job reaches TRANSCRIPTION_UPLOAD_COMPLETE, and the index can be backfilled from the
+# local transcript directory or the Drive transcripts folder. Searches return BM25-ranked snippets with
+# the transcript's file ID. There's a CLI and a GET /transcripts/search endpoint in the job service.
+# 
+# Usage: python transcript_index_code.py search "bone meal" [--limit 10]
+#        python transcript_index_code.py backfill [--local] [--drive]
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import argparse
+import asyncio
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Tuple
+
+from env_settings_code import get_settings
+from workflow_error_code import async_error_handler
+
+# The prefix of the file ID of a transcript only found in local_transcript_dir (it has no Drive file ID).
+LOCAL_FILE_ID_PREFIX = 'local:'
+# A match in the title counts this many times as much as one in the text.
+TITLE_WEIGHT = 5.0
+SNIPPET_TOKENS = 16
+# Transcripts are also kept as passages of this many words, so a snippet is made from a passage instead of the whole
+# transcript: making a snippet tokenizes its text again, which takes milliseconds for an hour-long transcript.
+PASSAGE_WORDS = 64
+# The rowid of a transcript's n-th passage is its ID << PASSAGE_ID_BITS | n, so its passages are a rowid range.
+PASSAGE_ID_BITS = 20
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transcripts (
+    id INTEGER PRIMARY KEY,
+    file_id TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    mp3_file_id TEXT,
+    indexed_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS transcripts_title ON transcripts(title);
+CREATE VIRTUAL TABLE IF NOT EXISTS transcript_text USING fts5(title, text, content = '', tokenize = 'porter unicode61', prefix = '3 4');
+CREATE VIRTUAL TABLE IF NOT EXISTS transcript_passages USING fts5(text, tokenize = 'porter unicode61', prefix = '3 4');
+"""
+
+
+class TranscriptHit(NamedTuple):
+    """
+    A transcript matching a search, with a passage where it matches ('snippet', matches within [brackets]).
+    The higher the score (BM25), the better the match.
+    """
+    file_id: str
+    title: str
+    mp3_file_id: Optional[str]
+    score: float
+    snippet: str
+
+
+class TranscriptIndex:
+    """
+    A full-text index of transcripts in an SQLite database, searchable by words, prefixes and phrases and ranked by BM25.
+
+    The transcripts table holds each transcript's file ID, title and mp3 file ID. Two FTS5 tables index the text,
+    tokenized with the Porter stemmer (so 'composting' matches 'compost') and with prefix indexes of 3 and 4 characters,
+    so a prefix search doesn't look through every term it starts:
+    - transcript_text indexes each transcript's title and text as a whole, under the transcript's ID, to rank the
+      transcripts. It is contentless: the text is only stored once, in transcript_passages.
+    - transcript_passages holds the text cut into passages of PASSAGE_WORDS words. The snippet of a hit is made from
+      a passage with all the terms of the query, if there is one, or else any of them.
+
+    The database is in WAL mode, so the CLI can search it while the service adds to it. One connection is shared by
+    the threads of the process, one call at a time. The calls block: call them from a thread in async code.
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.executescript(_SCHEMA)
+
+    def add(self, file_id: str, title: str, text: str, mp3_file_id: Optional[str] = None) -> None:
+        """
+        Adds a transcript, or replaces the transcript indexed under the same file ID.
+        """
+        with self._lock, self._connection:
+            self._remove(file_id)
+            cursor = self._connection.execute("INSERT INTO transcripts (file_id, title, mp3_file_id, indexed_at) VALUES (?, ?, ?, ?)",
+                                              (file_id, title, mp3_file_id, datetime.now(timezone.utc).isoformat()))
+            transcript_id = cursor.lastrowid
+            self._connection.execute("INSERT INTO transcript_text (rowid, title, text) VALUES (?, ?, ?)", (transcript_id, title, text))
+            self._connection.executemany("INSERT INTO transcript_passages (rowid, text) VALUES (?, ?)",
+                                         ((transcript_id << PASSAGE_ID_BITS | n, passage) for n, passage in enumerate(split_passages(text))))
+
+    def remove(self, file_id: str) -> bool:
+        """
+        Removes a transcript from the index. Returns False if it wasn't indexed.
+        """
+        with self._lock, self._connection:
+            return self._remove(file_id)
+
+    def _remove(self, file_id: str) -> bool:
+        row = self._connection.execute("SELECT id, title FROM transcripts WHERE file_id = ?", (file_id,)).fetchone()
+        if row is None:
+            return False
+        transcript_id, title = row
+        first, last = _passage_range(transcript_id)
+        # A contentless table is deleted from with the indexed values, which are the transcript's passages.
+        text = ''.join(passage for passage, in self._connection.execute(
+            "SELECT text FROM transcript_passages WHERE rowid BETWEEN ? AND ? ORDER BY rowid", (first, last)))
+        self._connection.execute("INSERT INTO transcript_text (transcript_text, rowid, title, text) VALUES ('delete', ?, ?, ?)",
+                                 (transcript_id, title, text))
+        self._connection.execute("DELETE FROM transcript_passages WHERE rowid BETWEEN ? AND ?", (first, last))
+        self._connection.execute("DELETE FROM transcripts WHERE id = ?", (transcript_id,))
+        return True
+
+    def contains(self, file_id: str = None, title: str = None) -> bool:
+        """
+        Returns whether a transcript with the file ID (or else the title) is indexed.
+        """
+        column, value = ('file_id', file_id) if file_id is not None else ('title', title)
+        with self._lock:
+            return self._connection.execute(f"SELECT 1 FROM transcripts WHERE {column} = ?", (value,)).fetchone() is not None
+
+    def count(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM transcripts").fetchone()[0]
+
+    def search(self, query: str, limit: int = 10) -> List[TranscriptHit]:
+        """
+        Returns the transcripts that match the query, best first.
+
+        The query is a list of words and "quoted phrases", all of which have to be in the transcript (or its title).
+        A word ending in '*' matches every word it starts. FTS5 operators aren't interpreted, so any text can be
+        searched for.
+
+        Parameters:
+            query (str): E.g. 'compost "bone meal"'.
+            limit (int): The most transcripts returned.
+
+        Returns:
+            List[TranscriptHit]: The matching transcripts, with a snippet of each.
+        """
+        terms = match_terms(query)
+        if not terms:
+            return []
+        with self._lock:
+            ranked = self._connection.execute(
+                "SELECT transcript_text.rowid, bm25(transcript_text, ?, 1.0) AS rank, file_id, transcripts.title, mp3_file_id "
+                "FROM transcript_text JOIN transcripts ON transcripts.id = transcript_text.rowid "
+                "WHERE transcript_text MATCH ? ORDER BY rank LIMIT ?", (TITLE_WEIGHT, ' '.join(terms), limit)).fetchall()
+            return [TranscriptHit(file_id, title, mp3_file_id, -rank, self._snippet(transcript_id, terms))
+                    for transcript_id, rank, file_id, title, mp3_file_id in ranked]
+
+    def _snippet(self, transcript_id: int, terms: List[str]) -> str:
+        first, last = _passage_range(transcript_id)
+        # The first passage with all the terms, or else with any of them (the terms can be in different passages).
+        # Ranking the passages instead would cost a millisecond per hit for common words.
+        expressions = [' '.join(terms), ' OR '.join(terms)] if len(terms) > 1 else terms
+        for expression in expressions:
+            passage = self._connection.execute("SELECT rowid FROM transcript_passages WHERE transcript_passages MATCH ? "
+                                               "AND rowid BETWEEN ? AND ? LIMIT 1", (expression, first, last)).fetchone()
+            if passage:
+                return self._connection.execute(
+                    f"SELECT snippet(transcript_passages, 0, '[', ']', '…', {SNIPPET_TOKENS}) FROM transcript_passages "
+                    f"WHERE transcript_passages MATCH ? AND rowid = ?", (expression, passage[0])).fetchone()[0]
+        # Only the title matched. Show the start of the transcript.
+        row = self._connection.execute("SELECT text FROM transcript_passages WHERE rowid = ?", (first,)).fetchone()
+        words = row[0].split() if row else []
+        return ' '.join(words[:SNIPPET_TOKENS]) + ('…' if len(words) > SNIPPET_TOKENS else '')
+
+    def optimize(self) -> None:
+        """
+        Merges the index's segments, which makes searches faster after many transcripts were added (e.g. a backfill).
+        """
+        with self._lock, self._connection:
+            self._connection.execute("INSERT INTO transcript_text (transcript_text) VALUES ('optimize')")
+            self._connection.execute("INSERT INTO transcript_passages (transcript_passages) VALUES ('optimize')")
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+def _passage_range(transcript_id: int) -> Tuple[int, int]:
+    first = transcript_id << PASSAGE_ID_BITS
+    return first, first + (1 << PASSAGE_ID_BITS) - 1
+
+def split_passages(text: str, words: int = PASSAGE_WORDS) -> List[str]:
+    """
+    Cuts a text into passages of `words` words. The passages joined are the text.
+    """
+    ends = [match.end() for n, match in enumerate(re.finditer(r'\S+\s*', text), 1) if n % words == 0]
+    starts = [0] + ends
+    passages = [text[start:end] for start, end in zip(starts, ends + [len(text)])]
+    return [passage for passage in passages if passage] or ['']
+
+def match_terms(query: str) -> List[str]:
+    """
+    Turns a search query (words, "quoted phrases" and prefixes ending in '*') into FTS5 terms, each quoted so no
+    character of the query can be taken for FTS5 syntax.
+    """
+    terms = []
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', query):
+        term = phrase if phrase else word.strip('"')
+        prefix = not phrase and term.endswith('*')
+        term = term.rstrip('*') if prefix else term
+        if term.strip():
+            terms.append('"' + term.replace('"', '""') + '"' + ('*' if prefix else ''))
+    return terms
+
+def transcript_index_path() -> Path:
+    """
+    The transcript_index_path setting, by default transcript_index.sqlite3 in local_transcript_dir.
+    """
+    settings = get_settings()
+    return Path(settings.transcript_index_path or Path(settings.local_transcript_dir) / 'transcript_index.sqlite3')
+
+_index: Optional[TranscriptIndex] = None
+_index_configured = False
+_index_lock = threading.Lock()
+
+def get_transcript_index() -> Optional[TranscriptIndex]:
+    """
+    Returns the process-wide TranscriptIndex, or None if the transcript_index_enabled setting is off.
+    """
+    global _index, _index_configured # pylint: disable=global-statement
+    with _index_lock:
+        if not _index_configured:
+            if get_settings().transcript_index_enabled:
+                _index = TranscriptIndex(transcript_index_path())
+            _index_configured = True
+        return _index
+
+def set_transcript_index(index: Optional[TranscriptIndex]) -> None:
+    """
+    Replaces the process-wide TranscriptIndex (None turns indexing off). Closing the old one is up to the caller.
+    """
+    global _index, _index_configured # pylint: disable=global-statement
+    with _index_lock:
+        _index, _index_configured = index, True
+
+@async_error_handler(error_message='Could not add the transcript to the search index.', raise_exception=False)
+async def index_transcript(file_id: str, title: str, text: str, mp3_file_id: Optional[str] = None) -> None:
+    """
+    Adds an uploaded transcript to the process-wide index, if indexing is on. A failure is logged, not raised: the
+    transcript is in Drive already, and a backfill can index it later.
+    """
+    index = await asyncio.to_thread(get_transcript_index)
+    if index is not None:
+        await asyncio.to_thread(index.add, file_id, title, text, mp3_file_id)
+
+def backfill_from_directory(index: TranscriptIndex, directory) -> int:
+    """
+    Indexes the transcripts (.txt files) in a directory, e.g. local_transcript_dir, that aren't indexed under their
+    title yet. They have no Drive file ID, so their file ID is 'local:' and the file name. Works with any index with
+    the same add and contains (e.g. a SemanticIndex).
+
+    Returns:
+        int: The number of transcripts added.
+    """
+    added = 0
+    for path in sorted(Path(directory).glob('*.txt')):
+        if not index.contains(title=path.name):
+            index.add(LOCAL_FILE_ID_PREFIX + path.name, path.name, path.read_text(encoding='utf-8', errors='replace'))
+            added += 1
+    return added
+
+async def backfill_from_drive(index: TranscriptIndex, gh, folder_id: str) -> int:
+    """
+    Downloads and indexes the transcripts in a Drive folder (e.g. gdrive_transcripts_folder_id) that aren't indexed
+    under their file ID yet. A transcript indexed from local_transcript_dir under the same title is replaced, since
+    it now has a file ID.
+
+    Parameters:
+        index (TranscriptIndex): The index, or any index with the same add, remove and contains (e.g. a SemanticIndex).
+        gh (GDriveHelper): The Drive helper.
+        folder_id (str): The folder of the transcripts.
+
+    Returns:
+        int: The number of transcripts added.
+    """
+    # pylint: disable=import-outside-toplevel
+    from pydantic_models import GDriveInput
+    added = 0
+    gfiles = await gh.list_files_to_transcribe(folder_id)
+    with tempfile.TemporaryDirectory() as download_dir:
+        for gfile in gfiles:
+            if not gfile.get('title', '').endswith('.txt') or await asyncio.to_thread(index.contains, gfile['id']):
+                continue
+            local_path = await gh.download_from_gdrive(GDriveInput(gdrive_id=gfile['id']), Path(download_dir))
+            text = local_path.read_text(encoding='utf-8', errors='replace')
+            local_path.unlink()
+            await asyncio.to_thread(index.remove, LOCAL_FILE_ID_PREFIX + gfile['title'])
+            await asyncio.to_thread(index.add, gfile['id'], gfile['title'], text)
+            added += 1
+    return added
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search the transcripts, or backfill their search index.")
+    parser.add_argument('--index', help="The index database. Defaults to the transcript_index_path setting.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    search_parser = commands.add_parser('search', help="Search the transcripts.")
+    search_parser.add_argument('query', help='Words and "quoted phrases", all of which have to match.')
+    search_parser.add_argument('--limit', type=int, default=10)
+    backfill_parser = commands.add_parser('backfill', help="Index the transcripts not indexed yet.")
+    backfill_parser.add_argument('--local', action='store_true', help="From local_transcript_dir.")
+    backfill_parser.add_argument('--drive', action='store_true', help="From gdrive_transcripts_folder_id.")
+    args = parser.parse_args()
+
+    index = TranscriptIndex(args.index or transcript_index_path())
+    try:
+        if args.command == 'search':
+            started = time.perf_counter()
+            hits = index.search(args.query, args.limit)
+            print(f"{len(hits)} transcript(s) in {(time.perf_counter() - started) * 1000:.1f} ms")
+            for hit in hits:
+                print(f"\n{hit.score:6.2f}  {hit.title}  ({hit.file_id})\n        {hit.snippet}")
+        else:
+            settings = get_settings()
+            if args.local or not args.drive:
+                print(f"Indexed {backfill_from_directory(index, settings.local_transcript_dir)} local transcript(s).")
+            if args.drive:
+                from gdrive_helper_code import GDriveHelper # pylint: disable=import-outside-toplevel
+                added = asyncio.run(backfill_from_drive(index, GDriveHelper(), settings.gdrive_transcripts_folder_id))
+                print(f"Indexed {added} Drive transcript(s).")
+            index.optimize()
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
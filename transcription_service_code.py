@@ -0,0 +1,728 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: The transcription_service module is the HTTP front end of the AudioTranscriber. A job (an uploaded
+# mp3 file or a GDrive ID) is accepted with 202 and a job ID straight away, and is transcribed by a
+# bounded pool of background workers. The job's WorkflowTrackerModel can be polled, or followed as a
+# Server-Sent-Events stream. Submissions are refused with 429 when the queue is full. Live audio can be
+# streamed to the /live WebSocket, which sends back interim and final text as it is spoken.
+# Run with: uvicorn transcription_service_code:app
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import asyncio
+import collections
+import json
+import shutil
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import ValidationError
+
+from audio_duration_code import mp3_file_duration_seconds
+from audio_transcriber_code import AudioTranscriber
+from env_settings_code import get_settings
+from gdrive_helper_code import GDriveHelper
+from live_transcriber_code import (OPUS, PCM_S16LE, SAMPLE_RATE, FFmpegAudioDecoder, LiveTranscriptionSession,
+                                   WhisperModelPool, get_model_pool, pcm_s16le_to_float32, pipeline_decoder)
+from job_scheduler_code import (BacklogFullError, ShortestJobFirstScheduler, estimate_gfile_audio_seconds,
+                                get_inference_load, get_real_time_factor_tracker)
+from logger_code import LoggerBase
+from metrics_code import get_metrics_registry
+from mp3_ingest_code import ingest_upload_file, upload_file_size
+from pydantic_models import GDriveInput, LocalMP3Input, MIN_MP3_FILE_SIZE, validate_upload_file
+from profiling_code import profile_job
+from storage_backend_code import StorageRequestError
+from tracing_code import start_trace
+from transcript_index_code import get_transcript_index, index_transcript
+from semantic_index_code import embed_transcript, get_semantic_index
+from topic_model_code import assign_topics
+from workflow_tracker_code import AUDIO_QUALITY_MAP, COMPUTE_TYPE_MAP, WorkflowTracker, WorkflowTrackerModel
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_SUCCEEDED = 'succeeded'
+JOB_FAILED = 'failed'
+
+# The duration assumed for an mp3 file whose duration can't be estimated.
+UNKNOWN_AUDIO_SECONDS = 3600
+# An SSE comment is sent after this many seconds without events, so proxies don't close an idle stream.
+SSE_KEEPALIVE_SECONDS = 15.0
+# WebSocket close codes: unsupported data (a bad parameter), internal error, and try again later (too many sessions).
+WS_UNSUPPORTED_DATA = 1003
+WS_INTERNAL_ERROR = 1011
+WS_TRY_AGAIN_LATER = 1013
+# The content type of the Prometheus text format.
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# The WorkflowTrackerModel fields that make up a status event.
+STATUS_EVENT_FIELDS = ('status', 'comment', 'upload_progress')
+
+
+class QueueFullError(Exception):
+    """
+    Raised when a job is submitted while the queue is full.
+
+    Attributes:
+        retry_after (float): Roughly how many seconds until there is room.
+    """
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TranscriptionJob:
+    """
+    A job submitted to the TranscriptionJobService, and the events it has published.
+
+    Events are (event, data) tuples:
+        - ('state', {'state': ..., 'error': ...}): The job was queued, started, succeeded or failed.
+        - ('status', {'status': ..., 'comment': ..., 'upload_progress': ...}): The WorkflowTrackerModel's status changed.
+        - ('text', {'text': ...}): The transcript text.
+
+    Attributes:
+        job_id (str): The job's ID.
+        input_mp3 (Union[GDriveInput, LocalMP3Input]): The mp3 file to transcribe.
+        audio_quality (str), compute_type (str), deadline_seconds (Optional[float]): Passed to AudioTranscriber.transcribe().
+        state (str): JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED or JOB_FAILED.
+        workflow (Optional[WorkflowTrackerModel]): The job's workflow state, once it has started.
+        text (Optional[str]): The transcript, once the job has succeeded.
+        error (Optional[str]): Why the job failed.
+        staging_dir (Optional[Path]): The directory an uploaded mp3 file was copied to.
+        profile (bool): Whether the job was submitted with profile=true (see profiling_code).
+        profile_dir (Optional[Path]): Where the job's profiles were written, if it was profiled.
+        requesters (int): The number of requests the job answers: 1, plus the requests coalesced into it.
+    """
+    def __init__(self, job_id: str, input_mp3, audio_quality: str = "default", compute_type: str = "default",
+                 deadline_seconds: Optional[float] = None, staging_dir: Optional[Path] = None, profile: bool = False):
+        self.job_id = job_id
+        self.input_mp3 = input_mp3
+        self.audio_quality = audio_quality
+        self.compute_type = compute_type
+        self.deadline_seconds = deadline_seconds
+        self.staging_dir = staging_dir
+        self.profile = profile
+        self.profile_dir: Optional[Path] = None
+        self.state = JOB_QUEUED
+        self.submitted_at = datetime.now(timezone.utc)
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.workflow: Optional[WorkflowTrackerModel] = None
+        self.text: Optional[str] = None
+        self.error: Optional[str] = None
+        self.events: List[Tuple[str, dict]] = []
+        self.requesters = 1
+        # Resolved, and replaced by a new future, whenever an event is published.
+        self._next_event = asyncio.get_running_loop().create_future()
+        self._last_status = None
+        self.publish('state', {'state': JOB_QUEUED})
+
+    @property
+    def finished(self) -> bool:
+        return self.state in (JOB_SUCCEEDED, JOB_FAILED)
+
+    def publish(self, event: str, data: dict) -> None:
+        self.events.append((event, data))
+        next_event, self._next_event = self._next_event, asyncio.get_running_loop().create_future()
+        next_event.set_result(None)
+
+    def set_state(self, state: str, error: Optional[str] = None) -> None:
+        self.state = state
+        self.error = error
+        now = datetime.now(timezone.utc)
+        if state == JOB_RUNNING:
+            self.started_at = now
+        elif self.finished:
+            self.finished_at = now
+        self.publish('state', {'state': state, 'error': error} if error else {'state': state})
+
+    def on_workflow_update(self, model: WorkflowTrackerModel, updated: dict) -> None:
+        """
+        The WorkflowTracker listener of the job. Publishes a status event when the status, comment or upload progress changed.
+        """
+        if model.status is None or not any(field in updated for field in STATUS_EVENT_FIELDS):
+            return
+        status = {field: getattr(model, field) for field in STATUS_EVENT_FIELDS}
+        if status != self._last_status:
+            self._last_status = status
+            self.publish('status', status)
+
+    async def wait(self) -> str:
+        """
+        Waits for the job to finish.
+
+        Returns:
+            str: The transcript.
+
+        Raises:
+            RuntimeError: If the job failed.
+        """
+        while not self.finished:
+            # shield: the other waiters and streams share the future.
+            await asyncio.shield(self._next_event)
+        if self.state == JOB_FAILED:
+            raise RuntimeError(f"Job {self.job_id} failed: {self.error}")
+        return self.text
+
+    async def stream(self, keepalive_seconds: float = SSE_KEEPALIVE_SECONDS) -> AsyncIterator[Optional[Tuple[str, dict]]]:
+        """
+        Yields the events published so far, then each new event until the job has finished. Yields None when there
+        was no event for keepalive_seconds.
+        """
+        sent = 0
+        while True:
+            while sent < len(self.events):
+                yield self.events[sent]
+                sent += 1
+            if self.finished:
+                return
+            try:
+                # shield: a timeout must not cancel the future the other streams are waiting on.
+                await asyncio.wait_for(asyncio.shield(self._next_event), keepalive_seconds)
+            except asyncio.TimeoutError:
+                yield None
+
+    def describe(self) -> dict:
+        return {
+            'job_id': self.job_id,
+            'state': self.state,
+            'submitted_at': self.submitted_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'error': self.error,
+            'text': self.text,
+            'requesters': self.requesters,
+            'profile_dir': str(self.profile_dir) if self.profile_dir else None,
+            'workflow': self.workflow.model_dump(mode='json') if self.workflow else None,
+        }
+
+
+class TranscriptionJobService:
+    """
+    Runs transcription jobs on a bounded pool of background workers.
+
+    The waiting jobs are ordered by a ShortestJobFirstScheduler, like the batch transcriber's: the job with the least
+    estimated processing time (with aging) runs next. Admission control refuses a job (QueueFullError) when
+    max_queued_jobs jobs are waiting, or when the estimated processing time of the waiting and running jobs would
+    go over max_backlog_seconds.
+
+    Requests for audio that is already being transcribed are coalesced (single-flight): a request for the same
+    GDrive file, or for an upload with the same content (sha256), and the same transcription options as a waiting
+    or running job gets that job back instead of a new one. The requesters share the job's transcript and event
+    stream. Once the job has finished, a new request starts a new job.
+
+    Each job runs in its own asyncio task with its own WorkflowTrackerModel (WorkflowTracker.start_job()), so the
+    workers don't overwrite each other's workflow state. Each worker has its own AudioTranscriber.
+
+    Attributes:
+        workers (int): The number of jobs run at a time.
+        max_queued_jobs (int): The number of jobs that can wait.
+        job_retention (int): The number of finished jobs kept for lookup.
+        scheduler (ShortestJobFirstScheduler): The waiting and running jobs.
+        coalesced (int): The number of requests that were answered by a job already in flight.
+    """
+    def __init__(self, workers: int = 1, max_queued_jobs: int = 100, max_backlog_seconds: Optional[float] = None,
+                 aging_factor: float = 1.0, job_retention: int = 1000):
+        self.workers = workers
+        self.max_queued_jobs = max_queued_jobs
+        self.job_retention = job_retention
+        self.scheduler = ShortestJobFirstScheduler(max_backlog_seconds=max_backlog_seconds, aging_factor=aging_factor)
+        self.logger = LoggerBase.setup_logger('TranscriptionJobService')
+        self._jobs: Dict[str, TranscriptionJob] = {}
+        self._finished_job_ids = collections.deque()
+        # The waiting and running jobs, by coalescing key (see _coalescing_key()).
+        self._in_flight: Dict[Tuple[str, str], TranscriptionJob] = {}
+        self.coalesced = 0
+        self._worker_tasks: List[asyncio.Task] = []
+        self._work_available: Optional[asyncio.Event] = None
+        self._gh: Optional[GDriveHelper] = None
+
+    @classmethod
+    def from_settings(cls) -> 'TranscriptionJobService':
+        """
+        Creates the service from the 'service_*' and 'job_*' settings.
+        """
+        settings = get_settings()
+        return cls(workers=settings.service_workers, max_queued_jobs=settings.service_max_queued_jobs,
+                   max_backlog_seconds=settings.job_max_backlog_seconds, aging_factor=settings.job_aging_factor,
+                   job_retention=settings.service_job_retention)
+
+    async def start(self) -> None:
+        self._work_available = asyncio.Event()
+        self._gh = GDriveHelper()
+        self._worker_tasks = [asyncio.create_task(self._worker(), name=f'transcription-worker-{n}') for n in range(self.workers)]
+        self._register_metrics()
+        self.logger.info(f"Started {self.workers} transcription workers.")
+
+    def _register_metrics(self) -> None:
+        registry = get_metrics_registry()
+        registry.gauge('transcription_jobs_waiting', "Jobs waiting for a worker.", callback=lambda: self.scheduler.stats()['waiting'])
+        registry.gauge('transcription_jobs_running', "Jobs being transcribed.", callback=lambda: self.scheduler.stats()['running'])
+        registry.gauge('transcription_backlog_seconds', "Estimated processing seconds of the waiting and running jobs.",
+                       callback=lambda: self.scheduler.backlog_seconds)
+        registry.gauge('transcriber_inference_backlog_seconds', "Estimated seconds of inference left on this host.",
+                       callback=lambda: get_inference_load().remaining_seconds())
+        registry.counter('transcription_jobs_rejected_total', "Jobs refused by admission control.",
+                         callback=lambda: self.scheduler.rejected)
+        registry.counter('transcription_requests_coalesced_total', "Requests answered by a job already in flight.",
+                         callback=lambda: self.coalesced)
+
+    async def stop(self) -> None:
+        """
+        Cancels the workers, and with them the running jobs. Waiting jobs are dropped.
+        """
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+    def get_job(self, job_id: str) -> Optional[TranscriptionJob]:
+        return self._jobs.get(job_id)
+
+    def stats(self) -> dict:
+        return {'workers': self.workers, 'max_queued_jobs': self.max_queued_jobs, 'in_flight': len(self._in_flight),
+                'coalesced': self.coalesced, **self.scheduler.stats()}
+
+    async def submit_upload(self, upload_file: UploadFile, audio_quality: str = "default", compute_type: str = "default",
+                            deadline_seconds: Optional[float] = None, profile: bool = False) -> TranscriptionJob:
+        """
+        Copies an uploaded mp3 file to local_mp3_dir/jobs/<job ID> and queues a job for it. The copy is made before
+        returning, since the upload is closed when the request ends. If a job for the same content is in flight, the
+        copy is removed and that job is returned.
+
+        Raises:
+            QueueFullError: If the queue is full.
+            ValueError: If the file isn't an mp3 file of an accepted size.
+        """
+        self._check_queue_depth()
+        await validate_upload_file(upload_file)
+        settings = get_settings()
+        job_id = uuid.uuid4().hex
+        staging_dir = Path(settings.local_mp3_dir) / 'jobs' / job_id
+        staging_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            ingested_mp3 = await ingest_upload_file(upload_file, staging_dir / Path(upload_file.filename).name,
+                                                    min_size=MIN_MP3_FILE_SIZE, max_size=settings.max_upload_mp3_bytes,
+                                                    chunk_size=settings.upload_copy_chunk_size)
+            key = _coalescing_key(f'sha256:{ingested_mp3.sha256}', audio_quality, compute_type, deadline_seconds)
+            in_flight_job = self._coalesce(key)
+            if in_flight_job is not None:
+                shutil.rmtree(staging_dir, ignore_errors=True)
+                return in_flight_job
+            audio_seconds = await asyncio.to_thread(mp3_file_duration_seconds, ingested_mp3.path)
+            # An upload of the same content may have been admitted while the duration was read.
+            in_flight_job = self._coalesce(key)
+            if in_flight_job is not None:
+                shutil.rmtree(staging_dir, ignore_errors=True)
+                return in_flight_job
+            job = TranscriptionJob(job_id, LocalMP3Input(path=ingested_mp3.path, sha256=ingested_mp3.sha256),
+                                   audio_quality, compute_type, deadline_seconds, staging_dir=staging_dir, profile=profile)
+            self._admit(job, audio_seconds, key)
+        except BaseException:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
+        return job
+
+    async def submit_gdrive(self, gdrive_input: GDriveInput, audio_quality: str = "default", compute_type: str = "default",
+                            deadline_seconds: Optional[float] = None, profile: bool = False) -> TranscriptionJob:
+        """
+        Queues a job for an mp3 file in storage, or returns the job for it that is in flight.
+
+        Raises:
+            QueueFullError: If the queue is full.
+            StorageRequestError: If the file can't be found (status_code 404).
+        """
+        key = _coalescing_key(f'gdrive:{gdrive_input.gdrive_id}', audio_quality, compute_type, deadline_seconds)
+        in_flight_job = self._coalesce(key)
+        if in_flight_job is not None:
+            return in_flight_job
+        self._check_queue_depth()
+        g_file = await self._gh.get_file_metadata(gdrive_input.gdrive_id, ['id', 'title', 'fileSize'])
+        audio_seconds = await estimate_gfile_audio_seconds(self._gh, g_file)
+        # A request for the same file may have been admitted while the metadata was read.
+        in_flight_job = self._coalesce(key)
+        if in_flight_job is not None:
+            return in_flight_job
+        job = TranscriptionJob(uuid.uuid4().hex, gdrive_input, audio_quality, compute_type, deadline_seconds, profile=profile)
+        self._admit(job, audio_seconds, key)
+        return job
+
+    def _coalesce(self, key: Tuple[str, str]) -> Optional[TranscriptionJob]:
+        """
+        Returns the job in flight for the key, counting the request as one more of its requesters, or None.
+        """
+        job = self._in_flight.get(key)
+        if job is None:
+            return None
+        job.requesters += 1
+        self.coalesced += 1
+        self.logger.info(f"Coalesced a request for {key[0]} into job {job.job_id} ({job.requesters} requesters).")
+        return job
+
+    def _check_queue_depth(self) -> None:
+        if len(self.scheduler) >= self.max_queued_jobs:
+            self.scheduler.rejected += 1
+            raise QueueFullError(f"{len(self.scheduler)} jobs are waiting, the most allowed.",
+                                 retry_after=self.scheduler.backlog_seconds / max(1, self.workers))
+
+    def _admit(self, job: TranscriptionJob, audio_seconds: Optional[float], key: Tuple[str, str]) -> None:
+        """
+        Estimates the job's processing time and hands it to the scheduler. The job is in flight for the key until
+        it has finished.
+        """
+        compute_type = 'float32' if job.compute_type == 'float32' else 'float16'
+        cost_seconds = get_real_time_factor_tracker().estimate_seconds(audio_seconds or UNKNOWN_AUDIO_SECONDS,
+                                                                       AUDIO_QUALITY_MAP[job.audio_quality], compute_type)
+        if job.deadline_seconds is not None:
+            # A model fast enough for the deadline is picked when the job starts.
+            cost_seconds = min(cost_seconds, job.deadline_seconds)
+        self._check_queue_depth()
+        try:
+            self.scheduler.submit(job.job_id, job, cost_seconds)
+        except BacklogFullError as e:
+            raise QueueFullError(str(e), retry_after=e.retry_after) from e
+        self._jobs[job.job_id] = job
+        self._in_flight[key] = job
+        self._work_available.set()
+        self.logger.info(f"Queued job {job.job_id} (estimated processing: {cost_seconds:.0f}s). {self.scheduler.stats()}")
+
+    async def _worker(self) -> None:
+        transcriber = AudioTranscriber()
+        while True:
+            scheduled_job = self.scheduler.next_job()
+            if scheduled_job is None:
+                self._work_available.clear()
+                await self._work_available.wait()
+                continue
+            try:
+                # A task of its own gives the job a fresh context for its WorkflowTracker state.
+                await asyncio.create_task(self._run_job(scheduled_job.payload, transcriber))
+            finally:
+                self.scheduler.job_done(scheduled_job)
+                self._retire(scheduled_job.payload)
+
+    async def _run_job(self, job: TranscriptionJob, transcriber: AudioTranscriber) -> None:
+        job.workflow = WorkflowTracker.start_job(listener=job.on_workflow_update)
+        start_trace(job.job_id)
+        job.set_state(JOB_RUNNING)
+        try:
+            with profile_job(job.job_id, requested=job.profile) as profiler:
+                job.profile_dir = profiler.directory if profiler else None
+                text = await transcriber.transcribe(input_mp3=job.input_mp3, audio_quality=job.audio_quality,
+                                                    compute_type=job.compute_type, deadline_seconds=job.deadline_seconds)
+        except Exception as e: # pylint: disable=broad-exception-caught
+            # The error handlers have logged the details. The first line says what went wrong.
+            job.set_state(JOB_FAILED, error=str(e).split('\nTraceback')[0])
+        else:
+            job.text = text
+            job.publish('text', {'text': text})
+            job.set_state(JOB_SUCCEEDED)
+        finally:
+            get_metrics_registry().counter('transcription_jobs_total', "Jobs finished, by outcome.", ('state',)).inc(state=job.state)
+            if job.staging_dir:
+                settings = get_settings()
+                await asyncio.to_thread(_clear_staging_dir, job.staging_dir,
+                                        None if settings.remove_temp_mp3 else Path(settings.local_mp3_dir))
+
+    def _retire(self, job: TranscriptionJob) -> None:
+        """
+        Takes the job out of flight, and keeps the last job_retention finished jobs.
+        """
+        for key, in_flight_job in list(self._in_flight.items()):
+            if in_flight_job is job:
+                del self._in_flight[key]
+        self._finished_job_ids.append(job.job_id)
+        while len(self._finished_job_ids) > self.job_retention:
+            self._jobs.pop(self._finished_job_ids.popleft(), None)
+
+
+def _clear_staging_dir(staging_dir: Path, local_mp3_dir: Optional[Path]) -> None:
+    """
+    Removes the staging directory of a finished job. If local_mp3_dir is given (remove_temp_mp3 is off), the mp3
+    file the workflow left there is moved to local_mp3_dir first, where the mp3 files of the other jobs are kept.
+    It is prefixed with the job ID if local_mp3_dir has a file of that name already.
+    """
+    if local_mp3_dir is not None:
+        for mp3_path in staging_dir.glob('*'):
+            kept_path = local_mp3_dir / mp3_path.name
+            if kept_path.exists():
+                kept_path = local_mp3_dir / f'{staging_dir.name}_{mp3_path.name}'
+            shutil.move(str(mp3_path), str(kept_path))
+    shutil.rmtree(staging_dir, ignore_errors=True)
+
+def _coalescing_key(source: str, audio_quality: str, compute_type: str, deadline_seconds: Optional[float]) -> Tuple[str, str]:
+    """
+    The key requests are coalesced by: the audio, and the options that change the transcript. With a deadline the
+    model is picked when the job starts, so requests with a deadline are only coalesced with each other.
+    """
+    options = f'deadline:{deadline_seconds}' if deadline_seconds is not None else f'{audio_quality}/{compute_type}'
+    return source, options
+
+def _format_sse(event: Optional[Tuple[str, dict]]) -> str:
+    if event is None:
+        return ": keep-alive\n\n"
+    name, data = event
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+
+def create_app(service: Optional[TranscriptionJobService] = None, model_pool: Optional[WhisperModelPool] = None) -> FastAPI:
+    """
+    Creates the FastAPI app of the job service.
+
+    Endpoints:
+        POST /jobs: Submits a job, given either an mp3 file ('file') or a GDrive ID ('gdrive_id'), and optionally
+            'audio_quality', 'compute_type', 'deadline_seconds' and 'profile' (profile the job, see profiling_code).
+            Returns 202 with the job ID and the URLs below, or 429 with a Retry-After header when the queue is full.
+        GET /jobs/{job_id}: The job's state, transcript and WorkflowTrackerModel.
+        GET /jobs/{job_id}/events: A Server-Sent-Events stream of the job's events (see TranscriptionJob), from the
+            first. It ends when the job has finished.
+        GET /stats: The worker pool and queue statistics.
+        GET /metrics: The metrics of the process (see metrics_code) in the Prometheus text format.
+        GET /transcripts/search?q=...&limit=10: The transcripts matching the words and "quoted phrases" of q, best
+            first (BM25), with the file ID and a snippet of each (see transcript_index_code). 503 if indexing is off.
+        GET /transcripts/semantic-search?q=...&limit=10: The transcript chunks most similar in meaning to q, by cosine
+            similarity of their embeddings (see semantic_index_code). 503 if semantic_index_enabled is off.
+        WebSocket /live: Live transcription. See live_session().
+
+    Parameters:
+        service (TranscriptionJobService): Optional. By default the service is created from the settings when the app starts.
+        model_pool (WhisperModelPool): Optional. The models of the live sessions. By default the process-wide pool.
+    """
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        settings = get_settings()
+        app.state.service = service or TranscriptionJobService.from_settings()
+        app.state.model_pool = model_pool or get_model_pool()
+        app.state.live_sessions = 0
+        await app.state.service.start()
+        preload = None
+        if settings.live_preload_model:
+            preload = asyncio.create_task(app.state.model_pool.warm_up(AUDIO_QUALITY_MAP[settings.live_audio_quality], _live_compute_type()))
+        try:
+            yield
+        finally:
+            if preload:
+                preload.cancel()
+            await app.state.service.stop()
+
+    app = FastAPI(title="Audio Transcriber", lifespan=lifespan)
+
+    def _get_job(request: Request, job_id: str) -> TranscriptionJob:
+        job = request.app.state.service.get_job(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Job {job_id} not found.")
+        return job
+
+    @app.post("/jobs", status_code=202)
+    async def submit_job(request: Request, file: Optional[UploadFile] = File(None), gdrive_id: Optional[str] = Form(None),
+                         audio_quality: str = Form("default"), compute_type: str = Form("default"),
+                         deadline_seconds: Optional[float] = Form(None), profile: bool = Form(False)):
+        job_service = request.app.state.service
+        if (file is None) == (gdrive_id is None):
+            raise HTTPException(status_code=422, detail="Send either an mp3 file or a gdrive_id.")
+        if audio_quality not in AUDIO_QUALITY_MAP:
+            raise HTTPException(status_code=422, detail=f"{audio_quality} is not a valid audio quality.")
+        if compute_type not in COMPUTE_TYPE_MAP:
+            raise HTTPException(status_code=422, detail=f"{compute_type} is not a valid compute type.")
+        options = {'audio_quality': audio_quality, 'compute_type': compute_type, 'deadline_seconds': deadline_seconds,
+                   'profile': profile}
+        try:
+            if file is not None:
+                if upload_file_size(file) > get_settings().max_upload_mp3_bytes:
+                    raise HTTPException(status_code=413, detail="The mp3 file is too large.")
+                job = await job_service.submit_upload(file, **options)
+            else:
+                job = await job_service.submit_gdrive(GDriveInput(gdrive_id=gdrive_id), **options)
+        except QueueFullError as e:
+            return JSONResponse(status_code=429, content={'detail': str(e)},
+                                headers={'Retry-After': str(max(1, round(e.retry_after)))})
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=f"Not a valid GDrive ID: {gdrive_id}") from e
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e)) from e
+        except StorageRequestError as e:
+            if e.status_code == 404:
+                raise HTTPException(status_code=404, detail=f"GDrive file {gdrive_id} not found.") from e
+            raise
+        return {
+            'job_id': job.job_id,
+            'state': job.state,
+            'coalesced': job.requesters > 1,
+            'status_url': str(request.url_for('get_job', job_id=job.job_id)),
+            'events_url': str(request.url_for('stream_job_events', job_id=job.job_id)),
+        }
+
+    @app.get("/jobs/{job_id}")
+    async def get_job(request: Request, job_id: str):
+        return _get_job(request, job_id).describe()
+
+    @app.get("/jobs/{job_id}/events")
+    async def stream_job_events(request: Request, job_id: str):
+        job = _get_job(request, job_id)
+        async def _events():
+            async for event in job.stream():
+                yield _format_sse(event)
+        return StreamingResponse(_events(), media_type="text/event-stream",
+                                 headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    @app.get("/stats")
+    async def get_stats(request: Request):
+        return request.app.state.service.stats()
+
+    @app.get("/metrics")
+    async def get_metrics():
+        return PlainTextResponse(get_metrics_registry().render_prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+    @app.get("/transcripts/search")
+    async def search_transcripts(q: str, limit: int = 10):
+        index = await asyncio.to_thread(get_transcript_index)
+        if index is None:
+            raise HTTPException(status_code=503, detail="The transcript index is turned off (transcript_index_enabled).")
+        started = time.perf_counter()
+        hits = await asyncio.to_thread(index.search, q, max(1, min(limit, 100)))
+        return {'query': q, 'took_ms': round((time.perf_counter() - started) * 1000, 3),
+                'hits': [hit._asdict() for hit in hits]}
+
+    @app.get("/transcripts/semantic-search")
+    async def semantic_search_transcripts(q: str, limit: int = 10):
+        index = await asyncio.to_thread(get_semantic_index)
+        if index is None:
+            raise HTTPException(status_code=503, detail="The semantic index is turned off (semantic_index_enabled).")
+        started = time.perf_counter()
+        hits = await asyncio.to_thread(index.search, q, max(1, min(limit, 100)))
+        return {'query': q, 'took_ms': round((time.perf_counter() - started) * 1000, 3),
+                'hits': [hit._asdict() for hit in hits]}
+
+    @app.websocket("/live")
+    async def live_session(websocket: WebSocket, encoding: str = PCM_S16LE, sample_rate: int = SAMPLE_RATE,
+                           audio_quality: Optional[str] = None, title: Optional[str] = None):
+        """
+        Transcribes audio while it is captured.
+
+        The client sends the audio as binary messages: 16-bit little-endian mono PCM at sample_rate
+        (encoding=pcm_s16le), or Opus in WebM or Ogg as a browser's MediaRecorder produces it (encoding=opus, needs
+        ffmpeg). The server sends JSON messages: 'interim' text that is replaced by the next message, and 'final'
+        segments (see LiveTranscriptionSession). The client ends the stream by sending {"type": "end"} or by
+        closing the socket. The rest of the audio is then finalized, and the transcript is uploaded to the
+        transcripts folder as <title>.txt. If the socket is still open, a 'transcript' message with the text and
+        its GDrive ID follows, and the server closes the socket.
+        """
+        settings = get_settings()
+        audio_quality = audio_quality or settings.live_audio_quality
+        await websocket.accept()
+        if encoding not in (PCM_S16LE, OPUS) or audio_quality not in AUDIO_QUALITY_MAP:
+            await websocket.close(code=WS_UNSUPPORTED_DATA, reason=f"Unsupported encoding {encoding} or audio quality {audio_quality}.")
+            return
+        if encoding == OPUS and not FFmpegAudioDecoder.available():
+            await websocket.close(code=WS_UNSUPPORTED_DATA, reason="Opus audio needs ffmpeg, which isn't installed. Send PCM.")
+            return
+        if websocket.app.state.live_sessions >= settings.live_max_sessions:
+            await websocket.close(code=WS_TRY_AGAIN_LATER, reason="Too many live sessions.")
+            return
+        websocket.app.state.live_sessions += 1
+        try:
+            await _run_live_session(websocket, encoding, sample_rate, AUDIO_QUALITY_MAP[audio_quality],
+                                    title or f"live_{datetime.now(timezone.utc):%Y%m%d_%H%M%S}")
+        finally:
+            websocket.app.state.live_sessions -= 1
+
+    return app
+
+
+def _live_compute_type():
+    # float16 is slow or unsupported on CPUs.
+    import torch # pylint: disable=import-outside-toplevel
+    return "float16" if torch.cuda.is_available() else "float32"
+
+
+async def _run_live_session(websocket: WebSocket, encoding: str, sample_rate: int, model_name: str, title: str) -> None:
+    settings = get_settings()
+    logger = LoggerBase.setup_logger('LiveSession')
+    # A WorkflowTrackerModel of its own, so the session doesn't touch the state of the jobs.
+    WorkflowTracker.start_job()
+    connected = True
+
+    async def _send(message: dict) -> None:
+        nonlocal connected
+        if connected:
+            try:
+                await websocket.send_json(message)
+            except (WebSocketDisconnect, RuntimeError):
+                connected = False
+
+    session = LiveTranscriptionSession(pipeline_decoder(websocket.app.state.model_pool, model_name, _live_compute_type()), _send,
+                                       window_seconds=settings.live_window_seconds, step_seconds=settings.live_step_seconds)
+    decoding = asyncio.create_task(session.run())
+    ffmpeg = None
+    if encoding == OPUS:
+        ffmpeg = FFmpegAudioDecoder(session.add_audio)
+        await ffmpeg.start()
+    # A PCM sample split across two messages.
+    odd_byte = b''
+    try:
+        while not decoding.done():
+            message = await websocket.receive()
+            if message['type'] == 'websocket.disconnect':
+                connected = False
+                break
+            if message.get('bytes'):
+                if ffmpeg:
+                    await ffmpeg.write(message['bytes'])
+                else:
+                    pcm = odd_byte + message['bytes']
+                    odd_byte = pcm[len(pcm) - len(pcm) % 2:]
+                    session.add_audio(pcm_s16le_to_float32(pcm[:len(pcm) - len(odd_byte)], sample_rate))
+            elif message.get('text') and json.loads(message['text']).get('type') == 'end':
+                break
+        if ffmpeg:
+            await ffmpeg.close()
+        session.end()
+        transcript = await decoding
+        if transcript:
+            gh = GDriveHelper()
+            transcript_gfile_id, local_transcript_path = await gh.upload_transcript_to_gdrive(transcript, transcript_filename=f"{title}.txt")
+            if settings.remove_temp_transcription:
+                local_transcript_path.unlink()
+            await index_transcript(transcript_gfile_id, local_transcript_path.name, transcript)
+            await embed_transcript(transcript_gfile_id, local_transcript_path.name, transcript)
+            await assign_topics(transcript_gfile_id, local_transcript_path.name, transcript)
+            logger.info(f"Live session {title}: {session.final_segments[-1].end:.0f}s of audio, transcript gfile {transcript_gfile_id}.")
+            await _send({'type': 'transcript', 'text': transcript, 'gdrive_id': transcript_gfile_id})
+    except Exception as e: # pylint: disable=broad-exception-caught
+        decoding.cancel()
+        logger.error(f"Live session {title} failed: {e}")
+        if connected:
+            await websocket.close(code=WS_INTERNAL_ERROR, reason="Transcription failed.")
+        return
+    if connected:
+        await websocket.close()
+
+
+app = create_app()
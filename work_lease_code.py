@@ -0,0 +1,278 @@
+###########################################################################################
+# Author: HappyDay Johnson
+# Version: 0.01
+# Date: 2026-10-19
+# Summary: The work_lease module lets several hosts transcribe the files of one folder without doing the same
+# file twice. A worker claims a file by writing itself as the lease owner into the workflow status with
+# a compare-and-set on the file's etag, renews the lease with heartbeats while it works, and releases
+# it when done. Leases that have expired (their worker died) can be claimed by any other worker.
+#
+# License Information: MIT License
+#
+# Copyright (c) 2024 HappyDay Johnson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+###########################################################################################
+
+import asyncio
+import json
+import os
+import socket
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional, Tuple
+
+from logger_code import LoggerBase
+from storage_backend_code import StorageRequestError
+from workflow_states_code import WorkflowEnum
+from workflow_tracker_code import WorkflowTracker
+
+# Drive's answer to a write whose If-Match etag is out of date.
+PRECONDITION_FAILED = 412
+# How often a compare-and-set is retried when the file changed between reading and writing it.
+CAS_ATTEMPTS = 5
+
+
+def default_worker_id() -> str:
+    """
+    Returns an ID for this worker that no other process shares: host name, process ID and a random suffix.
+    """
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+def lease_from_state(state: dict) -> Tuple[Optional[str], Optional[datetime], int]:
+    """
+    Returns the (owner, expiry, version) of the lease in a workflow status.
+    """
+    try:
+        expires_at = state.get('lease_expires_at')
+        return state.get('lease_owner'), datetime.fromisoformat(expires_at) if expires_at else None, int(state.get('lease_version') or 0)
+    except (ValueError, TypeError, AttributeError):
+        return None, None, 0
+
+def parse_lease(description: Optional[str]) -> Tuple[Optional[str], Optional[datetime], int]:
+    """
+    Returns the (owner, expiry, version) of the lease in a file's workflow status (its description).
+    """
+    try:
+        state = json.loads(description or '{}')
+    except ValueError:
+        return None, None, 0
+    return lease_from_state(state if isinstance(state, dict) else {})
+
+
+class LeaseLostError(Exception):
+    """
+    Raised when a worker finds that its lease has expired or been taken over by another worker.
+    """
+
+
+class Lease:
+    """
+    A worker's claim on a file.
+
+    Attributes:
+        gfile_id (str): The file.
+        owner (str): The worker's ID.
+        version (int): The lease version the worker wrote. Another claim of the file increments it.
+        expires_at (datetime): When the lease runs out unless renewed.
+    """
+    __slots__ = ('gfile_id', 'owner', 'version', 'expires_at')
+
+    def __init__(self, gfile_id: str, owner: str, version: int, expires_at: datetime):
+        self.gfile_id = gfile_id
+        self.owner = owner
+        self.version = version
+        self.expires_at = expires_at
+
+    def __repr__(self):
+        return f"Lease({self.gfile_id!r}, owner={self.owner!r}, version={self.version}, expires_at={self.expires_at.isoformat()})"
+
+
+class LeaseManager:
+    """
+    Claims, renews and releases leases on files, stored in the lease fields of their workflow status.
+
+    Every change is a compare-and-set: the description and etag are read, the lease is checked, and the new
+    description is written only if the etag hasn't changed. Of several workers claiming a file at once, one
+    wins. The others see a 412 (or, reading again, the winner's lease) and leave the file alone.
+
+    The status writes of the workflow (GDriveHelper.update_mp3_gfile_status) carry the lease fields of the job's
+    WorkflowTrackerModel, which the manager keeps up to date, so they don't undo the lease. While a lease is held
+    they are compare-and-set too, and dropped once another worker has taken the lease over. The clocks of the
+    hosts should agree to well within ttl_seconds.
+
+    Attributes:
+        owner (str): This worker's ID.
+        ttl_seconds (float): How long a lease lasts without renewal.
+        heartbeat_seconds (float): How often hold() renews a lease. A third of ttl_seconds by default. It must be
+            less than half of ttl_seconds, since hold() gives a lease up a heartbeat before it runs out.
+
+    Raises:
+        ValueError: If heartbeat_seconds isn't less than half of ttl_seconds.
+    """
+    def __init__(self, gh, owner: Optional[str] = None, ttl_seconds: float = 600.0, heartbeat_seconds: Optional[float] = None,
+                 clock: Callable[[], datetime] = _utcnow):
+        self.gh = gh
+        self.owner = owner or default_worker_id()
+        self.ttl_seconds = ttl_seconds
+        self.heartbeat_seconds = heartbeat_seconds or ttl_seconds / 3
+        if self.heartbeat_seconds * 2 >= ttl_seconds:
+            raise ValueError(f"The lease heartbeat ({self.heartbeat_seconds}s) must be less than half the lease TTL ({ttl_seconds}s).")
+        self._clock = clock
+        self.logger = LoggerBase.setup_logger('LeaseManager')
+
+    async def _read(self, gfile_id: str) -> Tuple[dict, str]:
+        metadata = await self.gh.get_file_metadata(gfile_id, ['description', 'etag'])
+        try:
+            state = json.loads(metadata.get('description') or '{}')
+        except ValueError:
+            state = {}
+        return state if isinstance(state, dict) else {}, metadata['etag']
+
+    async def _write(self, gfile_id: str, state: dict, etag: str) -> bool:
+        """
+        Writes the state if the file still has the etag. Returns False if it hasn't.
+        """
+        try:
+            await self.gh.update_metadata_if_match(gfile_id, {'description': json.dumps(state)}, etag)
+            return True
+        except StorageRequestError as e:
+            if e.status_code == PRECONDITION_FAILED:
+                return False
+            raise
+
+    async def try_claim(self, gfile_id: str) -> Optional[Lease]:
+        """
+        Claims a file unless it is transcribed already or another worker's lease on it hasn't expired.
+
+        Returns:
+            Optional[Lease]: The lease, or None if the file isn't this worker's to transcribe.
+        """
+        claimed_version = None
+        for _ in range(CAS_ATTEMPTS):
+            state, etag = await self._read(gfile_id)
+            owner, expires_at, version = lease_from_state(state)
+            now = self._clock()
+            if owner == self.owner and version == claimed_version:
+                # The write went through, but its answer was lost and the request retried.
+                return self._claimed(gfile_id, version, expires_at)
+            if state.get('status') == WorkflowEnum.TRANSCRIPTION_UPLOAD_COMPLETE.name:
+                return None
+            if owner and owner != self.owner and expires_at and expires_at > now:
+                return None
+            if owner and owner != self.owner:
+                self.logger.info(f"Taking over the expired lease of {owner} on gfile {gfile_id}.")
+            claimed_version = version + 1
+            expires_at = now + timedelta(seconds=self.ttl_seconds)
+            state.update(lease_owner=self.owner, lease_expires_at=expires_at.isoformat(), lease_version=claimed_version)
+            if await self._write(gfile_id, state, etag):
+                return self._claimed(gfile_id, claimed_version, expires_at)
+        return None
+
+    def _claimed(self, gfile_id: str, version: int, expires_at: datetime) -> Lease:
+        WorkflowTracker.update(lease_owner=self.owner, lease_expires_at=expires_at, lease_version=version)
+        return Lease(gfile_id, self.owner, version, expires_at)
+
+    async def renew(self, lease: Lease) -> bool:
+        """
+        Extends a lease by ttl_seconds from now.
+
+        Returns:
+            bool: False if the file kept changing between reading and writing it. The lease is unchanged then.
+
+        Raises:
+            LeaseLostError: If another worker holds the lease now.
+        """
+        for _ in range(CAS_ATTEMPTS):
+            state, etag = await self._read(lease.gfile_id)
+            owner, _, version = lease_from_state(state)
+            if owner != self.owner or version != lease.version:
+                raise LeaseLostError(f"{owner} (version {version}) has taken over the lease on gfile {lease.gfile_id}.")
+            expires_at = self._clock() + timedelta(seconds=self.ttl_seconds)
+            # Status writes from now on carry the new expiry.
+            WorkflowTracker.update(lease_expires_at=expires_at)
+            state['lease_expires_at'] = expires_at.isoformat()
+            if await self._write(lease.gfile_id, state, etag):
+                lease.expires_at = expires_at
+                return True
+        return False
+
+    async def release(self, lease: Lease) -> None:
+        """
+        Gives up a lease, so another worker can take the file without waiting for the lease to expire.
+        """
+        WorkflowTracker.update(lease_owner=None, lease_expires_at=None)
+        for _ in range(CAS_ATTEMPTS):
+            state, etag = await self._read(lease.gfile_id)
+            owner, _, version = lease_from_state(state)
+            if owner != self.owner or version != lease.version:
+                return
+            state.update(lease_owner=None, lease_expires_at=None)
+            if await self._write(lease.gfile_id, state, etag):
+                return
+
+    @asynccontextmanager
+    async def hold(self, lease: Lease):
+        """
+        Renews the lease every heartbeat_seconds while the body runs. If the lease is lost (taken over, or not
+        renewed by the time it has a heartbeat left to run), the body is cancelled and LeaseLostError raised. Giving
+        the lease up a heartbeat early means the worker has stopped working on the file by the time another worker
+        can claim it, even if a renewal request is still hanging (e.g. retried after rate limits).
+        """
+        holder = asyncio.current_task()
+        lost: Optional[LeaseLostError] = None
+
+        async def _renew_after_heartbeat() -> bool:
+            await asyncio.sleep(self.heartbeat_seconds)
+            return await self.renew(lease)
+
+        async def _heartbeat():
+            nonlocal lost
+            while lost is None:
+                seconds_to_give_up = (lease.expires_at - self._clock()).total_seconds() - self.heartbeat_seconds
+                if seconds_to_give_up <= 0:
+                    lost = LeaseLostError(f"{lease} could not be renewed and runs out within a heartbeat.")
+                    break
+                try:
+                    if await asyncio.wait_for(_renew_after_heartbeat(), seconds_to_give_up):
+                        continue
+                    self.logger.warning(f"Could not renew {lease}: the file kept changing.")
+                except asyncio.TimeoutError:
+                    self.logger.warning(f"Could not renew {lease} in time.")
+                except LeaseLostError as e:
+                    lost = e
+                except Exception as e: # pylint: disable=broad-exception-caught
+                    self.logger.warning(f"Could not renew {lease}: {e}")
+            holder.cancel()
+
+        heartbeat = asyncio.create_task(_heartbeat())
+        try:
+            yield lease
+        except asyncio.CancelledError:
+            if lost is None:
+                raise
+            holder.uncancel()
+            raise lost from None
+        finally:
+            heartbeat.cancel()
+            await asyncio.gather(heartbeat, return_exceptions=True)
@@ -1,8 +1,13 @@
 
+import asyncio
+import time
 import traceback
 from functools import wraps
 
+from env_settings_code import get_settings
 from logger_code import LoggerBase
+from metrics_code import record_function_call
+from tracing_code import end_span, start_span
 
 
 async def handle_error(error_message: str=None, operation=None, raise_exception=True):
@@ -23,9 +28,19 @@ def async_error_handler(error_message=None, raise_exception=True):
     def decorator(func):
         @wraps(func)
         async def wrapper(*args, **kwargs):
+            # Every decorated function is timed as a pipeline stage (see metrics_code.STAGE_NAMES), and traced as a span.
+            start_time = time.perf_counter()
+            failed = False
+            span = start_span(func.__qualname__)
+            error = None
             try:
                 return await func(*args, **kwargs)
+            except asyncio.CancelledError as e:
+                error = e
+                raise
             except Exception as e:    # pylint: disable=broad-exception-caught
+                failed = True
+                error = e
                 tb_str = traceback.format_exc()
                 evolved_error_message = error_message if error_message else str(e)
                 detailed_error_message = f"{evolved_error_message}\nTraceback:\n{tb_str}"
@@ -38,5 +53,38 @@ def async_error_handler(error_message=None, raise_exception=True):
 
                 if raise_exception:
                     raise e
+            finally:
+                record_function_call(func.__qualname__, time.perf_counter() - start_time, failed)
+                end_span(span, error)
         return wrapper
     return decorator
+
+async def retry_stage(stage: str, func, *args, **kwargs):
+    """
+    Runs a stage of the transcription workflow (an @async_error_handler-decorated coroutine function), trying it again
+    after a failure as the stage's retry policy (the stage_retry_policy setting) allows. Each failure has been logged
+    by the decorator already. Cancellation isn't retried.
+
+    Parameters:
+        stage (str): The name of the stage in stage_retry_policy, e.g. 'download' or 'transcript_write'.
+        func: The coroutine function of the stage, called with args and kwargs.
+
+    Returns:
+        The result of the first successful try.
+
+    Raises:
+        The exception of the last try, once the attempts of the stage are used up.
+    """
+    policy = get_settings().stage_retry_policy.get(stage, {})
+    attempts = max(1, int(policy.get('attempts', 1)))
+    backoff_seconds = float(policy.get('backoff_seconds', 0.0))
+    for attempt in range(1, attempts + 1):
+        try:
+            return await func(*args, **kwargs)
+        except Exception as e:    # pylint: disable=broad-exception-caught
+            if attempt == attempts:
+                raise
+            wait_seconds = backoff_seconds * 2 ** (attempt - 1)
+            LoggerBase.setup_logger('retry_stage').warning(
+                f"The {stage} stage failed (attempt {attempt} of {attempts}): {str(e).splitlines()[0] if str(e) else type(e).__name__}. Trying again in {wait_seconds:.1f}s.")
+            await asyncio.sleep(wait_seconds)
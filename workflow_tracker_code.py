@@ -31,21 +31,21 @@
 # SOFTWARE.
 ###########################################################################################
 
+import contextvars
+from datetime import datetime
 from enum import Enum
 
 from difflib import get_close_matches
 from pathlib import Path
-from typing import Optional, Union
+from typing import Callable, List, Optional, Tuple, Union
 
 from fastapi import UploadFile
 from fastapi.encoders import jsonable_encoder
 
-import torch
-
 from pydantic import BaseModel, field_validator, field_serializer
 
 from logger_code import LoggerBase
-from pydantic_models import GDriveInput
+from pydantic_models import GDriveInput, LocalAudioInput, LocalMP3Input
 
 
 AUDIO_QUALITY_MAP = {
@@ -67,12 +67,21 @@ AUDIO_QUALITY_MAP = {
 
 }
 
+# The torch dtype of each compute type, by name. torch is only imported when a dtype is needed (see torch_dtype()), so
+# the tools that only list files or read the workflow status don't pay for importing it.
 COMPUTE_TYPE_MAP = {
-    "default": torch.float16,
-    "float16": torch.float16,
-    "float32": torch.float32,
+    "default": "float16",
+    "float16": "float16",
+    "float32": "float32",
 }
 
+def torch_dtype(compute_type: str):
+    """
+    Returns the torch dtype of a compute type (a key of COMPUTE_TYPE_MAP), float16 if it isn't one. Imports torch.
+    """
+    import torch # pylint: disable=import-outside-toplevel
+    return getattr(torch, COMPUTE_TYPE_MAP.get(compute_type, "float16"))
+
 
 class WorkflowTrackerModel(BaseModel):
     """
@@ -82,23 +91,46 @@ class WorkflowTrackerModel(BaseModel):
     Attributes:
         transcript_audio_quality (str): Quality setting for audio transcription.
         transcript_compute_type (str): Compute type to be used for transcription.
-        input_mp3 (Optional[Union[UploadFile, GDriveInput]]): The input mp3 file, either uploaded directly or from Google Drive.
+        input_mp3 (Optional[Union[UploadFile, GDriveInput, LocalMP3Input, LocalAudioInput]]): The input mp3 file, either uploaded directly,
+            from Google Drive or already copied to local_mp3_dir, or a local audio or video file decoded into the decode cache.
         mp3_gfile_id (Optional[str]): Google Drive ID for the mp3 file.
         local_mp3_path (Union[Path, None]): Local file system path to the mp3 file.
         status (str): Current status of the transcription workflow.
         comment (Optional[str]): Any additional comments or notes.
         transcript_gdrive_id (str): Google Drive ID for the transcript file.
         local_transcript_path (str): Local file system path to the transcript file.
+        transcript_sha256 (Optional[str]): The SHA-256 of the local transcript file, so a resumed workflow can tell it is intact.
+        upload_progress (Optional[int]): Percent of the current upload to GDrive that has been sent.
+        mp3_sha256 (Optional[str]): The SHA-256 of an uploaded mp3 file, computed while it was copied, or of a decoded local audio file.
+        audio_duration_seconds (Optional[float]): The duration of the mp3 file, read from its frame headers, or of the decoded audio.
+        deadline (Optional[datetime]): When the caller wants the transcript by, if they set a deadline.
+        chosen_model (Optional[str]): The model picked to meet the deadline.
+        predicted_completion (Optional[datetime]): When the transcription is predicted to be done with the chosen model.
+        lease_owner (Optional[str]): The worker that holds the lease on the mp3 file, when several hosts share the folder.
+        lease_expires_at (Optional[datetime]): When the lease runs out unless its owner renews it.
+        lease_version (Optional[int]): Incremented whenever the lease changes owner.
+        topics (Optional[List[Tuple[int, float]]]): The main topics of the transcript in the topic model, as (topic, weight).
     """
     transcript_audio_quality: str = "default"
     transcript_compute_type: str = "default"
-    input_mp3: Optional[Union[UploadFile, GDriveInput]] = None
+    input_mp3: Optional[Union[UploadFile, GDriveInput, LocalMP3Input, LocalAudioInput]] = None
     mp3_gfile_id: Optional[str] = None
     local_mp3_path: Union[Path, None] = None
     status: str = None
     comment: Optional[str] = None
     transcript_gdrive_id: str = None
     local_transcript_path: str = None
+    transcript_sha256: Optional[str] = None
+    upload_progress: Optional[int] = None
+    mp3_sha256: Optional[str] = None
+    audio_duration_seconds: Optional[float] = None
+    deadline: Optional[datetime] = None
+    chosen_model: Optional[str] = None
+    predicted_completion: Optional[datetime] = None
+    lease_owner: Optional[str] = None
+    lease_expires_at: Optional[datetime] = None
+    lease_version: Optional[int] = None
+    topics: Optional[List[Tuple[int, float]]] = None
 
     @field_serializer('input_mp3',when_used='json-unless-none')
     def serialize_input_mp3(self,input_mp3):
@@ -106,8 +138,10 @@ class WorkflowTrackerModel(BaseModel):
             file_info = jsonable_encoder(input_mp3)
         elif isinstance(input_mp3, GDriveInput):
             file_info = input_mp3.gdrive_id
+        elif isinstance(input_mp3, (LocalMP3Input, LocalAudioInput)):
+            file_info = input_mp3.path.name
         else:
-            raise ValueError(" The input_mp3 was neither of type GDriveInput or UploadFile.")
+            raise ValueError(" The input_mp3 was neither of type GDriveInput, LocalMP3Input, LocalAudioInput or UploadFile.")
         return file_info
 
 
@@ -178,40 +212,74 @@ class WorkflowTracker:
     - To ensure consistency across the application, interact with the WorkflowTracker class directly rather than instantiating
       WorkflowTrackerModel objects.
     - Use the class methods provided to update workflow states, retrieve current state information, and manage transcription settings.
+    - To run several jobs at once in one process (e.g. the job service), call start_job() at the start of each job's asyncio
+      task. The job then has its own WorkflowTrackerModel, which the tasks it creates share. Code outside a job keeps using
+      the process-wide model.
     """
     _model = WorkflowTrackerModel()
+    # The model and update listener of the job running in the current context (asyncio task), if any.
+    _job = contextvars.ContextVar('workflow_tracker_job', default=None)
     _logger = LoggerBase.setup_logger('WorkflowTracker')
     DEFAULT_AUDIO_QUALITY_KEY = "distil-large-v2"
     DEFAULT_COMPUTE_TYPE_KEY = "float16"
 
+    @classmethod
+    def start_job(cls, listener: Optional[Callable[[WorkflowTrackerModel, dict], None]] = None, **kwargs) -> WorkflowTrackerModel:
+        """
+        Gives the current context (the asyncio task of a job, and the tasks it creates from then on) its own
+        WorkflowTrackerModel, so concurrent jobs don't overwrite each other's state.
+
+        Parameters:
+            listener (Callable): Optional. Called with the model and the updated fields after every update.
+            kwargs: Initial values of the model's fields.
+
+        Returns:
+            WorkflowTrackerModel: The job's model.
+        """
+        model = WorkflowTrackerModel(**kwargs)
+        cls._job.set((model, listener))
+        return model
+
+    @classmethod
+    def _current(cls):
+        job = cls._job.get()
+        return job if job is not None else (cls._model, None)
+
     @classmethod
     def update(cls, **kwargs):
+        model, listener = cls._current()
+        updated = {}
         for key, value in kwargs.items():
             if isinstance(value, Enum):
                 # Assuming you want to use the first value in the tuple for the enum
                 actual_value = value.value[0]  # Adjust this as needed
             else:
                 actual_value = value
-            if hasattr(cls._model, key):
-                setattr(cls._model, key, actual_value)
+            if hasattr(model, key):
+                setattr(model, key, actual_value)
+                updated[key] = actual_value
             else:
                 real_field_name = cls.get_similar_field_name(key)
                 if real_field_name:
-                    setattr(cls._model, real_field_name, actual_value)
+                    setattr(model, real_field_name, actual_value)
+                    updated[real_field_name] = actual_value
                     cls._logger.info(f"Updated similar field name: {real_field_name} for entered key: {key}")
                 else:
                     raise ValueError(f"{key} is not a property of WorkflowTrackerModel and no similar field found.")
+        if listener:
+            listener(model, updated)
 
 
     @classmethod
     def get(cls, field_name):
-        if hasattr(cls._model, field_name):
-            return getattr(cls._model, field_name, None)
+        model, _ = cls._current()
+        if hasattr(model, field_name):
+            return getattr(model, field_name, None)
         else:
             real_field_name = cls.get_similar_field_name(field_name)
             if real_field_name:
                 cls._logger.info(f"Entered field name: {field_name}. Returning similar WorkflowTrackerModel property: {real_field_name}")
-                return getattr(cls._model, real_field_name, None)
+                return getattr(model, real_field_name, None)
             else:
                 raise ValueError(f"{field_name} is not a property of WorkflowTrackerModel and no similar field found.")
 
@@ -271,8 +339,9 @@ class WorkflowTracker:
     @classmethod
     def __call__(cls, **kwargs):
         cls.update(**kwargs)
-        return cls._model
+        return cls.get_model()
 
     @classmethod
     def get_model(cls):
-        return cls._model
+        model, _ = cls._current()
+        return model